@@ -0,0 +1,30 @@
+"""add target range and config hash to timing_signal
+
+Revision ID: 0003_timing_signal_targets
+Revises: 0002_signal_config
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_timing_signal_targets"
+down_revision = "0002_signal_config"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("timing_signal", sa.Column("target_price_low", sa.Float(), nullable=True))
+    op.add_column("timing_signal", sa.Column("target_price_high", sa.Float(), nullable=True))
+    op.add_column("timing_signal", sa.Column("target_price_basis", sa.JSON(), nullable=True))
+    op.add_column("timing_signal", sa.Column("config_hash", sa.String(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("timing_signal", "config_hash")
+    op.drop_column("timing_signal", "target_price_basis")
+    op.drop_column("timing_signal", "target_price_high")
+    op.drop_column("timing_signal", "target_price_low")
@@ -34,6 +34,11 @@ class Settings(BaseSettings):
     DART_API_KEY: str | None = None
     ECOS_API_KEY: str | None = None
 
+    # API caches: "memory" (per process) or "redis" (shared across workers, needs REDIS_URL)
+    CACHE_BACKEND: str = "memory"
+    REDIS_URL: str | None = None
+    CACHE_KEY_PREFIX: str = "stockmanager:cache"
+
     GCS_BUCKET: str | None = None
     GOOGLE_API_KEY: str | None = None
     LOG_LEVEL: str = "INFO"
@@ -57,13 +57,16 @@ def _auto_ingest_prices():
         from ingest.db import SessionLocal
         from sqlalchemy import text
         from ingest.kis_loader import update_kis_prices_task
+        from ingest.trading_calendar import get_trading_calendar
 
         today = dt_date.today()
+        # Weekends/holidays: the latest session is the last trading day, so nothing to do.
+        expected = get_trading_calendar().latest_session(today)
         with SessionLocal() as db:
             latest = db.execute(text("SELECT MAX(trade_date) FROM price_daily")).scalar()
 
-        if latest is None or latest < today:
-            print(f"Auto-ingest: price_daily 최신일 {latest} -> {today} 갱신 시작")
+        if latest is None or (expected is not None and latest < expected):
+            print(f"Auto-ingest: price_daily 최신일 {latest} -> {expected} 갱신 시작")
             update_kis_prices_task(limit=None)
         else:
             print(f"Auto-ingest: price_daily 최신일 {latest} (스킵)")
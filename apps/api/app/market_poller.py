@@ -0,0 +1,147 @@
+"""
+Market data poller.
+
+Separate long-running process that refreshes the market snapshots read by
+app.routers.market (indices, breadth, volume rankings, investor trends, index
+charts). It is the only place that calls KIS / FinanceDataReader for those
+endpoints. Each job records its last run in market_poller_health, which
+GET /market/poller/health reports.
+
+    cd apps/api && python -m app.market_poller            # run forever
+    cd apps/api && python -m app.market_poller --once     # one pass of every job
+    cd apps/api && python -m app.market_poller --only indices breadth --once
+"""
+import argparse
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from .services import market_snapshots as ms
+
+
+@dataclass
+class PollJob:
+    name: str
+    interval_sec: int
+    run: Callable[[Session], None]
+    next_run_at: float = 0.0
+
+
+def _refresh_indices(db: Session) -> None:
+    payload = ms.compute_indices(db)
+    if not payload or not any(ms.has_numeric_value(item.get("value")) for item in payload):
+        raise RuntimeError("no index values from FDR/KIS/DB")
+    ms.save_snapshot(db, "market_index_snapshot", payload)
+
+
+def _refresh_breadth(db: Session) -> None:
+    snapshot, _, _ = ms.compute_market_breadth(db)
+    if not snapshot:
+        raise RuntimeError("price_daily has no sessions")
+    ms.save_breadth_snapshot(db, snapshot)
+
+
+def _refresh_popular(db: Session) -> None:
+    payload = ms.compute_volume_rank(db, 12, include_volume=False)
+    if payload:
+        ms.save_snapshot(db, "market_popular_snapshot", payload)
+
+
+def _refresh_popular_all(db: Session) -> None:
+    payload = ms.compute_volume_rank(db, 50, include_volume=True)
+    if payload:
+        ms.save_keyed_snapshot(db, "popular_all", payload)
+
+
+def _refresh_investor_trends(db: Session) -> None:
+    payload = ms.compute_investor_trends()
+    if not payload:
+        raise RuntimeError("KIS investor trend returned no rows")
+    ms.save_keyed_snapshot(db, "investor_trends", payload)
+
+
+def _refresh_charts(interval: str, compute: Callable[[str], list[dict]]) -> Callable[[Session], None]:
+    def run(db: Session) -> None:
+        failed = []
+        for market, code in ms.MARKET_CODES.items():
+            try:
+                rows = compute(code)
+            except Exception as exc:
+                print(f"[market_poller] chart {market}:{interval} failed: {exc}")
+                rows = []
+            if rows:
+                ms.save_keyed_snapshot(db, ms.chart_key(market, interval), rows)
+            else:
+                failed.append(market)
+        if failed:
+            raise RuntimeError(f"no {interval} chart rows for {', '.join(failed)}")
+    return run
+
+
+def build_jobs() -> list[PollJob]:
+    return [
+        PollJob("indices", 60, _refresh_indices),
+        PollJob("breadth", 300, _refresh_breadth),
+        PollJob("popular", 60, _refresh_popular),
+        PollJob("popular_all", 300, _refresh_popular_all),
+        PollJob("investor_trends", 300, _refresh_investor_trends),
+        PollJob("index_chart_1m", 60, _refresh_charts("1m", ms.compute_index_chart_intraday)),
+        PollJob("index_chart_1d", 1800, _refresh_charts("1d", ms.compute_index_chart_daily)),
+    ]
+
+
+def run_job(job: PollJob, poller_id: str) -> bool:
+    db = SessionLocal()
+    started = time.time()
+    try:
+        ms.ensure_snapshot_tables(db)
+        ms.record_job_start(db, job.name, job.interval_sec, poller_id)
+        try:
+            job.run(db)
+        except Exception as exc:
+            db.rollback()
+            ms.record_job_result(db, job.name, int((time.time() - started) * 1000), error=str(exc) or type(exc).__name__)
+            print(f"[market_poller] {job.name} failed: {exc}")
+            return False
+        ms.record_job_result(db, job.name, int((time.time() - started) * 1000))
+        return True
+    finally:
+        db.close()
+
+
+def run_forever(jobs: list[PollJob], once: bool = False, tick_sec: float = 1.0) -> None:
+    poller_id = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"[market_poller] {poller_id} jobs={[j.name for j in jobs]}")
+    while True:
+        now = time.time()
+        for job in jobs:
+            if job.next_run_at > now:
+                continue
+            started = time.time()
+            ok = run_job(job, poller_id)
+            print(f"[market_poller] {job.name} {'ok' if ok else 'error'} ({time.time() - started:.2f}s)")
+            job.next_run_at = time.time() + job.interval_sec
+        if once:
+            return
+        next_due = min(job.next_run_at for job in jobs)
+        time.sleep(max(tick_sec, next_due - time.time()))
+
+
+def main():
+    jobs = build_jobs()
+    parser = argparse.ArgumentParser(description="Refresh market snapshots on a schedule.")
+    parser.add_argument("--once", action="store_true", help="run every job once and exit")
+    parser.add_argument("--only", nargs="+", choices=[j.name for j in jobs], help="run only these jobs")
+    args = parser.parse_args()
+    if args.only:
+        jobs = [j for j in jobs if j.name in args.only]
+    run_forever(jobs, once=args.once)
+
+
+if __name__ == "__main__":
+    main()
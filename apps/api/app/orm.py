@@ -114,6 +114,11 @@ class TimingSignalRow(Base):
     triggers: Mapped[list | None] = mapped_column(JSON, nullable=True)
     risk_flags: Mapped[list | None] = mapped_column(JSON, nullable=True)
     model_version: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    target_price_low: Mapped[float | None] = mapped_column(Float, nullable=True)
+    target_price_high: Mapped[float | None] = mapped_column(Float, nullable=True)
+    target_price_basis: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # signal_config_hash() of the config the row was computed with (NULL: legacy rows)
+    config_hash: Mapped[str | None] = mapped_column(String(16), nullable=True)
 
     __table_args__ = (Index("idx_signal_lookup", "ticker", "horizon", "ts"),)
 
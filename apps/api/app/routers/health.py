@@ -1,8 +1,16 @@
 from fastapi import APIRouter
 
+from app.services.cache import cache_stats
+
 router = APIRouter(tags=["Health"])
 
 
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@router.get("/health/cache")
+def health_cache():
+    """Per-cache size and hit/stale/miss/load counters for this worker process."""
+    return {"caches": cache_stats()}
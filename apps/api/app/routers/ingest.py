@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 import sys
 import os
@@ -23,7 +24,9 @@ TASK_STATUS = {
     "mapping": "IDLE",
     "dart": "IDLE",
     "ecos": "IDLE",
-    "dart_financials": "IDLE"
+    "dart_financials": "IDLE",
+    "backfill": "IDLE",
+    "classifications": "IDLE",
 }
 
 TASK_PROGRESS = {
@@ -32,6 +35,8 @@ TASK_PROGRESS = {
     "dart": {"processed": 0, "total": None},
     "ecos": {"processed": 0, "total": None},
     "dart_financials": {"processed": 0, "total": None},
+    "backfill": {"processed": 0, "total": None},
+    "classifications": {"processed": 0, "total": None},
 }
 
 JOB_TABLES = {
@@ -39,7 +44,8 @@ JOB_TABLES = {
     "mapping": "price_daily",
     "dart": "dart_filing",
     "ecos": "macro_series",
-    "dart_financials": "financial_statement"
+    "dart_financials": "financial_statement",
+    "classifications": "security_classification",
 }
 
 def update_status(job_id: str, status: str):
@@ -207,7 +213,8 @@ def get_ingest_status():
         "mapping": "SELECT count(*) FROM price_daily",
         "dart": "SELECT count(*) FROM dart_filing",
         "ecos": "SELECT count(*) FROM macro_series",
-        "dart_financials": "SELECT count(*) FROM financial_statement"
+        "dart_financials": "SELECT count(*) FROM financial_statement",
+        "classifications": "SELECT count(*) FROM security_classification WHERE effective_to IS NULL",
     }
     last_time_queries = {
         "krx": [
@@ -228,6 +235,9 @@ def get_ingest_status():
         "dart_financials": [
             "SELECT MAX(created_at) FROM financial_statement",
             "SELECT MAX(announced_at) FROM financial_statement"
+        ],
+        "classifications": [
+            "SELECT MAX(created_at) FROM security_classification"
         ]
     }
     
@@ -297,9 +307,59 @@ def get_ingest_status():
                 processed_count=TASK_PROGRESS.get(job_id, {}).get("processed") if is_running else None,
                 total_count=TASK_PROGRESS.get(job_id, {}).get("total") if is_running else None,
             ))
-                
+
+    backfill_status = _get_backfill_status()
+    if backfill_status:
+        results.append(backfill_status)
+
     return GetStatusResponse(jobs=results)
 
+def _get_backfill_status() -> JobStatus | None:
+    """Progress of the latest resumable price backfill job (backfill_work_item checkpoints)."""
+    from ingest.db import SessionLocal
+    from ingest import work_queue
+    from ingest.price_backfill_job import JOB_TYPE
+
+    try:
+        with SessionLocal() as db:
+            progress = work_queue.job_progress(db, job_type=JOB_TYPE)
+    except Exception:
+        return None
+    if not progress:
+        return None
+
+    is_running = TASK_STATUS.get("backfill") == "RUNNING" or (
+        progress["status"] == "RUNNING" and progress["leased"] > 0
+    )
+    last_time = progress["last_activity"] or progress["updated_at"]
+    if is_running:
+        status = "RUNNING"
+    elif progress["status"] == "RUNNING":
+        status = "PAUSED"
+    else:
+        status = "SUCCESS" if progress["status"] == "DONE" else progress["status"]
+    return JobStatus(
+        id="backfill",
+        row_count=int(progress["rows_written"] or 0),
+        last_updated=last_time.isoformat() if last_time else None,
+        status=status,
+        last_result_status=progress["status"],
+        is_running=is_running,
+        message=(
+            f"job {progress['job_id']}: {progress['done']}/{progress['total']} done, "
+            f"{progress['pending']} pending, {progress['failed']} failed"
+        ),
+        processed_count=progress["done"],
+        total_count=progress["total"],
+    )
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_ingest_metrics():
+    """Ingest client counters (KIS token cache etc.) in Prometheus text format."""
+    from ingest import metrics
+
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @router.post("/trigger/{job_id}", response_model=IngestResponse)
 def trigger_ingest_job(job_id: str, background_tasks: BackgroundTasks):
 
@@ -313,13 +373,25 @@ def trigger_ingest_job(job_id: str, background_tasks: BackgroundTasks):
         from ingest.dart_loader import fetch_and_save_dart_filings
         background_tasks.add_task(wrapped_task, fetch_and_save_dart_filings, "dart")
         return IngestResponse(task_id=job_id, status="accepted", message="DART Filings Ingest started.")
+    elif job_id == "dart_filings_full":
+        from ingest.dart_loader import fetch_and_save_dart_filings
+        background_tasks.add_task(wrapped_task, fetch_and_save_dart_filings, "dart", full=True)
+        return IngestResponse(task_id=job_id, status="accepted", message="DART Filings full sweep started.")
     elif job_id in ["ecos_series", "ecos"]:
         from ingest.ecos_loader import fetch_and_save_ecos_series
         background_tasks.add_task(wrapped_task, fetch_and_save_ecos_series, "ecos")
         return IngestResponse(task_id=job_id, status="accepted", message="ECOS Series Ingest started.")
+    elif job_id in ["kis_backfill", "backfill"]:
+        from ingest.price_backfill_job import resume_or_start_price_backfill
+        background_tasks.add_task(wrapped_task, resume_or_start_price_backfill, "backfill")
+        return IngestResponse(task_id=job_id, status="accepted", message="KIS Price Backfill started (resumes unfinished job).")
     elif job_id in ["dart_financials"]:
         from ingest.dart_financials_loader import fetch_and_save_company_financials
         background_tasks.add_task(wrapped_task, fetch_and_save_company_financials, "dart_financials")
         return IngestResponse(task_id=job_id, status="accepted", message="DART Financials Ingest started.")
+    elif job_id in ["naver_classifications", "classifications"]:
+        from ingest.naver_classification_sync import sync_naver_classifications
+        background_tasks.add_task(wrapped_task, sync_naver_classifications, "classifications")
+        return IngestResponse(task_id=job_id, status="accepted", message="Naver industry/theme membership sync started.")
     else:
         raise HTTPException(status_code=404, detail=f"Job {job_id} not implemented.")
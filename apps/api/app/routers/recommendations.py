@@ -14,6 +14,7 @@ from ..auth import get_current_user
 from ..config import settings
 from ..db import get_db
 from ..orm import RecommendationRow
+from ..services.target_range import _to_float, compute_target_ranges, latest_fs_ratios
 
 ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
 if ROOT_PATH not in sys.path:
@@ -25,84 +26,6 @@ if WORKER_PATH not in sys.path:
 router = APIRouter(tags=["Recommendations"])
 
 
-def _to_float(value: object | None) -> float | None:
-    if value is None:
-        return None
-    try:
-        return float(value)
-    except (TypeError, ValueError):
-        return None
-
-
-def _round_price(value: float) -> int:
-    return int(round(value / 10.0) * 10)
-
-
-def _compute_target_range(series: list[tuple], roe: float | None, debt_ratio: float | None):
-    if not series:
-        return None, None, None
-    series_sorted = sorted(series, key=lambda x: x[0])
-    closes = [_to_float(row[4]) for row in series_sorted]
-    closes = [value for value in closes if value is not None]
-    if not closes:
-        return None, None, None
-    latest_close = closes[-1]
-    if latest_close <= 0:
-        return None, None, None
-
-    trs: list[float] = []
-    prev_close = None
-    for trade_date, open_p, high_p, low_p, close_p in series_sorted:
-        close_val = _to_float(close_p)
-        if close_val is None:
-            continue
-        high_val = _to_float(high_p) if high_p is not None else close_val
-        low_val = _to_float(low_p) if low_p is not None else close_val
-        if high_val is None or low_val is None:
-            continue
-        if prev_close is None:
-            tr = high_val - low_val
-        else:
-            tr = max(
-                high_val - low_val,
-                abs(high_val - prev_close),
-                abs(low_val - prev_close),
-            )
-        trs.append(tr)
-        prev_close = close_val
-
-    if not trs:
-        return None, None, None
-    lookback = min(14, len(trs))
-    atr = sum(trs[-lookback:]) / lookback if lookback else 0.0
-    if atr <= 0:
-        return None, None, None
-
-    tech_low = latest_close - (atr * 1.5)
-    tech_high = latest_close + (atr * 2.0)
-
-    factor = 1.0
-    if roe is not None:
-        if roe >= 15:
-            factor += 0.1
-        elif roe <= 5:
-            factor -= 0.1
-    if debt_ratio is not None:
-        if debt_ratio >= 200:
-            factor -= 0.1
-        elif debt_ratio <= 100:
-            factor += 0.05
-    factor = max(0.7, min(1.3, factor))
-
-    low = latest_close - (latest_close - tech_low) * factor
-    high = latest_close + (tech_high - latest_close) * factor
-    return _round_price(low), _round_price(high), {
-        "basis": "mixed_atr_roe_debt",
-        "atr": round(atr, 2),
-        "factor": round(factor, 2),
-    }
-
-
 def _build_price_series(series: list[tuple]) -> list[dict[str, object]]:
     if not series:
         return []
@@ -317,35 +240,17 @@ def get_recommendations(
                 (row.trade_date, row.open, row.high, row.low, row.close)
             )
 
-    ratio_map: dict[int, tuple] = {}
-    if company_ids:
-        ratio_rows = db.execute(
-            text(
-                """
-                SELECT DISTINCT ON (company_id)
-                    company_id,
-                    roe,
-                    debt_ratio
-                FROM fs_ratio_mart
-                WHERE company_id = ANY(:company_ids)
-                ORDER BY company_id, fiscal_year DESC, fiscal_quarter DESC
-                """
-            ),
-            {"company_ids": company_ids},
-        ).fetchall()
-        ratio_map = {row.company_id: (row.roe, row.debt_ratio) for row in ratio_rows}
+    ratio_map = latest_fs_ratios(db, company_ids)
 
     items = []
     try:
+        targets = compute_target_ranges(
+            {r.ticker: price_map.get(r.ticker, []) for r in rows},
+            {r.ticker: ratio_map[r.company_id] for r in rows if r.company_id in ratio_map},
+        )
         for r in rows:
-            roe = None
-            debt_ratio = None
-            if r.company_id is not None and r.company_id in ratio_map:
-                roe_raw, debt_raw = ratio_map[r.company_id]
-                roe = _to_float(roe_raw)
-                debt_ratio = _to_float(debt_raw)
             series = price_map.get(r.ticker, [])
-            low, high, basis = _compute_target_range(series, roe, debt_ratio)
+            low, high, basis = targets[r.ticker]
             price_series = _build_price_series(series)
             current_price = price_series[-1]["close"] if price_series else None
             items.append(
@@ -0,0 +1,426 @@
+"""
+TTL cache shared by routers and scrapers.
+
+- per-key TTL, plus an optional stale window in which the old value is
+  served while one background thread refreshes it (stale-while-revalidate)
+- single-flight: concurrent get_or_load() calls on a cold key run the loader
+  once; the other callers wait for that result (or its exception)
+- max_entries with LRU eviction
+- hit/stale/miss/load/eviction counters via ingest.metrics (served at
+  /ingest/metrics) and stats() for JSON views
+
+Entries live in a backend. InProcessBackend (default) is a per-process LRU
+dict. With CACHE_BACKEND=redis and REDIS_URL set, shared caches use
+RedisBackend instead, so every uvicorn worker sees the same entries, cold
+keys are loaded by one worker (a SET NX lock) and values survive restarts.
+Redis values must be JSON-serializable; eviction there is left to the
+server's maxmemory policy, and Redis errors degrade to cache misses.
+
+    _THEMES = get_cache("naver_themes", ttl_sec=900, stale_ttl_sec=3600)
+    themes = _THEMES.get_or_load(("themes", pages), lambda: scrape(pages))
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../../../services/ingest"))
+
+from ingest import metrics
+
+from app.config import settings
+
+metrics.describe("api_cache_requests_total", "API cache lookups by result (hit, stale, miss).")
+metrics.describe("api_cache_loads_total", "API cache loader runs by outcome.")
+metrics.describe("api_cache_evictions_total", "API cache LRU evictions.")
+metrics.describe("api_cache_load_seconds", "API cache loader latency.")
+metrics.describe("api_cache_backend_errors_total", "Shared cache backend errors (treated as misses).")
+
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+_CACHES: dict[str, "TTLCache"] = {}
+_CACHES_LOCK = threading.Lock()
+
+# How long a worker that lost the cross-process load lock waits for the winner.
+LOCK_WAIT_SEC = 10.0
+LOCK_POLL_SEC = 0.05
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+class _Flight:
+    """One in-progress load; waiters block on `done` and read value/error."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: BaseException | None = None
+
+
+class CacheBackend(ABC):
+    """Storage for one named cache. Keys are hashable; entries carry their own expiry."""
+
+    shared = False
+
+    @abstractmethod
+    def get(self, key: Hashable) -> _Entry | None: ...
+
+    @abstractmethod
+    def set(self, key: Hashable, entry: _Entry) -> int:
+        """Store entry; returns how many entries were evicted to make room."""
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def size(self) -> int: ...
+
+    def try_lock(self, key: Hashable, ttl_sec: float) -> str | None:
+        """Cross-process load lock. Returns a token, or None if another process holds it."""
+        return "local"
+
+    def unlock(self, key: Hashable, token: str) -> None:
+        pass
+
+
+class InProcessBackend(CacheBackend):
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Entries as JSON strings under "<prefix>:<cache name>:<json key>", with a
+    server-side expiry at the end of the stale window.
+    """
+
+    shared = True
+
+    def __init__(self, client, namespace: str, prefix: str | None = None):
+        self.client = client
+        self.namespace = f"{prefix or settings.CACHE_KEY_PREFIX}:{namespace}"
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{json.dumps(key, ensure_ascii=False, default=str)}"
+
+    def _error(self, op: str, exc: Exception) -> None:
+        metrics.inc("api_cache_backend_errors_total", backend="redis", op=op)
+        print(f"Cache backend error ({self.namespace} {op}): {exc}")
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception as exc:
+            self._error("get", exc)
+            return None
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return _Entry(data["v"], data["f"], data["s"])
+
+    def set(self, key, entry):
+        ttl_ms = int((entry.stale_until - time.time()) * 1000)
+        if ttl_ms <= 0:
+            return 0
+        try:
+            # A value that is not JSON-serializable is simply not cached.
+            payload = json.dumps({"v": entry.value, "f": entry.fresh_until, "s": entry.stale_until}, ensure_ascii=False)
+            self.client.set(self._key(key), payload, px=ttl_ms)
+        except Exception as exc:
+            self._error("set", exc)
+        return 0
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except Exception as exc:
+            self._error("delete", exc)
+
+    def _scan(self) -> list[str]:
+        keys = self.client.scan_iter(match=f"{self.namespace}:*", count=500)
+        return [k.decode() if isinstance(k, bytes) else k for k in keys]
+
+    def clear(self):
+        try:
+            keys = self._scan()
+            if keys:
+                self.client.delete(*keys)
+        except Exception as exc:
+            self._error("clear", exc)
+
+    def size(self):
+        try:
+            return sum(1 for key in self._scan() if not key.endswith(":lock"))
+        except Exception as exc:
+            self._error("size", exc)
+            return 0
+
+    def try_lock(self, key, ttl_sec):
+        token = uuid.uuid4().hex
+        try:
+            acquired = self.client.set(self._key(key) + ":lock", token, nx=True, px=max(1, int(ttl_sec * 1000)))
+        except Exception as exc:
+            self._error("lock", exc)
+            return token  # no shared lock available; load locally
+        return token if acquired else None
+
+    def unlock(self, key, token):
+        lock_key = self._key(key) + ":lock"
+        try:
+            current = self.client.get(lock_key)
+            if current is not None and (current.decode() if isinstance(current, bytes) else current) == token:
+                self.client.delete(lock_key)
+        except Exception as exc:
+            self._error("unlock", exc)
+
+
+class TTLCache:
+    def __init__(
+        self,
+        name: str,
+        ttl_sec: float,
+        stale_ttl_sec: float = 0,
+        max_entries: int = 256,
+        backend: CacheBackend | None = None,
+    ):
+        self.name = name
+        self.ttl_sec = ttl_sec
+        self.stale_ttl_sec = stale_ttl_sec
+        self.max_entries = max_entries
+        self.backend = backend or InProcessBackend(max_entries)
+        self._flights: dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "loads": 0, "load_errors": 0, "evictions": 0}
+
+    # ------------------------------------------------------------ plain access
+
+    def get(self, key: Hashable, default=None, allow_stale: bool = True):
+        entry = self.backend.get(key)
+        now = time.time()
+        if entry is None or now >= entry.stale_until or (not allow_stale and now >= entry.fresh_until):
+            return default
+        return entry.value
+
+    def set(self, key: Hashable, value, ttl_sec: float | None = None, stale_ttl_sec: float | None = None) -> None:
+        ttl = self.ttl_sec if ttl_sec is None else ttl_sec
+        stale = self.stale_ttl_sec if stale_ttl_sec is None else stale_ttl_sec
+        now = time.time()
+        evicted = self.backend.set(key, _Entry(value, now + ttl, now + ttl + stale))
+        if evicted:
+            with self._lock:
+                self._stats["evictions"] += evicted
+            metrics.inc("api_cache_evictions_total", evicted, cache=self.name)
+
+    def invalidate(self, key: Hashable) -> None:
+        self.backend.delete(key)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def __len__(self) -> int:
+        return self.backend.size()
+
+    # ------------------------------------------------------------ loading
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        ttl_sec: float | None = None,
+        stale_ttl_sec: float | None = None,
+        cache_empty: bool = False,
+        serve_stale: bool = True,
+    ):
+        """
+        Fresh value -> returned as is. Stale value -> returned, and one
+        background refresh is started. Missing -> the loader runs once for all
+        concurrent callers; its exception propagates to each of them.
+        Falsy results are returned but not stored unless cache_empty is set.
+        With serve_stale=False a stale entry counts as a miss; the loader can
+        still read it with get() (e.g. for conditional-request validators).
+        """
+        entry = self.backend.get(key)
+        now = time.time()
+        with self._lock:
+            if entry is not None and (now < entry.fresh_until or (serve_stale and now < entry.stale_until)):
+                if now < entry.fresh_until:
+                    self._count("hits", "hit")
+                    return entry.value
+                self._count("stale_hits", "stale")
+                if key not in self._flights:
+                    self._flights[key] = _Flight()
+                    _REFRESH_POOL.submit(self._load, key, loader, ttl_sec, stale_ttl_sec, cache_empty)
+                return entry.value
+
+            self._count("misses", "miss")
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            self._load(key, loader, ttl_sec, stale_ttl_sec, cache_empty)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _wait_for_peer(self, key: Hashable):
+        """Another process holds the load lock: poll the backend for its result."""
+        deadline = time.time() + LOCK_WAIT_SEC
+        while time.time() < deadline:
+            time.sleep(LOCK_POLL_SEC)
+            entry = self.backend.get(key)
+            if entry is not None and time.time() < entry.fresh_until:
+                return entry
+        return None
+
+    def _load(self, key, loader, ttl_sec, stale_ttl_sec, cache_empty) -> None:
+        with self._lock:
+            flight = self._flights[key]
+        started = time.time()
+        token = None
+        try:
+            token = self.backend.try_lock(key, LOCK_WAIT_SEC)
+            if token is None:
+                # Another worker is loading this key; use its result unless it takes too long.
+                peer = self._wait_for_peer(key)
+                if peer is not None:
+                    flight.value = peer.value
+                    return
+            value = loader()
+        except BaseException as exc:
+            flight.error = exc
+            with self._lock:
+                self._stats["load_errors"] += 1
+            metrics.inc("api_cache_loads_total", cache=self.name, outcome="error")
+        else:
+            flight.value = value
+            if value or cache_empty:
+                self.set(key, value, ttl_sec=ttl_sec, stale_ttl_sec=stale_ttl_sec)
+            with self._lock:
+                self._stats["loads"] += 1
+            metrics.inc("api_cache_loads_total", cache=self.name, outcome="ok")
+        finally:
+            if token is not None:
+                self.backend.unlock(key, token)
+            metrics.observe("api_cache_load_seconds", time.time() - started, cache=self.name)
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _count(self, stat: str, result: str) -> None:
+        # Caller holds self._lock.
+        self._stats[stat] += 1
+        metrics.inc("api_cache_requests_total", cache=self.name, result=result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            "name": self.name,
+            "backend": "redis" if self.backend.shared else "memory",
+            "size": self.backend.size(),
+            "max_entries": self.max_entries,
+            **stats,
+        }
+
+
+_redis_client = None
+
+
+def _get_redis_client():
+    """Shared redis client for CACHE_BACKEND=redis, or None (logged) if unavailable."""
+    global _redis_client
+    if _redis_client is None:
+        if not settings.REDIS_URL:
+            print("CACHE_BACKEND=redis but REDIS_URL is not set; using in-process caches.")
+            return None
+        try:
+            import redis
+        except ImportError:
+            print("CACHE_BACKEND=redis but the redis package is not installed; using in-process caches.")
+            return None
+        _redis_client = redis.Redis.from_url(
+            settings.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5, health_check_interval=30
+        )
+    return _redis_client
+
+
+def _make_backend(name: str, max_entries: int, shared: bool) -> CacheBackend:
+    if shared and settings.CACHE_BACKEND.lower() == "redis":
+        client = _get_redis_client()
+        if client is not None:
+            return RedisBackend(client, name)
+    return InProcessBackend(max_entries)
+
+
+def get_cache(
+    name: str,
+    ttl_sec: float,
+    stale_ttl_sec: float = 0,
+    max_entries: int = 256,
+    shared: bool = True,
+) -> TTLCache:
+    """
+    Named cache registry; the first call for a name fixes its settings.
+    shared=False keeps a cache in-process even when CACHE_BACKEND=redis
+    (for values that are not JSON-serializable or only make sense locally).
+    """
+    with _CACHES_LOCK:
+        cache = _CACHES.get(name)
+        if cache is None:
+            backend = _make_backend(name, max_entries, shared)
+            cache = _CACHES[name] = TTLCache(name, ttl_sec, stale_ttl_sec, max_entries, backend=backend)
+        return cache
+
+
+def cache_stats() -> list[dict]:
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    return [cache.stats() for cache in caches]
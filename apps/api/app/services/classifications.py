@@ -0,0 +1,103 @@
+"""
+Industry / theme membership lookups against security_classification.
+
+Memberships are written by the ingest task naver_classifications
+(ingest.naver_classification_sync). Until that task has run once for a
+taxonomy, callers fall back to scraping the Naver member pages live.
+"""
+import os
+import sys
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../../../services/ingest"))
+
+from ingest.naver_classification_sync import INDUSTRY_TAXONOMY, THEME_TAXONOMY
+
+from app.services import scrapers
+from app.services.cache import get_cache
+
+_SYNCED = get_cache("classification_synced", ttl_sec=300, max_entries=16)
+
+
+def split_names(value: str | None) -> list[str]:
+    if not value:
+        return []
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def taxonomy_synced(db: Session, taxonomy_id: str) -> bool:
+    def load():
+        return bool(db.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM security_classification
+                WHERE taxonomy_id = :tid AND effective_to IS NULL
+            )
+        """), {"tid": taxonomy_id}).scalar())
+
+    return _SYNCED.get_or_load(taxonomy_id, load)
+
+
+def members_by_names(db: Session, taxonomy_id: str, names: list[str], as_of: date | None = None) -> dict[str, str]:
+    """
+    {ticker: node name} for the given node names. A ticker in several of the
+    nodes maps to the first one in `names`. With as_of, memberships effective
+    on that date; otherwise the open ones.
+    """
+    if not names:
+        return {}
+    if as_of is None:
+        effective = "sc.effective_to IS NULL"
+    else:
+        effective = (
+            "(sc.effective_from IS NULL OR sc.effective_from <= :as_of) "
+            "AND (sc.effective_to IS NULL OR sc.effective_to >= :as_of)"
+        )
+    rows = db.execute(text(f"""
+        SELECT sc.ticker, n.name
+        FROM classification_node n
+        JOIN security_classification sc
+          ON sc.taxonomy_id = n.taxonomy_id AND sc.code = n.code
+        WHERE n.taxonomy_id = :tid
+          AND n.name = ANY(:names)
+          AND {effective}
+        ORDER BY array_position(CAST(:names AS TEXT[]), n.name), sc.ticker
+    """), {"tid": taxonomy_id, "names": names, "as_of": as_of}).fetchall()
+    members: dict[str, str] = {}
+    for row in rows:
+        members.setdefault(row.ticker, row.name)
+    return members
+
+
+def _scrape_members(taxonomy_id: str, names: list[str]) -> dict[str, str]:
+    if taxonomy_id == INDUSTRY_TAXONOMY:
+        link_by_name, fetch = scrapers.get_industry_link_by_name, scrapers.get_naver_industry_members
+    else:
+        link_by_name, fetch = scrapers.get_theme_link_by_name, scrapers.get_naver_theme_members
+    members: dict[str, str] = {}
+    for name in names:
+        link = link_by_name(name)
+        if not link:
+            continue
+        for ticker in fetch(link):
+            members.setdefault(ticker, name)
+    return members
+
+
+def resolve_members(db: Session, taxonomy_id: str, names: list[str], as_of: date | None = None) -> dict[str, str]:
+    """members_by_names, or a live scrape while the taxonomy has never been synced."""
+    if not names:
+        return {}
+    if taxonomy_synced(db, taxonomy_id):
+        return members_by_names(db, taxonomy_id, names, as_of=as_of)
+    return _scrape_members(taxonomy_id, names)
+
+
+def industry_members(db: Session, names: list[str], as_of: date | None = None) -> dict[str, str]:
+    return resolve_members(db, INDUSTRY_TAXONOMY, names, as_of=as_of)
+
+
+def theme_members(db: Session, names: list[str], as_of: date | None = None) -> dict[str, str]:
+    return resolve_members(db, THEME_TAXONOMY, names, as_of=as_of)
@@ -0,0 +1,793 @@
+"""
+Market data snapshots shared by the market router (reader) and the market
+poller (writer).
+
+The poller (app.market_poller) is the only code path that talks to KIS or
+FinanceDataReader for dashboard data. It computes indices, breadth, volume
+rankings, investor trends and index charts on a schedule and stores them
+here; the endpoints only read the latest rows, so request latency does not
+depend on upstream APIs or KIS token issuance.
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../../../services/ingest"))
+
+from ingest.trading_calendar import get_trading_calendar
+
+from app.services.cache import get_cache
+
+INDEX_TARGETS = [
+    {"code": "0001", "name": "KOSPI", "fdr": "KS11"},
+    {"code": "1001", "name": "KOSDAQ", "fdr": "KQ11"},
+    {"code": "2001", "name": "KOSPI200", "fdr": "KS200"},
+]
+MARKET_CODES = {t["name"]: t["code"] for t in INDEX_TARGETS}
+FDR_CODES = {t["code"]: t["fdr"] for t in INDEX_TARGETS}
+
+# Daily chart snapshots keep this many sessions; longer requests read market_index_daily.
+CHART_SESSIONS = 400
+SNAPSHOT_RETENTION_DAYS = 7
+
+_kis = None
+_TABLES_READY = False
+# Shared with other workers when CACHE_BACKEND=redis, so a fresh worker skips the DDL.
+_SCHEMA_READY = get_cache("schema_ready", ttl_sec=86400, max_entries=32)
+
+
+def get_kis():
+    """KisClient for the poller (and the breadth debug view), created on first use."""
+    global _kis
+    if _kis is None:
+        from ingest.kis_client import KisClient
+
+        _kis = KisClient()
+    return _kis
+
+
+def ensure_snapshot_tables(db: Session) -> None:
+    global _TABLES_READY
+    if _TABLES_READY:
+        return
+    if _SCHEMA_READY.get("market_snapshots"):
+        _TABLES_READY = True
+        return
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS market_breadth_snapshot (
+            as_of_date DATE NOT NULL,
+            up INTEGER NOT NULL,
+            down INTEGER NOT NULL,
+            flat INTEGER NOT NULL,
+            program_net_krw BIGINT,
+            arbitrage_net_krw BIGINT,
+            non_arbitrage_net_krw BIGINT,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """))
+    db.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_market_breadth_snapshot_updated
+        ON market_breadth_snapshot(updated_at DESC)
+    """))
+    for table in ("market_index_snapshot", "market_popular_snapshot"):
+        db.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                payload JSONB NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """))
+        db.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_updated
+            ON {table}(updated_at DESC)
+        """))
+    # Keyed snapshots: popular_all, investor_trends, index_chart:<market>:<interval>
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS market_data_snapshot (
+            key TEXT PRIMARY KEY,
+            payload JSONB NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """))
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS market_poller_health (
+            job TEXT PRIMARY KEY,
+            interval_sec INTEGER NOT NULL,
+            last_started_at TIMESTAMPTZ,
+            last_success_at TIMESTAMPTZ,
+            last_error TEXT,
+            last_error_at TIMESTAMPTZ,
+            last_duration_ms INTEGER,
+            runs BIGINT NOT NULL DEFAULT 0,
+            failures BIGINT NOT NULL DEFAULT 0,
+            poller_id TEXT,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """))
+    db.commit()
+    _TABLES_READY = True
+    _SCHEMA_READY.set("market_snapshots", True)
+
+
+def load_latest_snapshot(db: Session, table: str):
+    row = db.execute(text(f"""
+        SELECT payload, updated_at
+        FROM {table}
+        ORDER BY updated_at DESC
+        LIMIT 1
+    """)).fetchone()
+    if not row:
+        return None, None
+    return row.payload, row.updated_at
+
+
+def save_snapshot(db: Session, table: str, payload) -> None:
+    db.execute(text(f"""
+        INSERT INTO {table} (payload, updated_at)
+        VALUES (CAST(:payload AS jsonb), NOW())
+    """), {"payload": json.dumps(payload, ensure_ascii=False)})
+    db.execute(text(f"""
+        DELETE FROM {table}
+        WHERE updated_at < NOW() - make_interval(days => :days)
+    """), {"days": SNAPSHOT_RETENTION_DAYS})
+    db.commit()
+
+
+def load_keyed_snapshot(db: Session, key: str):
+    row = db.execute(
+        text("SELECT payload, updated_at FROM market_data_snapshot WHERE key = :k"), {"k": key}
+    ).fetchone()
+    if not row:
+        return None, None
+    return row.payload, row.updated_at
+
+
+def save_keyed_snapshot(db: Session, key: str, payload) -> None:
+    db.execute(text("""
+        INSERT INTO market_data_snapshot (key, payload, updated_at)
+        VALUES (:k, CAST(:payload AS jsonb), NOW())
+        ON CONFLICT (key) DO UPDATE SET payload = EXCLUDED.payload, updated_at = NOW()
+    """), {"k": key, "payload": json.dumps(payload, ensure_ascii=False)})
+    db.commit()
+
+
+def chart_key(market: str, interval: str) -> str:
+    return f"index_chart:{market}:{interval}"
+
+
+# ---------------------------------------------------------------- parsing helpers
+
+def _to_int(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text_value = str(value).strip().replace(",", "")
+    if not text_value:
+        return None
+    try:
+        return int(float(text_value))
+    except ValueError:
+        return None
+
+
+def _pick_value(row, keys):
+    if not row:
+        return None
+    for key in keys:
+        if key in row and row[key] not in (None, ""):
+            return _to_int(row[key])
+    return None
+
+
+def _pick_value_by_hint(row, include_hints, exclude_hints=None):
+    if not row:
+        return None
+    exclude_hints = exclude_hints or []
+    for key, value in row.items():
+        key_lower = str(key).lower()
+        if any(hint in key_lower for hint in exclude_hints):
+            continue
+        if all(hint in key_lower for hint in include_hints):
+            parsed = _to_int(value)
+            if parsed is not None:
+                return parsed
+    return None
+
+
+def _pick_latest_row(rows):
+    if isinstance(rows, dict):
+        return rows
+    if not isinstance(rows, list):
+        return None
+    if not rows:
+        return None
+    date_keys = ["stck_bsop_date", "bsop_date", "date", "trd_dt", "trd_date"]
+    best_row = rows[0]
+    best_date = ""
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        for key in date_keys:
+            value = row.get(key)
+            if not value:
+                continue
+            value_str = str(value)
+            if value_str > best_date:
+                best_date = value_str
+                best_row = row
+    return best_row
+
+
+def has_numeric_value(value) -> bool:
+    if value in (None, "-", ""):
+        return False
+    try:
+        float(str(value).replace(",", ""))
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+# ---------------------------------------------------------------- breadth
+
+def latest_and_prev_trade_dates(db: Session):
+    """
+    Latest loaded trade date and the session before it per the trading calendar.
+    Falls back to the latest earlier loaded date when that session has no bars.
+    """
+    latest = db.execute(text("SELECT MAX(trade_date) FROM price_daily")).scalar()
+    if latest is None:
+        return None, None
+    prev = get_trading_calendar().prev_session(latest)
+    if prev is None or not db.execute(
+        text("SELECT 1 FROM price_daily WHERE trade_date = :d LIMIT 1"), {"d": prev}
+    ).first():
+        prev = db.execute(
+            text("SELECT MAX(trade_date) FROM price_daily WHERE trade_date < :d"), {"d": latest}
+        ).scalar()
+    return latest, prev
+
+
+def compute_breadth_counts(db: Session) -> dict | None:
+    """Up/down/flat counts for the latest session from price_daily (DB only)."""
+    latest, prev = latest_and_prev_trade_dates(db)
+    if latest is None:
+        return None
+    row = db.execute(text("""
+        WITH today AS (
+            SELECT ticker, close FROM price_daily
+            WHERE trade_date = :latest
+        ),
+        yday AS (
+            SELECT ticker, close FROM price_daily
+            WHERE trade_date = :prev
+        ),
+        cmp AS (
+            SELECT t.ticker, t.close AS c, y.close AS p
+            FROM today t
+            JOIN yday y USING (ticker)
+        )
+        SELECT
+            CAST(:latest AS DATE) AS as_of_date,
+            SUM(CASE WHEN c > p THEN 1 ELSE 0 END) AS up_count,
+            SUM(CASE WHEN c < p THEN 1 ELSE 0 END) AS down_count,
+            SUM(CASE WHEN c = p THEN 1 ELSE 0 END) AS flat_count
+        FROM cmp
+    """), {"latest": latest, "prev": prev}).fetchone()
+    if not row or not row[0]:
+        return None
+    as_of_date, up_count, down_count, flat_count = row
+    return {
+        "as_of_date": as_of_date,
+        "up": int(up_count or 0),
+        "down": int(down_count or 0),
+        "flat": int(flat_count or 0),
+        "program_net_krw": None,
+        "arbitrage_net_krw": None,
+        "non_arbitrage_net_krw": None,
+    }
+
+
+def compute_market_breadth(db: Session, debug: bool = False):
+    snapshot = compute_breadth_counts(db)
+    if snapshot is None:
+        return None, None, None
+    kis = get_kis()
+
+    program_debug = None
+    try:
+        if debug:
+            program_payload = kis.get_program_trade_daily("0001", return_raw=True)
+            if isinstance(program_payload, dict):
+                program_rows = program_payload.get("parsed")
+                raw_data = program_payload.get("raw")
+                program_debug = {
+                    "status": program_payload.get("status"),
+                    "error": program_payload.get("error"),
+                    "raw_keys": sorted(raw_data.keys()) if isinstance(raw_data, dict) else [],
+                    "raw_output1_keys": sorted(raw_data.get("output1", {}).keys()) if isinstance(raw_data, dict) and isinstance(raw_data.get("output1"), dict) else [],
+                    "raw_output2_length": len(raw_data.get("output2", [])) if isinstance(raw_data, dict) and isinstance(raw_data.get("output2"), list) else 0,
+                    "tried": program_payload.get("tried"),
+                }
+            else:
+                program_rows = None
+        else:
+            program_rows = kis.get_program_trade_daily("0001")
+    except Exception as exc:
+        program_rows = None
+        if debug:
+            program_debug = {
+                "status": "exception",
+                "error": {"message": str(exc)},
+            }
+    program_row = _pick_latest_row(program_rows)
+
+    program_val = _pick_value(program_row, [
+        "whol_smtn_ntby_tr_pbmn",
+        "whol_entm_ntby_tr_pbmn",
+        "whol_onsl_ntby_tr_pbmn",
+        "whol_ntby_tr_pbmn",
+        "prgm_ntby_tr_pbmn",
+        "prgm_ntby_amt",
+        "prgm_netby_amt",
+        "program_net",
+    ])
+    if program_val is None:
+        program_val = _pick_value_by_hint(program_row, ["prgm", "ntby"])
+    if program_val is None:
+        program_val = _pick_value_by_hint(program_row, ["program", "net"])
+    arbitrage_val = _pick_value(program_row, [
+        "arbt_smtn_ntby_tr_pbmn",
+        "arbt_entm_ntby_tr_pbmn",
+        "arbt_onsl_ntby_tr_pbmn",
+        "arbt_ntby_tr_pbmn",
+        "arbt_ntby_amt",
+        "arbt_netby_amt",
+        "arbitrage_net",
+    ])
+    if arbitrage_val is None:
+        arbitrage_val = _pick_value_by_hint(program_row, ["arbt", "ntby"])
+    if arbitrage_val is None:
+        arbitrage_val = _pick_value_by_hint(program_row, ["arbitrage", "net"])
+    non_arbitrage_val = _pick_value(program_row, [
+        "nabt_smtn_ntby_tr_pbmn",
+        "nabt_entm_ntby_tr_pbmn",
+        "nabt_onsl_ntby_tr_pbmn",
+        "nabt_ntby_tr_pbmn",
+        "narb_ntby_tr_pbmn",
+        "narb_ntby_amt",
+        "nonarbt_ntby_amt",
+        "non_arbitrage_net",
+    ])
+    if non_arbitrage_val is None:
+        non_arbitrage_val = _pick_value_by_hint(program_row, ["narb", "ntby"])
+    if non_arbitrage_val is None:
+        non_arbitrage_val = _pick_value_by_hint(program_row, ["non", "arbitrage"], exclude_hints=["arbt"])
+
+    snapshot.update({
+        "program_net_krw": program_val,
+        "arbitrage_net_krw": arbitrage_val,
+        "non_arbitrage_net_krw": non_arbitrage_val,
+    })
+    return snapshot, program_debug, program_row
+
+
+def save_breadth_snapshot(db: Session, snapshot: dict) -> None:
+    if not snapshot:
+        return
+    db.execute(text("""
+        INSERT INTO market_breadth_snapshot (
+            as_of_date, up, down, flat,
+            program_net_krw, arbitrage_net_krw, non_arbitrage_net_krw, updated_at
+        )
+        VALUES (
+            :as_of_date, :up, :down, :flat,
+            :program, :arbitrage, :non_arbitrage, NOW()
+        )
+    """), {
+        "as_of_date": snapshot["as_of_date"],
+        "up": snapshot["up"],
+        "down": snapshot["down"],
+        "flat": snapshot["flat"],
+        "program": snapshot.get("program_net_krw"),
+        "arbitrage": snapshot.get("arbitrage_net_krw"),
+        "non_arbitrage": snapshot.get("non_arbitrage_net_krw"),
+    })
+    db.execute(text("""
+        DELETE FROM market_breadth_snapshot
+        WHERE updated_at < NOW() - make_interval(days => :days)
+    """), {"days": SNAPSHOT_RETENTION_DAYS})
+    db.commit()
+
+
+def load_breadth_snapshot(db: Session) -> dict | None:
+    row = db.execute(text("""
+        SELECT as_of_date, up, down, flat,
+               program_net_krw, arbitrage_net_krw, non_arbitrage_net_krw, updated_at
+        FROM market_breadth_snapshot
+        ORDER BY updated_at DESC
+        LIMIT 1
+    """)).fetchone()
+    if not row:
+        return None
+    return {
+        "as_of_date": row.as_of_date,
+        "up": row.up,
+        "down": row.down,
+        "flat": row.flat,
+        "program_net_krw": row.program_net_krw,
+        "arbitrage_net_krw": row.arbitrage_net_krw,
+        "non_arbitrage_net_krw": row.non_arbitrage_net_krw,
+        "updated_at": row.updated_at,
+    }
+
+
+# ---------------------------------------------------------------- indices
+
+def compute_indices_from_db(db: Session, index_code: str):
+    rows = db.execute(
+        text("""
+            SELECT trade_date, close
+            FROM market_index_daily
+            WHERE index_code = :index_code
+            ORDER BY trade_date DESC
+            LIMIT 2
+        """),
+        {"index_code": index_code},
+    ).fetchall()
+    if not rows:
+        return None
+    latest = rows[0]
+    prev = rows[1] if len(rows) > 1 else rows[0]
+    if latest.close is None:
+        return None
+    price = float(latest.close)
+    prev_close = float(prev.close) if prev.close is not None else price
+    change = price - prev_close
+    rate = (change / prev_close * 100) if prev_close else 0.0
+    return {
+        "value": format(price, ",.2f"),
+        "change": f"{change:+.2f}",
+        "changePercent": f"{rate:+.2f}%",
+        "up": change > 0,
+    }
+
+
+def placeholder_index(name: str) -> dict:
+    return {"name": name, "value": "-", "change": "-", "changePercent": "-", "up": False}
+
+
+def indices_from_db(db: Session) -> list[dict]:
+    """DB-only index cards from market_index_daily."""
+    results = []
+    for t in INDEX_TARGETS:
+        db_payload = compute_indices_from_db(db, t["code"])
+        results.append({"name": t["name"], **db_payload} if db_payload else placeholder_index(t["name"]))
+    return results
+
+
+def compute_indices(db: Session):
+    import FinanceDataReader as fdr
+
+    kis = get_kis()
+    results = []
+    for t in INDEX_TARGETS:
+        fdr_code = t["fdr"]
+        if fdr_code:
+            try:
+                df = fdr.DataReader(fdr_code)
+                latest = df.iloc[-1]
+                price = float(latest["Close"])
+                prev = float(df.iloc[-2]["Close"]) if len(df) > 1 else price
+                change = price - prev
+                rate = (change / prev * 100) if prev else 0.0
+                results.append({
+                    "name": t["name"],
+                    "value": format(price, ",.2f"),
+                    "change": f"{change:+.2f}",
+                    "changePercent": f"{rate:+.2f}%",
+                    "up": change > 0
+                })
+                continue
+            except Exception:
+                pass
+
+        data = kis.get_market_index(t["code"])
+        if data:
+            try:
+                if 'bstp_nmix_prpr' in data:
+                    price = float(data['bstp_nmix_prpr'])
+                    change = float(data['bstp_nmix_prdy_vrss'])
+                    rate = float(data['bstp_nmix_prdy_ctrt'])
+                elif 'stck_clpr' in data:
+                    price = float(data['stck_clpr'])
+                    change = float(data['prdy_vrss'])
+                    rate = float(data['prdy_ctrt'])
+                else:
+                    raise KeyError("Unknown key format")
+                results.append({
+                    "name": t["name"],
+                    "value": format(price, ","),
+                    "change": f"{change:+.2f}",
+                    "changePercent": f"{rate:+.2f}%",
+                    "up": change > 0
+                })
+                continue
+            except (ValueError, KeyError):
+                pass
+
+        db_payload = compute_indices_from_db(db, t["code"])
+        results.append({"name": t["name"], **db_payload} if db_payload else placeholder_index(t["name"]))
+    return results
+
+
+# ---------------------------------------------------------------- index charts
+
+def _index_row_value(row: dict):
+    value_raw = (
+        row.get("bstp_nmix_prpr")
+        or row.get("stck_clpr")
+        or row.get("indx_clpr")
+        or row.get("clpr")
+    )
+    try:
+        return float(value_raw) if value_raw is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_index_chart_daily(code: str, sessions: int = CHART_SESSIONS) -> list[dict]:
+    """Daily closes for the last `sessions` sessions (FDR first, then KIS)."""
+    import FinanceDataReader as fdr
+
+    end_date = datetime.now()
+    start_session = get_trading_calendar().sessions_back(end_date.date(), sessions)
+    start_date = (
+        datetime.combine(start_session, datetime.min.time())
+        if start_session
+        else end_date - timedelta(days=sessions * 2)
+    )
+    fdr_code = FDR_CODES.get(code)
+    if fdr_code:
+        try:
+            df = fdr.DataReader(fdr_code, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"))
+            if df.empty:
+                df = fdr.DataReader(fdr_code)
+            if not df.empty:
+                return [
+                    {"date": idx.strftime("%Y%m%d"), "value": float(row["Close"])}
+                    for idx, row in df.tail(sessions).iterrows()
+                ]
+        except Exception as exc:
+            print(f"FDR Index Chart Error for {fdr_code}: {exc}")
+
+    results = []
+    for row in get_kis().get_market_index_history(code, start_date.strftime("%Y%m%d"), end_date.strftime("%Y%m%d")) or []:
+        date_str = row.get("stck_bsop_date") or row.get("date") or ""
+        value = _index_row_value(row)
+        if date_str and value is not None:
+            results.append({"date": date_str, "value": value})
+    return sorted(results, key=lambda r: r["date"])
+
+
+def compute_index_chart_intraday(code: str) -> list[dict]:
+    """Minute bars for the latest session that has them."""
+    import FinanceDataReader as fdr
+
+    kis = get_kis()
+    end_date = datetime.now()
+    target_date = end_date.strftime("%Y%m%d")
+    fdr_code = FDR_CODES.get(code)
+    if fdr_code:
+        try:
+            df_latest = fdr.DataReader(fdr_code)
+            if not df_latest.empty:
+                latest_date = df_latest.index[-1].strftime("%Y%m%d")
+                if latest_date < target_date:
+                    target_date = latest_date
+        except Exception:
+            pass
+    try:
+        start_str = (end_date - timedelta(days=10)).strftime("%Y%m%d")
+        daily_rows = kis.get_market_index_history(code, start_str, end_date.strftime("%Y%m%d"))
+        if daily_rows:
+            last_daily = daily_rows[-1].get("stck_bsop_date")
+            if last_daily and last_daily < target_date:
+                target_date = last_daily
+    except Exception:
+        pass
+
+    results = []
+    for row in kis.get_market_index_intraday(code, target_date) or []:
+        date_str = row.get("stck_bsop_date") or target_date
+        time_raw = row.get("stck_cntg_hour") or row.get("stck_hgpr_hour") or ""
+        time_fmt = f"{time_raw[0:2]}:{time_raw[2:4]}" if len(time_raw) >= 4 else ""
+        value = _index_row_value(row)
+        if not date_str or value is None:
+            continue
+        results.append({"date": f"{date_str} {time_fmt}".strip(), "value": value})
+    return results
+
+
+def index_chart_from_db(db: Session, code: str, days: int) -> list[dict]:
+    rows = db.execute(
+        text("""
+            SELECT trade_date, close
+            FROM market_index_daily
+            WHERE index_code = :index_code
+            ORDER BY trade_date DESC
+            LIMIT :limit
+        """),
+        {"index_code": code, "limit": days},
+    ).fetchall()
+    return [
+        {"date": r.trade_date.strftime("%Y%m%d"), "value": float(r.close)}
+        for r in reversed(rows)
+        if r.trade_date and r.close is not None
+    ]
+
+
+# ---------------------------------------------------------------- volume rank / investor trends
+
+def fallback_volume_rank(db: Session, limit: int):
+    latest, prev = latest_and_prev_trade_dates(db)
+    if latest is None:
+        return []
+    rows = db.execute(text("""
+        WITH today AS (
+            SELECT ticker, close, volume
+            FROM price_daily
+            WHERE trade_date = :latest
+        ),
+        yday AS (
+            SELECT ticker, close AS prev_close
+            FROM price_daily
+            WHERE trade_date = :prev
+        )
+        SELECT t.ticker, t.close, t.volume, y.prev_close, c.name_ko
+        FROM today t
+        LEFT JOIN yday y USING (ticker)
+        LEFT JOIN security s ON s.ticker = t.ticker
+        LEFT JOIN company c ON c.company_id = s.company_id
+        ORDER BY t.volume DESC NULLS LAST
+        LIMIT :limit
+    """), {"limit": limit, "latest": latest, "prev": prev}).fetchall()
+    results = []
+    for idx, row in enumerate(rows):
+        change_rate = None
+        if row.prev_close and row.prev_close != 0 and row.close is not None:
+            change_rate = (row.close - row.prev_close) / row.prev_close * 100
+        results.append({
+            "rank": idx + 1,
+            "name": row.name_ko or row.ticker,
+            "price": format(int(row.close or 0), ","),
+            "changePercent": f"{change_rate:+.2f}%" if change_rate is not None else "-",
+            "up": change_rate is not None and change_rate > 0,
+            "volume": format(int(row.volume or 0), ","),
+        })
+    return results
+
+
+def compute_volume_rank(db: Session, limit: int, include_volume: bool) -> list[dict]:
+    try:
+        data = get_kis().get_volume_rank()
+    except Exception:
+        data = None
+    if not data:
+        return fallback_volume_rank(db, limit)
+
+    results = []
+    for idx, item in enumerate(data[:limit]):
+        try:
+            change_rate = float(item.get('prdy_ctrt', 0))
+        except (TypeError, ValueError):
+            change_rate = 0
+        entry = {
+            "rank": idx + 1,
+            "name": item.get('hts_kor_isnm') or item.get('stck_shrn_iscd') or '-',
+            "price": format(int(item.get('stck_prpr', 0)), ","),
+            "changePercent": f"{change_rate:+.2f}%",
+            "up": change_rate > 0
+        }
+        if include_volume:
+            entry["volume"] = format(int(item.get('acml_vol', 0)), ",")
+        results.append(entry)
+    return results
+
+
+def compute_investor_trends() -> list[dict]:
+    # KOSPI base: 0001
+    data = get_kis().get_investor_trend("0001")
+    if not data:
+        return []
+    recent = data[0]
+
+    def format_billion(val):
+        try:
+            # Convert to Billion Won (100 Million)
+            return f"{int(val) // 100:,}억"
+        except (TypeError, ValueError):
+            return "-"
+
+    personal_val = int(recent.get('prsn_ntby_tr_pbmn', 0))
+    foreigner_val = int(recent.get('frgn_ntby_tr_pbmn', 0))
+    institution_val = int(recent.get('orgn_ntby_tr_pbmn', 0))
+    return [
+        {"type": "개인", "value": format_billion(personal_val), "buying": personal_val > 0, "up": personal_val > 0},
+        {"type": "외국인", "value": format_billion(foreigner_val), "buying": foreigner_val > 0, "up": foreigner_val > 0},
+        {"type": "기관", "value": format_billion(institution_val), "buying": institution_val > 0, "up": institution_val > 0},
+    ]
+
+
+# ---------------------------------------------------------------- poller health
+
+def record_job_start(db: Session, job: str, interval_sec: int, poller_id: str) -> None:
+    db.execute(text("""
+        INSERT INTO market_poller_health (job, interval_sec, last_started_at, poller_id, updated_at)
+        VALUES (:job, :interval, NOW(), :pid, NOW())
+        ON CONFLICT (job) DO UPDATE SET
+            interval_sec = EXCLUDED.interval_sec,
+            last_started_at = NOW(),
+            poller_id = EXCLUDED.poller_id,
+            updated_at = NOW()
+    """), {"job": job, "interval": interval_sec, "pid": poller_id})
+    db.commit()
+
+
+def record_job_result(db: Session, job: str, duration_ms: int, error: str | None = None) -> None:
+    if error is None:
+        db.execute(text("""
+            UPDATE market_poller_health
+            SET last_success_at = NOW(), last_duration_ms = :ms, runs = runs + 1, updated_at = NOW()
+            WHERE job = :job
+        """), {"job": job, "ms": duration_ms})
+    else:
+        db.execute(text("""
+            UPDATE market_poller_health
+            SET last_error = :err, last_error_at = NOW(), last_duration_ms = :ms,
+                runs = runs + 1, failures = failures + 1, updated_at = NOW()
+            WHERE job = :job
+        """), {"job": job, "ms": duration_ms, "err": error[:500]})
+    db.commit()
+
+
+def poller_health(db: Session) -> dict:
+    """Per-job freshness. A job is stale when it has not succeeded for 3 intervals."""
+    rows = db.execute(text("""
+        SELECT job, interval_sec, last_started_at, last_success_at, last_error, last_error_at,
+               last_duration_ms, runs, failures, poller_id,
+               EXTRACT(EPOCH FROM (NOW() - last_success_at)) AS age_sec
+        FROM market_poller_health
+        ORDER BY job
+    """)).fetchall()
+    jobs = []
+    for row in rows:
+        stale = row.age_sec is None or row.age_sec > 3 * row.interval_sec
+        jobs.append({
+            "job": row.job,
+            "interval_sec": row.interval_sec,
+            "last_started_at": row.last_started_at.isoformat() if row.last_started_at else None,
+            "last_success_at": row.last_success_at.isoformat() if row.last_success_at else None,
+            "age_sec": round(float(row.age_sec), 1) if row.age_sec is not None else None,
+            "last_error": row.last_error,
+            "last_error_at": row.last_error_at.isoformat() if row.last_error_at else None,
+            "last_duration_ms": row.last_duration_ms,
+            "runs": row.runs,
+            "failures": row.failures,
+            "poller_id": row.poller_id,
+            "stale": stale,
+        })
+    if not jobs:
+        status = "down"
+    elif all(job["stale"] for job in jobs):
+        status = "down"
+    elif any(job["stale"] for job in jobs):
+        status = "degraded"
+    else:
+        status = "ok"
+    return {"status": status, "checked_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "jobs": jobs}
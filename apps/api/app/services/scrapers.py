@@ -1,25 +1,182 @@
 import requests
 from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+import threading
 import time
 
+from app.services.cache import get_cache
+
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
+BASE_URL = "https://finance.naver.com"
+MAX_WORKERS = 8
+
+# Per-page TTLs. Once an entry goes stale it is revalidated with
+# If-None-Match / If-Modified-Since, so an unchanged page costs a 304.
+LIST_PAGE_TTL_SEC = 300
+DETAIL_PAGE_TTL_SEC = 600
+MEMBER_PAGE_TTL_SEC = 3600
+
+# Parsed results per (function, args). Stale lists are served for up to an hour
+# while one background refresh runs; name -> link / leading-stock lookups are
+# long-lived tables filled as a side effect of the list scrapes.
+_THEME_CACHE = get_cache("naver_themes", ttl_sec=900, stale_ttl_sec=3600, max_entries=32)
+_INDUSTRY_CACHE = get_cache("naver_industries", ttl_sec=300, stale_ttl_sec=3600, max_entries=32)
+_LINK_CACHE = get_cache("naver_links", ttl_sec=86400, max_entries=4096)
+_INDUSTRY_LEADING_NAME_CACHE = get_cache("naver_industry_leading", ttl_sec=86400, max_entries=1024)
+# (parser, url) -> {"etag", "last_modified", "data"}; stale entries are kept a day for their validators.
+_PAGE_CACHE = get_cache("naver_pages", ttl_sec=LIST_PAGE_TTL_SEC, stale_ttl_sec=86400, max_entries=2048)
+
+_POOL = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="naver")
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _session() -> requests.Session:
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS * 2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HEADERS)
+            _SESSION = session
+        return _SESSION
+
+
+def _absolute(link: str) -> str:
+    return f"{BASE_URL}{link}" if link.startswith("/") else link
+
+
+def _revalidate(key: tuple, url: str, parse) -> dict:
+    previous = _PAGE_CACHE.get(key)
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    resp = _session().get(url, headers=headers, timeout=10)
+    if resp.status_code == 304 and previous:
+        return previous
+    resp.raise_for_status()
+    resp.encoding = 'euc-kr'
+    return {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "data": parse(resp.text),
+    }
+
+
+def fetch_page(url: str, parse, ttl_sec: int = LIST_PAGE_TTL_SEC):
+    """
+    parse(html) for `url`, cached per page and parser. Concurrent callers
+    share one request; a stale page is revalidated with its ETag /
+    Last-Modified. Raises on network/HTTP errors.
+    """
+    key = (parse.__name__, url)
+    return _PAGE_CACHE.get_or_load(
+        key, lambda: _revalidate(key, url, parse), ttl_sec=ttl_sec, serve_stale=False
+    )["data"]
+
+
+# ---------------------------------------------------------------- parsers (html -> data)
+
+def parse_first_stock(html: str) -> str:
+    """First stock in a theme/industry detail page (table.type_5), or "-"."""
+    soup = BeautifulSoup(html, "html.parser")
+    # The detail page lists stocks sorted by change rate desc.
+    table = soup.select_one("table.type_5")
+    if not table:
+        return "-"
+    for row in table.select("tr"):
+        name_td = row.select_one("td.name")
+        if name_td:
+            return name_td.get_text(strip=True)
+    return "-"
+
+
+def parse_member_tickers(html: str) -> list[str]:
+    """6-digit tickers linked from a theme/industry detail page."""
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.select_one("table.type_5")
+    if not table:
+        return []
+    tickers = []
+    for a in table.select("a[href*='code=']"):
+        href = a.get("href") or ""
+        if "code=" not in href:
+            continue
+        code = href.split("code=")[-1].split("&")[0]
+        if code and code.isdigit() and len(code) == 6:
+            tickers.append(code)
+    return sorted(set(tickers))
+
+
+def parse_theme_page(html: str) -> list[dict]:
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.select_one("table.type_1")
+    if not table:
+        return []
+    themes = []
+    for row in table.select("tr"):
+        cols = row.select("td")
+        if len(cols) < 4:
+            continue
+        name_link = cols[0].select_one("a")
+        if not name_link:
+            continue
+        leading_stock = "-"
+        if len(cols) >= 7:
+            primary = cols[6].get_text(strip=True)
+            secondary = cols[7].get_text(strip=True) if len(cols) >= 8 else ""
+            leading_stock = primary or secondary or "-"
+        themes.append({
+            "name": name_link.get_text(strip=True),
+            "link": name_link.get("href") or "",
+            "change": cols[1].get_text(strip=True),
+            "avg3d": cols[2].get_text(strip=True),
+            "leadingStock": leading_stock,
+        })
+    return themes
+
+
+def parse_industry_page(html: str) -> list[dict]:
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.select_one("table.type_1")
+    if not table:
+        return []
 
-_INDUSTRY_LINK_CACHE: dict[str, str] = {}
-_THEME_LINK_CACHE: dict[str, str] = {}
-_THEME_CACHE: list[dict] | None = None
-_THEME_CACHE_AT: float | None = None
-_THEME_REFRESHING: bool = False
-_INDUSTRY_CACHE: list[dict] | None = None
-_INDUSTRY_CACHE_AT: float | None = None
-_INDUSTRY_REFRESHING: bool = False
-_INDUSTRY_LEADING_CACHE: list[dict] | None = None
-_INDUSTRY_LEADING_CACHE_AT: float | None = None
-_INDUSTRY_LEADING_REFRESHING: bool = False
-_INDUSTRY_LEADING_NAME_CACHE: dict[str, str] = {}
-_INDUSTRY_LEADING_CACHE_LIMITED: bool = False
+    def parse_int(value: str):
+        try:
+            return int(value.replace(",", ""))
+        except Exception:
+            return 0
+
+    industries = []
+    for row in table.select("tr"):
+        cols = row.select("td")
+        if len(cols) < 6:
+            continue
+        link = cols[0].select_one("a")
+        if not link:
+            continue
+        industries.append({
+            "name": link.get_text(strip=True),
+            "link": link.get("href") or "",
+            "change": cols[1].get_text(strip=True),
+            "total": parse_int(cols[2].get_text(strip=True)),
+            "up": parse_int(cols[3].get_text(strip=True)),
+            "flat": parse_int(cols[4].get_text(strip=True)),
+            "down": parse_int(cols[5].get_text(strip=True)),
+        })
+    return industries
+
+
+# ---------------------------------------------------------------- themes
 
 def _get_cached_industry_leading(name: str | None) -> str:
     if not name:
@@ -29,34 +186,14 @@ def _get_cached_industry_leading(name: str | None) -> str:
 def _set_cached_industry_leading(name: str | None, value: str) -> None:
     if not name or not value or value == "-":
         return
-    _INDUSTRY_LEADING_NAME_CACHE[name] = value
+    _INDUSTRY_LEADING_NAME_CACHE.set(name, value)
 
 def fetch_leading_stock(sub_url_suffix):
     """
     Fetch the leading stock (highest change rate) from the theme detail page.
     """
     try:
-        url = f"https://finance.naver.com{sub_url_suffix}"
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        resp.encoding = 'euc-kr'
-        soup = BeautifulSoup(resp.text, "html.parser")
-        
-        # The detail page lists stocks. Usually sorted by change rate desc?
-        # We need to find the first stock in the list.
-        # Table class 'type_5' usually contains stock list in detail page.
-        table = soup.select_one("table.type_5")
-        if not table:
-            return "-"
-            
-        # Find first stock row
-        rows = table.select("tr")
-        for row in rows:
-            name_td = row.select_one("td.name")
-            if name_td:
-                # Found the first stock!
-                stock_name = name_td.get_text(strip=True)
-                return stock_name
-        return "-"
+        return fetch_page(_absolute(sub_url_suffix), parse_first_stock, ttl_sec=DETAIL_PAGE_TTL_SEC)
     except Exception:
         return "-"
 
@@ -64,44 +201,34 @@ def fetch_theme_page(page):
     """
     Fetch a single page of themes.
     """
-    url = f"https://finance.naver.com/sise/theme.nhn?&page={page}"
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        resp.encoding = 'euc-kr'
-        soup = BeautifulSoup(resp.text, "html.parser")
-        table = soup.select_one("table.type_1")
-        if not table: return []
-        
-        themes = []
-        rows = table.select("tr")
-        for row in rows:
-            cols = row.select("td")
-            if len(cols) < 4:
-                continue
-            
-            name_link = cols[0].select_one("a")
-            if not name_link: continue
-            
-            name = name_link.get_text(strip=True)
-            link = name_link.get("href") or ""
-            if name and link:
-                _THEME_LINK_CACHE[name] = link
-            leading_stock = "-"
-            if len(cols) >= 7:
-                primary = cols[6].get_text(strip=True)
-                secondary = cols[7].get_text(strip=True) if len(cols) >= 8 else ""
-                leading_stock = primary or secondary or "-"
-
-            themes.append({
-                "name": name_link.get_text(strip=True),
-                "link": link,
-                "change": cols[1].get_text(strip=True),
-                "avg3d": cols[2].get_text(strip=True),
-                "leadingStock": leading_stock,
-            })
-        return themes
-    except:
+        themes = fetch_page(f"{BASE_URL}/sise/theme.nhn?&page={page}", parse_theme_page)
+    except Exception:
         return []
+    for item in themes:
+        if item["name"] and item["link"]:
+            _LINK_CACHE.set(("theme", item["name"]), item["link"])
+    return themes
+
+def _fill_within_budget(items: list[dict], fetch, time_budget_sec: float) -> None:
+    """
+    item["leadingStock"] = fetch(item) on the shared pool. Items not done
+    within the budget keep their current value. Requests already running
+    finish in the background and warm the page cache for the next call;
+    unstarted ones are cancelled so they do not hold up the next call's
+    list-page fetches on the same pool.
+    """
+    if not items:
+        return
+    futures = {_POOL.submit(fetch, item): item for item in items}
+    done, not_done = wait(futures, timeout=time_budget_sec)
+    for future in not_done:
+        future.cancel()
+    for future in done:
+        try:
+            futures[future]["leadingStock"] = future.result()
+        except Exception:
+            futures[future]["leadingStock"] = "-"
 
 def get_naver_themes(
     include_leading_stock: bool = True,
@@ -115,71 +242,43 @@ def get_naver_themes(
     Columns: 테마명 | 전일대비 | 최근3일등락률(평균) | 상승/보합/하락 (종목수)
     Includes deep scraping for 'Leading Stock'.
     """
-    global _THEME_CACHE, _THEME_CACHE_AT, _THEME_REFRESHING
+    pages = max(1, min(pages, 10))
     try:
-        now = time.time()
-        if _THEME_CACHE and _THEME_CACHE_AT and (now - _THEME_CACHE_AT) < cache_ttl_sec:
-            return _THEME_CACHE
-        if _THEME_CACHE and not _THEME_REFRESHING:
-            def _refresh():
-                global _THEME_REFRESHING
-                _THEME_REFRESHING = True
-                try:
-                    get_naver_themes(
-                        include_leading_stock=include_leading_stock,
-                        cache_ttl_sec=cache_ttl_sec,
-                        time_budget_sec=time_budget_sec,
-                        pages=pages,
-                    )
-                finally:
-                    _THEME_REFRESHING = False
-            ThreadPoolExecutor(max_workers=1).submit(_refresh)
-            return _THEME_CACHE
-
-        start_time = time.time()
-        pages = max(1, min(pages, 10))
-        # Fetch pages 1..N concurrently
-        all_rows = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(fetch_theme_page, page) for page in range(1, pages + 1)]
-            for future in futures:
-                all_rows.extend(future.result())
-        
-        # Deduplicate if needed (though pages shouldn't overlap)
-        results_map = {}
-        if include_leading_stock and all_rows:
-            # Skip deep scrape if time budget already exceeded.
-            if time.time() - start_time < time_budget_sec:
-                targets = [i for i, item in enumerate(all_rows) if not item.get("leadingStock") or item.get("leadingStock") == "-"]
-                if targets:
-                    with ThreadPoolExecutor(max_workers=5) as executor:
-                        futures = {executor.submit(fetch_leading_stock, all_rows[i]['link']): i for i in targets}
-                        for future in futures:
-                            idx = futures[future]
-                            try:
-                                results_map[idx] = future.result()
-                            except Exception:
-                                results_map[idx] = "-"
-
-        # Assemble result
-        themes = []
-        for i, item in enumerate(all_rows):
-            leading = item.get("leadingStock") or results_map.get(i, "-")
-            themes.append({
-                "rank": i + 1,
-                "name": item['name'],
-                "changePercent": item['change'],
-                "change3d": item['avg3d'],
-                "leadingStock": leading,
-            })
-        
-        _THEME_CACHE = themes
-        _THEME_CACHE_AT = time.time()
-        return themes
-        
+        return _THEME_CACHE.get_or_load(
+            ("themes", include_leading_stock, pages),
+            lambda: _scrape_naver_themes(include_leading_stock, time_budget_sec, pages),
+            ttl_sec=cache_ttl_sec,
+        )
     except Exception as e:
         print(f"Error scraping themes: {str(e)}")
-        return _THEME_CACHE or []
+        return []
+
+def _scrape_naver_themes(include_leading_stock: bool, time_budget_sec: int, pages: int):
+    start_time = time.time()
+    # Fetch pages 1..N concurrently
+    all_rows = []
+    for rows in _POOL.map(fetch_theme_page, range(1, pages + 1)):
+        all_rows.extend(dict(row) for row in rows)
+
+    if include_leading_stock and all_rows:
+        targets = [item for item in all_rows if not item.get("leadingStock") or item.get("leadingStock") == "-"]
+        remaining = time_budget_sec - (time.time() - start_time)
+        if remaining > 0:
+            _fill_within_budget(targets, lambda item: fetch_leading_stock(item["link"]), remaining)
+
+    # Assemble result
+    return [
+        {
+            "rank": i + 1,
+            "name": item['name'],
+            "changePercent": item['change'],
+            "change3d": item['avg3d'],
+            "leadingStock": item.get("leadingStock") or "-",
+        }
+        for i, item in enumerate(all_rows)
+    ]
+
+# ---------------------------------------------------------------- industries
 
 def fetch_industry_leading_stock(industry_link: str, industry_name: str | None = None) -> str:
     """
@@ -187,27 +286,15 @@ def fetch_industry_leading_stock(industry_link: str, industry_name: str | None =
     """
     cached = _get_cached_industry_leading(industry_name)
     if not industry_link:
-        return cached if cached != "-" else "-"
-    url = industry_link
-    if industry_link.startswith("/"):
-        url = f"https://finance.naver.com{industry_link}"
+        return cached
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        resp.encoding = 'euc-kr'
-        soup = BeautifulSoup(resp.text, "html.parser")
-        table = soup.select_one("table.type_5")
-        if not table:
-            return cached if cached != "-" else "-"
-        rows = table.select("tr")
-        for row in rows:
-            name_td = row.select_one("td.name")
-            if name_td:
-                stock_name = name_td.get_text(strip=True)
-                _set_cached_industry_leading(industry_name, stock_name)
-                return stock_name
-        return cached if cached != "-" else "-"
+        stock_name = fetch_page(_absolute(industry_link), parse_first_stock, ttl_sec=DETAIL_PAGE_TTL_SEC)
     except Exception:
-        return cached if cached != "-" else "-"
+        return cached
+    if stock_name == "-":
+        return cached
+    _set_cached_industry_leading(industry_name, stock_name)
+    return stock_name
 
 
 def get_naver_industries(
@@ -220,140 +307,39 @@ def get_naver_industries(
     Scrape Industry rankings from Naver Finance
     URL: https://finance.naver.com/sise/sise_group.nhn?type=upjong
     """
-    global _INDUSTRY_CACHE, _INDUSTRY_CACHE_AT, _INDUSTRY_REFRESHING
-    global _INDUSTRY_LEADING_CACHE, _INDUSTRY_LEADING_CACHE_AT, _INDUSTRY_LEADING_REFRESHING
-    global _INDUSTRY_LEADING_CACHE_LIMITED
-    url = "https://finance.naver.com/sise/sise_group.nhn?type=upjong"
+    key = ("industries", include_leading_stock, limit_leading if include_leading_stock else 0)
     try:
-        now = time.time()
-        if include_leading_stock:
-            if (
-                _INDUSTRY_LEADING_CACHE
-                and _INDUSTRY_LEADING_CACHE_AT
-                and (now - _INDUSTRY_LEADING_CACHE_AT) < cache_ttl_sec
-                and not (_INDUSTRY_LEADING_CACHE_LIMITED and not limit_leading)
-            ):
-                return _INDUSTRY_LEADING_CACHE
-            if (
-                _INDUSTRY_LEADING_CACHE
-                and not _INDUSTRY_LEADING_REFRESHING
-                and not (_INDUSTRY_LEADING_CACHE_LIMITED and not limit_leading)
-            ):
-                def _refresh():
-                    global _INDUSTRY_LEADING_REFRESHING
-                    _INDUSTRY_LEADING_REFRESHING = True
-                    try:
-                        get_naver_industries(
-                            include_leading_stock=True,
-                            cache_ttl_sec=cache_ttl_sec,
-                            time_budget_sec=time_budget_sec,
-                            limit_leading=limit_leading,
-                        )
-                    finally:
-                        _INDUSTRY_LEADING_REFRESHING = False
-                ThreadPoolExecutor(max_workers=1).submit(_refresh)
-                return _INDUSTRY_LEADING_CACHE
-        else:
-            if _INDUSTRY_CACHE and _INDUSTRY_CACHE_AT and (now - _INDUSTRY_CACHE_AT) < cache_ttl_sec:
-                return _INDUSTRY_CACHE
-            if _INDUSTRY_CACHE and not _INDUSTRY_REFRESHING:
-                def _refresh():
-                    global _INDUSTRY_REFRESHING
-                    _INDUSTRY_REFRESHING = True
-                    try:
-                        get_naver_industries(
-                            include_leading_stock=False,
-                            cache_ttl_sec=cache_ttl_sec,
-                            time_budget_sec=time_budget_sec,
-                            limit_leading=limit_leading,
-                        )
-                    finally:
-                        _INDUSTRY_REFRESHING = False
-                ThreadPoolExecutor(max_workers=1).submit(_refresh)
-                return _INDUSTRY_CACHE
-
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        resp.encoding = 'euc-kr'
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        table = soup.select_one("table.type_1")
-        if not table:
-            return []
-
-        industries = []
-        rows = table.select("tr")
-        rank = 1
-
-        def parse_int(value: str):
-            try:
-                return int(value.replace(",", ""))
-            except Exception:
-                return 0
-
-        for row in rows:
-            cols = row.select("td")
-            if len(cols) < 6:
-                continue
-
-            link = cols[0].select_one("a")
-            if not link:
-                continue
-
-            name = link.get_text(strip=True)
-            change = cols[1].get_text(strip=True)
-            href = link.get("href") or ""
-            if name and href:
-                _INDUSTRY_LINK_CACHE[name] = href
-
-            total = parse_int(cols[2].get_text(strip=True))
-            up = parse_int(cols[3].get_text(strip=True))
-            flat = parse_int(cols[4].get_text(strip=True))
-            down = parse_int(cols[5].get_text(strip=True))
-
-            cached_leading = _get_cached_industry_leading(name)
-            industries.append({
-                "rank": rank,
-                "name": name,
-                "link": href,
-                "change": change,
-                "total": total,
-                "up": up,
-                "flat": flat,
-                "down": down,
-                "leadingStock": cached_leading if cached_leading != "-" else "-",
-            })
-            rank += 1
-
-        if include_leading_stock and industries:
-            start_time = time.time()
-            targets = industries[:limit_leading] if limit_leading else industries
-            if time.time() - start_time < time_budget_sec and targets:
-                with ThreadPoolExecutor(max_workers=5) as executor:
-                    futures = {
-                        executor.submit(fetch_industry_leading_stock, item["link"], item["name"]): i
-                        for i, item in enumerate(targets)
-                        if item.get("leadingStock") in ("", "-", None)
-                    }
-                    for future in futures:
-                        idx = futures[future]
-                        try:
-                            industries[idx]["leadingStock"] = future.result()
-                        except Exception:
-                            industries[idx]["leadingStock"] = "-"
-
-        if include_leading_stock:
-            if not limit_leading:
-                _INDUSTRY_LEADING_CACHE = industries
-                _INDUSTRY_LEADING_CACHE_AT = time.time()
-                _INDUSTRY_LEADING_CACHE_LIMITED = False
-        else:
-            _INDUSTRY_CACHE = industries
-            _INDUSTRY_CACHE_AT = time.time()
-        return industries
-
+        return _INDUSTRY_CACHE.get_or_load(
+            key,
+            lambda: _scrape_naver_industries(include_leading_stock, time_budget_sec, limit_leading),
+            ttl_sec=cache_ttl_sec,
+        )
     except Exception as e:
         print(f"Error scraping industries: {str(e)}")
-        return _INDUSTRY_LEADING_CACHE or _INDUSTRY_CACHE or []
+        return _INDUSTRY_CACHE.get(("industries", False, 0)) or []
+
+def _scrape_naver_industries(include_leading_stock: bool, time_budget_sec: int, limit_leading: int):
+    start_time = time.time()
+    rows = fetch_page(f"{BASE_URL}/sise/sise_group.nhn?type=upjong", parse_industry_page)
+
+    industries = []
+    for rank, row in enumerate(rows, start=1):
+        if row["name"] and row["link"]:
+            _LINK_CACHE.set(("industry", row["name"]), row["link"])
+        industries.append({"rank": rank, **row, "leadingStock": _get_cached_industry_leading(row["name"])})
+
+    if include_leading_stock and industries:
+        targets = industries[:limit_leading] if limit_leading else industries
+        remaining = time_budget_sec - (time.time() - start_time)
+        if remaining > 0:
+            _fill_within_budget(
+                targets,
+                lambda item: fetch_industry_leading_stock(item["link"], item["name"]),
+                remaining,
+            )
+    return industries
+
+# ---------------------------------------------------------------- members
 
 def get_naver_industry_members(industry_link: str):
     """
@@ -361,36 +347,17 @@ def get_naver_industry_members(industry_link: str):
     """
     if not industry_link:
         return []
-
-    url = industry_link
-    if industry_link.startswith("/"):
-        url = f"https://finance.naver.com{industry_link}"
-
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        resp.encoding = 'euc-kr'
-        soup = BeautifulSoup(resp.text, "html.parser")
-        table = soup.select_one("table.type_5")
-        if not table:
-            return []
-
-        tickers = []
-        for a in table.select("a[href*='code=']"):
-            href = a.get("href") or ""
-            if "code=" not in href:
-                continue
-            code = href.split("code=")[-1].split("&")[0]
-            if code and code.isdigit() and len(code) == 6:
-                tickers.append(code)
-
-        return sorted(set(tickers))
+        return fetch_page(_absolute(industry_link), parse_member_tickers, ttl_sec=MEMBER_PAGE_TTL_SEC)
     except Exception:
         return []
 
 def get_industry_link_by_name(name: str) -> str | None:
-    if not _INDUSTRY_LINK_CACHE:
+    link = _LINK_CACHE.get(("industry", name))
+    if link is None:
         get_naver_industries()
-    return _INDUSTRY_LINK_CACHE.get(name)
+        link = _LINK_CACHE.get(("industry", name))
+    return link
 
 def get_naver_theme_members(theme_link: str):
     """
@@ -398,33 +365,14 @@ def get_naver_theme_members(theme_link: str):
     """
     if not theme_link:
         return []
-
-    url = theme_link
-    if theme_link.startswith("/"):
-        url = f"https://finance.naver.com{theme_link}"
-
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        resp.encoding = 'euc-kr'
-        soup = BeautifulSoup(resp.text, "html.parser")
-        table = soup.select_one("table.type_5")
-        if not table:
-            return []
-
-        tickers = []
-        for a in table.select("a[href*='code=']"):
-            href = a.get("href") or ""
-            if "code=" not in href:
-                continue
-            code = href.split("code=")[-1].split("&")[0]
-            if code and code.isdigit() and len(code) == 6:
-                tickers.append(code)
-
-        return sorted(set(tickers))
+        return fetch_page(_absolute(theme_link), parse_member_tickers, ttl_sec=MEMBER_PAGE_TTL_SEC)
     except Exception:
         return []
 
 def get_theme_link_by_name(name: str) -> str | None:
-    if not _THEME_LINK_CACHE:
+    link = _LINK_CACHE.get(("theme", name))
+    if link is None:
         get_naver_themes()
-    return _THEME_LINK_CACHE.get(name)
+        link = _LINK_CACHE.get(("theme", name))
+    return link
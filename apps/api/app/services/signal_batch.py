@@ -0,0 +1,233 @@
+"""
+Cross-sectional evaluation of the simple_ma_v2_gate3 signal.
+
+compute_signal_simple_ma_v2_gate3 (services/signal_engine.py) builds one DataFrame
+per ticker and evaluates ~15 rolling series to read their last row. Here the
+bars of many tickers are stacked into a (bars x tickers) panel, every rolling
+series is computed once for all columns, and only the final-row state is
+turned into payloads. compute_live_signals uses it for tickers that have no
+usable indicator state yet (first nightly build, new listings, rewritten
+history).
+
+Panels are aligned by position (the n-th latest bar of every ticker), not by
+calendar date, which is what the per-ticker function sees too. Each rolling
+series is one pandas rolling-kernel pass over the tickers stacked end to end,
+with window bounds that restart at every ticker, so the kernel state is the
+same as for a fresh Series and the results are identical to the per-ticker
+function, not just close.
+(The per-ticker ATR subtracts the raw DB Decimals; that equals the float
+difference for KRW prices, which are whole numbers.)
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def _to_panel(series_list: list[list[tuple]]) -> dict[str, np.ndarray]:
+    """Rows (date, open, high, low, close, volume) of equal length -> float arrays [bar, ticker]."""
+    bars = len(series_list[0])
+    values = (
+        np.nan if value is None else float(value)
+        for rows in series_list
+        for row in sorted(rows, key=lambda row: row[0])
+        for value in row[1:6]
+    )
+    count = len(series_list) * bars * len(PRICE_COLUMNS)
+    frame = np.fromiter(values, dtype=float, count=count).reshape(len(series_list), bars, len(PRICE_COLUMNS))
+    # frame: [ticker, bar, field] -> one [bar, ticker] array per field
+    return {name: np.ascontiguousarray(frame[:, :, i].T) for i, name in enumerate(PRICE_COLUMNS)}
+
+
+class _PerTickerWindows(BaseIndexer):
+    """
+    Fixed trailing windows over tickers stacked end to end (each ticker's
+    `bars` rows contiguous); no window crosses into the previous ticker.
+    Each window restarts the kernel's running state at a ticker boundary,
+    exactly as a fresh Series would.
+    """
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        idx = np.arange(num_values, dtype=np.int64)
+        end = idx + 1
+        start = idx - np.minimum(idx % self.bars, self.window_size - 1)
+        return start, end
+
+
+def _rolling(values: np.ndarray, n: int, how: str, q: float | None = None) -> np.ndarray:
+    """Series.rolling(n, min_periods=n).<how>() for every column of a [bar, ticker] array, one kernel pass."""
+    bars, tickers = values.shape
+    stacked = pd.Series(values.T.ravel())
+    window = stacked.rolling(_PerTickerWindows(window_size=n, bars=bars), min_periods=n)
+    result = window.quantile(q) if how == "quantile" else window.mean()
+    return result.to_numpy().reshape(tickers, bars).T
+
+
+def _rolling_mean(values: np.ndarray, n: int) -> np.ndarray:
+    return _rolling(values, n, "mean")
+
+
+def _rolling_quantile(values: np.ndarray, window: int, q: float, tail: int) -> np.ndarray:
+    """Rolling quantile for the last `tail` bars only (NaN before); windows are self-contained, so this is exact."""
+    out = np.full_like(values, np.nan)
+    start = max(0, values.shape[0] - (window + tail - 1))
+    part = _rolling(np.ascontiguousarray(values[start:]), window, "quantile", q)
+    out[-tail:] = part[-tail:]
+    return out
+
+
+def _shift(values: np.ndarray, k: int) -> np.ndarray:
+    if k == 0:
+        return values.copy()
+    out = np.full_like(values, np.nan)
+    if k < values.shape[0]:
+        out[k:] = values[:-k]
+    return out
+
+
+def _nan_zero(values: np.ndarray) -> np.ndarray:
+    """x.replace({0: np.nan}) for float arrays."""
+    return np.where(values == 0, np.nan, values)
+
+
+def _triggers(signal: str, r: dict) -> list[str]:
+    if signal == "BUY":
+        return [
+            f"MA{r['short']} > MA{r['long']}",
+            f"Mom{r['mom']}d > 0",
+            "TrendGate",
+            "VolumeGate",
+            "VolatilityGate",
+            f"Confirm{r['confirm']}",
+        ]
+    if signal == "SELL":
+        return [
+            f"MA{r['short']} < MA{r['long']}",
+            f"Mom{r['mom']}d < 0",
+            "TrendGate",
+            "VolumeGate",
+            "VolatilityGate",
+            f"Confirm{r['confirm']}",
+        ]
+    return ["Gates not satisfied"]
+
+
+def _evaluate_panel(p: dict[str, np.ndarray], r: dict, weights: dict) -> list[dict]:
+    close = p["close"]
+    vol = p["volume"]
+    bars = close.shape[0]
+    confirm = r["confirm"]
+    tail = max(confirm, 1)
+
+    ma_s = _rolling_mean(close, r["short"])
+    ma_l = _rolling_mean(close, r["long"])
+    mom = close / _shift(close, r["mom"]) - 1.0
+    slope = (ma_l - _shift(ma_l, r["slope_lb"])) / float(r["slope_lb"])
+
+    vol_ma = _rolling_mean(vol, r["vol_n"])
+    vol_ratio = vol / _nan_zero(vol_ma)
+
+    prev_close = _shift(close, 1)
+    tr = np.fmax(
+        np.fmax(np.abs(p["high"] - p["low"]), np.abs(p["high"] - prev_close)),
+        np.abs(p["low"] - prev_close),
+    )
+    atr = _rolling_mean(tr, r["atr_n"])
+    atr_pct = atr / _nan_zero(close)
+    atr_pct_q = _rolling_quantile(atr_pct, r["vol_q_window"], r["vol_q"], tail)
+    atr_pct_fallback = _rolling_mean(atr_pct, 60)
+    atr_gate = np.where(np.isnan(atr_pct_q), atr_pct <= atr_pct_fallback, atr_pct <= atr_pct_q)
+
+    buy_base = (ma_s > ma_l) & (mom > 0)
+    sell_base = (ma_s < ma_l) & (mom < 0)
+    buy_trend = (close > ma_l) & (slope > 0)
+    sell_trend = (close < ma_l) & (slope < 0)
+
+    buy_event = (close > ma_s) & (prev_close <= _shift(ma_s, 1))
+    sell_event = (close < ma_s) & (prev_close >= _shift(ma_s, 1))
+    vol_gate_relaxed = vol_ratio >= 1.0
+    buy_vol_gate = np.where(buy_event, vol_ratio >= r["vol_mult"], vol_gate_relaxed)
+    sell_vol_gate = np.where(sell_event, vol_ratio >= r["vol_mult"], vol_gate_relaxed)
+
+    buy_final_raw = buy_base & buy_trend & atr_gate & buy_vol_gate
+    sell_final_raw = sell_base & sell_trend & atr_gate & sell_vol_gate
+    if confirm <= 1:
+        buy_final = buy_final_raw[-1]
+        sell_final = sell_final_raw[-1]
+    elif bars >= confirm:
+        buy_final = buy_final_raw[-confirm:].all(axis=0)
+        sell_final = sell_final_raw[-confirm:].all(axis=0)
+    else:
+        buy_final = sell_final = np.zeros(close.shape[1], dtype=bool)
+
+    # Confidence, last bar only.
+    ma_l_last = _nan_zero(ma_l[-1])
+    ma_gap = np.abs(ma_s[-1] - ma_l[-1]) / ma_l_last
+    trend_strength = np.abs(slope[-1]) / ma_l_last
+    vol_strength = np.clip((vol_ratio[-1] - 1.0) / max(r["vol_mult"] - 1.0, 1e-9), 0, 1)
+    vol_strength = np.where(buy_event[-1] | sell_event[-1], vol_strength, 0.0)
+    vol_strength = np.where(np.isnan(vol_strength), 0.0, vol_strength)
+    vol_penalty = np.clip((atr_pct[-1] - atr_pct_q[-1]) / _nan_zero(atr_pct_q[-1]), 0, 1)
+    vol_penalty = np.where(np.isnan(vol_penalty), 0.0, vol_penalty)
+    w_gap = weights.get("ma_gap", 0.45)
+    w_trend = weights.get("trend_strength", 0.35)
+    w_vol = weights.get("vol_strength", 0.20)
+    w_penalty = weights.get("vol_penalty", -0.40)
+    conf = (
+        w_gap * np.where(np.isnan(ma_gap), 0.0, ma_gap)
+        + w_trend * np.where(np.isnan(trend_strength), 0.0, trend_strength)
+        + w_vol * vol_strength
+        + w_penalty * vol_penalty
+    )
+    conf = np.clip(conf, 0, 1)
+    conf = np.where(np.isnan(conf), 0.0, conf)
+
+    payloads = []
+    for j in range(close.shape[1]):
+        if buy_final[j] and not sell_final[j]:
+            signal = "BUY"
+        elif sell_final[j] and not buy_final[j]:
+            signal = "SELL"
+        else:
+            signal = "WAIT"
+        vr = vol_ratio[-1, j]
+        payloads.append({
+            "signal": signal,
+            "confidence": float(conf[j]),
+            "triggers": _triggers(signal, r),
+            "debug": {
+                "buy_base": bool(buy_base[-1, j]),
+                "sell_base": bool(sell_base[-1, j]),
+                "buy_trend": bool(buy_trend[-1, j]),
+                "sell_trend": bool(sell_trend[-1, j]),
+                "atr_gate": bool(atr_gate[-1, j]),
+                "vol_ratio": float(vr) if not np.isnan(vr) else None,
+            },
+        })
+    return payloads
+
+
+def compute_signals_v2_gate3_batch(series_by_ticker: dict[str, list[tuple]], rules: dict, weights: dict) -> dict[str, dict]:
+    """
+    series_by_ticker: {ticker: [(date, open, high, low, close, volume), ...]} in any order.
+    Returns {ticker: payload} with the payload compute_signal_simple_ma_v2_gate3
+    would return for that ticker's rows. Tickers are evaluated in one panel per
+    distinct history length (normally a single one).
+    """
+    results: dict[str, dict] = {}
+    by_length: dict[int, list[str]] = {}
+    for ticker, rows in series_by_ticker.items():
+        if not rows:
+            results[ticker] = {"signal": "WAIT", "confidence": 0.0, "triggers": [], "debug": {"reason": "no_data"}}
+            continue
+        by_length.setdefault(len(rows), []).append(ticker)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for tickers in by_length.values():
+            panel = _to_panel([series_by_ticker[t] for t in tickers])
+            for ticker, payload in zip(tickers, _evaluate_panel(panel, rules, weights)):
+                results[ticker] = payload
+    return results
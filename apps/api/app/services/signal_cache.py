@@ -0,0 +1,73 @@
+"""
+Caches for GET /signals.
+
+- signal_config: the normalized config (one row read per TTL instead of per
+  request); PUT /signals/config invalidates it (other processes follow within
+  the TTL unless CACHE_BACKEND=redis shares the entry).
+- signal_results: the /signals items of one request, keyed by
+  (config hash, horizon, and per ticker its latest trade_date and price data
+  version). The data version is the ticker's row in ingest_data_version,
+  which every price_daily upsert touches in the same transaction
+  (ingest.bulk_writer.upsert_price_daily). A quote revision, backfill or new
+  bar misses the cache only for the requests that include that ticker; a
+  config change changes the hash.
+
+A hit costs one small indexed probe query and no pandas/state work, which is
+what dashboard polling of the same ticker set needs.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .cache import get_cache
+from .signal_config import load_signal_config
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../../../services/ingest"))
+
+from ingest.watermark import ensure_watermark_table  # noqa: E402
+
+PRICE_VERSION_SOURCE = "price_daily"  # ingest.bulk_writer.PRICE_VERSION_SOURCE
+
+_CONFIG = get_cache("signal_config", ttl_sec=60, max_entries=4)
+_RESULTS = get_cache("signal_results", ttl_sec=6 * 3600, max_entries=512)
+
+
+def cached_signal_config(db: Session) -> tuple[dict, str, dict]:
+    """load_signal_config() through the cache (no stale window: the loader uses the caller's session)."""
+    config, mode, defaults = _CONFIG.get_or_load("current", lambda: list(load_signal_config(db)))
+    return config, mode, defaults
+
+
+def invalidate_signal_config() -> None:
+    _CONFIG.invalidate("current")
+
+
+def _price_versions(db: Session, tickers_list: list[str]) -> str:
+    """Digest of every ticker's (latest trade_date, price data version), in one query."""
+    ensure_watermark_table(db)
+    rows = db.execute(text("""
+        SELECT req.ticker, lb.trade_date, EXTRACT(EPOCH FROM v.updated_at) AS version
+        FROM unnest(CAST(:tickers AS TEXT[])) WITH ORDINALITY AS req(ticker, ord)
+        LEFT JOIN LATERAL (
+            SELECT trade_date FROM price_daily p
+            WHERE p.ticker = req.ticker
+            ORDER BY p.trade_date DESC
+            LIMIT 1
+        ) lb ON true
+        LEFT JOIN ingest_data_version v ON v.source = :source AND v.key = req.ticker
+        ORDER BY req.ord
+    """), {"tickers": tickers_list, "source": PRICE_VERSION_SOURCE}).fetchall()
+    return hashlib.sha1(
+        ",".join(f"{row.ticker}:{row.trade_date}:{row.version}" for row in rows).encode()
+    ).hexdigest()
+
+
+def cached_signal_items(db: Session, tickers_list: list[str], horizon_key: str, config_hash: str, loader) -> list[dict]:
+    """Items for `tickers_list` from the cache, or loader() (cached under the current versions)."""
+    key = ("items", config_hash, horizon_key, _price_versions(db, tickers_list))
+    return _RESULTS.get_or_load(key, loader, cache_empty=True)
@@ -0,0 +1,122 @@
+"""
+Signal engine configuration: built-in horizon rules/weights and the stored
+override in signal_config (id=1). Shared by the /signals router and the
+worker's signals_nightly job.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..orm import SignalConfigRow
+
+SIGNAL_ENGINE_DEFAULT = os.environ.get("SIGNAL_ENGINE", "simple_ma_v2_gate3").lower()
+
+DEFAULT_SIGNAL_WEIGHTS = {
+    "ma_gap": 0.45,
+    "trend_strength": 0.35,
+    "vol_strength": 0.20,
+    "vol_penalty": -0.40,
+}
+
+HORIZON_RULES = {
+    "1D": dict(short=5, long=20, mom=5, slope_lb=10,
+               vol_n=20, vol_mult=1.20, atr_n=14,
+               vol_q_window=200, vol_q=0.90, confirm=2),
+    "3D": dict(short=10, long=30, mom=10, slope_lb=15,
+               vol_n=20, vol_mult=1.15, atr_n=14,
+               vol_q_window=200, vol_q=0.85, confirm=2),
+    "1W": dict(short=20, long=60, mom=20, slope_lb=20,
+               vol_n=20, vol_mult=1.10, atr_n=14,
+               vol_q_window=200, vol_q=0.80, confirm=1),
+}
+
+_RULE_FLOAT_KEYS = {"vol_mult", "vol_q"}
+ALLOWED_ENGINES = {"simple_ma_v1", "simple_ma_v2_gate3"}
+
+
+def default_signal_config() -> dict:
+    return {
+        "engine": SIGNAL_ENGINE_DEFAULT if SIGNAL_ENGINE_DEFAULT in ALLOWED_ENGINES else "simple_ma_v2_gate3",
+        "horizons": {key: value.copy() for key, value in HORIZON_RULES.items()},
+        "weights": DEFAULT_SIGNAL_WEIGHTS.copy(),
+    }
+
+
+def _normalize_rule(rule: dict, defaults: dict) -> dict:
+    normalized = {}
+    for key, default_val in defaults.items():
+        raw_val = rule.get(key, default_val)
+        try:
+            if key in _RULE_FLOAT_KEYS:
+                normalized[key] = float(raw_val)
+            else:
+                normalized[key] = int(raw_val)
+        except (TypeError, ValueError):
+            normalized[key] = default_val
+    return normalized
+
+
+def normalize_signal_config(config: dict) -> dict:
+    defaults = default_signal_config()
+    engine = str(config.get("engine", defaults["engine"])).lower()
+    if engine not in ALLOWED_ENGINES:
+        engine = defaults["engine"]
+
+    horizons_raw = config.get("horizons", {})
+    horizons = {}
+    for key, default_rule in defaults["horizons"].items():
+        rule_raw = horizons_raw.get(key, {}) if isinstance(horizons_raw, dict) else {}
+        horizons[key] = _normalize_rule(rule_raw, default_rule)
+
+    weights_raw = config.get("weights", {})
+    weights = {}
+    for key, default_val in defaults["weights"].items():
+        raw_val = weights_raw.get(key, default_val) if isinstance(weights_raw, dict) else default_val
+        try:
+            weights[key] = float(raw_val)
+        except (TypeError, ValueError):
+            weights[key] = default_val
+
+    return {"engine": engine, "horizons": horizons, "weights": weights}
+
+
+def load_signal_config(db: Session) -> tuple[dict, str, dict]:
+    """(config, "default" | "custom", defaults)"""
+    defaults = default_signal_config()
+    row = db.execute(select(SignalConfigRow).where(SignalConfigRow.id == 1)).scalar_one_or_none()
+    if not row:
+        return defaults, "default", defaults
+    config = normalize_signal_config({
+        "engine": row.engine,
+        "horizons": row.horizons,
+        "weights": row.weights,
+    })
+    return config, "custom", defaults
+
+
+def required_lookback(rules: dict) -> int:
+    """Bars with a close a ticker needs before its signal is evaluated."""
+    return max(
+        rules["long"],
+        rules["mom"],
+        rules["slope_lb"],
+        rules["vol_q_window"],
+        rules["vol_n"],
+        rules["atr_n"],
+        60,
+    ) + 5
+
+
+def signal_config_hash(config: dict, horizon: str) -> str:
+    """Identity of the (engine, horizon rules, weights) a signal was computed with."""
+    payload = {
+        "engine": config["engine"],
+        "rules": config["horizons"].get(horizon),
+        "weights": config["weights"],
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
@@ -0,0 +1,459 @@
+"""
+Signal computation shared by the /signals router and the worker's
+signals_nightly job: per-ticker engines, live evaluation for a list of
+tickers (target ranges from target_range), and the precomputed rows in
+timing_signal.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+from datetime import date as dt_date, datetime, timezone
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .signal_batch import compute_signals_v2_gate3_batch
+from .signal_config import required_lookback as _required_lookback
+from .target_range import TARGET_RANGE_BARS, _to_float, compute_target_ranges, latest_fs_ratios
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../../../services/ingest"))
+
+from ingest.indicator_state import evaluate_snapshot, refresh_states  # noqa: E402
+
+
+def _sma(s: pd.Series, n: int) -> pd.Series:
+    return s.rolling(n, min_periods=n).mean()
+
+def _atr(df: pd.DataFrame, n: int = 14) -> pd.Series:
+    high = df["high"]
+    low = df["low"]
+    close = df["close"]
+    prev_close = close.shift(1)
+    tr = pd.concat([
+        (high - low).abs(),
+        (high - prev_close).abs(),
+        (low - prev_close).abs(),
+    ], axis=1).max(axis=1)
+    return tr.rolling(n, min_periods=n).mean()
+
+def _rolling_quantile(s: pd.Series, window: int, q: float) -> pd.Series:
+    return s.rolling(window, min_periods=window).quantile(q)
+
+def _apply_confirm_bars(cond: pd.Series, confirm: int) -> pd.Series:
+    if confirm <= 1:
+        return cond.fillna(False)
+    c = cond.fillna(False).astype(int)
+    return c.rolling(confirm, min_periods=confirm).sum().eq(confirm)
+
+def _build_price_df(rows: list[tuple]) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=["date", "open", "high", "low", "close", "volume"])
+    df = df.sort_values("date")
+    return df
+
+def compute_signal_simple_ma_v1(price_daily: pd.DataFrame, horizon: str, rules: dict) -> dict:
+    r = rules
+    df = price_daily.copy().sort_values("date")
+    if df.empty:
+        return {"signal": "WAIT", "confidence": 0.0, "triggers": [], "debug": {"reason": "no_data"}}
+    close = df["close"].astype(float)
+    ma_s = _sma(close, r["short"])
+    ma_l = _sma(close, r["long"])
+    mom = close / close.shift(r["mom"]) - 1.0
+    last = df.index[-1]
+    buy_base = (ma_s > ma_l) & (mom > 0)
+    sell_base = (ma_s < ma_l) & (mom < 0)
+    signal = "WAIT"
+    triggers: list[str] = []
+    if bool(buy_base.loc[last]) and not bool(sell_base.loc[last]):
+        signal = "BUY"
+        triggers = [f"MA{r['short']} > MA{r['long']}", f"Mom{r['mom']}d > 0"]
+    elif bool(sell_base.loc[last]) and not bool(buy_base.loc[last]):
+        signal = "SELL"
+        triggers = [f"MA{r['short']} < MA{r['long']}", f"Mom{r['mom']}d < 0"]
+    else:
+        triggers = [f"MA{r['short']} ~ MA{r['long']}", f"Mom{r['mom']}d mixed"]
+    spread = abs(ma_s - ma_l) / ma_l.replace({0: np.nan})
+    confidence = float(spread.loc[last]) if not pd.isna(spread.loc[last]) else 0.0
+    confidence = max(0.0, min(confidence, 1.0))
+    return {
+        "signal": signal,
+        "confidence": confidence,
+        "triggers": triggers,
+        "debug": {
+            "buy_base": bool(buy_base.loc[last]) if not pd.isna(buy_base.loc[last]) else False,
+            "sell_base": bool(sell_base.loc[last]) if not pd.isna(sell_base.loc[last]) else False,
+        },
+    }
+
+def compute_signal_simple_ma_v2_gate3(price_daily: pd.DataFrame, horizon: str, rules: dict, weights: dict) -> dict:
+    r = rules
+    df = price_daily.copy().sort_values("date")
+    if df.empty:
+        return {"signal": "WAIT", "confidence": 0.0, "triggers": [], "debug": {"reason": "no_data"}}
+    for col in ("open", "high", "low", "close", "volume"):
+        if col not in df.columns:
+            return {"signal": "WAIT", "confidence": 0.0, "debug": {"reason": f"missing:{col}"}}
+
+    close = df["close"].astype(float)
+    vol = df["volume"].astype(float)
+
+    ma_s = _sma(close, r["short"])
+    ma_l = _sma(close, r["long"])
+    mom = close / close.shift(r["mom"]) - 1.0
+    slope = (ma_l - ma_l.shift(r["slope_lb"])) / float(r["slope_lb"])
+
+    vol_ma = _sma(vol, r["vol_n"])
+    vol_ratio = vol / vol_ma.replace({0: np.nan})
+
+    atr = _atr(df, r["atr_n"])
+    atr_pct = atr / close.replace({0: np.nan})
+    atr_pct_q = _rolling_quantile(atr_pct, r["vol_q_window"], r["vol_q"])
+    atr_pct_fallback = _sma(atr_pct, 60)
+    atr_gate = (atr_pct <= atr_pct_q)
+    atr_gate = atr_gate.where(~atr_pct_q.isna(), atr_pct <= atr_pct_fallback)
+    atr_gate = atr_gate.fillna(False)
+
+    buy_base = (ma_s > ma_l) & (mom > 0)
+    sell_base = (ma_s < ma_l) & (mom < 0)
+    buy_trend = (close > ma_l) & (slope > 0)
+    sell_trend = (close < ma_l) & (slope < 0)
+
+    buy_event = (close > ma_s) & (close.shift(1) <= ma_s.shift(1))
+    sell_event = (close < ma_s) & (close.shift(1) >= ma_s.shift(1))
+    vol_gate_relaxed = (vol_ratio >= 1.0)
+    buy_vol_gate = np.where(buy_event.fillna(False), (vol_ratio >= r["vol_mult"]), vol_gate_relaxed)
+    sell_vol_gate = np.where(sell_event.fillna(False), (vol_ratio >= r["vol_mult"]), vol_gate_relaxed)
+    buy_vol_gate = pd.Series(buy_vol_gate, index=df.index).fillna(False)
+    sell_vol_gate = pd.Series(sell_vol_gate, index=df.index).fillna(False)
+
+    buy_final_raw = buy_base & buy_trend & atr_gate & buy_vol_gate
+    sell_final_raw = sell_base & sell_trend & atr_gate & sell_vol_gate
+    buy_final = _apply_confirm_bars(buy_final_raw, r["confirm"])
+    sell_final = _apply_confirm_bars(sell_final_raw, r["confirm"])
+
+    last = df.index[-1]
+    if bool(buy_final.loc[last]) and not bool(sell_final.loc[last]):
+        signal = "BUY"
+    elif bool(sell_final.loc[last]) and not bool(buy_final.loc[last]):
+        signal = "SELL"
+    else:
+        signal = "WAIT"
+
+    ma_gap = (ma_s - ma_l).abs() / ma_l.replace({0: np.nan})
+    trend_strength = (slope.abs() / ma_l.replace({0: np.nan}))
+    vol_strength = ((vol_ratio - 1.0) / max(r["vol_mult"] - 1.0, 1e-9)).clip(0, 1)
+    is_event = (buy_event | sell_event).fillna(False)
+    vol_strength = vol_strength.where(is_event, 0.0).fillna(0.0)
+    vol_penalty = ((atr_pct - atr_pct_q) / atr_pct_q.replace({0: np.nan})).clip(0, 1)
+    vol_penalty = vol_penalty.fillna(0.0)
+    w_gap = weights.get("ma_gap", 0.45)
+    w_trend = weights.get("trend_strength", 0.35)
+    w_vol = weights.get("vol_strength", 0.20)
+    w_penalty = weights.get("vol_penalty", -0.40)
+    conf = (w_gap * ma_gap.fillna(0.0) + w_trend * trend_strength.fillna(0.0) + w_vol * vol_strength + w_penalty * vol_penalty)
+    conf = conf.clip(0, 1).fillna(0.0)
+
+    triggers: list[str] = []
+    if signal == "BUY":
+        triggers = [
+            f"MA{r['short']} > MA{r['long']}",
+            f"Mom{r['mom']}d > 0",
+            "TrendGate",
+            "VolumeGate",
+            "VolatilityGate",
+            f"Confirm{r['confirm']}",
+        ]
+    elif signal == "SELL":
+        triggers = [
+            f"MA{r['short']} < MA{r['long']}",
+            f"Mom{r['mom']}d < 0",
+            "TrendGate",
+            "VolumeGate",
+            "VolatilityGate",
+            f"Confirm{r['confirm']}",
+        ]
+    else:
+        triggers = ["Gates not satisfied"]
+
+    return {
+        "signal": signal,
+        "confidence": float(conf.loc[last]),
+        "triggers": triggers,
+        "debug": {
+            "buy_base": bool(buy_base.loc[last]) if not pd.isna(buy_base.loc[last]) else False,
+            "sell_base": bool(sell_base.loc[last]) if not pd.isna(sell_base.loc[last]) else False,
+            "buy_trend": bool(buy_trend.loc[last]) if not pd.isna(buy_trend.loc[last]) else False,
+            "sell_trend": bool(sell_trend.loc[last]) if not pd.isna(sell_trend.loc[last]) else False,
+            "atr_gate": bool(atr_gate.loc[last]) if not pd.isna(atr_gate.loc[last]) else False,
+            "vol_ratio": float(vol_ratio.loc[last]) if not pd.isna(vol_ratio.loc[last]) else None,
+        }
+    }
+
+
+def compute_live_signals(
+    db: Session, tickers_list: list[str], horizon_key: str, signal_config: dict, persist_state: bool = False
+) -> list[dict]:
+    """
+    Evaluate `tickers_list` on their latest bars; one /signals item per ticker, in order.
+    Read-only unless persist_state=True (the nightly job), which also stores
+    the advanced indicator states and seeds the missing ones.
+    """
+    config = signal_config["horizons"].get(horizon_key, signal_config["horizons"]["1D"])
+    engine = signal_config["engine"]
+    model_version_default = "simple_ma_v1" if engine == "simple_ma_v1" else "simple_ma_v2_gate3"
+
+    required_lookback = _required_lookback(config)
+
+    # simple_ma_v2_gate3: incremental per-ticker state (ingest.indicator_state);
+    # only bars the state has not consumed yet are read. Tickers without a
+    # usable state are evaluated from their last required_lookback bars in one
+    # panel pass (signal_batch) rather than replayed bar by bar.
+    states: dict[str, tuple] = {}
+    if engine != "simple_ma_v1":
+        states = refresh_states(db, tickers_list, config, persist=persist_state, seed=False)
+
+    def _has_state_history(symbol: str) -> bool:
+        return symbol in states and states[symbol][1]["valid_run"] >= required_lookback
+
+    # Bars per ticker: the target range only needs the last TARGET_RANGE_BARS
+    # when the state already answers the signal; otherwise the full lookback.
+    rows = db.execute(
+        text(
+            """
+            SELECT req.ticker, b.trade_date, b.open, b.high, b.low, b.close, b.volume
+            FROM unnest(CAST(:tickers AS TEXT[]), CAST(:limits AS INT[])) AS req(ticker, lim)
+            JOIN LATERAL (
+                SELECT p.trade_date, p.open, p.high, p.low, p.close, p.volume
+                FROM price_daily p
+                WHERE p.ticker = req.ticker
+                ORDER BY p.trade_date DESC
+                LIMIT req.lim
+            ) b ON true
+            ORDER BY req.ticker, b.trade_date DESC
+            """
+        ),
+        {
+            "tickers": list(dict.fromkeys(tickers_list)),
+            "limits": [
+                TARGET_RANGE_BARS if _has_state_history(symbol) else required_lookback
+                for symbol in dict.fromkeys(tickers_list)
+            ],
+        },
+    ).fetchall()
+
+    name_rows = db.execute(
+        text(
+            """
+            SELECT stock_code, name_ko, company_id
+            FROM company
+            WHERE stock_code = ANY(:tickers)
+            """
+        ),
+        {"tickers": tickers_list},
+    ).fetchall()
+    name_map = {row.stock_code: row.name_ko for row in name_rows}
+    company_map = {row.stock_code: row.company_id for row in name_rows}
+    ratio_map = latest_fs_ratios(db, [row.company_id for row in name_rows if row.company_id is not None])
+
+    grouped: dict[str, list[tuple]] = {}
+    for row in rows:
+        grouped.setdefault(row.ticker, []).append(
+            (row.trade_date, row.open, row.high, row.low, row.close, row.volume)
+        )
+    # Target ranges for every ticker with bars in one array pass.
+    targets = compute_target_ranges(
+        grouped,
+        {
+            symbol: ratio_map[company_map[symbol]]
+            for symbol in grouped
+            if company_map.get(symbol) in ratio_map
+        },
+    )
+
+    def _has_history(symbol: str, series: list[tuple]) -> bool:
+        if symbol in states:
+            return _has_state_history(symbol)
+        return sum(1 for value in series if _to_float(value[4]) is not None) >= required_lookback
+
+    cold: dict[str, dict] = {}
+    if engine != "simple_ma_v1":
+        cold = compute_signals_v2_gate3_batch(
+            {
+                symbol: series
+                for symbol, series in grouped.items()
+                if symbol not in states and _has_history(symbol, series)
+            },
+            config,
+            signal_config["weights"],
+        )
+
+    items = []
+    for symbol in tickers_list:
+        series = grouped.get(symbol, [])
+        if not series:
+            items.append({
+                "ts": dt_date.today().isoformat(),
+                "ticker": symbol,
+                "name": name_map.get(symbol),
+                "horizon": horizon_key,
+                "signal": "WAIT",
+                "confidence": 0.0,
+                "triggers": ["데이터 부족"],
+                "risk_flags": ["NO_PRICE_DATA"],
+                "model_version": model_version_default,
+                "target_price_low": None,
+                "target_price_high": None,
+                "target_price_basis": None,
+            })
+            continue
+
+        trade_date = series[0][0]
+        if not _has_history(symbol, series):
+            low, high, basis = targets[symbol]
+            items.append({
+                "ts": trade_date.isoformat() if trade_date else dt_date.today().isoformat(),
+                "ticker": symbol,
+                "name": name_map.get(symbol),
+                "horizon": horizon_key,
+                "signal": "WAIT",
+                "confidence": 0.0,
+                "triggers": ["데이터 부족"],
+                "risk_flags": ["INSUFFICIENT_HISTORY"],
+                "model_version": model_version_default,
+                "target_price_low": low,
+                "target_price_high": high,
+                "target_price_basis": basis,
+            })
+            continue
+
+        if engine == "simple_ma_v1":
+            signal_payload = compute_signal_simple_ma_v1(_build_price_df(series), horizon_key, config)
+            model_version = "simple_ma_v1"
+        elif symbol in cold:
+            signal_payload = cold[symbol]
+            model_version = "simple_ma_v2_gate3"
+        else:
+            signal_payload = evaluate_snapshot(states[symbol][1], config, signal_config["weights"])
+            model_version = "simple_ma_v2_gate3"
+        signal = signal_payload.get("signal", "WAIT")
+        confidence = signal_payload.get("confidence", 0.0)
+        triggers = signal_payload.get("triggers", [])
+
+        low, high, basis = targets[symbol]
+
+        items.append({
+            "ts": trade_date.isoformat() if trade_date else dt_date.today().isoformat(),
+            "ticker": symbol,
+            "name": name_map.get(symbol),
+            "horizon": horizon_key,
+            "signal": signal,
+            "confidence": round(confidence, 3),
+            "triggers": triggers,
+            "risk_flags": [],
+            "model_version": model_version,
+            "target_price_low": low,
+            "target_price_high": high,
+            "target_price_basis": basis,
+        })
+
+    if persist_state and engine != "simple_ma_v1":
+        # Seed states for the cold tickers so the next run is incremental.
+        refresh_states(db, [symbol for symbol in grouped if symbol not in states], config)
+    return items
+
+
+# ---------------------------------------------------------------- precomputed
+
+def signal_ts(trade_date: dt_date) -> datetime:
+    """timing_signal.ts for signals of `trade_date` (same convention as the daily_close job)."""
+    return datetime(trade_date.year, trade_date.month, trade_date.day, 15, 30, tzinfo=timezone.utc)
+
+
+def write_signal_rows(db: Session, items: list[dict], config_hash: str) -> int:
+    """Upsert /signals items into timing_signal (items without a bar are skipped). Does not commit."""
+    params = [
+        {
+            "ts": signal_ts(dt_date.fromisoformat(item["ts"])),
+            "ticker": item["ticker"],
+            "horizon": item["horizon"],
+            "signal": item["signal"],
+            "confidence": item["confidence"],
+            "triggers": json.dumps(item["triggers"], ensure_ascii=False),
+            "risk_flags": json.dumps(item["risk_flags"]),
+            "model_version": item["model_version"],
+            "target_low": item["target_price_low"],
+            "target_high": item["target_price_high"],
+            "target_basis": json.dumps(item["target_price_basis"]) if item["target_price_basis"] else None,
+            "config_hash": config_hash,
+        }
+        for item in items
+        if "NO_PRICE_DATA" not in item["risk_flags"]
+    ]
+    if not params:
+        return 0
+    db.execute(text("""
+        INSERT INTO timing_signal
+            (ts, ticker, horizon, signal, confidence, triggers, risk_flags, model_version,
+             target_price_low, target_price_high, target_price_basis, config_hash)
+        VALUES (:ts, :ticker, :horizon, CAST(:signal AS signal_type), :confidence,
+                CAST(:triggers AS JSON), CAST(:risk_flags AS JSON), :model_version,
+                :target_low, :target_high, CAST(:target_basis AS JSON), :config_hash)
+        ON CONFLICT (ts, ticker, horizon) DO UPDATE
+        SET signal = EXCLUDED.signal,
+            confidence = EXCLUDED.confidence,
+            triggers = EXCLUDED.triggers,
+            risk_flags = EXCLUDED.risk_flags,
+            model_version = EXCLUDED.model_version,
+            target_price_low = EXCLUDED.target_price_low,
+            target_price_high = EXCLUDED.target_price_high,
+            target_price_basis = EXCLUDED.target_price_basis,
+            config_hash = EXCLUDED.config_hash
+    """), params)
+    return len(params)
+
+
+def load_precomputed_signals(db: Session, tickers_list: list[str], horizon_key: str, config_hash: str) -> dict[str, dict]:
+    """
+    {ticker: /signals item} for tickers whose newest timing_signal row was
+    computed with `config_hash` on the ticker's latest price_daily bar.
+    Anything else (no row, older bar, other config) is left to live compute.
+    """
+    rows = db.execute(text("""
+        SELECT req.ticker, c.name_ko, s.ts, s.signal, s.confidence, s.triggers, s.risk_flags, s.model_version,
+               s.target_price_low, s.target_price_high, s.target_price_basis
+        FROM unnest(CAST(:tickers AS TEXT[])) AS req(ticker)
+        JOIN LATERAL (
+            SELECT trade_date FROM price_daily p
+            WHERE p.ticker = req.ticker
+            ORDER BY p.trade_date DESC
+            LIMIT 1
+        ) lb ON true
+        JOIN LATERAL (
+            SELECT * FROM timing_signal t
+            WHERE t.ticker = req.ticker AND t.horizon = :horizon AND t.config_hash = :config_hash
+            ORDER BY t.ts DESC
+            LIMIT 1
+        ) s ON (s.ts AT TIME ZONE 'UTC')::date = lb.trade_date
+        LEFT JOIN company c ON c.stock_code = req.ticker
+    """), {"tickers": list(dict.fromkeys(tickers_list)), "horizon": horizon_key, "config_hash": config_hash}).fetchall()
+    return {
+        row.ticker: {
+            "ts": row.ts.astimezone(timezone.utc).date().isoformat(),
+            "ticker": row.ticker,
+            "name": row.name_ko,
+            "horizon": horizon_key,
+            "signal": row.signal,
+            "confidence": float(row.confidence) if row.confidence is not None else 0.0,
+            "triggers": row.triggers or [],
+            "risk_flags": row.risk_flags or [],
+            "model_version": row.model_version,
+            "target_price_low": int(row.target_price_low) if row.target_price_low is not None else None,
+            "target_price_high": int(row.target_price_high) if row.target_price_high is not None else None,
+            "target_price_basis": row.target_price_basis,
+        }
+        for row in rows
+    }
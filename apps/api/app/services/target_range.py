@@ -0,0 +1,214 @@
+"""
+ATR-based target price range shared by /signals, /recommendations and the
+worker's signals_nightly job.
+
+compute_target_range() is the per-ticker reference. compute_target_ranges()
+returns the same results for many tickers at once: the dates and closes of
+every ticker go into one set of arrays, sorted per ticker. The last 15 bars
+with a close (the only ones whose high/low are converted) give 14 true
+ranges; ATR-14 and the tech bands are computed with array ops. The float operations run in
+the same order as the scalar version (the ATR is summed left to right), so
+the results are identical, not merely close.
+"""
+from __future__ import annotations
+
+from typing import Hashable
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+ATR_N = 14
+LOW_ATR_MULT = 1.5
+HIGH_ATR_MULT = 2.0
+# ATR14 over the latest bars needs the previous close of its first bar.
+TARGET_RANGE_BARS = ATR_N + 1
+
+
+def _to_float(value: object | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _round_price(value: float) -> int:
+    return int(round(value / 10.0) * 10)
+
+
+def _quality_factor(roe: float | None, debt_ratio: float | None) -> float:
+    factor = 1.0
+    if roe is not None:
+        if roe >= 15:
+            factor += 0.1
+        elif roe <= 5:
+            factor -= 0.1
+    if debt_ratio is not None:
+        if debt_ratio >= 200:
+            factor -= 0.1
+        elif debt_ratio <= 100:
+            factor += 0.05
+    return max(0.7, min(1.3, factor))
+
+
+def _range_from_atr(latest_close: float, atr: float, factor: float):
+    tech_low = latest_close - (atr * LOW_ATR_MULT)
+    tech_high = latest_close + (atr * HIGH_ATR_MULT)
+    low = latest_close - (latest_close - tech_low) * factor
+    high = latest_close + (tech_high - latest_close) * factor
+    return _round_price(low), _round_price(high), {
+        "basis": "mixed_atr_roe_debt",
+        "atr": round(atr, 2),
+        "factor": round(factor, 2),
+    }
+
+
+def _column(rows: list[tuple], position: int) -> np.ndarray:
+    return np.fromiter(
+        (np.nan if row[position] is None else float(row[position]) for row in rows),
+        dtype=float,
+        count=len(rows),
+    )
+
+
+def compute_target_range(series: list[tuple], roe: float | None, debt_ratio: float | None):
+    """
+    series: (trade_date, open, high, low, close) rows in any order.
+    Returns (low, high, basis), or (None, None, None) without a usable close/ATR.
+    """
+    if not series:
+        return None, None, None
+    series_sorted = sorted(series, key=lambda x: x[0])
+    closes = [_to_float(row[4]) for row in series_sorted]
+    closes = [value for value in closes if value is not None]
+    if not closes:
+        return None, None, None
+    latest_close = closes[-1]
+    if latest_close <= 0:
+        return None, None, None
+
+    trs: list[float] = []
+    prev_close = None
+    for trade_date, open_p, high_p, low_p, close_p in series_sorted:
+        close_val = _to_float(close_p)
+        if close_val is None:
+            continue
+        high_val = _to_float(high_p) if high_p is not None else close_val
+        low_val = _to_float(low_p) if low_p is not None else close_val
+        if high_val is None or low_val is None:
+            continue
+        if prev_close is None:
+            tr = high_val - low_val
+        else:
+            tr = max(
+                high_val - low_val,
+                abs(high_val - prev_close),
+                abs(low_val - prev_close),
+            )
+        trs.append(tr)
+        prev_close = close_val
+
+    if not trs:
+        return None, None, None
+    lookback = min(ATR_N, len(trs))
+    atr = sum(trs[-lookback:]) / lookback if lookback else 0.0
+    if atr <= 0:
+        return None, None, None
+    return _range_from_atr(latest_close, atr, _quality_factor(roe, debt_ratio))
+
+
+def compute_target_ranges(
+    series_by_key: dict[Hashable, list[tuple]],
+    ratios: dict[Hashable, tuple[float | None, float | None]] | None = None,
+) -> dict[Hashable, tuple]:
+    """
+    Batch compute_target_range(): {key: (low, high, basis)} for every key,
+    with ratios {key: (roe, debt_ratio)} (missing keys: no adjustment).
+    """
+    ratios = ratios or {}
+    keys = list(series_by_key)
+    results: dict[Hashable, tuple] = {key: (None, None, None) for key in keys}
+    counts = np.fromiter((len(series_by_key[key]) for key in keys), dtype=np.int64, count=len(keys))
+    total = int(counts.sum())
+    if total == 0:
+        return results
+
+    rows = [row for key in keys for row in series_by_key[key]]
+    group = np.repeat(np.arange(len(keys)), counts)
+    ordinals = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=total)
+    close = _column(rows, 4)
+
+    # Chronological within each ticker; rows without a close do not count (as in the scalar loop).
+    order = np.lexsort((ordinals, group))
+    order = order[~np.isnan(close[order])]
+    if order.size == 0:
+        return results
+    group, close = group[order], close[order]
+    valid = np.bincount(group, minlength=len(keys))
+    from_end = np.cumsum(valid)[group] - 1 - np.arange(group.size)  # 0 = latest bar of its ticker
+
+    # Only the last TARGET_RANGE_BARS valid bars feed ATR14; high/low are read for those alone.
+    recent = from_end < TARGET_RANGE_BARS
+    order, group, close, from_end = order[recent], group[recent], close[recent], from_end[recent]
+    recent_rows = [rows[idx] for idx in order]
+    high = _column(recent_rows, 2)
+    low = _column(recent_rows, 3)
+    high = np.where(np.isnan(high), close, high)
+    low = np.where(np.isnan(low), close, low)
+    first = np.ones(group.size, dtype=bool)
+    first[1:] = group[1:] != group[:-1]
+
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    hl = high - low
+    tr = np.where(
+        first,
+        hl,
+        np.maximum(np.maximum(hl, np.abs(high - prev_close)), np.abs(low - prev_close)),
+    )
+
+    # Latest ATR_N true ranges per ticker, right-aligned and zero-padded on the left,
+    # then summed column by column (the scalar sum() order).
+    window = from_end < ATR_N
+    trs = np.zeros((len(keys), ATR_N))
+    trs[group[window], ATR_N - 1 - from_end[window]] = tr[window]
+    acc = np.zeros(len(keys))
+    for column in range(ATR_N):
+        acc = acc + trs[:, column]
+    lookback = np.minimum(valid, ATR_N)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr = acc / lookback
+
+    latest_close = np.full(len(keys), np.nan)
+    latest_close[group[from_end == 0]] = close[from_end == 0]
+
+    usable = (valid > 0) & (latest_close > 0) & (atr > 0)
+    for idx in np.flatnonzero(usable):
+        key = keys[idx]
+        roe, debt_ratio = ratios.get(key, (None, None))
+        results[key] = _range_from_atr(float(latest_close[idx]), float(atr[idx]), _quality_factor(roe, debt_ratio))
+    return results
+
+
+def latest_fs_ratios(db: Session, company_ids: list[int]) -> dict[int, tuple[float | None, float | None]]:
+    """{company_id: (roe, debt_ratio)} from the latest fs_ratio_mart quarter."""
+    if not company_ids:
+        return {}
+    rows = db.execute(
+        text(
+            """
+            SELECT DISTINCT ON (company_id)
+                company_id,
+                roe,
+                debt_ratio
+            FROM fs_ratio_mart
+            WHERE company_id = ANY(:company_ids)
+            ORDER BY company_id, fiscal_year DESC, fiscal_quarter DESC
+            """
+        ),
+        {"company_ids": company_ids},
+    ).fetchall()
+    return {row.company_id: (_to_float(row.roe), _to_float(row.debt_ratio)) for row in rows}
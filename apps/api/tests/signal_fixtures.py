@@ -0,0 +1,23 @@
+"""Synthetic daily bars shared by the signal engine tests."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+
+def random_bars(rng, bars: int, kind: str, start: date = date(2023, 1, 2)) -> list[tuple]:
+    """(trade_date, open, high, low, close, volume) rows, oldest first; kind: up/down/noise/flat."""
+    if kind == "flat":
+        closes = np.full(bars, 10000.0)
+    else:
+        drift = {"up": 0.004, "down": -0.004, "noise": 0.0}[kind]
+        closes = np.round(10000 * np.exp(np.cumsum(rng.normal(drift, 0.02, bars))))
+    volumes = rng.integers(0, 2_000_000, bars).astype(float)
+    volumes[rng.random(bars) < 0.05] = 0
+    rows = []
+    for i, close in enumerate(closes):
+        high = close + float(rng.integers(0, 300))
+        low = max(close - float(rng.integers(0, 300)), 1.0)
+        volume = None if rng.random() < 0.02 else Decimal(int(volumes[i]))
+        rows.append((start + timedelta(days=i), Decimal(int(close)), Decimal(int(high)), Decimal(int(low)), Decimal(int(close)), volume))
+    return rows
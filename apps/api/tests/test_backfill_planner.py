@@ -0,0 +1,82 @@
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest import backfill_planner
+from ingest.backfill_planner import checked_sessions, missing_ranges, record_checked_range
+
+
+def _weekdays(start, count):
+    days = []
+    cursor = start
+    while len(days) < count:
+        if cursor.weekday() < 5:
+            days.append(cursor)
+        cursor += timedelta(days=1)
+    return days
+
+
+def test_up_to_date_ticker_needs_nothing():
+    sessions = _weekdays(date(2024, 1, 1), 20)
+    assert missing_ranges("005930", sessions, set(sessions), sessions[-1]) == []
+
+
+def test_tail_and_interior_gaps():
+    sessions = _weekdays(date(2024, 1, 1), 40)
+    have = set(sessions[:10]) | set(sessions[11:30])  # one-day hole at 10, tail from 30
+    end = sessions[-1] + timedelta(days=2)
+
+    plan = missing_ranges("005930", sessions, have, end, merge_gap=5)
+
+    assert [(r.start, r.end, r.sessions) for r in plan] == [
+        (sessions[10], sessions[10], 1),
+        (sessions[30], end, 10),
+    ]
+
+
+def test_close_gaps_are_merged():
+    sessions = _weekdays(date(2024, 1, 1), 20)
+    have = set(sessions) - {sessions[3], sessions[6]}
+
+    plan = missing_ranges("005930", sessions, have, sessions[-1], merge_gap=5)
+
+    assert len(plan) == 1
+    assert (plan[0].start, plan[0].end, plan[0].sessions) == (sessions[3], sessions[6], 2)
+
+
+def test_new_ticker_fetches_whole_window():
+    sessions = _weekdays(date(2024, 1, 1), 15)
+    plan = missing_ranges("999999", sessions, set(), sessions[-1])
+    assert [(r.start, r.end, r.sessions) for r in plan] == [(sessions[0], sessions[-1], 15)]
+
+
+def test_checked_sessions_without_bars_are_not_replanned():
+    sessions = _weekdays(date(2024, 1, 1), 30)
+    # Listed at session 10, halted for sessions 20-22; KIS answered for all of it.
+    loaded = set(sessions[10:20]) | set(sessions[23:])
+    checked = [(sessions[0], sessions[12]), (sessions[13], sessions[-1])]
+
+    have = loaded | checked_sessions(sessions, checked)
+
+    assert missing_ranges("005930", sessions, have, sessions[-1]) == []
+    assert missing_ranges("005930", sessions, loaded, sessions[-1])[0].start == sessions[0]
+
+
+class _RecordingDb:
+    def __init__(self):
+        self.params = []
+
+    def execute(self, statement, params):
+        self.params.append(params)
+
+
+def test_checked_range_stops_before_today(monkeypatch):
+    monkeypatch.setattr(backfill_planner, "_TABLE_READY", True)
+    db = _RecordingDb()
+
+    record_checked_range(db, "005930", date(2024, 1, 2), date(2024, 1, 10), today=date(2024, 1, 10))
+    record_checked_range(db, "005930", date(2024, 1, 10), date(2024, 1, 10), today=date(2024, 1, 10))
+
+    assert db.params == [{"t": "005930", "s": date(2024, 1, 2), "e": date(2024, 1, 9)}]
@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from app.services.cache import TTLCache
+
+
+def test_cold_key_loads_once_for_concurrent_callers():
+    cache = TTLCache("test_single_flight", ttl_sec=60)
+    calls = []
+    gate = threading.Event()
+
+    def loader():
+        calls.append(1)
+        gate.wait(1)
+        return ["value"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [["value"]] * 8
+    assert cache.stats()["misses"] == 8
+    assert cache.stats()["loads"] == 1
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    cache = TTLCache("test_swr", ttl_sec=0.01, stale_ttl_sec=60)
+    cache.set("k", "old")
+    time.sleep(0.02)
+    refreshed = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        refreshed.set()
+        return "new"
+
+    assert cache.get_or_load("k", loader) == "old"
+    assert refreshed.wait(1)
+    time.sleep(0.05)
+    assert cache.get_or_load("k", loader) == "new"
+    assert len(calls) == 1
+
+
+def test_loader_error_reaches_caller_and_is_not_cached():
+    cache = TTLCache("test_errors", ttl_sec=60)
+
+    def boom():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", boom)
+    assert cache.get_or_load("k", lambda: "ok") == "ok"
+    assert cache.stats()["load_errors"] == 1
+
+
+def test_lru_eviction_keeps_recently_used_keys():
+    cache = TTLCache("test_lru", ttl_sec=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def _redis_pair():
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.services.cache import RedisBackend
+
+    server = fakeredis.FakeServer()
+    # Two caches on one server stand in for two uvicorn workers.
+    return [
+        TTLCache("test_shared", ttl_sec=60, backend=RedisBackend(fakeredis.FakeRedis(server=server), "test_shared"))
+        for _ in range(2)
+    ]
+
+
+def test_redis_backend_shares_entries_between_workers():
+    worker_a, worker_b = _redis_pair()
+    worker_a.set(("themes", True, 5), [{"name": "반도체"}])
+    assert worker_b.get(("themes", True, 5)) == [{"name": "반도체"}]
+    assert worker_b.get_or_load(("themes", True, 5), lambda: pytest.fail("should hit")) == [{"name": "반도체"}]
+
+
+def test_redis_backend_loads_cold_key_once_across_workers():
+    worker_a, worker_b = _redis_pair()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": 1}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda c=c: results.append(c.get_or_load("indices", loader)))
+        for c in (worker_a, worker_b)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [{"value": 1}, {"value": 1}]
+
+
+def test_redis_errors_degrade_to_misses():
+    from app.services.cache import RedisBackend
+
+    class DownClient:
+        def __getattr__(self, name):
+            def fail(*args, **kwargs):
+                raise ConnectionError("redis down")
+            return fail
+
+    cache = TTLCache("test_down", ttl_sec=60, backend=RedisBackend(DownClient(), "test_down"))
+    assert cache.get_or_load("k", lambda: "loaded") == "loaded"
+    assert cache.get_or_load("k", lambda: "again") == "again"
+
+
+def test_redis_backend_skips_values_it_cannot_serialize():
+    from ingest import metrics
+
+    worker_a, worker_b = _redis_pair()
+    series = 'api_cache_backend_errors_total{backend="redis",op="set"}'
+    before = metrics.snapshot().get(series, 0)
+
+    assert worker_a.get_or_load("rows", lambda: {object()}) is not None
+    assert worker_b.get("rows") is None
+    assert metrics.snapshot().get(series, 0) == before + 1
@@ -0,0 +1,78 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest import naver_classification_sync as ncs
+
+
+class FakeScrapers:
+    BASE_URL = "https://finance.naver.com"
+
+    def __init__(self, pages, failing=()):
+        self.pages = pages
+        self.failing = set(failing)
+
+    @staticmethod
+    def parse_member_tickers(html):
+        return []
+
+    @staticmethod
+    def _absolute(link):
+        return f"https://finance.naver.com{link}"
+
+    def fetch_page(self, url, parse, ttl_sec=None):
+        code = ncs.node_code(url)
+        if code in self.failing:
+            raise RuntimeError("503")
+        return self.pages.get(code, [])
+
+
+def test_node_code_reads_group_number():
+    assert ncs.node_code("/sise/sise_group_detail.naver?type=upjong&no=278") == "278"
+    assert ncs.node_code("/sise/sise_group_detail.naver?no=5&type=theme") == "5"
+    assert ncs.node_code("/sise/theme.nhn") is None
+
+
+def test_failed_member_pages_are_not_reported_as_empty():
+    groups = [
+        {"name": "반도체", "link": "/sise/sise_group_detail.naver?type=upjong&no=1"},
+        {"name": "제약", "link": "/sise/sise_group_detail.naver?type=upjong&no=2"},
+        {"name": "반도체", "link": "/sise/sise_group_detail.naver?type=upjong&no=1"},
+        {"name": "은행", "link": "/sise/sise_group_detail.naver?type=upjong&no=3"},
+    ]
+    scrapers = FakeScrapers({"1": ["005930", "000660"], "3": []}, failing={"2"})
+    nodes, members, failed = ncs.fetch_memberships(scrapers, groups)
+    assert [n["code"] for n in nodes] == ["1", "2", "3"]
+    # Node 3 really has no members (its memberships get closed); node 2 failed and is left alone.
+    assert members == {"1": ["005930", "000660"], "3": []}
+    assert failed == ["2"]
+
+
+class FakeListScrapers(FakeScrapers):
+    def __init__(self, theme_pages):
+        super().__init__({})
+        self.theme_pages = theme_pages
+
+    @staticmethod
+    def parse_theme_page(html):
+        return []
+
+    parse_industry_page = parse_theme_page
+
+    def fetch_page(self, url, parse, ttl_sec=None):
+        if "theme.nhn" in url:
+            page = int(url.rsplit("=", 1)[1])
+            return self.theme_pages[page - 1] if page <= len(self.theme_pages) else []
+        return [{"name": "반도체", "link": "/sise/sise_group_detail.naver?type=upjong&no=1"}]
+
+
+def test_list_is_complete_only_when_read_to_the_end():
+    row = {"name": "2차전지", "link": "/sise/sise_group_detail.naver?type=theme&no=64"}
+    groups, complete = ncs.fetch_groups(FakeListScrapers([[row], [row]]), ncs.THEME_TAXONOMY)
+    assert len(groups) == 2 and complete
+    # Every page had rows: later pages may exist, so absent codes must not be closed.
+    _, complete = ncs.fetch_groups(FakeListScrapers([[row]] * ncs.THEME_PAGES), ncs.THEME_TAXONOMY)
+    assert not complete
+    _, complete = ncs.fetch_groups(FakeListScrapers([]), ncs.INDUSTRY_TAXONOMY)
+    assert complete
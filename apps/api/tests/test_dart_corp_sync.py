@@ -0,0 +1,68 @@
+import io
+import os
+import sys
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest import dart_corp_sync
+from ingest.config import settings
+
+
+def _corp_zip() -> bytes:
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8"?><result>'
+        "<list><corp_code>00126380</corp_code><corp_name>삼성전자</corp_name><stock_code>005930</stock_code></list>"
+        "<list><corp_code>00999999</corp_code><corp_name>비상장</corp_name><stock_code> </stock_code></list>"
+        "<list><corp_code>00164779</corp_code><corp_name>SK하이닉스</corp_name><stock_code>000660</stock_code></list>"
+        "</result>"
+    )
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("CORPCODE.xml", xml.encode("utf-8"))
+    return buf.getvalue()
+
+
+def test_iter_listed_corp_codes(tmp_path):
+    path = tmp_path / "corpCode.zip"
+    path.write_bytes(_corp_zip())
+    assert list(dart_corp_sync.iter_listed_corp_codes(str(path))) == [
+        ("00126380", "005930"),
+        ("00164779", "000660"),
+    ]
+
+
+def test_download_is_skipped_when_etag_matches(tmp_path, monkeypatch):
+    body = _corp_zip()
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            requests_seen.append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "DART_CACHE_DIR", str(tmp_path))
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        path, downloaded = dart_corp_sync.download_corp_code_zip("key", base_url=base_url)
+        assert downloaded and zipfile.is_zipfile(path)
+        path, downloaded = dart_corp_sync.download_corp_code_zip("key", base_url=base_url)
+        assert not downloaded and zipfile.is_zipfile(path)
+    finally:
+        server.shutdown()
+    assert requests_seen == [None, '"v1"']
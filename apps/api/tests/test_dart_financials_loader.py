@@ -0,0 +1,57 @@
+import os
+import sys
+from datetime import date, datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest import dart_financials_loader as loader
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class _FakeSession:
+    def __init__(self, multi_status="000"):
+        self.multi_status = multi_status
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        endpoint = url.rsplit("/", 1)[-1]
+        codes = params["corp_code"].split(",")
+        self.calls.append((endpoint, len(codes)))
+        if endpoint == "fnlttMultiAcnt.json" and self.multi_status != "000":
+            return _FakeResponse({"status": self.multi_status, "message": "error"})
+        items = [
+            {"corp_code": code, "account_nm": "매출액", "fs_div": "CFS", "rcept_dt": "20250315", "thstrm_amount": "1,234"}
+            for code in codes
+        ]
+        return _FakeResponse({"status": "000", "list": items})
+
+
+def test_parse_account_item():
+    item = {"account_nm": "영업이익", "fs_div": "OFS", "thstrm_amount": "-", "thstrm_dt": "2024.12.31 현재"}
+    row = loader.parse_account_item(item, "00126380", 2024)
+    assert row == ("00126380", date(2024, 12, 31), datetime(2024, 12, 31), "영업이익", "영업이익", 0, "KRW", False)
+
+
+def test_fetch_batch_uses_one_multi_call():
+    session = _FakeSession()
+    rows, found = loader._fetch_batch(session, "key", "http://dart", ["A", "B", "C"], 2024, "11011")
+    assert session.calls == [("fnlttMultiAcnt.json", 3)]
+    assert found == 3
+    assert [row[0] for row in rows] == ["A", "B", "C"]
+    assert rows[0][5] == 1234.0
+
+
+def test_fetch_batch_falls_back_to_single_calls():
+    session = _FakeSession(multi_status="100")
+    rows, found = loader._fetch_batch(session, "key", "http://dart", ["A", "B"], 2024, "11011")
+    assert session.calls == [("fnlttMultiAcnt.json", 2), ("fnlttSinglAcnt.json", 1), ("fnlttSinglAcnt.json", 1)]
+    assert found == 2 and len(rows) == 2
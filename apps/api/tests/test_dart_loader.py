@@ -0,0 +1,121 @@
+import os
+import sys
+from datetime import date
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest import dart_loader
+
+
+def test_parse_filing_item():
+    item = {"rcept_no": "20250102000123", "corp_code": "00126380", "rcept_dt": "20250102", "report_nm": "분기보고서"}
+    assert dart_loader.parse_filing_item(item) == (
+        "20250102000123", "00126380", date(2025, 1, 2), "-", "분기보고서",
+    )
+    assert dart_loader.parse_filing_item({"rcept_dt": "20250102"}) is None
+
+
+def test_stream_windows_yields_every_page(monkeypatch):
+    def fake_pages(session, api_key, bgn_de, end_de, **kwargs):
+        for page in range(3):
+            yield (30 if page == 0 else None), [(f"{bgn_de}-{page}",)]
+
+    monkeypatch.setattr(dart_loader, "iter_filing_pages", fake_pages)
+    windows = list(dart_loader._iter_date_ranges(date(2025, 1, 1), date(2025, 12, 31), window_days=90))
+    pages = list(dart_loader._stream_windows(None, "key", windows, concurrency=3))
+    assert len(pages) == 3 * len(windows)
+    assert sum(total or 0 for total, _ in pages) == 30 * len(windows)
+
+
+def test_stream_windows_stops_cleanly_when_consumer_exits(monkeypatch):
+    def fake_pages(session, api_key, bgn_de, end_de, **kwargs):
+        for page in range(50):
+            yield None, [(page,)]
+
+    monkeypatch.setattr(dart_loader, "iter_filing_pages", fake_pages)
+    windows = list(dart_loader._iter_date_ranges(date(2025, 1, 1), date(2025, 12, 31), window_days=90))
+    stream = dart_loader._stream_windows(None, "key", windows, concurrency=2)
+    assert next(stream) is not None
+    stream.close()
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class _FakeSession:
+    """Three pages of 100 filings, newest first; rcp_no counts down from 300."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        page = params["page_no"]
+        self.calls.append(page)
+        top = 300 - (page - 1) * 100
+        items = [
+            {"rcept_no": f"20250102{n:06d}", "corp_code": "00126380", "rcept_dt": "20250102", "report_nm": "x"}
+            for n in range(top, top - 100, -1)
+        ]
+        return _FakeResponse({"status": "000", "total_count": 300, "total_page": 3, "list": items})
+
+
+class _ListSession:
+    """Serves `items` (already in list.json order) 100 per page."""
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        page = params["page_no"]
+        self.calls.append(page)
+        chunk = self.items[(page - 1) * 100:page * 100]
+        total_page = (len(self.items) + 99) // 100
+        return _FakeResponse({"status": "000", "total_count": len(self.items), "total_page": total_page, "list": chunk})
+
+
+def _filing(rcp_no, rcept_dt):
+    return {"rcept_no": rcp_no, "corp_code": "00126380", "rcept_dt": rcept_dt, "report_nm": "x"}
+
+
+def test_incremental_walk_keeps_same_day_filings_below_an_80_series_mark():
+    # One day, interleaved: exchange-desk 80-series ids sort above DART 00-series ids.
+    ids = [f"2025010280{n:04d}" for n in range(150, 0, -1)] + [f"2025010200{n:04d}" for n in range(150, 0, -1)]
+    # The last run stored the 80-series and the first 100 DART filings (mark: 20250102800150);
+    # DART filings 101-150 were submitted afterwards, on the same day.
+    known = {i for i in ids if i[8:10] == "80" or int(i[10:]) <= 100}
+    session = _ListSession([_filing(i, "20250102") for i in ids])
+
+    pages = list(
+        dart_loader.iter_filing_pages(session, "key", "20250102", "20250102", since=date(2025, 1, 2), known=known)
+    )
+
+    assert session.calls == [1, 2, 3]
+    rows = [row for _, page in pages for row in page]
+    assert sorted(row[0] for row in rows) == [f"2025010200{n:04d}" for n in range(101, 151)]
+
+
+def test_iter_filing_pages_stops_at_a_page_older_than_since():
+    items = [_filing(f"20250103{n:06d}", "20250103") for n in range(100, 0, -1)]
+    items += [_filing(f"20250101{n:06d}", "20250101") for n in range(200, 0, -1)]
+    session = _ListSession(items)
+
+    pages = list(dart_loader.iter_filing_pages(session, "key", "20250101", "20250103", since=date(2025, 1, 2)))
+
+    assert session.calls == [1, 2]
+    assert sum(len(page) for _, page in pages) == 100
+
+
+def test_iter_filing_pages_full_walk():
+    session = _FakeSession()
+    pages = list(dart_loader.iter_filing_pages(session, "key", "20250102", "20250102"))
+    assert session.calls == [1, 2, 3]
+    assert pages[0][0] == 300
+    assert sum(len(page) for _, page in pages) == 300
@@ -0,0 +1,62 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest import ecos_loader
+from ingest.bulk_writer import BulkWriteStats
+from ingest.ecos_loader import EcosSeries, _format_period, _next_period, _parse_ecos_time, fetch_ecos_statistic_series
+
+
+def test_next_period_round_trips_stored_dates():
+    # Stored obs_date -> next period string, for every cycle the loader uses.
+    cases = [
+        ("D", "20251231", "20260101"),
+        ("M", "202512", "202601"),
+        ("Q", "2025Q4", "2026Q1"),
+        ("A", "2025", "2026"),
+    ]
+    for cycle, stored, expected in cases:
+        last = _parse_ecos_time(stored)
+        assert _format_period(_next_period(last, cycle), cycle) == expected
+
+
+def test_parse_ecos_time_quarter_end():
+    assert _parse_ecos_time("2024Q1") == date(2024, 3, 31)
+
+
+class _Db:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_failing_series_does_not_abort_the_others(monkeypatch):
+    series_list = [EcosSeries(f"S{i}", f"S{i}", "M", "X", f"series {i}", "202401") for i in range(3)]
+    written = []
+
+    def search_page(api_key, series, start_period, end_period, first, last):
+        if series.series_code == "S1" and first > 1:
+            raise ConnectionError("ECOS timeout")
+        rows = [(series.series_code, date(2024, 1, 1), float(first), None)]
+        return 2500, rows
+
+    def upsert(db, rows):
+        written.append(rows)
+        return BulkWriteStats()
+
+    monkeypatch.setattr(ecos_loader, "_search_page", search_page)
+    monkeypatch.setattr(ecos_loader, "upsert_macro_series", upsert)
+    db = _Db()
+
+    with pytest.raises(RuntimeError, match="S1"):
+        fetch_ecos_statistic_series(db, series_list, api_key="k", full=True, page_size=1000, concurrency=2)
+
+    # S0 and S2 are written whole (3 pages each) in one upsert; S1 is not written at all.
+    assert sorted((rows[0][0], len(rows)) for rows in written) == [("S0", 3), ("S2", 3)]
+    assert db.commits == 2
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from app.routers.signals import DEFAULT_SIGNAL_WEIGHTS, HORIZON_RULES
+from app.services.signal_engine import _build_price_df, compute_signal_simple_ma_v2_gate3
+from ingest.indicator_state import GateState, evaluate_snapshot, required_lookback
+from signal_fixtures import random_bars
+
+
+def _reference(rows: list[tuple], rules: dict, weights: dict) -> dict:
+    return compute_signal_simple_ma_v2_gate3(_build_price_df(rows), "1D", rules, weights)
+
+
+def _stream(rules: dict, rows: list[tuple], persist_at: int | None = None) -> dict:
+    state = GateState(rules)
+    snapshot = None
+    for i, (trade_date, _, high, low, close, volume) in enumerate(rows):
+        if i == persist_at:
+            # Round-trip through JSON as the table does.
+            state = GateState(rules, json.loads(json.dumps(state.to_dict())))
+        snapshot = state.update(trade_date, high, low, close, volume)
+    return snapshot
+
+
+def _assert_same(payload: dict, expected: dict):
+    assert payload["signal"] == expected["signal"]
+    assert payload["triggers"] == expected["triggers"]
+    assert payload["debug"].keys() == expected["debug"].keys()
+    for key, value in expected["debug"].items():
+        if key == "vol_ratio" and value is not None:
+            assert abs(payload["debug"][key] - value) <= 1e-9 * max(1.0, abs(value))
+        else:
+            assert payload["debug"][key] == value, key
+    assert abs(payload["confidence"] - expected["confidence"]) <= 1e-9
+
+
+def test_state_matches_signals_over_required_lookback_window():
+    # /signals evaluated the latest required_lookback bars only; states must give the same answer.
+    rng = np.random.default_rng(5)
+    kinds = ["up", "down", "noise", "flat"]
+    for horizon, rules in HORIZON_RULES.items():
+        lookback = required_lookback(rules)
+        for i in range(12):
+            rows = random_bars(rng, lookback + 150, kinds[i % 4])
+            snapshot = _stream(rules, rows, persist_at=lookback + 40)
+            expected = _reference(rows[-lookback:], rules, DEFAULT_SIGNAL_WEIGHTS)
+            _assert_same(evaluate_snapshot(snapshot, rules, DEFAULT_SIGNAL_WEIGHTS), expected)
+            assert snapshot["valid_run"] >= lookback
+
+
+def test_state_matches_reference_where_windows_start_at_the_frame():
+    # Rule sets whose ATR%, quantile or fallback window begins at the frame's first true range.
+    rng = np.random.default_rng(9)
+    weights = {"ma_gap": 0.3, "trend_strength": 0.3, "vol_strength": 0.2, "vol_penalty": -0.5}
+    base = dict(HORIZON_RULES["1D"], vol_q=0.5)
+    rule_sets = [
+        dict(base, atr_n=6, confirm=2),  # quantile of the latest row
+        dict(base, vol_q_window=50, atr_n=6, confirm=2),  # 60-bar fallback of the latest row
+        dict(base, vol_q_window=50, atr_n=60, confirm=6),  # ATR% of the oldest confirm row
+        dict(base, vol_q_window=40, confirm=1),  # quantile in effect inside the frame
+    ]
+    for rules in rule_sets:
+        lookback = required_lookback(rules)
+        rows = random_bars(rng, 400, "noise")
+        for end in range(lookback - 3, len(rows), 7):
+            snapshot = _stream(rules, rows[:end], persist_at=end // 2)
+            expected = _reference(rows[:end][-lookback:], rules, weights)
+            _assert_same(evaluate_snapshot(snapshot, rules, weights), expected)
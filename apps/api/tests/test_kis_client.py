@@ -0,0 +1,189 @@
+import os
+import sys
+import threading
+from datetime import date
+
+import httpx
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest.kis_client import KisClient, KisRequestError
+from ingest.ratelimit import TokenBucket
+from ingest import kis_async, kis_client, price_backfill_job, ratelimit, work_queue
+
+
+class _Resp:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self._payload
+
+
+class _Session:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class _Tokens:
+    def __init__(self):
+        self.invalidated = 0
+
+    def get_token(self, key, issue):
+        return f"token-{self.invalidated}"
+
+    def invalidate(self, key, token):
+        self.invalidated += 1
+
+
+def _client(responses):
+    return KisClient(app_key="k", app_secret="s", token_provider=_Tokens(), session=_Session(responses))
+
+
+_SERVER_ERROR = {"rt_cd": "1", "msg_cd": "EGW00000", "msg1": "server error"}
+
+
+def test_get_handles_kis_error_bodies(monkeypatch):
+    monkeypatch.setattr(kis_client, "RATE_LIMIT_BACKOFF_SEC", 0.0)
+    rate_limited = _Resp(500, {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "rate limit"})
+    expired = _Resp(500, {"rt_cd": "1", "msg_cd": "EGW00123", "msg1": "token expired"})
+    ok = _Resp(200, {"rt_cd": "0", "output": {"stck_prpr": "100"}})
+
+    kis = _client([rate_limited, rate_limited, ok])
+    assert kis.get_stock_price("005930") == {"stck_prpr": "100"}
+    assert kis.session.calls == 3
+
+    kis = _client([expired, ok])
+    assert kis.get_stock_price("005930") == {"stck_prpr": "100"}
+    assert kis.token_provider.invalidated == 1
+
+    # Persistent rate limiting gives up after MAX_ATTEMPTS; other errors are not retried.
+    kis = _client([rate_limited] * kis_client.MAX_ATTEMPTS)
+    assert kis.get_stock_price("005930") is None
+    assert kis.session.calls == kis_client.MAX_ATTEMPTS
+    kis = _client([_Resp(500, _SERVER_ERROR)])
+    assert kis.get_stock_price("005930") is None
+    assert kis.session.calls == 1
+
+
+def _item():
+    return work_queue.WorkItem(item_id=1, job_id=1, ticker="005930", start_date=date(2024, 1, 2), end_date=date(2024, 1, 5), attempts=1)
+
+
+def test_daily_history_failure_is_distinct_from_empty():
+    failed = _client([_Resp(500, _SERVER_ERROR)])
+    assert failed.get_stock_daily_history("005930", "20240102", "20240105") == []
+    failed = _client([_Resp(500, _SERVER_ERROR)])
+    with pytest.raises(KisRequestError):
+        failed.get_stock_daily_history("005930", "20240102", "20240105", raise_on_error=True)
+
+    empty = _client([_Resp(200, {"rt_cd": "0", "output2": []})])
+    assert empty.get_stock_daily_history("005930", "20240102", "20240105", raise_on_error=True) == []
+
+
+def test_backfill_item_with_failed_fetch_is_not_completed(monkeypatch):
+    completed = []
+    monkeypatch.setattr(work_queue, "complete_item", lambda db, item_id, rows: completed.append(item_id))
+    kis = _client([_Resp(500, _SERVER_ERROR)])
+    # process_item raises; run_price_backfill_job routes that to fail_item (retry/backoff).
+    with pytest.raises(KisRequestError):
+        price_backfill_job.process_item(kis, _item())
+    assert completed == []
+
+
+class _CountingBucket(TokenBucket):
+    def __init__(self):
+        super().__init__(1000, capacity=1000)
+        self.calls = 0
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        self.calls += 1
+        return await super().acquire_async(tokens)
+
+
+def test_async_fetch_uses_shared_limiter_and_retries_rate_limit(monkeypatch):
+    shared = _CountingBucket()
+    monkeypatch.setitem(ratelimit._SOURCE_LIMITERS, "kis", shared)
+    monkeypatch.setattr(kis_async, "RATE_LIMIT_BACKOFF_SEC", 0.0)
+    seen: dict[str, int] = {}
+
+    def handler(request):
+        ticker = request.url.params["FID_INPUT_ISCD"]
+        seen[ticker] = seen.get(ticker, 0) + 1
+        if ticker == "000002" or seen[ticker] <= 2:
+            return httpx.Response(500, json={"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "rate limit"})
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"stck_prpr": "100"}})
+
+    kis = _client([])
+    results = kis_async.fetch_stock_prices(
+        ["000000", "000001", "000002"], kis=kis, concurrency=2, transport=httpx.MockTransport(handler)
+    )
+
+    assert results["000000"] == {"stck_prpr": "100"}
+    assert results["000001"] == {"stck_prpr": "100"}
+    # Gives up after max_attempts on a persistent EGW00201.
+    assert results["000002"] is None
+    assert seen == {"000000": 3, "000001": 3, "000002": 5}
+    assert shared.calls == 11
+
+
+def test_async_fetch_refreshes_expired_token_and_checks_rt_cd(monkeypatch):
+    monkeypatch.setitem(ratelimit._SOURCE_LIMITERS, "kis", _CountingBucket())
+    sent: list[tuple[str, str]] = []
+
+    def handler(request):
+        ticker = request.url.params["FID_INPUT_ISCD"]
+        token = request.headers["authorization"]
+        sent.append((ticker, token))
+        if token == "Bearer token-0":
+            return httpx.Response(500, json={"rt_cd": "1", "msg_cd": "EGW00123", "msg1": "token expired"})
+        if ticker == "000002":
+            return httpx.Response(200, json={"rt_cd": "1", "msg_cd": "40570000", "msg1": "no such item"})
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"stck_prpr": "100"}})
+
+    kis = _client([])
+    results = kis_async.fetch_stock_prices(
+        ["000000", "000001", "000002"], kis=kis, concurrency=1, transport=httpx.MockTransport(handler)
+    )
+
+    assert results == {"000000": {"stck_prpr": "100"}, "000001": {"stck_prpr": "100"}, "000002": None}
+    # One refresh for everyone; the error body on HTTP 200 is not retried.
+    assert kis.token_provider.invalidated == 1
+    assert sent == [
+        ("000000", "Bearer token-0"),
+        ("000000", "Bearer token-1"),
+        ("000001", "Bearer token-1"),
+        ("000002", "Bearer token-1"),
+    ]
+
+
+def test_async_fetch_runs_on_result_off_the_event_loop(monkeypatch):
+    monkeypatch.setitem(ratelimit._SOURCE_LIMITERS, "kis", _CountingBucket())
+    tickers = [f"{i:06d}" for i in range(6)]
+    last_requested = threading.Event()
+    calls: list[tuple[str, str, bool]] = []
+
+    def handler(request):
+        if request.url.params["FID_INPUT_ISCD"] == tickers[-1]:
+            last_requested.set()
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"stck_prpr": "100"}})
+
+    def on_result(ticker, output):
+        # A slow batch write: requests must keep going while it blocks.
+        unblocked = last_requested.wait(timeout=2) if not calls else True
+        calls.append((ticker, threading.current_thread().name, unblocked))
+
+    kis_async.fetch_stock_prices(
+        tickers, kis=_client([]), concurrency=1, on_result=on_result, transport=httpx.MockTransport(handler)
+    )
+
+    assert [ticker for ticker, _, _ in calls] == tickers
+    assert all(name.startswith("kis-on-result") and unblocked for _, name, unblocked in calls)
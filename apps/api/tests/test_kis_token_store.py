@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest.token_store import CachedToken, FileTokenStore, KisTokenProvider, KisTokenRateLimited
+
+
+def _issuer(counter, delay=0.05):
+    lock = threading.Lock()
+
+    def issue():
+        time.sleep(delay)
+        with lock:
+            counter.append(1)
+            return CachedToken(f"token-{len(counter)}", time.time() + 86400, time.time())
+
+    return issue
+
+
+def test_single_flight_across_threads_and_providers(tmp_path):
+    path = str(tmp_path / "kis_token.json")
+    # Two providers on one file behave like two processes sharing the cache.
+    providers = [KisTokenProvider(FileTokenStore(path)) for _ in range(2)]
+    issued = []
+    issue = _issuer(issued)
+    tokens = []
+
+    def worker(i):
+        tokens.append(providers[i % 2].get_token("k", issue))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(issued) == 1
+    assert set(tokens) == {"token-1"}
+    # A fresh provider (e.g. after a restart) reuses the persisted token.
+    assert KisTokenProvider(FileTokenStore(path)).get_token("k", issue) == "token-1"
+    assert len(issued) == 1
+
+
+def test_refreshes_inside_margin(tmp_path):
+    store = FileTokenStore(str(tmp_path / "kis_token.json"))
+    store.save("k", CachedToken("old", time.time() + 60, time.time()))
+    issued = []
+    provider = KisTokenProvider(store, refresh_margin_sec=600)
+
+    assert provider.get_token("k", _issuer(issued, delay=0)) == "token-1"
+    assert store.load("k").access_token == "token-1"
+
+
+def test_rate_limited_waits_for_peer_token(tmp_path):
+    store = FileTokenStore(str(tmp_path / "kis_token.json"))
+    provider = KisTokenProvider(store, rate_limit_wait_sec=5, poll_interval_sec=0.05)
+
+    def rate_limited():
+        raise KisTokenRateLimited("EGW00133")
+
+    def peer():
+        time.sleep(0.2)
+        with store.lock("k"):
+            store.save("k", CachedToken("peer", time.time() + 86400, time.time()))
+
+    threading.Thread(target=peer).start()
+    started = time.time()
+    assert provider.get_token("k", rate_limited) == "peer"
+    assert time.time() - started < 2
+
+
+def test_rate_limited_wait_does_not_hold_the_key_lock(tmp_path):
+    store = FileTokenStore(str(tmp_path / "kis_token.json"))
+    provider = KisTokenProvider(store, rate_limit_wait_sec=5, poll_interval_sec=0.05)
+    attempts = []
+
+    def rate_limited():
+        attempts.append(1)
+        raise KisTokenRateLimited("EGW00133")
+
+    tokens = []
+    waiters = [threading.Thread(target=lambda: tokens.append(provider.get_token("k", rate_limited))) for _ in range(4)]
+    for t in waiters:
+        t.start()
+    time.sleep(0.2)
+    # Waiters poll outside the key lock: invalidate() is not stalled behind them.
+    started = time.time()
+    provider.invalidate("k")
+    assert time.time() - started < 1
+    with store.lock("k"):
+        store.save("k", CachedToken("peer", time.time() + 86400, time.time()))
+    for t in waiters:
+        t.join(timeout=5)
+
+    assert tokens == ["peer"] * 4
+    # Only the first caller asked KIS; the rest waited for the window.
+    assert len(attempts) == 1
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest.krx_loader import build_listing_frame, diff_listing
+
+
+def _krx():
+    return pd.DataFrame({
+        "Code": ["005930", "000660", "035720", "900000"],
+        "Name": ["삼성전자", "SK하이닉스", "카카오", "코넥스사"],
+        "Market": ["KOSPI", "KOSPI", "KOSDAQ", "KONEX"],
+        "Sector": ["전기전자 ", None, "", "기타"],
+    })
+
+
+def test_build_listing_frame():
+    frame = build_listing_frame(_krx())
+    assert frame["ticker"].tolist() == ["005930", "000660", "035720"]
+    assert frame["market"].tolist() == ["KRX_KOSPI", "KRX_KOSPI", "KRX_KOSDAQ"]
+    assert frame["sector_name"].tolist() == ["전기전자 ", None, None]
+    assert frame["sector_code"][0].startswith("KRX_SECTOR_") and frame["sector_code"][1] is None
+
+
+def test_diff_listing_counts():
+    frame = build_listing_frame(_krx())
+    current = pd.DataFrame([
+        # unchanged
+        ("005930", 1, "삼성전자", "전기전자 ", frame["sector_code"][0], "KRX_KOSPI", 1, True),
+        # stored sector is kept when the listing has none, but the name changed
+        ("000660", 2, "하이닉스", "반도체", "KRX_SECTOR_x", "KRX_KOSPI", 2, True),
+    ], columns=["ticker", "company_id", "name_ko", "sector_name", "sector_code", "market", "sec_company_id", "has_security"])
+    changed, counts = diff_listing(frame, current)
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+    assert changed["ticker"].tolist() == ["000660", "035720"]
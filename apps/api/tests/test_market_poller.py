@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from app import market_poller
+from app.services import market_snapshots as ms
+
+
+def test_chart_job_saves_each_market_and_reports_gaps(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(ms, "save_keyed_snapshot", lambda db, key, rows: saved.__setitem__(key, rows))
+
+    def compute(code):
+        if code == ms.MARKET_CODES["KOSDAQ"]:
+            raise RuntimeError("upstream down")
+        return [{"date": "20260105", "value": 1.0}]
+
+    job = market_poller._refresh_charts("1d", compute)
+    with pytest.raises(RuntimeError, match="KOSDAQ"):
+        job(db=None)
+    # Markets that did load are still written.
+    assert set(saved) == {ms.chart_key("KOSPI", "1d"), ms.chart_key("KOSPI200", "1d")}
+
+
+def test_run_forever_once_runs_every_job(monkeypatch):
+    ran = []
+    monkeypatch.setattr(market_poller, "run_job", lambda job, poller_id: ran.append(job.name) or True)
+    jobs = [market_poller.PollJob("a", 60, None), market_poller.PollJob("b", 300, None)]
+    market_poller.run_forever(jobs, once=True)
+    assert ran == ["a", "b"]
+    assert all(job.next_run_at > 0 for job in jobs)
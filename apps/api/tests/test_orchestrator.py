@@ -0,0 +1,109 @@
+import os
+import queue
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest import ecos_loader, kis_loader, orchestrator
+from ingest.orchestrator import TaskSpec
+
+
+class _Db:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Calendar:
+    def latest_session(self, day):
+        return date(2024, 1, 5)
+
+
+def _events(q: queue.Queue) -> list[tuple]:
+    events = []
+    while not q.empty():
+        events.append(q.get_nowait())
+    return events
+
+
+def _ok(progress_cb=None):
+    progress_cb(3, 3)
+
+
+def _boom():
+    raise RuntimeError("source down")
+
+
+def test_expand_tasks():
+    assert orchestrator.expand_tasks(["morning", "kis_prices", "krx_meta"]) == [
+        "kis_prices", "dart_filings", "ecos_series", "naver_classifications", "krx_meta",
+    ]
+    with pytest.raises(ValueError):
+        orchestrator.expand_tasks(["nope"])
+
+
+def test_child_env_splits_source_budget(monkeypatch):
+    monkeypatch.setenv("KIS_RATE_LIMIT_PER_SEC", "20")
+    monkeypatch.setenv("DART_RATE_LIMIT_PER_SEC", "10")
+    envs = orchestrator._child_env(["kis_prices", "kis_backfill", "dart_filings", "krx_meta"], pool_size=2)
+
+    assert float(envs["kis_prices"]["KIS_RATE_LIMIT_PER_SEC"]) == 10.0
+    assert float(envs["kis_backfill"]["KIS_RATE_LIMIT_PER_SEC"]) == 10.0
+    assert float(envs["dart_filings"]["DART_RATE_LIMIT_PER_SEC"]) == 10.0
+    assert envs["krx_meta"] == {"DB_POOL_SIZE": "2", "DB_MAX_OVERFLOW": "2"}
+
+
+def test_run_task_reports_done_and_failed(monkeypatch):
+    monkeypatch.setitem(orchestrator.TASKS, "ok", TaskSpec(__name__, "_ok", "db"))
+    monkeypatch.setitem(orchestrator.TASKS, "boom", TaskSpec(__name__, "_boom", "db"))
+    events = queue.Queue()
+
+    orchestrator._run_task("ok", events)
+    orchestrator._run_task("boom", events)
+
+    progress, done, failed = _events(events)
+    assert progress == ("progress", "ok", 3, 3)
+    assert done[:2] == ("done", "ok")
+    assert failed[:2] == ("failed", "boom")
+    assert failed[3] == "RuntimeError: source down"
+
+
+def test_loader_failures_are_not_reported_as_success(monkeypatch):
+    # Both loaders used to print the error and return normally.
+    def fetch_fails(*args, **kwargs):
+        raise ConnectionError("KIS unreachable")
+
+    def key_statistics_fail(api_key):
+        raise ConnectionError("ECOS unreachable")
+        yield
+
+    monkeypatch.setattr(kis_loader, "SessionLocal", _Db)
+    monkeypatch.setattr(kis_loader, "_load_tickers", lambda db, limit, offset: ["005930"])
+    monkeypatch.setattr(kis_loader, "get_trading_calendar", _Calendar)
+    monkeypatch.setattr(kis_loader, "fetch_stock_prices", fetch_fails)
+    monkeypatch.setattr(ecos_loader, "SessionLocal", _Db)
+    monkeypatch.setattr(ecos_loader, "_fetch_key_statistics", key_statistics_fail)
+    monkeypatch.setitem(
+        orchestrator.TASKS, "kis_prices", TaskSpec("ingest.kis_loader", "update_kis_prices_task", "kis", {"kis": object()})
+    )
+    events = queue.Queue()
+
+    orchestrator._run_task("kis_prices", events)
+    orchestrator._run_task("ecos_series", events)
+
+    finished = {event[1]: event for event in _events(events) if event[0] != "progress"}
+    assert finished["kis_prices"][0] == "failed"
+    assert finished["kis_prices"][3] == "ConnectionError: KIS unreachable"
+    assert finished["ecos_series"][0] == "failed"
+    assert finished["ecos_series"][3] == "ConnectionError: ECOS unreachable"
@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest.ratelimit import TokenBucket
+
+
+def test_fresh_bucket_paces_from_the_first_call():
+    bucket = TokenBucket(20)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    # One token up front, then 1/rate apart: no second's worth of burst.
+    assert time.monotonic() - started >= 4 / 20 - 0.01
+
+
+def test_capacity_allows_a_configured_burst():
+    bucket = TokenBucket(1, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket._reserve(1) > 0
+
+
+def test_async_waiters_share_the_rate():
+    bucket = TokenBucket(50)
+
+    async def run():
+        await asyncio.gather(*(bucket.acquire_async() for _ in range(6)))
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started >= 5 / 50 - 0.01
+
+
+def test_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
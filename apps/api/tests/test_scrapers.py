@@ -0,0 +1,122 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from app.services import scrapers
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "naver")
+
+
+def _fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.encoding = None
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class FakeSession:
+    """Serves the saved euc-kr pages; answers 304 when the client sends the ETag back."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls.append((url, dict(headers or {})))
+        if "sise_group.nhn?type=upjong" in url:
+            body, etag = _fixture("industry_list.html"), '"industries-v1"'
+        elif "theme.nhn" in url:
+            body, etag = _fixture("theme_list.html"), '"themes-v1"'
+        else:
+            body, etag = _fixture("group_detail.html"), '"detail-v1"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, body, {"ETag": etag})
+
+
+def _reset(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(scrapers, "_session", lambda: session)
+    for cache in (scrapers._PAGE_CACHE, scrapers._INDUSTRY_CACHE, scrapers._THEME_CACHE, scrapers._LINK_CACHE):
+        cache.clear()
+    return session
+
+
+def test_parsers_read_euc_kr_fixtures():
+    themes = scrapers.parse_theme_page(_fixture("theme_list.html").decode("euc-kr"))
+    assert len(themes) == 40
+    assert themes[0]["name"] == "2차전지(소재/부품)"
+    assert themes[0]["link"].startswith("/sise/sise_group_detail.naver?type=theme")
+    assert themes[0]["leadingStock"] != "-"
+
+    industries = scrapers.parse_industry_page(_fixture("industry_list.html").decode("euc-kr"))
+    assert len(industries) == 30
+    assert industries[0]["name"] == "반도체와반도체장비"
+    assert industries[0]["total"] == industries[0]["up"] + industries[0]["flat"] + industries[0]["down"]
+
+    detail = _fixture("group_detail.html").decode("euc-kr")
+    assert scrapers.parse_first_stock(detail) != "-"
+    tickers = scrapers.parse_member_tickers(detail)
+    assert tickers and all(len(t) == 6 and t.isdigit() for t in tickers)
+
+
+def test_industries_with_leading_fetch_each_page_once(monkeypatch):
+    session = _reset(monkeypatch)
+    industries = scrapers.get_naver_industries(include_leading_stock=True)
+    assert len(industries) == 30
+    assert all(item["leadingStock"] != "-" for item in industries)
+    # 1 list page + 30 detail pages, fetched once each.
+    assert len(session.calls) == 31
+    assert len({url for url, _ in session.calls}) == 31
+
+    # Links were recorded, so member lookups reuse them without another list scrape.
+    link = scrapers.get_industry_link_by_name("제약")
+    assert link and len(session.calls) == 31
+    assert scrapers.get_naver_industry_members(link)
+
+
+def test_stale_page_is_revalidated_with_etag(monkeypatch):
+    session = _reset(monkeypatch)
+    url = f"{scrapers.BASE_URL}/sise/sise_group.nhn?type=upjong"
+    first = scrapers.fetch_page(url, scrapers.parse_industry_page, ttl_sec=0)
+    second = scrapers.fetch_page(url, scrapers.parse_industry_page, ttl_sec=0)
+    assert first == second
+    assert session.calls[0][1] == {}
+    assert session.calls[1][1].get("If-None-Match") == '"industries-v1"'
+
+
+def test_budget_expiry_cancels_queued_detail_fetches(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(scrapers, "_POOL", pool)
+    started = []
+    release = threading.Event()
+
+    def slow_fetch(item):
+        started.append(item["name"])
+        release.wait(5)
+        return "leader"
+
+    items = [{"name": f"theme{i}", "leadingStock": "-"} for i in range(10)]
+    scrapers._fill_within_budget(items, slow_fetch, time_budget_sec=0.1)
+    release.set()
+    pool.shutdown(wait=True)
+
+    # Only the two running fetches completed; the eight queued ones never ran.
+    assert len(started) == 2
+    assert all(item["leadingStock"] == "-" for item in items)
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from app.services.signal_batch import compute_signals_v2_gate3_batch
+from app.services.signal_config import DEFAULT_SIGNAL_WEIGHTS, HORIZON_RULES, required_lookback
+from app.services.signal_engine import _build_price_df, compute_signal_simple_ma_v2_gate3
+from signal_fixtures import random_bars
+
+
+def _series(rng, bars: int, kind: str) -> list[tuple]:
+    # compute_live_signals reads bars newest first.
+    return random_bars(rng, bars, kind)[::-1]
+
+
+def _assert_matches_per_ticker(series_by_ticker, rules, weights):
+    batch = compute_signals_v2_gate3_batch(series_by_ticker, rules, weights)
+    for ticker, rows in series_by_ticker.items():
+        expected = compute_signal_simple_ma_v2_gate3(_build_price_df(rows), "1D", rules, weights)
+        assert batch[ticker] == expected, ticker
+
+
+def test_batch_matches_per_ticker_for_every_horizon():
+    rng = np.random.default_rng(7)
+    kinds = ["up", "down", "noise", "flat"]
+    for horizon, rules in HORIZON_RULES.items():
+        bars = required_lookback(rules)
+        series = {f"{i:06d}": _series(rng, bars, kinds[i % 4]) for i in range(60)}
+        _assert_matches_per_ticker(series, rules, DEFAULT_SIGNAL_WEIGHTS)
+
+
+def test_batch_matches_with_mixed_lengths_and_custom_config():
+    rng = np.random.default_rng(11)
+    rules = dict(HORIZON_RULES["1D"], confirm=3, vol_q_window=120, vol_q=0.75)
+    weights = {"ma_gap": 0.6, "trend_strength": 0.2, "vol_strength": 0.3, "vol_penalty": -0.2}
+    # 90 bars: no rolling quantile yet, the 60-bar fallback gate applies.
+    series = {f"A{i:05d}": _series(rng, 90 if i % 2 else 205, "up" if i % 3 else "noise") for i in range(30)}
+    series["EMPTY"] = []
+    _assert_matches_per_ticker({k: v for k, v in series.items() if v}, rules, weights)
+    assert compute_signals_v2_gate3_batch(series, rules, weights)["EMPTY"]["debug"] == {"reason": "no_data"}
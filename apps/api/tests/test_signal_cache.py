@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from app.services import signal_cache
+
+
+def test_signal_items_cached_until_price_version_or_config_changes(monkeypatch):
+    versions = {"digest": "a"}
+    monkeypatch.setattr(signal_cache, "_price_versions", lambda db, tickers: versions["digest"])
+    signal_cache._RESULTS.clear()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return [{"ticker": "005930", "signal": "WAIT"}]
+
+    def fetch(config_hash="h1"):
+        return signal_cache.cached_signal_items(None, ["005930"], "1D", config_hash, loader)
+
+    assert fetch() == [{"ticker": "005930", "signal": "WAIT"}]
+    fetch()
+    assert len(calls) == 1
+
+    versions["digest"] = "b"  # a price_daily upsert touched one of the tickers
+    fetch()
+    assert len(calls) == 2
+
+    fetch("h2")  # config changed
+    assert len(calls) == 3
+    fetch("h1")
+    assert len(calls) == 3
+
+
+def test_signal_config_cache_invalidation(monkeypatch):
+    loads = []
+
+    def fake_load(db):
+        loads.append(db)
+        return {"engine": "simple_ma_v2_gate3"}, "default", {}
+
+    monkeypatch.setattr(signal_cache, "load_signal_config", fake_load)
+    signal_cache.invalidate_signal_config()
+    assert signal_cache.cached_signal_config("db")[1] == "default"
+    signal_cache.cached_signal_config("db")
+    assert len(loads) == 1
+    signal_cache.invalidate_signal_config()
+    signal_cache.cached_signal_config("db")
+    assert len(loads) == 2
+    signal_cache.invalidate_signal_config()
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from app.services.signal_config import (
+    default_signal_config,
+    normalize_signal_config,
+    required_lookback,
+    signal_config_hash,
+)
+
+
+def test_config_hash_tracks_engine_rules_and_weights_per_horizon():
+    base = default_signal_config()
+    same = normalize_signal_config({"engine": base["engine"], "horizons": base["horizons"], "weights": base["weights"]})
+    assert signal_config_hash(same, "1D") == signal_config_hash(base, "1D")
+    # String inputs normalize to the same numbers, hence the same hash.
+    stringly = normalize_signal_config({"horizons": {"1D": {k: str(v) for k, v in base["horizons"]["1D"].items()}}})
+    assert signal_config_hash(stringly, "1D") == signal_config_hash(base, "1D")
+
+    hashes = {signal_config_hash(base, h) for h in base["horizons"]}
+    assert len(hashes) == len(base["horizons"])
+
+    reweighted = normalize_signal_config({"weights": dict(base["weights"], ma_gap=0.5)})
+    assert signal_config_hash(reweighted, "1D") != signal_config_hash(base, "1D")
+    v1 = normalize_signal_config({"engine": "simple_ma_v1"})
+    assert signal_config_hash(v1, "1D") != signal_config_hash(base, "1D")
+    retuned = normalize_signal_config({"horizons": {"3D": dict(base["horizons"]["3D"], confirm=3)}})
+    assert signal_config_hash(retuned, "1D") == signal_config_hash(base, "1D")
+    assert signal_config_hash(retuned, "3D") != signal_config_hash(base, "3D")
+
+
+def test_required_lookback_matches_rules():
+    rules = default_signal_config()["horizons"]
+    assert required_lookback(rules["1D"]) == 205
+    assert required_lookback(dict(rules["1D"], vol_q_window=20)) == 65
@@ -0,0 +1,59 @@
+import os
+import random
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from app.services.target_range import compute_target_range, compute_target_ranges
+
+
+def _random_series(rng: random.Random, n: int) -> list[tuple]:
+    start = date(2024, 1, 2)
+    close = rng.uniform(1_000, 200_000)
+    rows = []
+    for i in range(n):
+        close = max(close * (1 + rng.gauss(0, 0.03)), 1.0)
+        high = close * (1 + abs(rng.gauss(0, 0.02)))
+        low = close * (1 - abs(rng.gauss(0, 0.02)))
+        open_ = rng.uniform(low, high)
+        values = [Decimal(str(round(v, 2))) for v in (open_, high, low, close)]
+        # Gaps the scalar version tolerates: missing close / high / low.
+        for k in range(4):
+            if rng.random() < 0.05:
+                values[k] = None
+        rows.append((start + timedelta(days=i), *values))
+    rng.shuffle(rows)
+    return rows
+
+
+def test_batch_matches_scalar():
+    rng = random.Random(7)
+    series_by_key = {f"T{i:03d}": _random_series(rng, rng.choice([0, 1, 2, 5, 14, 15, 16, 60, 200])) for i in range(300)}
+    series_by_key["ZERO"] = [(date(2024, 1, 2), 0, 0, 0, 0), (date(2024, 1, 3), 0, 0, 0, 0)]
+    series_by_key["NEG"] = [(date(2024, 1, 2), 10, 12, 9, 11), (date(2024, 1, 3), 1, 1, -1, -1)]
+    series_by_key["FLAT"] = [(date(2024, 1, 2) + timedelta(days=i), 500, 500, 500, 500) for i in range(20)]
+    series_by_key["NOCLOSE"] = [(date(2024, 1, 2), 10, 12, 9, None)]
+    ratio_choices = [(None, None), (20.0, 50.0), (3.0, 250.0), (10.0, 150.0), (15.0, 100.0), (5.0, 200.0)]
+    ratios = {key: rng.choice(ratio_choices) for key in series_by_key if rng.random() < 0.8}
+
+    batch = compute_target_ranges(series_by_key, ratios)
+
+    assert set(batch) == set(series_by_key)
+    for key, series in series_by_key.items():
+        roe, debt_ratio = ratios.get(key, (None, None))
+        assert batch[key] == compute_target_range(series, roe, debt_ratio), key
+    assert batch["ZERO"] == (None, None, None)
+    assert batch["NEG"] == (None, None, None)
+    assert batch["FLAT"] == (None, None, None)
+    assert batch["NOCLOSE"] == (None, None, None)
+
+
+def test_batch_reads_extra_columns_and_empty_input():
+    rows = [(date(2024, 1, 2) + timedelta(days=i), 100, 110 + i, 95, 100 + i, 1_000) for i in range(20)]
+    result = compute_target_ranges({"A": rows})
+    assert result["A"] == compute_target_range([row[:5] for row in rows], None, None)
+    assert result["A"][2]["basis"] == "mixed_atr_roe_debt"
+    assert compute_target_ranges({}) == {}
+    assert compute_target_ranges({"A": []}) == {"A": (None, None, None)}
@@ -0,0 +1,38 @@
+import os
+import sys
+from datetime import date
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../services/ingest")))
+
+from ingest.trading_calendar import TradingCalendar
+
+
+def _calendar(observed=()):
+    return TradingCalendar(date(2023, 1, 1), date(2026, 12, 31), observed=observed)
+
+
+def test_weekends_and_holidays_are_skipped():
+    cal = _calendar()
+    # Chuseok 2025: Fri 10/3 holiday, Mon 10/6 ~ Thu 10/9 closed.
+    assert cal.prev_session(date(2025, 10, 10)) == date(2025, 10, 2)
+    assert cal.next_session(date(2025, 10, 2)) == date(2025, 10, 10)
+    assert cal.latest_session(date(2025, 10, 5)) == date(2025, 10, 2)
+    assert not cal.is_session(date(2025, 10, 4))
+
+
+def test_sessions_between_and_back():
+    cal = _calendar()
+    sessions = cal.sessions_between(date(2025, 9, 29), date(2025, 10, 12))
+    assert sessions == [
+        date(2025, 9, 29), date(2025, 9, 30), date(2025, 10, 1), date(2025, 10, 2), date(2025, 10, 10),
+    ]
+    assert cal.count_sessions(date(2025, 10, 4), date(2025, 10, 5)) == 0
+    assert cal.sessions_back(date(2025, 10, 12), 4) == date(2025, 9, 29)
+
+
+def test_observed_dates_decide_years_without_holiday_table():
+    # 2023 has no holiday table: inside the loaded span, missing weekdays are closures.
+    observed = [date(2023, 5, 2), date(2023, 5, 3), date(2023, 5, 4), date(2023, 5, 8)]
+    cal = _calendar(observed)
+    assert cal.prev_session(date(2023, 5, 8)) == date(2023, 5, 4)
+    assert cal.is_session(date(2023, 4, 28))  # before the loaded span: weekday rule
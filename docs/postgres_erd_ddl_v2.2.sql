@@ -159,6 +159,59 @@ CREATE TABLE IF NOT EXISTS ingest_run_log (
 );
 CREATE INDEX IF NOT EXISTS idx_ingest_run_log_job_started ON ingest_run_log(job_id, started_at DESC);
 
+-- Resumable backfill jobs (ticker x date-range work items leased with SKIP LOCKED)
+CREATE TABLE IF NOT EXISTS backfill_job (
+  job_id      BIGSERIAL PRIMARY KEY,
+  job_type    TEXT NOT NULL,
+  status      TEXT NOT NULL DEFAULT 'RUNNING',  -- RUNNING / DONE / FAILED
+  params      JSONB,
+  created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  finished_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS backfill_work_item (
+  item_id          BIGSERIAL PRIMARY KEY,
+  job_id           BIGINT NOT NULL REFERENCES backfill_job(job_id) ON DELETE CASCADE,
+  ticker           TEXT NOT NULL,
+  start_date       DATE NOT NULL,
+  end_date         DATE NOT NULL,
+  status           TEXT NOT NULL DEFAULT 'PENDING',  -- PENDING / LEASED / DONE / FAILED
+  attempts         INTEGER NOT NULL DEFAULT 0,
+  lease_owner      TEXT,
+  lease_expires_at TIMESTAMPTZ,
+  next_attempt_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  rows_written     INTEGER,
+  last_error       TEXT,
+  updated_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_backfill_work_item_job_status ON backfill_work_item(job_id, status, next_attempt_at);
+
+-- High-water marks for incremental ingests (e.g. newest DART rcp_no stored)
+CREATE TABLE IF NOT EXISTS ingest_watermark (
+  source     TEXT PRIMARY KEY,
+  last_date  DATE,
+  last_key   TEXT,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Per-key data versions, e.g. one row per ticker touched by price_daily upserts
+CREATE TABLE IF NOT EXISTS ingest_data_version (
+  source     TEXT NOT NULL,
+  key        TEXT NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (source, key)
+);
+
+-- Price ranges KIS answered for (bars or not); the backfill planner skips them
+CREATE TABLE IF NOT EXISTS price_fetch_checked (
+  ticker     TEXT NOT NULL,
+  start_date DATE NOT NULL,
+  end_date   DATE NOT NULL,
+  checked_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (ticker, start_date, end_date)
+);
+
 CREATE TABLE IF NOT EXISTS feature_snapshot (
   as_of_date     DATE NOT NULL,
   ticker         TEXT NOT NULL,
@@ -227,11 +280,30 @@ CREATE TABLE IF NOT EXISTS timing_signal (
   triggers      JSONB,
   risk_flags    JSONB,
   model_version TEXT,
+  target_price_low   NUMERIC,
+  target_price_high  NUMERIC,
+  target_price_basis JSONB,
+  config_hash   TEXT,                 -- engine/rules/weights the row was computed with (signals_nightly)
   created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
   PRIMARY KEY(ts, ticker, horizon)
 );
 CREATE INDEX IF NOT EXISTS idx_signal_ticker_ts ON timing_signal(ticker, ts DESC);
 
+-- Incremental gate3 indicator state per (rule set, ticker) (ingest/indicator_state.py)
+CREATE TABLE IF NOT EXISTS indicator_state (
+  ticker          TEXT NOT NULL,
+  rules_key       TEXT NOT NULL,          -- hash of the horizon rule set
+  rules           JSONB NOT NULL,
+  committed_date  DATE,                   -- last bar folded into `state`
+  last_trade_date DATE NOT NULL,          -- bar `snapshot` describes (re-applied on refresh)
+  last_bar        JSONB NOT NULL,
+  snapshot        JSONB NOT NULL,
+  state           JSONB NOT NULL,         -- rolling windows
+  updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (rules_key, ticker)
+);
+CREATE INDEX IF NOT EXISTS idx_indicator_state_ticker ON indicator_state(ticker);
+
 CREATE TABLE IF NOT EXISTS watchlist (
   watchlist_id  BIGSERIAL PRIMARY KEY,
   owner_user_id TEXT NOT NULL,
@@ -297,6 +369,7 @@ CREATE TABLE IF NOT EXISTS classification_node (
 );
 CREATE INDEX IF NOT EXISTS idx_class_node_tax_parent ON classification_node(taxonomy_id, parent_code);
 CREATE INDEX IF NOT EXISTS idx_class_node_tax_level ON classification_node(taxonomy_id, level);
+CREATE INDEX IF NOT EXISTS idx_class_node_tax_name ON classification_node(taxonomy_id, name);
 
 -- M:N mapping: security ↔ classification (industry/theme)
 CREATE TABLE IF NOT EXISTS security_classification (
@@ -314,3 +387,5 @@ CREATE TABLE IF NOT EXISTS security_classification (
 );
 CREATE INDEX IF NOT EXISTS idx_sec_class_ticker ON security_classification(ticker);
 CREATE INDEX IF NOT EXISTS idx_sec_class_tax_code ON security_classification(taxonomy_id, code);
+-- open memberships by node (effective_to IS NULL = current)
+CREATE INDEX IF NOT EXISTS idx_sec_class_open ON security_classification(taxonomy_id, code, ticker) WHERE effective_to IS NULL;
@@ -21,6 +21,7 @@ def main():
     parser.add_argument("--watchlist", action="store_true", help="Use watchlist tickers.")
     parser.add_argument("--limit", type=int, default=None, help="Limit number of tickers when using universe.")
     parser.add_argument("--offset", type=int, default=0, help="Offset for ticker list.")
+    parser.add_argument("--full", action="store_true", help="Re-fetch the whole window instead of only missing ranges.")
     args = parser.parse_args()
 
     tickers: list[str] | None = None
@@ -34,6 +35,7 @@ def main():
         tickers=tickers,
         limit=args.limit,
         offset=args.offset,
+        incremental=not args.full,
     )
 
 
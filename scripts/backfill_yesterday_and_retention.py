@@ -1,5 +1,5 @@
 import argparse
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 import time
 import sys
 import os
@@ -10,20 +10,8 @@ from sqlalchemy import text
 
 from ingest.db import SessionLocal
 from ingest.kis_client import KisClient
-
-
-def _to_int(value: str | int | None):
-    if value is None:
-        return None
-    if isinstance(value, int):
-        return value
-    value = str(value).strip().replace(",", "")
-    if not value:
-        return None
-    try:
-        return int(float(value))
-    except ValueError:
-        return None
+from ingest.bulk_writer import PriceDailyWriter
+from ingest.kis_loader import parse_daily_history_row
 
 
 def _get_tickers(db):
@@ -42,55 +30,21 @@ def _backfill_date(target_date: date, dry_run: bool = False) -> int:
     total_rows = 0
     with SessionLocal() as db:
         tickers = _get_tickers(db)
-        for idx, ticker in enumerate(tickers, start=1):
-            rows = kis.get_stock_daily_history(ticker, target_str, target_str)
-            if not rows:
+    writer = PriceDailyWriter(batch_size=500, label="daily backfill")
+    for idx, ticker in enumerate(tickers, start=1):
+        rows = kis.get_stock_daily_history(ticker, target_str, target_str)
+        for row in rows or []:
+            parsed = parse_daily_history_row(ticker, row)
+            if not parsed or parsed[1] != target_date:
                 continue
-            for row in rows:
-                trade_date_str = row.get("stck_bsop_date")
-                if not trade_date_str:
-                    continue
-                try:
-                    trade_date = datetime.strptime(trade_date_str, "%Y%m%d").date()
-                except ValueError:
-                    continue
-                if trade_date != target_date:
-                    continue
-                if dry_run:
-                    total_rows += 1
-                    continue
-                db.execute(text("""
-                    INSERT INTO price_daily (
-                        ticker, trade_date, open, high, low, close, volume, turnover_krw, source, created_at
-                    )
-                    VALUES (:t, :d, :o, :h, :l, :c, :v, :val, 'KIS', NOW())
-                    ON CONFLICT (ticker, trade_date)
-                    DO UPDATE SET
-                        open = EXCLUDED.open,
-                        high = EXCLUDED.high,
-                        low = EXCLUDED.low,
-                        close = EXCLUDED.close,
-                        volume = EXCLUDED.volume,
-                        turnover_krw = EXCLUDED.turnover_krw,
-                        created_at = NOW()
-                """), {
-                    "t": ticker,
-                    "d": trade_date,
-                    "o": _to_int(row.get("stck_oprc")),
-                    "h": _to_int(row.get("stck_hgpr")),
-                    "l": _to_int(row.get("stck_lwpr")),
-                    "c": _to_int(row.get("stck_clpr")),
-                    "v": _to_int(row.get("acml_vol")),
-                    "val": _to_int(row.get("acml_tr_pbmn")),
-                })
-                total_rows += 1
-            if not dry_run and idx % 20 == 0:
-                db.commit()
-            time.sleep(0.1)
-            if idx % 100 == 0:
-                print(f"Backfill progress: {idx}/{len(tickers)} tickers")
-        if not dry_run:
-            db.commit()
+            total_rows += 1
+            if not dry_run:
+                writer.add(parsed)
+        time.sleep(0.1)
+        if idx % 100 == 0:
+            print(f"Backfill progress: {idx}/{len(tickers)} tickers")
+    if not dry_run:
+        writer.close()
     return total_rows
 
 
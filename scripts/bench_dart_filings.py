@@ -0,0 +1,184 @@
+"""
+Benchmark DART filings ingest against a local fake OpenDART server.
+
+Compares the old path (90-day windows walked one after another, one INSERT
+per filing) with the pipelined loader in ingest.dart_loader (windows fetched
+concurrently, one bulk upsert per page), then shows a follow-up incremental
+run. Writes to the configured DB; the fake filings use rcp_no values starting
+with "BENCH" and are deleted at the end, and the DART high-water mark is
+restored.
+
+    python scripts/bench_dart_filings.py --days 365 --per-day 150 --latency-ms 150
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../services/ingest")))
+
+from sqlalchemy import text  # noqa: E402
+
+from ingest import dart_loader  # noqa: E402
+from ingest.config import settings  # noqa: E402
+from ingest.db import SessionLocal  # noqa: E402
+from ingest.watermark import get_watermark  # noqa: E402
+
+
+def _make_handler(latency_sec: float, per_day: int, hits: list):
+    class FakeDartHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            hits.append(1)
+            qs = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            bgn = date(int(qs["bgn_de"][:4]), int(qs["bgn_de"][4:6]), int(qs["bgn_de"][6:8]))
+            end = date(int(qs["end_de"][:4]), int(qs["end_de"][4:6]), int(qs["end_de"][6:8]))
+            page_no = int(qs.get("page_no", 1))
+            page_count = int(qs.get("page_count", 100))
+            total = ((end - bgn).days + 1) * per_day
+            first = (page_no - 1) * page_count
+            items = []
+            # newest first, like sort_mth=desc
+            for n in reversed(range(max(total - first - page_count, 0), total - first)):
+                day = bgn + timedelta(days=n // per_day)
+                items.append({
+                    "corp_code": f"{n % 3000:08d}",
+                    "rcept_no": f"BENCH{day:%Y%m%d}{n % per_day:05d}",
+                    "rcept_dt": f"{day:%Y%m%d}",
+                    "report_nm": f"주요사항보고서 {n}",
+                })
+            time.sleep(latency_sec)
+            payload = {
+                "status": "000" if total else "013",
+                "message": "정상",
+                "page_no": page_no,
+                "page_count": page_count,
+                "total_count": total,
+                "total_page": (total + page_count - 1) // page_count,
+                "list": items,
+            }
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FakeDartHandler
+
+
+def _run_legacy(base_url: str, days: int) -> int:
+    """The pre-pipeline loop: serial windows and pages, row-at-a-time inserts."""
+    session = dart_loader._get_dart_session()
+    end_date = date.today()
+    count = 0
+    with SessionLocal() as db:
+        for chunk_start, chunk_end in dart_loader._iter_date_ranges(end_date - timedelta(days=days), end_date, 90):
+            page_no = 1
+            while True:
+                dart_loader.get_source_limiter("dart").acquire()
+                data = session.get(f"{base_url}/api/list.json", params={
+                    "crtfc_key": "bench", "bgn_de": chunk_start.strftime("%Y%m%d"),
+                    "end_de": chunk_end.strftime("%Y%m%d"), "page_count": 100, "page_no": page_no,
+                }, timeout=30).json()
+                list_data = data.get("list") or []
+                if data.get("status") != "000" or not list_data:
+                    break
+                for item in list_data:
+                    rdt = item["rcept_dt"]
+                    db.execute(text("""
+                        INSERT INTO dart_filing (rcp_no, corp_code, filing_date, filing_type, title, created_at)
+                        VALUES (:rno, :cc, :d, :typ, :title, NOW())
+                        ON CONFLICT (rcp_no) DO UPDATE SET title = EXCLUDED.title
+                    """), {
+                        "rno": item["rcept_no"], "cc": item["corp_code"],
+                        "d": date(int(rdt[:4]), int(rdt[4:6]), int(rdt[6:8])),
+                        "typ": item.get("pblntf_ty", "-"), "title": item["report_nm"],
+                    })
+                    count += 1
+                db.commit()
+                page_no += 1
+    return count
+
+
+def _cleanup():
+    with SessionLocal() as db:
+        db.execute(text("DELETE FROM dart_filing WHERE rcp_no LIKE 'BENCH%'"))
+        db.execute(text("DELETE FROM ingest_watermark WHERE source = :s"), {"s": dart_loader.WATERMARK_SOURCE})
+        db.commit()
+
+
+def _restore_watermark(mark):
+    if mark is None:
+        return
+    with SessionLocal() as db:
+        db.execute(text("""
+            INSERT INTO ingest_watermark (source, last_date, last_key) VALUES (:s, :d, :k)
+            ON CONFLICT (source) DO UPDATE SET last_date = EXCLUDED.last_date, last_key = EXCLUDED.last_key
+        """), {"s": mark.source, "d": mark.last_date, "k": mark.last_key})
+        db.commit()
+
+
+def _count():
+    with SessionLocal() as db:
+        return db.execute(text("SELECT COUNT(*) FROM dart_filing WHERE rcp_no LIKE 'BENCH%'")).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs pipelined DART filings ingest.")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=150, help="Fake filings per calendar day.")
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    # The fake server has no quota; keep the real limiter out of the measurement.
+    settings.DART_RATE_LIMIT_PER_SEC = 1000.0
+    settings.DART_API_KEY = settings.DART_API_KEY or "bench"
+
+    hits: list = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(args.latency_ms / 1000.0, args.per_day, hits))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with SessionLocal() as db:
+        saved_mark = get_watermark(db, dart_loader.WATERMARK_SOURCE)
+    try:
+        _cleanup()
+        if not args.skip_legacy:
+            started, hits[:] = time.time(), []
+            rows = _run_legacy(base_url, args.days)
+            elapsed = time.time() - started
+            print(f"legacy      : {rows} filings, {len(hits)} calls in {elapsed:.2f}s -> {rows / elapsed:,.0f} filings/sec")
+            _cleanup()
+
+        started, hits[:] = time.time(), []
+        dart_loader.fetch_and_save_dart_filings(
+            days=args.days, concurrency=args.concurrency, base_url=base_url, full=True
+        )
+        elapsed = time.time() - started
+        rows = _count()
+        print(f"pipeline    : {rows} filings, {len(hits)} calls in {elapsed:.2f}s -> {rows / elapsed:,.0f} filings/sec")
+
+        started, hits[:] = time.time(), []
+        dart_loader.fetch_and_save_dart_filings(days=args.days, concurrency=args.concurrency, base_url=base_url)
+        print(f"incremental : {len(hits)} calls in {time.time() - started:.2f}s (nothing new upstream)")
+    finally:
+        _cleanup()
+        _restore_watermark(saved_mark)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark DART financial statements ingest against a local fake OpenDART server.
+
+Compares the old path (one fnlttSinglAcnt call per company-year, one INSERT
+per account, a commit per company-year) with ingest.dart_financials_loader
+(fnlttMultiAcnt for 100 companies per call, concurrent calls, bulk upserts).
+Writes to the configured DB; the fake companies use corp_codes starting with
+"BENCH" and their rows are deleted at the end.
+
+    python scripts/bench_dart_financials.py --companies 300 --latency-ms 100
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../services/ingest")))
+
+from sqlalchemy import text  # noqa: E402
+
+from ingest import dart_financials_loader as loader  # noqa: E402
+from ingest.config import settings  # noqa: E402
+from ingest.db import SessionLocal  # noqa: E402
+
+ACCOUNTS = ["매출액", "영업이익", "법인세차감전 순이익", "당기순이익", "자산총계", "부채총계", "자본총계"]
+
+
+def _accounts(corp_code: str, year: str) -> list[dict]:
+    items = []
+    for fs_div in ("CFS", "OFS"):
+        for n, account in enumerate(ACCOUNTS):
+            items.append({
+                "corp_code": corp_code,
+                "bsns_year": year,
+                "rcept_no": f"{int(year) + 1}0315000001",
+                "fs_div": fs_div,
+                "account_nm": account,
+                "thstrm_dt": f"{year}.12.31 현재",
+                "thstrm_amount": f"{(n + 1) * 1_000_000_000:,}",
+            })
+    return items
+
+
+def _make_handler(latency_sec: float, hits: list):
+    class FakeDartHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            hits.append(1)
+            url = urlparse(self.path)
+            qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+            items = []
+            for corp_code in qs["corp_code"].split(","):
+                items.extend(_accounts(corp_code, qs["bsns_year"]))
+            time.sleep(latency_sec)
+            body = json.dumps({"status": "000", "message": "정상", "list": items}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FakeDartHandler
+
+
+def _run_legacy(base_url: str, corp_codes: list[str], years: list[int]) -> int:
+    """The pre-batching loop: one call per company-year, row-at-a-time upserts."""
+    session = loader._get_dart_session()
+    count = 0
+    with SessionLocal() as db:
+        for corp_code in corp_codes:
+            for year in years:
+                loader.get_source_limiter("dart").acquire()
+                data = session.get(f"{base_url}/api/fnlttSinglAcnt.json", params={
+                    "crtfc_key": "bench", "corp_code": corp_code, "bsns_year": str(year), "reprt_code": "11011",
+                }, timeout=30).json()
+                for item in data.get("list") or []:
+                    row = loader.parse_account_item(item, corp_code, year)
+                    db.execute(text("""
+                        INSERT INTO financial_statement
+                        (corp_code, period_end, announced_at, item_code, item_name, value, unit, consolidated_flag, created_at)
+                        VALUES (:cc, :pe, :ann, :icode, :iname, :v, :u, :cf, NOW())
+                        ON CONFLICT (corp_code, period_end, item_code, announced_at)
+                        DO UPDATE SET value = EXCLUDED.value, item_name = EXCLUDED.item_name
+                    """), dict(zip(["cc", "pe", "ann", "icode", "iname", "v", "u", "cf"], row)))
+                count += 1
+                db.commit()
+    return count
+
+
+def _cleanup():
+    with SessionLocal() as db:
+        db.execute(text("DELETE FROM financial_statement WHERE corp_code LIKE 'BENCH%'"))
+        db.commit()
+
+
+def _count():
+    with SessionLocal() as db:
+        return db.execute(text("SELECT COUNT(*) FROM financial_statement WHERE corp_code LIKE 'BENCH%'")).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs batched DART financials ingest.")
+    parser.add_argument("--companies", type=int, default=300)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    # The fake server has no quota; keep the real limiter out of the measurement
+    # and report call counts instead (real runs pay ~1/DART_RATE_LIMIT_PER_SEC per call).
+    real_rate = settings.DART_RATE_LIMIT_PER_SEC
+    settings.DART_RATE_LIMIT_PER_SEC = 1000.0
+
+    hits: list = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(args.latency_ms / 1000.0, hits))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    corp_codes = [f"BENCH{i:03d}" for i in range(args.companies)]
+    latest_year = date.today().year - 2
+    years = [latest_year - i for i in range(args.years)]
+
+    try:
+        _cleanup()
+        if not args.skip_legacy:
+            started, hits[:] = time.time(), []
+            done = _run_legacy(base_url, corp_codes, years)
+            elapsed = time.time() - started
+            print(
+                f"legacy  : {done} company-years, {_count()} rows, {len(hits)} calls in {elapsed:.2f}s "
+                f"(>= {len(hits) / real_rate:.0f}s at {real_rate:g} req/s)"
+            )
+            _cleanup()
+
+        started, hits[:] = time.time(), []
+        with SessionLocal() as db:
+            done = loader.load_financials(
+                db, corp_codes, years, api_key="bench", base_url=base_url, concurrency=args.concurrency
+            )
+        elapsed = time.time() - started
+        print(
+            f"batched : {done} company-years, {_count()} rows, {len(hits)} calls in {elapsed:.2f}s "
+            f"(>= {len(hits) / real_rate:.0f}s at {real_rate:g} req/s)"
+        )
+    finally:
+        _cleanup()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark KIS quote ingest throughput against a local fake KIS server.
+
+Compares the old serial loop (get_stock_price + fixed sleep) with the async
+engine in ingest.kis_async. No real KIS credentials or DB are needed.
+
+    python scripts/bench_kis_async.py --tickers 300 --latency-ms 40 --quota 20
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../services/ingest")))
+
+from ingest.kis_async import fetch_stock_prices  # noqa: E402
+from ingest.kis_client import KisClient  # noqa: E402
+from ingest.token_store import KisTokenProvider, MemoryTokenStore  # noqa: E402
+
+
+def _make_handler(latency_sec: float, quota_per_sec: int):
+    hits: deque = deque()
+    lock = threading.Lock()
+
+    class FakeKisHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            self._send(200, {"access_token": "fake-token", "expires_in": 86400})
+
+        def do_GET(self):
+            now = time.monotonic()
+            with lock:
+                while hits and now - hits[0] > 1.0:
+                    hits.popleft()
+                over_quota = len(hits) >= quota_per_sec
+                if not over_quota:
+                    hits.append(now)
+            if over_quota:
+                self._send(500, {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."})
+                return
+            time.sleep(latency_sec)
+            self._send(200, {"rt_cd": "0", "output": {
+                "stck_prpr": "70000", "stck_oprc": "69500", "stck_hgpr": "70500",
+                "stck_lwpr": "69000", "acml_vol": "1000", "acml_tr_pbmn": "70000000",
+            }})
+
+    return FakeKisHandler
+
+
+def _run_serial(kis: KisClient, tickers: list[str]) -> int:
+    ok = 0
+    for ticker in tickers:
+        if kis.get_stock_price(ticker):
+            ok += 1
+        time.sleep(0.1)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs async KIS quote ingest.")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--quota", type=int, default=20, help="Fake server requests/sec quota.")
+    parser.add_argument("--rate", type=float, default=18.0, help="Client token bucket rate.")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(args.latency_ms / 1000.0, args.quota))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    tickers = [f"{i:06d}" for i in range(args.tickers)]
+
+    # Keep the fake token out of the shared on-disk token cache.
+    kis = KisClient(
+        base_url=base_url,
+        app_key="bench",
+        app_secret="bench",
+        token_provider=KisTokenProvider(MemoryTokenStore()),
+    )
+
+    if not args.skip_serial:
+        started = time.time()
+        ok = _run_serial(kis, tickers)
+        elapsed = time.time() - started
+        print(f"serial : {ok}/{len(tickers)} ok in {elapsed:.2f}s -> {len(tickers) / elapsed:.1f} tickers/sec")
+
+    started = time.time()
+    results = fetch_stock_prices(tickers, kis=kis, rate_per_sec=args.rate, concurrency=args.concurrency)
+    elapsed = time.time() - started
+    ok = sum(1 for value in results.values() if value)
+    print(f"async  : {ok}/{len(tickers)} ok in {elapsed:.2f}s -> {len(tickers) / elapsed:.1f} tickers/sec")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark the Naver theme/industry scrapers against a local server that
+serves the saved euc-kr fixtures (apps/api/tests/fixtures/naver) with a fixed
+latency and ETag support.
+
+Compares the old cold path for get_naver_industries(include_leading_stock=True)
+(requests.get per page, no connection reuse, 5 threads) with the scraper
+engine in app.services.scrapers: cold (pooled session, 8 workers), warm (cache
+hit) and revalidated (TTL expired, every page answered 304).
+
+    python scripts/bench_naver_scrapers.py --latency-ms 150
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "apps/api"))
+FIXTURES = os.path.join(ROOT, "apps/api/tests/fixtures/naver")
+
+import requests  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+from app.services import scrapers  # noqa: E402
+
+
+def _make_handler(latency_sec: float, hits: dict):
+    pages = {}
+    for name in ("industry_list.html", "theme_list.html", "group_detail.html"):
+        with open(os.path.join(FIXTURES, name), "rb") as f:
+            pages[name] = f.read()
+
+    class FakeNaverHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if "sise_group.nhn" in self.path:
+                name = "industry_list.html"
+            elif "theme.nhn" in self.path:
+                name = "theme_list.html"
+            else:
+                name = "group_detail.html"
+            etag = f'"{name}-v1"'
+            time.sleep(latency_sec)
+            if self.headers.get("If-None-Match") == etag:
+                hits["304"] = hits.get("304", 0) + 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            hits["200"] = hits.get("200", 0) + 1
+            body = pages[name]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=euc-kr")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FakeNaverHandler
+
+
+def _legacy_industries(base_url: str) -> list[dict]:
+    """The pre-engine cold path: unpooled requests.get, 5 threads for leading stocks."""
+    resp = requests.get(f"{base_url}/sise/sise_group.nhn?type=upjong", headers=scrapers.HEADERS, timeout=10)
+    resp.encoding = "euc-kr"
+    industries = scrapers.parse_industry_page(resp.text)
+
+    def leading(link):
+        r = requests.get(f"{base_url}{link}", headers=scrapers.HEADERS, timeout=10)
+        r.encoding = "euc-kr"
+        table = BeautifulSoup(r.text, "html.parser").select_one("table.type_5")
+        name_td = table.select_one("td.name") if table else None
+        return name_td.get_text(strip=True) if name_td else "-"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        for item, stock in zip(industries, executor.map(leading, [i["link"] for i in industries])):
+            item["leadingStock"] = stock
+    return industries
+
+
+def _timed(label: str, fn, hits: dict):
+    hits.clear()
+    started = time.time()
+    result = fn()
+    elapsed = time.time() - started
+    print(f"{label:<12}: {len(result)} industries in {elapsed * 1000:7.1f}ms  requests={dict(hits)}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Naver industry scraping cold/warm paths.")
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    hits: dict = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(args.latency_ms / 1000.0, hits))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    scrapers.BASE_URL = base_url
+
+    try:
+        _timed("legacy", lambda: _legacy_industries(base_url), hits)
+        engine = lambda: scrapers.get_naver_industries(include_leading_stock=True, time_budget_sec=60)  # noqa: E731
+        _timed("engine cold", engine, hits)
+        _timed("engine warm", engine, hits)
+
+        # Expire the list cache and every page: all pages come back as 304.
+        scrapers._INDUSTRY_CACHE.clear()
+        for key in list(getattr(scrapers._PAGE_CACHE.backend, "_entries", {})):
+            entry = scrapers._PAGE_CACHE.backend.get(key)
+            entry.fresh_until = 0
+        _timed("revalidated", engine, hits)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
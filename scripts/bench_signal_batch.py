@@ -0,0 +1,80 @@
+"""
+Benchmark simple_ma_v2_gate3 evaluation from bars: per-ticker DataFrames vs
+the panel engine in app.services.signal_batch (the cold path of
+compute_live_signals), on synthetic random-walk bars. Also checks that both
+produce identical payloads.
+
+    cd apps/api && python ../../scripts/bench_signal_batch.py --tickers 50 500 2500
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "apps/api"))
+
+from app.services.signal_batch import compute_signals_v2_gate3_batch  # noqa: E402
+from app.services.signal_config import DEFAULT_SIGNAL_WEIGHTS, HORIZON_RULES, required_lookback  # noqa: E402
+from app.services.signal_engine import _build_price_df, compute_signal_simple_ma_v2_gate3  # noqa: E402
+
+
+def make_series(rng, tickers: int, bars: int) -> dict[str, list[tuple]]:
+    start = date(2024, 1, 1)
+    series = {}
+    for t in range(tickers):
+        closes = np.round(10000 * np.exp(np.cumsum(rng.normal(rng.normal(0, 0.003), 0.02, bars))))
+        spread = rng.integers(0, 300, (2, bars))
+        volumes = rng.integers(1, 2_000_000, bars)
+        series[f"{t:06d}"] = [
+            (
+                start + timedelta(days=i),
+                Decimal(int(closes[i])),
+                Decimal(int(closes[i] + spread[0, i])),
+                Decimal(int(max(closes[i] - spread[1, i], 1))),
+                Decimal(int(closes[i])),
+                Decimal(int(volumes[i])),
+            )
+            for i in range(bars - 1, -1, -1)
+        ]
+    return series
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-ticker vs panel gate3 signals.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[50, 500, 2500])
+    parser.add_argument("--horizon", default="1D", choices=sorted(HORIZON_RULES))
+    args = parser.parse_args()
+
+    rules = HORIZON_RULES[args.horizon]
+    weights = DEFAULT_SIGNAL_WEIGHTS
+    bars = required_lookback(rules)
+    rng = np.random.default_rng(0)
+
+    for count in args.tickers:
+        series = make_series(rng, count, bars)
+
+        started = time.perf_counter()
+        per_ticker = {
+            ticker: compute_signal_simple_ma_v2_gate3(_build_price_df(rows), args.horizon, rules, weights)
+            for ticker, rows in series.items()
+        }
+        legacy_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        batch = compute_signals_v2_gate3_batch(series, rules, weights)
+        batch_ms = (time.perf_counter() - started) * 1000
+
+        mismatches = sum(1 for ticker in series if per_ticker[ticker] != batch[ticker])
+        print(
+            f"{count:>5} tickers x {bars} bars: per-ticker {legacy_ms:8.0f}ms  panel {batch_ms:7.0f}ms  "
+            f"x{legacy_ms / max(batch_ms, 1e-9):5.1f}  mismatches={mismatches}"
+        )
+
+
+if __name__ == "__main__":
+    main()
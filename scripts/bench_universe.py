@@ -0,0 +1,147 @@
+"""
+Benchmark GET /universe on a synthetic full-universe dataset.
+
+Seeds company / security / price_daily as session TEMP tables (they shadow the
+real tables for this connection only, nothing is written to them), then times
+the previous per-ticker implementation against app.routers.universe with and
+without as_of_date.
+
+    cd apps/api && python ../../scripts/bench_universe.py --tickers 2700 --days 300
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date as dt_date
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "apps/api"))
+
+from sqlalchemy import func, select, text  # noqa: E402
+
+from app.db import SessionLocal  # noqa: E402
+from app.orm import PriceDaily  # noqa: E402
+from app.routers.universe import get_universe  # noqa: E402
+
+
+def seed(db, tickers: int, days: int) -> dt_date:
+    db.execute(text("""
+        CREATE TEMP TABLE company (
+            stock_code TEXT PRIMARY KEY, name_ko TEXT, market TEXT, sector_name TEXT, sector_code TEXT
+        )
+    """))
+    db.execute(text("CREATE TEMP TABLE security (ticker TEXT PRIMARY KEY, market TEXT)"))
+    db.execute(text("""
+        CREATE TEMP TABLE price_daily (
+            ticker TEXT, trade_date DATE, open NUMERIC, close NUMERIC, turnover_krw NUMERIC,
+            PRIMARY KEY (ticker, trade_date)
+        )
+    """))
+    db.execute(text("""
+        INSERT INTO company
+        SELECT lpad(i::text, 6, '0'), 'co' || i, CASE WHEN i % 2 = 0 THEN 'KOSPI' ELSE 'KOSDAQ' END,
+               'sector' || (i % 40), 'S' || (i % 40)
+        FROM generate_series(1, :n) i
+    """), {"n": tickers})
+    db.execute(text("INSERT INTO security SELECT stock_code, market FROM company"))
+    db.execute(text("""
+        INSERT INTO price_daily
+        SELECT c.stock_code, d::date,
+               1000 + (abs(hashtext(c.stock_code || d::text)) % 50000),
+               1000 + (abs(hashtext(d::text || c.stock_code)) % 50000),
+               (abs(hashtext(c.stock_code || 't' || d::text)) % 10000000000)::numeric
+        FROM company c
+        CROSS JOIN generate_series(CURRENT_DATE - :days + 1, CURRENT_DATE, interval '1 day') d
+    """), {"days": days})
+    db.execute(text("ANALYZE company"))
+    db.execute(text("ANALYZE security"))
+    db.execute(text("ANALYZE price_daily"))
+    return db.execute(text("SELECT MAX(trade_date) FROM price_daily")).scalar()
+
+
+def legacy_universe(db, asof: dt_date | None, min_price: float | None, min_turnover: float | None) -> int:
+    """The previous implementation's query pattern (two queries per ticker with as_of_date)."""
+    rows = db.execute(text("""
+        SELECT c.stock_code FROM company c LEFT JOIN security s ON s.ticker = c.stock_code
+        WHERE c.stock_code IS NOT NULL ORDER BY c.stock_code
+    """)).fetchall()
+    latest = {r.ticker: r.close for r in db.execute(text("""
+        SELECT DISTINCT ON (ticker) ticker, close FROM price_daily ORDER BY ticker, trade_date DESC
+    """))}
+    avg_map = {r.ticker: r.a for r in db.execute(text("""
+        SELECT ticker, AVG(turnover_krw) AS a FROM (
+            SELECT ticker, turnover_krw, ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY trade_date DESC) AS rn
+            FROM price_daily WHERE turnover_krw IS NOT NULL
+        ) t WHERE rn <= 20 GROUP BY ticker
+    """))}
+    count = 0
+    for r in rows:
+        if asof:
+            price = db.execute(
+                select(PriceDaily.close).where(PriceDaily.ticker == r.stock_code, PriceDaily.trade_date <= asof)
+                .order_by(PriceDaily.trade_date.desc()).limit(1)
+            ).scalar_one_or_none()
+            turnover = db.execute(
+                select(func.avg(PriceDaily.turnover_krw))
+                .where(PriceDaily.ticker == r.stock_code, PriceDaily.trade_date <= asof)
+            ).scalar_one_or_none()
+        else:
+            price, turnover = latest.get(r.stock_code), avg_map.get(r.stock_code)
+        if min_price is not None and (price is None or price < min_price):
+            continue
+        if min_turnover is not None and (turnover is None or turnover < min_turnover):
+            continue
+        count += 1
+    return count
+
+
+def current_universe(db, asof: dt_date | None, min_price: float | None, min_turnover: float | None) -> int:
+    result = get_universe(
+        include_etf_reit=False,
+        min_price_krw=min_price,
+        min_avg_turnover_krw_20d=min_turnover,
+        min_listing_days=None,
+        as_of_date=asof.isoformat() if asof else None,
+        include_industry_codes=None,
+        include_industry_names=None,
+        exclude_industry_codes=None,
+        include_theme_ids=None,
+        exclude_theme_ids=None,
+        _user=None,
+        db=db,
+    )
+    return len(result["items"])
+
+
+def timed(label: str, fn, repeat: int) -> None:
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    print(f"{label:<26} rows={count:<6} median={samples[len(samples) // 2]:8.1f}ms  min={samples[0]:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /universe on a synthetic dataset.")
+    parser.add_argument("--tickers", type=int, default=2700)
+    parser.add_argument("--days", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        last = seed(db, args.tickers, args.days)
+        print(f"seeded {args.tickers} tickers x {args.days} days in {time.perf_counter() - started:.1f}s")
+        asof = dt_date.fromordinal(last.toordinal() - 30)
+        filters = (10000.0, 1e9)
+        for label, when in (("latest", None), (f"as_of {asof}", asof)):
+            timed(f"legacy {label}", lambda: legacy_universe(db, when, *filters), args.repeat if when is None else 1)
+            timed(f"set-based {label}", lambda: current_universe(db, when, *filters), args.repeat)
+        db.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,16 @@
-
+import argparse
 import sys
 import os
-import time
-import concurrent.futures
-from datetime import datetime, date
-from sqlalchemy import text
-import requests
+from datetime import datetime
 
 # Add ingest service path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../services/ingest")))
 
 from ingest.db import SessionLocal
 from ingest.kis_client import KisClient
-from ingest.config import settings
+from ingest.trading_calendar import get_trading_calendar
+from ingest import work_queue
+from ingest.price_backfill_job import JOB_TYPE, plan_price_backfill_job, run_price_backfill_job
 
 import threading
 
@@ -27,70 +25,20 @@ def _log(msg):
     with open("backfill_debug.log", "a", encoding="utf-8") as f:
         f.write(log_msg + "\n")
 
-def process_ticker(kis, ticker, start_dt, end_dt):
-    """
-    Fetch and save price history for a single ticker.
-    Returns (success: bool, message: str)
-    """
-    try:
-        if ticker in ['000020', '005930']: # Sample debug for specific tickers
-             _log(f"Fetching {ticker}...") 
-        
-        # 1. Fetch data
-        # KisClient handles authentication internally
-        # get_stock_daily_history returns list of dicts
-        prices = kis.get_stock_daily_history(ticker, start_dt, end_dt)
-        
-        if not prices:
-            return False, f"{ticker}: No data returned"
-
-        # 2. Save to DB (Single Transaction per ticker to avoid locking issues)
-        with SessionLocal() as db:
-            stmt = text("""
-                INSERT INTO price_daily (
-                    ticker, trade_date, open, high, low, close, volume, 
-                    turnover_krw, created_at
-                ) VALUES (
-                    :t, :d, :o, :h, :l, :c, :v, :turnover_krw, NOW()
-                )
-                ON CONFLICT (ticker, trade_date) DO UPDATE SET
-                    open = EXCLUDED.open,
-                    high = EXCLUDED.high,
-                    low = EXCLUDED.low,
-                    close = EXCLUDED.close,
-                    volume = EXCLUDED.volume,
-                    turnover_krw = EXCLUDED.turnover_krw
-            """)
-            
-            for p in prices:
-                # KIS returns YYYYMMDD string
-                d_str = p['stck_bsop_date']
-                p_date = date(int(d_str[:4]), int(d_str[4:6]), int(d_str[6:8]))
-                
-                db.execute(stmt, {
-                    "t": ticker,
-                    "d": p_date,
-                    "o": int(p.get('stck_oprc', 0)),
-                    "h": int(p.get('stck_hgpr', 0)),
-                    "l": int(p.get('stck_lwpr', 0)),
-                    "c": int(p.get('stck_clpr', 0)),
-                    "v": int(p.get('acml_vol', 0)),
-                    "turnover_krw": int(p.get('acml_tr_pbmn', 0))
-                })
-            db.commit()
-            
-        return True, f"{ticker}: Saved {len(prices)} rows"
-
-    except Exception as e:
-        return False, f"{ticker}: Error - {e}"
-
 def main():
-    # To get ~252 trading days (1 year), we need roughly 365 calendar days.
-    # Previous setting of 252 calendar days only fetched ~175 trading days (start date ~May 9th).
-    days = 365 
-    workers = 5  # Conservative concurrency
+    parser = argparse.ArgumentParser(
+        description="Backfill KIS daily prices for the whole universe through the resumable backfill job queue."
+    )
+    parser.add_argument("--sessions", type=int, default=252, help="Trading sessions to cover (252 = ~1 year).")
+    parser.add_argument("--workers", type=int, default=5, help="Conservative concurrency.")
+    parser.add_argument("--full", action="store_true", help="Re-fetch the whole window instead of only missing ranges.")
+    parser.add_argument("--new", action="store_true", help="Plan a new job even if an unfinished one exists.")
+    parser.add_argument("--job-id", type=int, default=None, help="Resume a specific job.")
+    parser.add_argument("--max-attempts", type=int, default=5, help="Attempts per work item before it is marked FAILED.")
+    args = parser.parse_args()
+    workers = args.workers
     
-    _log(f"Starting FAST Backfill (Days={days}, Workers={workers})")
+    _log(f"Starting FAST Backfill (Sessions={args.sessions}, Workers={workers}, {'full' if args.full else 'incremental'})")
 
     # 1. Initialize KIS Client
     kis = KisClient()
@@ -100,84 +48,37 @@ def main():
         _log(f"Failed to issue KIS Access Token: {e}")
         return
 
-    # 2. Get Tickers
+    # 2. Resume an unfinished job, or plan a new one
+    job_id = args.job_id
     with SessionLocal() as db:
-        tickers = [r[0] for r in db.execute(text("SELECT ticker FROM security ORDER BY ticker")).fetchall()]
-    
-    _log(f"Total Tickers to process: {len(tickers)}")
-    
-    # 3. Define Date Range
-    # Simple approach: Request today's data and KIS will give us 'days' worth of history backwards?
-    # Actually get_stock_daily_history needs YYYYMMDD ~ YYYYMMDD
-    # But the KisClient.get_stock_daily_history implementation handles the paging/date logic internally 
-    # if we look at the implementation... wait, let's check kis_client.py logic usage.
-    # The existing loader does: kis.get_stock_daily_history(ticker, period_code="D") ... no, let's pass dates if possible.
-    # Looking at previous context, get_stock_daily_history(self, stock_code, start_date=None, end_date=None)
-    # If start/end not provided, it fetches recent?
-    # Let's verify KIS client usage.
-    
-    # Assuming get_stock_daily_history(ticker) fetches recent 30 days by default or we need to loop?
-    # Let's stick to what the original backfill did or try to be smart.
-    # Original backfill_kis_prices.py calls: update_kis_prices_task or backfill...
-    # In kis_loader.py: 
-    # def backfill_kis_prices_task(days=100):
-    #    ...
-    #    hist = kis.get_stock_daily_history(t.ticker, start_date=start_str, end_date=end_str)
-    
-    # So we need start/end str.
-    from datetime import timedelta
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=days)
-    
-    start_str = start_date.strftime("%Y%m%d")
-    end_str = end_date.strftime("%Y%m%d")
-    
-    _log(f"Target Period: {start_str} ~ {end_str}")
-
-    success_count = 0
-    fail_count = 0
-    
-    # 4. Run Parallel with Retry Queue
-    # We will use a while loop to process tickers, and retry failed ones.
-    # But for simplicity in this script, let's just process once and log failures.
-    # To be robust as user requested, we could add auto-restart logic here?
-    # Actually, the user wants me to *cognize* error and restart.
-    # So I will wrap the executor in a try-except block that can recover?
-    # No, better to handle inside threaded tasks.
-    
-    max_retries = 3
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-        # Submit all tasks
-        future_to_ticker = {
-            executor.submit(process_ticker, kis, ticker, start_str, end_str): ticker 
-            for ticker in tickers
-        }
-        
-        for future in concurrent.futures.as_completed(future_to_ticker):
-            ticker = future_to_ticker[future]
-            try:
-                success, msg = future.result()
-                if success:
-                    success_count += 1
-                    if success_count % 50 == 0:
-                        _log(f"Progress: {success_count}/{len(tickers)} (Last: {msg})")
-                else:
-                    fail_count += 1
-                    _log(f"FAIL: {msg}")
-                    # Basic retry logic could be added here if needed, but keeping it simple for now.
-            except Exception as e:
-                fail_count += 1
-                _log(f"CRASH {ticker}: {e}")
-                
-            # Rate Limit Throttle (Simple)
-            time.sleep(0.05) 
-
-    _log(f"Finished. Success: {success_count}, Fail: {fail_count}")
-
-    # Auto-restart check: if too many failures (e.g. token issue), we might want to alert or re-run.
-    if fail_count > 100:
-        _log("WARNING: High failure count. Check logs.")
+        work_queue.ensure_queue_tables(db)
+        if job_id is None and not args.new:
+            job_id = work_queue.find_resumable_job(db, JOB_TYPE)
+        if job_id is not None:
+            progress = work_queue.job_progress(db, job_id=job_id)
+            _log(f"Resuming job {job_id}: {progress['done']}/{progress['total']} items done, {progress['failed']} failed")
+
+    if job_id is None:
+        # 3. Define Date Range (exact session count) and plan what is actually missing
+        calendar = get_trading_calendar()
+        end_date = datetime.now().date()
+        start_date = calendar.sessions_back(end_date, args.sessions - 1)
+        _log(f"Target Period: {start_date:%Y%m%d} ~ {end_date:%Y%m%d}")
+        job_id = plan_price_backfill_job(start_date, end_date, full=args.full, log=_log)
+        if job_id is None:
+            _log("Nothing to backfill.")
+            return
+        _log(f"Planned job {job_id}")
+
+    # 4. Drain the queue; items are checkpointed as they finish, so this can be re-run after a crash
+    progress = run_price_backfill_job(job_id, kis=kis, workers=workers, max_attempts=args.max_attempts, log=_log)
+    if progress:
+        _log(
+            f"Finished. Done: {progress['done']}/{progress['total']}, Failed: {progress['failed']}, "
+            f"Rows: {progress['rows_written']}"
+        )
+        if progress["failed"] > 100:
+            _log("WARNING: High failure count. Check logs.")
 
 if __name__ == "__main__":
     main()
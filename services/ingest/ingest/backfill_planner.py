@@ -0,0 +1,166 @@
+"""
+Incremental price backfill planning.
+
+Instead of asking KIS for the full window for every ticker, read what
+price_daily already holds (one query for all tickers) and compute only the
+missing date ranges per ticker: the tail after MAX(trade_date), interior
+gaps, and any head of the window that was never loaded.
+
+Sessions KIS has no bar for (before the listing, trading halts) would look
+missing forever, so every range KIS answered for is recorded in
+price_fetch_checked; sessions inside a checked range count as covered
+whether or not a bar came back. full=True runs bypass the plan and still
+re-fetch them.
+
+Expected sessions come from ingest.trading_calendar.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from ingest.ddl import ensure_ddl
+from ingest.trading_calendar import get_trading_calendar
+
+_TABLE_READY = False
+
+
+@dataclass
+class FetchRange:
+    ticker: str
+    start: date
+    end: date
+    sessions: int  # expected sessions missing inside [start, end]
+
+
+def load_expected_sessions(start: date, end: date) -> list[date]:
+    return get_trading_calendar().sessions_between(start, end)
+
+
+def ensure_checked_table(db) -> None:
+    global _TABLE_READY
+    if _TABLE_READY:
+        return
+    ensure_ddl(db, [
+        """
+        CREATE TABLE IF NOT EXISTS price_fetch_checked (
+          ticker     TEXT NOT NULL,
+          start_date DATE NOT NULL,
+          end_date   DATE NOT NULL,
+          checked_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+          PRIMARY KEY (ticker, start_date, end_date)
+        )
+        """,
+    ])
+    _TABLE_READY = True
+
+
+def record_checked_range(db, ticker: str, start: date, end: date, today: date | None = None) -> None:
+    """
+    Remember that KIS answered completely for [start, end]. Only pass ranges
+    from a fetch that did not fail. The end is cut to yesterday: today's bar
+    may simply not be published yet. Does not commit.
+    """
+    end = min(end, (today or date.today()) - timedelta(days=1))
+    if end < start:
+        return
+    ensure_checked_table(db)
+    db.execute(text("""
+        INSERT INTO price_fetch_checked (ticker, start_date, end_date, checked_at)
+        VALUES (:t, :s, :e, now())
+        ON CONFLICT (ticker, start_date, end_date) DO UPDATE SET checked_at = now()
+    """), {"t": ticker, "s": start, "e": end})
+
+
+def load_checked_ranges(db, tickers: list[str], start: date, end: date) -> dict[str, list[tuple[date, date]]]:
+    """Checked (start, end) ranges per ticker overlapping [start, end], in one query."""
+    ensure_checked_table(db)
+    rows = db.execute(text("""
+        SELECT ticker, start_date, end_date
+        FROM price_fetch_checked
+        WHERE ticker = ANY(:tickers)
+          AND end_date >= :s
+          AND start_date <= :e
+    """), {"tickers": list(tickers), "s": start, "e": end}).fetchall()
+    ranges: dict[str, list[tuple[date, date]]] = {}
+    for ticker, range_start, range_end in rows:
+        ranges.setdefault(ticker, []).append((range_start, range_end))
+    return ranges
+
+
+def checked_sessions(sessions: list[date], ranges: list[tuple[date, date]]) -> set[date]:
+    return {s for s in sessions if any(first <= s <= last for first, last in ranges)}
+
+
+def load_ticker_dates(db, tickers: list[str], start: date, end: date) -> dict[str, set[date]]:
+    """Loaded trade dates per ticker inside [start, end], in one query."""
+    rows = db.execute(text("""
+        SELECT ticker, array_agg(trade_date)
+        FROM price_daily
+        WHERE ticker = ANY(:tickers)
+          AND trade_date BETWEEN :s AND :e
+        GROUP BY ticker
+    """), {"tickers": list(tickers), "s": start, "e": end}).fetchall()
+    return {row[0]: set(row[1] or []) for row in rows}
+
+
+def missing_ranges(
+    ticker: str,
+    sessions: list[date],
+    have: set[date],
+    end: date,
+    merge_gap: int = 5,
+) -> list[FetchRange]:
+    """
+    Group missing sessions into ranges. Ranges separated by no more than
+    merge_gap loaded sessions are merged, trading a few re-fetched bars for
+    fewer requests. The last range is stretched to `end` so today's bar is
+    picked up even if the calendar does not know about it yet.
+    """
+    ranges: list[list[int]] = []
+    for idx, session in enumerate(sessions):
+        if session in have:
+            continue
+        if ranges and idx - ranges[-1][1] - 1 <= merge_gap:
+            ranges[-1][1] = idx
+        else:
+            ranges.append([idx, idx])
+
+    result = []
+    for first, last in ranges:
+        missing = sum(1 for s in sessions[first:last + 1] if s not in have)
+        result.append(FetchRange(ticker, sessions[first], sessions[last], missing))
+    if result and result[-1].end < end and sessions[-1] == result[-1].end:
+        result[-1].end = end
+    return result
+
+
+def plan_backfill(
+    db,
+    tickers: list[str],
+    start: date,
+    end: date,
+    merge_gap: int = 5,
+    sessions: list[date] | None = None,
+) -> list[FetchRange]:
+    if sessions is None:
+        sessions = load_expected_sessions(start, end)
+    if not sessions:
+        return []
+    loaded = load_ticker_dates(db, tickers, start, end)
+    checked = load_checked_ranges(db, tickers, start, end)
+    plan: list[FetchRange] = []
+    for ticker in tickers:
+        have = loaded.get(ticker, set()) | checked_sessions(sessions, checked.get(ticker, []))
+        plan.extend(missing_ranges(ticker, sessions, have, end, merge_gap))
+    return plan
+
+
+def describe_plan(plan: list[FetchRange], tickers: int, sessions_per_ticker: int) -> str:
+    missing = sum(r.sessions for r in plan)
+    ticker_count = len({r.ticker for r in plan})
+    full = tickers * sessions_per_ticker
+    return (
+        f"backfill plan: {len(plan)} ranges for {ticker_count}/{tickers} tickers, "
+        f"{missing} missing bars (full window would be ~{full})"
+    )
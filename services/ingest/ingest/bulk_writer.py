@@ -0,0 +1,211 @@
+"""
+Set-based write helpers shared by the loaders.
+
+Rows are staged into a temp table with COPY (falling back to a multi-row
+executemany when the driver has no COPY support) and merged into the target
+with one INSERT ... SELECT ... ON CONFLICT statement per batch.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ingest.db import SessionLocal
+from ingest.watermark import touch_versions
+
+
+@dataclass
+class BulkWriteStats:
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def add(self, other: "BulkWriteStats") -> None:
+        self.rows += other.rows
+        self.seconds += other.seconds
+
+
+def _driver_connection(db: Session):
+    raw = db.connection().connection
+    return getattr(raw, "driver_connection", raw)
+
+
+def _supports_copy(conn) -> bool:
+    try:
+        import psycopg
+    except ImportError:
+        return False
+    return isinstance(conn, psycopg.Connection)
+
+
+def stage_rows(db: Session, stage: str, columns: dict[str, str], rows: Iterable[Sequence]) -> int:
+    """
+    (Re)create temp table `stage` with the given column types and load rows into it.
+    The table lives until the surrounding transaction commits.
+    """
+    col_names = list(columns)
+    col_defs = ", ".join(f"{name} {sql_type}" for name, sql_type in columns.items())
+    db.execute(text(f"DROP TABLE IF EXISTS {stage}"))
+    db.execute(text(f"CREATE TEMP TABLE {stage} ({col_defs}) ON COMMIT DROP"))
+
+    conn = _driver_connection(db)
+    count = 0
+    if _supports_copy(conn):
+        with conn.cursor() as cur:
+            with cur.copy(f"COPY {stage} ({', '.join(col_names)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+        return count
+
+    params = [{f"c{i}": value for i, value in enumerate(row)} for row in rows]
+    if params:
+        placeholders = ", ".join(f":c{i}" for i in range(len(col_names)))
+        db.execute(text(f"INSERT INTO {stage} ({', '.join(col_names)}) VALUES ({placeholders})"), params)
+    return len(params)
+
+
+def bulk_upsert(
+    db: Session,
+    table: str,
+    columns: dict[str, str],
+    rows: Iterable[Sequence],
+    conflict_cols: list[str],
+    update_cols: list[str],
+    extra_values: dict[str, str] | None = None,
+    update_extra: dict[str, str] | None = None,
+) -> BulkWriteStats:
+    """
+    Upsert rows into `table` in one merge statement. Duplicate keys inside a
+    batch keep the last row. extra_values adds SQL-expression columns to the
+    insert (e.g. {"created_at": "NOW()"}); update_extra adds SQL expressions to
+    the DO UPDATE clause. Does not commit.
+    """
+    started = time.perf_counter()
+    stage = f"_stage_{table}"
+    count = stage_rows(db, stage, columns, rows)
+    if count == 0:
+        return BulkWriteStats(0, time.perf_counter() - started)
+
+    extra_values = extra_values or {}
+    update_extra = update_extra or {}
+    col_names = list(columns)
+    insert_cols = ", ".join(col_names + list(extra_values))
+    select_cols = ", ".join(col_names + list(extra_values.values()))
+    conflict = ", ".join(conflict_cols)
+    assignments = [f"{col} = EXCLUDED.{col}" for col in update_cols]
+    assignments += [f"{col} = {expr}" for col, expr in update_extra.items()]
+    on_conflict = f"DO UPDATE SET {', '.join(assignments)}" if assignments else "DO NOTHING"
+
+    db.execute(text(f"""
+        INSERT INTO {table} ({insert_cols})
+        SELECT DISTINCT ON ({conflict}) {select_cols}
+        FROM {stage}
+        ORDER BY {conflict}, ctid DESC
+        ON CONFLICT ({conflict}) {on_conflict}
+    """))
+    return BulkWriteStats(count, time.perf_counter() - started)
+
+
+PRICE_DAILY_COLUMNS = {
+    "ticker": "TEXT",
+    "trade_date": "DATE",
+    "open": "NUMERIC",
+    "high": "NUMERIC",
+    "low": "NUMERIC",
+    "close": "NUMERIC",
+    "volume": "NUMERIC",
+    "turnover_krw": "NUMERIC",
+}
+PRICE_UPDATE_ALL = ["open", "high", "low", "close", "volume", "turnover_krw"]
+PRICE_UPDATE_QUOTE = ["close", "volume"]
+PRICE_VERSION_SOURCE = "price_daily"
+
+
+def upsert_price_daily(
+    db: Session,
+    rows: Iterable[Sequence],
+    update_cols: list[str] | None = None,
+    source: str = "KIS",
+) -> BulkWriteStats:
+    """
+    rows: (ticker, trade_date, open, high, low, close, volume, turnover_krw) tuples.
+    Also touches the per-ticker price_daily data version of the written
+    tickers (what cached signals are keyed on). Does not commit.
+    """
+    rows = list(rows)
+    stats = bulk_upsert(
+        db,
+        "price_daily",
+        PRICE_DAILY_COLUMNS,
+        rows,
+        conflict_cols=["ticker", "trade_date"],
+        update_cols=PRICE_UPDATE_ALL if update_cols is None else update_cols,
+        extra_values={"source": f"'{source}'", "created_at": "NOW()"},
+        update_extra={"created_at": "NOW()"},
+    )
+    if stats.rows:
+        touch_versions(db, PRICE_VERSION_SOURCE, [row[0] for row in rows])
+    return stats
+
+
+class PriceDailyWriter:
+    """
+    Buffers price rows and flushes them in batches, each batch in its own
+    short transaction. Safe to share between threads.
+    """
+
+    def __init__(self, batch_size: int = 5000, update_cols: list[str] | None = None, label: str = "price_daily"):
+        self.batch_size = batch_size
+        self.update_cols = update_cols
+        self.label = label
+        self.stats = BulkWriteStats()
+        self._buffer: list[tuple] = []
+        self._lock = threading.Lock()
+
+    def add(self, row: tuple) -> None:
+        self.extend([row])
+
+    def extend(self, rows: Iterable[tuple]) -> None:
+        batch = None
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.batch_size:
+                batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: list[tuple]) -> None:
+        with SessionLocal() as db:
+            stats = upsert_price_daily(db, batch, update_cols=self.update_cols)
+            db.commit()
+        with self._lock:
+            self.stats.add(stats)
+
+    def close(self) -> BulkWriteStats:
+        self.flush()
+        print(
+            f"{self.label}: {self.stats.rows} rows upserted in {self.stats.seconds:.2f}s "
+            f"({self.stats.rows_per_sec:,.0f} rows/sec)"
+        )
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
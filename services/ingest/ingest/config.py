@@ -17,17 +17,38 @@ class Settings(BaseSettings):
     DB_HOST: str = "localhost"
     DB_PORT: str = "5432"
     DB_NAME: str = "stockmanager"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
     
     # KIS
     KIS_API_KEY: str | None = None
     KIS_API_SECRET_KEY: str | None = None
     KIS_BASE_URL: str = "https://openapi.koreainvestment.com:9443"
+    # KIS allows 20 requests/sec per app key; keep some headroom.
+    KIS_RATE_LIMIT_PER_SEC: float = 18.0
+    KIS_RATE_LIMIT_BURST: float = 1.0
+    KIS_ASYNC_CONCURRENCY: int = 10
+    KIS_HTTP_POOL_SIZE: int = 20
+    # Token cache shared by API/worker/scripts: "file", "db" or "memory".
+    KIS_TOKEN_STORE: str = "file"
+    KIS_TOKEN_CACHE_PATH: str | None = None  # default ~/.cache/stockmanager/kis_token.json
+    KIS_TOKEN_REFRESH_MARGIN_SEC: float = 600.0
+    KIS_TOKEN_RATE_LIMIT_WAIT_SEC: float = 65.0
 
     # DART
     DART_API_KEY: str | None = None
+    DART_BASE_URL: str = "https://opendart.fss.or.kr"
+    DART_RATE_LIMIT_PER_SEC: float = 5.0
+    # Date windows fetched at once by the filings ingest (all share the limiter).
+    DART_CONCURRENCY: int = 4
+    DART_CACHE_DIR: str | None = None  # default ~/.cache/stockmanager/dart (corpCode.zip)
     
     # ECOS
     ECOS_API_KEY: str | None = "sample"
+    ECOS_BASE_URL: str = "https://ecos.bok.or.kr/api"
+    ECOS_RATE_LIMIT_PER_SEC: float = 5.0
+    # StatisticSearch requests in flight at once (all share the limiter).
+    ECOS_CONCURRENCY: int = 4
 
     @property
     def DATABASE_URL(self) -> str:
@@ -1,13 +1,110 @@
+import json
 import os
+import time
 import zipfile
-import io
 import requests
 import xml.etree.ElementTree as ET
+from typing import Iterator
 from sqlalchemy import text
+from ingest.bulk_writer import stage_rows
 from ingest.config import settings
 from ingest.db import SessionLocal
 
-def sync_dart_corp_codes():
+
+def _cache_dir() -> str:
+    return settings.DART_CACHE_DIR or os.path.join(os.path.expanduser("~"), ".cache", "stockmanager", "dart")
+
+
+def download_corp_code_zip(api_key: str, base_url: str | None = None, force: bool = False) -> tuple[str, bool]:
+    """
+    Stream corpCode.xml (a ZIP) to the on-disk cache. The previous response's
+    ETag / Last-Modified are sent back, so an unchanged file is not downloaded
+    again. Returns (zip path, downloaded).
+    """
+    cache_dir = _cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    zip_path = os.path.join(cache_dir, "corpCode.zip")
+    meta_path = zip_path + ".meta.json"
+
+    headers = {}
+    if not force and os.path.exists(zip_path) and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    url = f"{(base_url or settings.DART_BASE_URL).rstrip('/')}/api/corpCode.xml"
+    with requests.get(url, params={"crtfc_key": api_key}, headers=headers, stream=True, timeout=(5, 120)) as resp:
+        if resp.status_code == 304:
+            return zip_path, False
+        if resp.status_code != 200:
+            raise RuntimeError(f"Failed to download: {resp.status_code}")
+        tmp_path = f"{zip_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for chunk in resp.iter_content(chunk_size=1 << 16):
+                f.write(chunk)
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+
+    # Errors (bad key, quota) come back as 200 with an XML/JSON body instead of a ZIP.
+    if not zipfile.is_zipfile(tmp_path):
+        with open(tmp_path, "rb") as f:
+            snippet = f.read(300).decode("utf-8", "replace")
+        os.remove(tmp_path)
+        raise RuntimeError(f"corpCode.xml response is not a ZIP: {snippet}")
+    os.replace(tmp_path, zip_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"etag": etag, "last_modified": last_modified, "downloaded_at": time.time()}, f)
+    return zip_path, True
+
+
+def iter_listed_corp_codes(zip_path: str) -> Iterator[tuple[str, str]]:
+    """
+    Stream (corp_code, stock_code) for listed companies out of the ZIP.
+    Each <list> element is cleared after use, so memory stays flat.
+    """
+    with zipfile.ZipFile(zip_path) as z:
+        name = next(n for n in z.namelist() if n.lower().endswith(".xml"))
+        with z.open(name) as xml_file:
+            context = ET.iterparse(xml_file, events=("start", "end"))
+            _, root = next(context)
+            for event, elem in context:
+                if event != "end" or elem.tag != "list":
+                    continue
+                corp_code = (elem.findtext("corp_code") or "").strip()
+                stock_code = (elem.findtext("stock_code") or "").strip()
+                if corp_code and stock_code:  # Only for listed companies that have stock_code
+                    yield corp_code, stock_code
+                elem.clear()
+                root.clear()
+
+
+def apply_corp_codes(db, rows) -> tuple[int, int]:
+    """
+    COPY (corp_code, stock_code) rows into a temp table and fill company.corp_code
+    with one UPDATE ... FROM. Only companies without a corp_code are touched,
+    and a corp_code already owned by another company is skipped. Does not commit.
+    Returns (staged rows, updated companies).
+    """
+    staged = stage_rows(db, "_stage_corp_code", {"corp_code": "TEXT", "stock_code": "TEXT"}, rows)
+    updated = db.execute(text("""
+        UPDATE company c
+        SET corp_code = s.corp_code, updated_at = now()
+        FROM (
+            SELECT DISTINCT ON (stock_code) stock_code, corp_code
+            FROM _stage_corp_code
+            ORDER BY stock_code, ctid DESC
+        ) s
+        WHERE c.stock_code = s.stock_code
+          AND c.corp_code IS NULL
+          AND NOT EXISTS (SELECT 1 FROM company o WHERE o.corp_code = s.corp_code)
+    """)).rowcount
+    return staged, updated
+
+
+def sync_dart_corp_codes(force_download: bool = False):
     """
     Download ALL corp_codes from OpenDART and update 'company' table.
     Matches by 'stock_code' (ticker) for listed companies.
@@ -18,44 +115,22 @@ def sync_dart_corp_codes():
         return
 
     print("Downloading Corp Codes from OpenDART...", flush=True)
-    url = "https://opendart.fss.or.kr/api/corpCode.xml"
-    params = {"crtfc_key": api_key}
-    
-    resp = requests.get(url, params=params)
-    if resp.status_code != 200:
-        print(f"Failed to download: {resp.status_code}", flush=True)
-        return
-
-    # Response is a ZIP file containing corpCode.xml
+    started = time.time()
     try:
-        with zipfile.ZipFile(io.BytesIO(resp.content)) as z:
-            xml_data = z.read("CORPCODE.xml")
-            
-        tree = ET.fromstring(xml_data)
-        count = 0
-        
+        zip_path, downloaded = download_corp_code_zip(api_key, force=force_download)
+        print(f"corpCode.zip {'downloaded' if downloaded else 'unchanged, using cache'} ({zip_path})", flush=True)
+
         with SessionLocal() as db:
             print("Syncing corp_codes to DB...", flush=True)
-            for list_node in tree.findall("list"):
-                corp_code = list_node.findtext("corp_code")
-                stock_code = list_node.findtext("stock_code").strip()
-                
-                if stock_code: # Only for listed companies that have stock_code
-                    # Update company table where stock_code matches
-                    stmt = text("""
-                        UPDATE company 
-                        SET corp_code = :cc 
-                        WHERE stock_code = :sc AND corp_code IS NULL
-                    """)
-                    res = db.execute(stmt, {"cc": corp_code, "sc": stock_code})
-                    if res.rowcount > 0:
-                        count += 1
-                        if count % 100 == 0:
-                            db.commit()
-                            print(f"Synced {count} companies...", flush=True)
-            
+            db_started = time.time()
+            staged, count = apply_corp_codes(db, iter_listed_corp_codes(zip_path))
             db.commit()
-            print(f"Finished. Total {count} corp_codes updated.", flush=True)
-            
+            print(
+                f"Finished. Total {count} corp_codes updated from {staged} listed entries "
+                f"(db {time.time() - db_started:.2f}s, total {time.time() - started:.1f}s).",
+                flush=True,
+            )
+            return count
+
     except Exception as e:
         print(f"Sync Failed: {e}", flush=True)
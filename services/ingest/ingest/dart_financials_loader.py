@@ -1,25 +1,29 @@
 import requests
 from sqlalchemy import text
+from ingest.bulk_writer import BulkWriteStats, bulk_upsert
 from ingest.config import settings
 from ingest.db import SessionLocal
+from ingest.ratelimit import get_source_limiter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime
 import time
 from ingest.dart_corp_sync import sync_dart_corp_codes
+from ingest.dart_loader import _get_dart_session
 
+# fnlttMultiAcnt accepts up to 100 comma-separated corp_codes per call.
+MULTI_ACNT_BATCH = 100
 
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+FINANCIAL_STATEMENT_COLUMNS = {
+    "corp_code": "TEXT",
+    "period_end": "DATE",
+    "announced_at": "TIMESTAMPTZ",
+    "item_code": "TEXT",
+    "item_name": "TEXT",
+    "value": "NUMERIC",
+    "unit": "TEXT",
+    "consolidated_flag": "BOOLEAN",
+}
 
-def _get_dart_session():
-    session = requests.Session()
-    retries = Retry(
-        total=5,
-        backoff_factor=1,
-        status_forcelist=[500, 502, 503, 504],
-        allowed_methods=["GET", "POST"]
-    )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
-    return session
 
 def _parse_dart_date(value: str | None) -> datetime | None:
     if not value:
@@ -32,6 +36,144 @@ def _parse_dart_date(value: str | None) -> datetime | None:
     except ValueError:
         return None
 
+
+def parse_account_item(item: dict, corp_code: str, bsns_year: int) -> tuple:
+    """fnlttSinglAcnt/fnlttMultiAcnt item -> financial_statement row."""
+    # value is usually a string with commas
+    val_str = (item.get('thstrm_amount') or '0').replace(',', '')
+    try:
+        val = float(val_str) if val_str and val_str != '-' else 0
+    except ValueError:
+        val = 0
+
+    p_end = date(int(bsns_year), 12, 31)
+    announced_at = (
+        _parse_dart_date(item.get("rcept_dt"))
+        or _parse_dart_date(item.get("thstrm_dt"))
+        or datetime.combine(p_end, datetime.min.time())
+    )
+    return (
+        corp_code,
+        p_end,
+        announced_at,
+        item.get('account_id', item.get('account_nm')),
+        item.get('account_nm'),
+        val,
+        "KRW",
+        # fs_div: CFS (Consolidated), OFS (Separate)
+        item.get('fs_div') == 'CFS',
+    )
+
+
+def upsert_financial_statements(db, rows: list[tuple]) -> BulkWriteStats:
+    """Does not commit. Rows with the same key keep the last one, as the row-by-row upsert did."""
+    return bulk_upsert(
+        db,
+        "financial_statement",
+        FINANCIAL_STATEMENT_COLUMNS,
+        rows,
+        conflict_cols=["corp_code", "period_end", "item_code", "announced_at"],
+        update_cols=["value", "item_name"],
+        extra_values={"created_at": "NOW()"},
+    )
+
+
+def _dart_get(session, url: str, params: dict) -> dict | None:
+    try:
+        get_source_limiter("dart").acquire()
+        resp = session.get(url, params=params, timeout=30)
+        data = resp.json()
+    except (requests.exceptions.RequestException, ValueError) as re:
+        print(f"DART request failed ({url.rsplit('/', 1)[-1]}): {re}", flush=True)
+        return None
+    if resp.status_code != 200:
+        return None
+    return data
+
+
+def _fetch_batch(session, api_key: str, base_url: str, corp_codes: list[str], bsns_year: int, reprt_code: str):
+    """
+    One fnlttMultiAcnt call for up to 100 companies. If the multi call errors
+    out (anything but OK / no data), fall back to fnlttSinglAcnt per company.
+    Returns (rows, companies with data).
+    """
+    params = {"crtfc_key": api_key, "bsns_year": str(bsns_year), "reprt_code": reprt_code}
+    data = _dart_get(session, f"{base_url}/api/fnlttMultiAcnt.json", {**params, "corp_code": ",".join(corp_codes)})
+    if data is not None and data.get("status") in ("000", "013"):
+        rows = []
+        found = set()
+        wanted = set(corp_codes)
+        for item in data.get("list") or []:
+            corp_code = item.get("corp_code")
+            if corp_code in wanted:
+                rows.append(parse_account_item(item, corp_code, bsns_year))
+                found.add(corp_code)
+        return rows, len(found)
+
+    if data is not None:
+        print(f"fnlttMultiAcnt {bsns_year}: {data.get('message')} ({data.get('status')}); falling back to single calls", flush=True)
+    rows = []
+    found = 0
+    for corp_code in corp_codes:
+        data = _dart_get(session, f"{base_url}/api/fnlttSinglAcnt.json", {**params, "corp_code": corp_code})
+        if data is not None and data.get("status") == "000":
+            rows.extend(parse_account_item(item, corp_code, bsns_year) for item in data.get("list") or [])
+            found += 1
+    return rows, found
+
+
+def load_financials(
+    db,
+    corp_codes: list[str],
+    years: list[int],
+    reprt_code: str = "11011",
+    api_key: str | None = None,
+    base_url: str | None = None,
+    concurrency: int | None = None,
+    progress_cb=None,
+) -> int:
+    """
+    Fetch (corp_code batch x year) calls concurrently under the shared DART
+    limiter and bulk-upsert each response as it arrives. Returns the number of
+    company-years that had data.
+    """
+    api_key = api_key or settings.DART_API_KEY
+    base_url = (base_url or settings.DART_BASE_URL).rstrip("/")
+    concurrency = concurrency or settings.DART_CONCURRENCY
+    batches = [
+        (corp_codes[i:i + MULTI_ACNT_BATCH], year)
+        for year in years
+        for i in range(0, len(corp_codes), MULTI_ACNT_BATCH)
+    ]
+    total = len(corp_codes) * len(years)
+    processed = 0
+    count = 0
+    stats = BulkWriteStats()
+    if progress_cb:
+        progress_cb(0, total)
+
+    session = _get_dart_session(pool_size=concurrency)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="dart-fin") as pool:
+        futures = {
+            pool.submit(_fetch_batch, session, api_key, base_url, codes, year, reprt_code): (codes, year)
+            for codes, year in batches
+        }
+        for future in as_completed(futures):
+            codes, year = futures[future]
+            rows, found = future.result()
+            if rows:
+                stats.add(upsert_financial_statements(db, rows))
+                db.commit()
+            count += found
+            processed += len(codes)
+            print(f"Saved financials {year}: {found}/{len(codes)} companies, {len(rows)} rows", flush=True)
+            if progress_cb:
+                progress_cb(processed, total)
+
+    print(f"financial_statement: {stats.rows} rows upserted in {stats.seconds:.2f}s", flush=True)
+    return count
+
+
 def fetch_and_save_company_financials(
     limit_companies: int | None = None,
     progress_cb=None,
@@ -39,9 +181,9 @@ def fetch_and_save_company_financials(
     years: list[int] | None = None,
 ):
     """
-    Fetch major financial indicators (Revenue, Operating Profit, etc.) 
+    Fetch major financial indicators (Revenue, Operating Profit, etc.)
     for companies from OpenDART and save to 'financial_statement' table.
-    Uses 'fnlttSinglAcnt' API (Major Accounts).
+    Uses 'fnlttMultiAcnt' (Major Accounts, 100 companies per call).
     """
     api_key = settings.DART_API_KEY
     if not api_key:
@@ -49,7 +191,8 @@ def fetch_and_save_company_financials(
         return
 
     print(f"Starting DART Financials Ingest (Limit: {limit_companies} companies)...", flush=True)
-    
+    started = time.time()
+
     with SessionLocal() as db:
         try:
             # 1. Get companies with corp_code
@@ -76,93 +219,21 @@ def fetch_and_save_company_financials(
                 if not companies:
                     print("No corp_code available after sync. Aborting.", flush=True)
                     return
-            
+
             # Reprt codes: 11011(Annual), 11012(Half), 11013(Q1), 11014(Q3)
             reprt_code = "11011"
             if years is None:
                 # Annual reports are typically finalized the following year.
                 latest_year = date.today().year - 2
                 years = [latest_year - i for i in range(3)]
-            
-            count = 0
-            total = len(companies)
-            if progress_cb:
-                progress_cb(0, total)
-            session = _get_dart_session()
-            for corp_code, name in companies:
-                print(f"Fetching financials for {name} ({corp_code})...", flush=True)
-                
-                for bsns_year in years:
-                    url = "https://opendart.fss.or.kr/api/fnlttSinglAcnt.json"
-                    params = {
-                        "crtfc_key": api_key,
-                        "corp_code": corp_code,
-                        "bsns_year": str(bsns_year),
-                        "reprt_code": reprt_code,
-                    }
-
-                    try:
-                        resp = session.get(url, params=params, timeout=30)
-                    except requests.exceptions.RequestException as re:
-                        print(f"Skipping {name}({bsns_year}): Request Failed {re}", flush=True)
-                        time.sleep(0.5)
-                        continue
-                    data = resp.json()
-
-                    if resp.status_code == 200 and data.get("status") == "000":
-                        list_data = data.get("list", [])
-                        for item in list_data:
-                            # item keys: account_nm, thstrm_amount, fs_div, fs_nm, etc.
-                            # value is usually a string with commas
-                            val_str = item.get('thstrm_amount', '0').replace(',', '')
-                            try:
-                                val = float(val_str) if val_str and val_str != '-' else 0
-                            except ValueError:
-                                val = 0
-
-                            # fs_div: CFS (Consolidated), OFS (Separate)
-                            is_consolidated = (item.get('fs_div') == 'CFS')
-                            announced_at = (
-                                _parse_dart_date(item.get("rcept_dt"))
-                                or _parse_dart_date(item.get("thstrm_dt"))
-                            )
-
-                            stmt_upsert = text("""
-                                INSERT INTO financial_statement 
-                                (corp_code, period_end, announced_at, item_code, item_name, value, unit, consolidated_flag, created_at)
-                                VALUES (:cc, :pe, :ann, :icode, :iname, :v, :u, :cf, NOW())
-                                ON CONFLICT (corp_code, period_end, item_code, announced_at) 
-                                DO UPDATE SET value = EXCLUDED.value, item_name = EXCLUDED.item_name
-                            """)
-
-                            p_end = date(int(bsns_year), 12, 31)
-
-                            db.execute(stmt_upsert, {
-                                "cc": corp_code,
-                                "pe": p_end,
-                                "ann": announced_at or datetime.combine(p_end, datetime.min.time()),
-                                "icode": item.get('account_id', item.get('account_nm')),
-                                "iname": item.get('account_nm'),
-                                "v": val,
-                                "u": "KRW",
-                                "cf": is_consolidated,
-                            })
-
-                        count += 1
-                        db.commit()
-                        print(f"Saved financials for {name} ({bsns_year})", flush=True)
-                    else:
-                        print(f"Skipping {name}({bsns_year}): {data.get('message')}", flush=True)
-
-                    if progress_cb:
-                        progress_cb(count, total)
-
-                    time.sleep(0.2)
-                
-            print(f"Finished. Processed {count} companies.", flush=True)
-            
+
+            codes = list(dict.fromkeys(corp_code for corp_code, _ in companies))
+            count = load_financials(db, codes, years, reprt_code=reprt_code, api_key=api_key, progress_cb=progress_cb)
+            print(f"Finished. Processed {count} company-years in {time.time() - started:.1f}s.", flush=True)
+
         except Exception as e:
             print(f"DART Financials Ingest Failed: {e}", flush=True)
             db.rollback()
+            raise
         finally:
             db.close()
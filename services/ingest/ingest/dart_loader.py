@@ -1,15 +1,35 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Iterator
+
 import requests
 from sqlalchemy import text
+from ingest.bulk_writer import BulkWriteStats, bulk_upsert
 from ingest.config import settings
 from ingest.db import SessionLocal
-from datetime import date, timedelta
+from ingest.ratelimit import get_source_limiter
+from ingest.watermark import advance_watermark, get_watermark
 import time
 
 
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-def _get_dart_session():
+DART_PAGE_COUNT = 100
+WATERMARK_SOURCE = "dart_filings"
+
+DART_FILING_COLUMNS = {
+    "rcp_no": "TEXT",
+    "corp_code": "TEXT",
+    "filing_date": "DATE",
+    "filing_type": "TEXT",
+    "title": "TEXT",
+}
+
+
+def _get_dart_session(pool_size: int = 10):
     session = requests.Session()
     retries = Retry(
         total=5,
@@ -17,7 +37,9 @@ def _get_dart_session():
         status_forcelist=[500, 502, 503, 504],
         allowed_methods=["GET", "POST"]
     )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
     return session
 
 def _iter_date_ranges(start: date, end: date, window_days: int = 90):
@@ -27,10 +49,208 @@ def _iter_date_ranges(start: date, end: date, window_days: int = 90):
         yield current, chunk_end
         current = chunk_end + timedelta(days=1)
 
-def fetch_and_save_dart_filings(days: int = 180, progress_cb=None):
+
+def _parse_total(raw) -> int | None:
+    try:
+        return int(str(raw).replace(",", "")) if raw is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_filing_item(item: dict) -> tuple | None:
+    """list.json item -> (rcp_no, corp_code, filing_date, filing_type, title)."""
+    rcp_no = item.get("rcept_no")
+    if not rcp_no:
+        return None
+    rdt = item.get("rcept_dt")
+    f_date = date(int(rdt[:4]), int(rdt[4:6]), int(rdt[6:8])) if rdt else date.today()
+    return (rcp_no, item.get("corp_code"), f_date, item.get("pblntf_ty", "-"), item.get("report_nm"))
+
+
+def iter_filing_pages(
+    session: requests.Session,
+    api_key: str,
+    bgn_de: str,
+    end_de: str,
+    corp_code: str | None = None,
+    base_url: str | None = None,
+    since: date | None = None,
+    known: set[str] | None = None,
+    errors: list | None = None,
+) -> Iterator[tuple[int | None, list[tuple]]]:
+    """
+    Walk list.json pages for one date window, newest first, yielding
+    (total_count, parsed rows) per page. Every request goes through the shared
+    DART limiter.
+
+    since: rows filed before this date are dropped, and paging stops at the
+    first page that is entirely older. Pages are only sorted by date: within a
+    day, exchange-desk disclosures (YYYYMMDD80xxxx) and DART filings
+    (YYYYMMDD00xxxx) interleave, so rcp_no is no high-water mark.
+    known: rcp_nos already stored; they are dropped, but a page of known
+    rows does not stop paging, since unseen filings of the same day can
+    follow it.
+    errors: when given, a message is appended if paging stops on an error.
+    """
+    url = f"{(base_url or settings.DART_BASE_URL).rstrip('/')}/api/list.json"
+    limiter = get_source_limiter("dart")
+    page_no = 1
+    max_pages = None
+    while True:
+        params = {
+            "crtfc_key": api_key,
+            "bgn_de": bgn_de,
+            "end_de": end_de,
+            "page_count": DART_PAGE_COUNT,
+            "page_no": page_no,
+            "sort": "date",
+            "sort_mth": "desc",
+        }
+        if corp_code:
+            params["corp_code"] = corp_code
+
+        try:
+            limiter.acquire()
+            resp = session.get(url, params=params, timeout=30)
+            data = resp.json()
+        except (requests.exceptions.RequestException, ValueError) as re:
+            print(f"DART Request Failed ({bgn_de}~{end_de} p{page_no}): {re}")
+            if errors is not None:
+                errors.append(f"{bgn_de}~{end_de} p{page_no}: {re}")
+            return
+
+        # 013 = no data for the query
+        if data.get("status") == "013":
+            if page_no == 1:
+                yield 0, []
+            return
+        if resp.status_code != 200 or data.get("status") != "000":
+            print(f"DART API Error: {data.get('message')} (Code: {data.get('status')})")
+            if errors is not None:
+                errors.append(f"{bgn_de}~{end_de} p{page_no}: {data.get('status')} {data.get('message')}")
+            return
+
+        total = _parse_total(data.get("total_count")) if page_no == 1 else None
+        if page_no == 1:
+            raw_pages = _parse_total(data.get("total_page"))
+            if raw_pages is None and total is not None:
+                raw_pages = (total + DART_PAGE_COUNT - 1) // DART_PAGE_COUNT
+            max_pages = raw_pages
+
+        list_data = data.get("list") or []
+        rows = [r for r in (parse_filing_item(item) for item in list_data) if r]
+        all_older = False
+        if since:
+            current = [r for r in rows if r[2] >= since]
+            all_older = bool(rows) and not current
+            rows = current
+        if known:
+            rows = [r for r in rows if r[0] not in known]
+        yield total, rows
+
+        if not list_data or all_older:
+            return
+        page_no += 1
+        if max_pages is not None and page_no > max_pages:
+            return
+
+
+def upsert_dart_filings(db, rows: list[tuple]) -> BulkWriteStats:
+    """rows: (rcp_no, corp_code, filing_date, filing_type, title). Does not commit."""
+    return bulk_upsert(
+        db,
+        "dart_filing",
+        DART_FILING_COLUMNS,
+        rows,
+        conflict_cols=["rcp_no"],
+        update_cols=["title"],
+        extra_values={"created_at": "NOW()"},
+    )
+
+
+def load_known_rcp_nos(db, since: date) -> set[str]:
+    """rcp_nos already stored for filings on or after `since`."""
+    rows = db.execute(text("SELECT rcp_no FROM dart_filing WHERE filing_date >= :d"), {"d": since}).fetchall()
+    return {row[0] for row in rows}
+
+
+_DONE = object()
+
+
+def _stream_windows(
+    session,
+    api_key: str,
+    windows: list[tuple[date, date]],
+    concurrency: int,
+    base_url=None,
+    since: date | None = None,
+    known: set[str] | None = None,
+    errors: list | None = None,
+):
     """
-    Fetch recent filings from OpenDART. 
+    Fetch windows concurrently and yield their pages as they arrive.
+    The bounded queue keeps fetchers from running far ahead of the writer.
+    """
+    pages: queue.Queue = queue.Queue(maxsize=max(concurrency * 2, 2))
+    stop = threading.Event()
+
+    def fetch(window):
+        bgn_de, end_de = window[0].strftime("%Y%m%d"), window[1].strftime("%Y%m%d")
+        try:
+            pages_iter = iter_filing_pages(
+                session, api_key, bgn_de, end_de, base_url=base_url, since=since, known=known, errors=errors
+            )
+            for page in pages_iter:
+                if stop.is_set():
+                    return
+                pages.put(page)
+        except Exception as exc:
+            print(f"DART window {bgn_de}~{end_de} failed: {exc}")
+            if errors is not None:
+                errors.append(f"{bgn_de}~{end_de}: {exc}")
+        finally:
+            pages.put(_DONE)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="dart-list") as pool:
+        for window in windows:
+            pool.submit(fetch, window)
+        remaining = len(windows)
+        try:
+            while remaining:
+                page = pages.get()
+                if page is _DONE:
+                    remaining -= 1
+                    continue
+                yield page
+        finally:
+            # Writer stopped early: unblock fetchers so the pool can shut down.
+            stop.set()
+            while remaining:
+                if pages.get() is _DONE:
+                    remaining -= 1
+
+
+def fetch_and_save_dart_filings(
+    days: int = 180,
+    progress_cb=None,
+    concurrency: int | None = None,
+    base_url: str | None = None,
+    full: bool = False,
+):
+    """
+    Fetch recent filings from OpenDART.
     REAL API ONLY. Fails if credentials or network is invalid.
+
+    list.json without corp_code only accepts 3-month windows, so the range is
+    split into 90-day windows fetched concurrently; each page is written with
+    one bulk upsert.
+
+    Filings are append-only by rcp_no, so by default the run is incremental:
+    it re-reads the stored high-water mark's whole date and everything newer,
+    skipping rcp_nos already stored from that date on (rcp_no order does not
+    follow filing order within a day, so no id is used as a cut-off).
+    full=True sweeps the whole `days` window. The mark only advances after a
+    run without fetch errors.
     """
     api_key = settings.DART_API_KEY
     if not api_key:
@@ -38,91 +258,67 @@ def fetch_and_save_dart_filings(days: int = 180, progress_cb=None):
         return
 
     print("Starting REAL DART Filings Ingest...")
-    
+    started = time.time()
+
     with SessionLocal() as db:
         try:
             # Load filings across a wider window to cover more companies.
             start_date = date.today() - timedelta(days=days)
             end_date = date.today()
-            url = "https://opendart.fss.or.kr/api/list.json"
+            mark = None if full else get_watermark(db, WATERMARK_SOURCE)
+            known = None
+            if mark and mark.last_date:
+                start_date = min(mark.last_date, end_date)
+                known = load_known_rcp_nos(db, start_date)
+                print(f"Incremental sync from {start_date} ({len(known)} filings already stored)")
+            else:
+                mark = None
+                print(f"Full sweep {start_date}~{end_date}")
+            windows = list(_iter_date_ranges(start_date, end_date, window_days=90))
+            session = _get_dart_session()
             count = 0
             total_est = 0
-            session = _get_dart_session()
-            for chunk_start, chunk_end in _iter_date_ranges(start_date, end_date, window_days=90):
-                bgn_de = chunk_start.strftime("%Y%m%d")
-                end_de = chunk_end.strftime("%Y%m%d")
-                page_no = 1
-                while True:
-                    params = {
-                        "crtfc_key": api_key,
-                        "bgn_de": bgn_de,
-                        "end_de": end_de,
-                        "page_count": 100,
-                        "page_no": page_no,
-                    }
-
-                    try:
-                        resp = session.get(url, params=params, timeout=30)
-                    except requests.exceptions.RequestException as re:
-                        print(f"DART Request Failed (Connection/Timeout): {re}")
-                        time.sleep(2)
-                        break
-                    data = resp.json()
-
-                    if resp.status_code != 200 or data.get("status") != "000":
-                        print(f"DART API Error: {data.get('message')} (Code: {data.get('status')})")
-                        break
-
-                    list_data = data.get("list", [])
-                    if page_no == 1:
-                        raw_total = data.get("total_count", 0)
-                        try:
-                            total_est += int(str(raw_total).replace(",", ""))
-                        except (TypeError, ValueError):
-                            total_est += 0
-                        if total_est and count > total_est:
-                            total_est = count
-                        if progress_cb:
-                            progress_cb(count, total_est if total_est > 0 else None)
-                    if not list_data:
-                        if page_no == 1:
-                            print(f"No filings found for {bgn_de}~{end_de}.")
-                        break
-
-                    for item in list_data:
-                        if count == 0:
-                            print(f"Sample item keys: {item.keys()}")
-
-                        stmt = text("""
-                            INSERT INTO dart_filing (rcp_no, corp_code, filing_date, filing_type, title, created_at)
-                            VALUES (:rno, :cc, :d, :typ, :title, NOW())
-                            ON CONFLICT (rcp_no) DO UPDATE SET title = EXCLUDED.title
-                        """)
-
-                        rdt = item.get('rcept_dt')
-                        f_date = date(int(rdt[:4]), int(rdt[4:6]), int(rdt[6:8])) if rdt else date.today()
-
-                        db.execute(stmt, {
-                            "rno": item.get('rcept_no'),
-                            "cc": item.get('corp_code'),
-                            "d": f_date,
-                            "typ": item.get('pblntf_ty', '-'),
-                            "title": item.get('report_nm')
-                        })
-                        count += 1
+            newest = None
+            errors: list[str] = []
+            stats = BulkWriteStats()
+            for total, rows in _stream_windows(
+                session,
+                api_key,
+                windows,
+                concurrency or settings.DART_CONCURRENCY,
+                base_url=base_url,
+                since=start_date if mark else None,
+                known=known,
+                errors=errors,
+            ):
+                if total and not mark:
+                    total_est += total
+                if rows:
+                    stats.add(upsert_dart_filings(db, rows))
                     db.commit()
-                    if total_est and count > total_est:
-                        total_est = count
-                    if progress_cb:
-                        progress_cb(count, total_est if total_est > 0 else None)
-                    page_no += 1
-                    time.sleep(0.2)
-
-            print(f"Successfully saved {count} filings from DART.")
-                
+                    count += len(rows)
+                    top = max(rows, key=lambda r: (r[2], r[0]))
+                    if newest is None or (top[2], top[0]) > (newest[2], newest[0]):
+                        newest = top
+                if total_est and count > total_est:
+                    total_est = count
+                if progress_cb:
+                    progress_cb(count, total_est if total_est > 0 else None)
+
+            if errors:
+                print(f"DART sync had {len(errors)} fetch errors; high-water mark not advanced ({errors[0]})")
+            elif newest:
+                advance_watermark(db, WATERMARK_SOURCE, newest[2], newest[0])
+
+            print(
+                f"Successfully saved {count} filings from DART in {time.time() - started:.1f}s "
+                f"(writes {stats.seconds:.2f}s)."
+            )
+
         except Exception as e:
             print(f"DART Ingest Failed: {e}")
             db.rollback()
+            raise
         finally:
             db.close()
 
@@ -143,79 +339,21 @@ def fetch_and_save_dart_filings_for_corp(corp_code: str, days: int = 1095, progr
         try:
             bgn_de = (date.today() - timedelta(days=days)).strftime("%Y%m%d")
             end_de = date.today().strftime("%Y%m%d")
-            url = "https://opendart.fss.or.kr/api/list.json"
             count = 0
             total_count = None
-            max_pages = None
-            page_no = 1
-            page_count = 100
 
             session = _get_dart_session()
-            while True:
-                params = {
-                    "crtfc_key": api_key,
-                    "corp_code": corp_code,
-                    "bgn_de": bgn_de,
-                    "end_de": end_de,
-                    "page_count": page_count,
-                    "page_no": page_no,
-                }
-
-                try:
-                    resp = session.get(url, params=params, timeout=30)
-                except requests.exceptions.RequestException as re:
-                    print(f"DART Request Failed: {re}")
-                    break
-                data = resp.json()
-
-                if resp.status_code != 200 or data.get("status") != "000":
-                    print(f"DART API Error: {data.get('message')} (Code: {data.get('status')})")
-                    break
-
-                list_data = data.get("list", [])
-                if page_no == 1:
-                    raw_total = data.get("total_count", None)
-                    try:
-                        total_count = int(str(raw_total).replace(",", "")) if raw_total is not None else None
-                    except (TypeError, ValueError):
-                        total_count = None
-                    if total_count is not None and total_count > 0:
-                        max_pages = (total_count + page_count - 1) // page_count
-                    elif total_count == 0:
-                        if progress_cb:
-                            progress_cb(0, 0)
-                        break
-                if not list_data:
-                    break
-
-                for item in list_data:
-                    stmt = text("""
-                        INSERT INTO dart_filing (rcp_no, corp_code, filing_date, filing_type, title, created_at)
-                        VALUES (:rno, :cc, :d, :typ, :title, NOW())
-                        ON CONFLICT (rcp_no) DO UPDATE SET title = EXCLUDED.title
-                    """)
-
-                    rdt = item.get('rcept_dt')
-                    f_date = date(int(rdt[:4]), int(rdt[4:6]), int(rdt[6:8])) if rdt else date.today()
-
-                    db.execute(stmt, {
-                        "rno": item.get('rcept_no'),
-                        "cc": item.get('corp_code'),
-                        "d": f_date,
-                        "typ": item.get('pblntf_ty', '-'),
-                        "title": item.get('report_nm')
-                    })
-                    count += 1
-
-                db.commit()
+            for total, rows in iter_filing_pages(session, api_key, bgn_de, end_de, corp_code=corp_code):
+                if total is not None:
+                    total_count = total
+                if rows:
+                    upsert_dart_filings(db, rows)
+                    db.commit()
+                    count += len(rows)
                 if total_count is not None and count > total_count:
                     count = total_count
                 if progress_cb:
                     progress_cb(count, total_count)
-                page_no += 1
-                if max_pages is not None and page_no > max_pages:
-                    break
-                time.sleep(0.2)
 
             print(f"Finished DART Filings Backfill for {corp_code}. Count={count}")
             if progress_cb:
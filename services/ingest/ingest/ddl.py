@@ -0,0 +1,15 @@
+"""
+CREATE ... IF NOT EXISTS for tables the ingest modules own.
+
+The statements run on their own connection and commit there, so calling an
+ensure_* helper in the middle of a write never commits the caller's pending
+rows early.
+"""
+from sqlalchemy import text
+
+
+def ensure_ddl(db, statements: list[str]) -> None:
+    engine = db.get_bind().engine
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
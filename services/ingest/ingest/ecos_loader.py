@@ -1,11 +1,45 @@
 import requests
 from sqlalchemy import text
+from ingest.bulk_writer import BulkWriteStats, bulk_upsert
 from ingest.config import settings
 from ingest.db import SessionLocal
-from datetime import date
+from ingest.ratelimit import get_source_limiter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import date, timedelta
 import calendar
 import hashlib
 import re
+import time
+
+
+@dataclass(frozen=True)
+class EcosSeries:
+    series_code: str
+    stat_code: str
+    cycle: str  # D / M / Q / A
+    item_code1: str
+    name: str
+    start: str  # first period to load when nothing is stored yet
+
+
+# Full series pulled through StatisticSearch. series_code follows
+# _build_series_code (STAT_CODE:ITEM_CODE1, base rate kept as "0101000").
+ECOS_SERIES = [
+    EcosSeries("0101000", "722Y001", "D", "0101000", "한국은행 기준금리", "20100101"),
+    EcosSeries("731Y001:0000001", "731Y001", "D", "0000001", "원/미국달러(매매기준율)", "20100101"),
+    EcosSeries("817Y002:010200000", "817Y002", "D", "010200000", "국고채(3년)", "20100101"),
+    EcosSeries("817Y002:010210000", "817Y002", "D", "010210000", "국고채(10년)", "20100101"),
+    EcosSeries("901Y009:0", "901Y009", "M", "0", "소비자물가지수(총지수)", "201001"),
+]
+USD_KRW_SERIES = "731Y001:0000001"
+
+MACRO_SERIES_COLUMNS = {
+    "series_code": "TEXT",
+    "obs_date": "DATE",
+    "value": "NUMERIC",
+    "unit": "TEXT",
+}
 
 def _parse_ecos_time(time_str: str) -> date | None:
     if not time_str:
@@ -67,7 +101,8 @@ def _fetch_key_statistics(api_key: str, page_size: int = 1000):
     start = 1
     while True:
         end = start + page_size - 1
-        url = f"http://ecos.bok.or.kr/api/KeyStatisticList/{api_key}/json/kr/{start}/{end}"
+        url = f"{settings.ECOS_BASE_URL.rstrip('/')}/KeyStatisticList/{api_key}/json/kr/{start}/{end}"
+        get_source_limiter("ecos").acquire()
         resp = requests.get(url, timeout=10)
         data = resp.json()
         if resp.status_code != 200 or "KeyStatisticList" not in data:
@@ -85,51 +120,223 @@ def _fetch_key_statistics(api_key: str, page_size: int = 1000):
         start += page_size
 
 
-def fetch_and_save_ecos_series(limit: int | None = None, progress_cb=None):
+def _format_period(day: date, cycle: str) -> str:
+    if cycle == "D":
+        return day.strftime("%Y%m%d")
+    if cycle == "M":
+        return day.strftime("%Y%m")
+    if cycle == "Q":
+        return f"{day.year}Q{(day.month - 1) // 3 + 1}"
+    return str(day.year)
+
+
+def _next_period(last: date, cycle: str) -> date:
+    """First day of the period after the one stored as `last` (see _parse_ecos_time)."""
+    if cycle == "D":
+        return last + timedelta(days=1)
+    if cycle == "M":
+        return date(last.year + (last.month == 12), last.month % 12 + 1, 1)
+    if cycle == "Q":
+        return last + timedelta(days=1)  # stored as the quarter's last day
+    return date(last.year + 1, 1, 1)
+
+
+def upsert_macro_series(db, rows: list[tuple]) -> BulkWriteStats:
+    """rows: (series_code, obs_date, value, unit). Does not commit."""
+    return bulk_upsert(
+        db,
+        "macro_series",
+        MACRO_SERIES_COLUMNS,
+        rows,
+        conflict_cols=["series_code", "obs_date"],
+        update_cols=["value", "unit"],
+        extra_values={"source": "'ECOS'", "created_at": "NOW()"},
+    )
+
+
+def _parse_value(value) -> float | None:
+    if value in (None, "", "-"):
+        return None
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def _search_page(api_key: str, series: EcosSeries, start_period: str, end_period: str, first: int, last: int):
+    """One StatisticSearch page -> (list_total_count, rows)."""
+    url = (
+        f"{settings.ECOS_BASE_URL.rstrip('/')}/StatisticSearch/{api_key}/json/kr/{first}/{last}/"
+        f"{series.stat_code}/{series.cycle}/{start_period}/{end_period}/{series.item_code1}"
+    )
+    get_source_limiter("ecos").acquire()
+    resp = requests.get(url, timeout=20)
+    data = resp.json()
+    if "StatisticSearch" not in data:
+        result = data.get("RESULT", {})
+        # INFO-200: no data for the requested range
+        if result.get("CODE") == "INFO-200":
+            return 0, []
+        raise RuntimeError(f"ECOS StatisticSearch {series.series_code}: {result.get('MESSAGE') or data}")
+    body = data["StatisticSearch"]
+    rows = []
+    for row in body.get("row", []):
+        value = _parse_value(row.get("DATA_VALUE"))
+        obs_date = _parse_ecos_time(row.get("TIME", ""))
+        if value is not None and obs_date:
+            rows.append((series.series_code, obs_date, value, row.get("UNIT_NAME")))
+    return int(body.get("list_total_count") or 0), rows
+
+
+def load_series_latest(db, codes: list[str]) -> dict[str, date]:
+    rows = db.execute(text("""
+        SELECT series_code, MAX(obs_date) FROM macro_series
+        WHERE series_code = ANY(:codes)
+        GROUP BY series_code
+    """), {"codes": codes}).fetchall()
+    return {code: last for code, last in rows}
+
+
+def fetch_ecos_statistic_series(
+    db,
+    series_list: list[EcosSeries] | None = None,
+    api_key: str | None = None,
+    full: bool = False,
+    page_size: int = 1000,
+    concurrency: int | None = None,
+    progress_cb=None,
+) -> int:
+    """
+    Pull each configured series through StatisticSearch, starting after its
+    stored max obs_date (full=True reloads from series.start). First pages go
+    out concurrently; once a page reports list_total_count the remaining pages
+    are queued on the same pool. A series is bulk-upserted and committed once
+    all its pages are in, so a failed page never leaves a hole behind a newer
+    max obs_date. A failing series is logged and skipped; the others are
+    still written, then RuntimeError names the failed ones. Returns the
+    number of rows written.
+    """
+    api_key = api_key or settings.ECOS_API_KEY
+    series_list = series_list or ECOS_SERIES
+    latest = {} if full else load_series_latest(db, [s.series_code for s in series_list])
+    today = date.today()
+
+    windows = []
+    for series in series_list:
+        last = latest.get(series.series_code)
+        if last is None:
+            start_period = series.start
+        else:
+            nxt = _next_period(last, series.cycle)
+            if nxt > today:
+                continue
+            start_period = _format_period(nxt, series.cycle)
+        windows.append((series, start_period, _format_period(today, series.cycle)))
+    print(f"ECOS StatisticSearch: {len(windows)}/{len(series_list)} series need new observations", flush=True)
+
+    concurrency = max(1, concurrency or settings.ECOS_CONCURRENCY)
+    count = 0
+    stats = BulkWriteStats()
+    buffered: dict[str, list[tuple]] = {}
+    outstanding: dict[str, int] = {}
+    failed: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ecos") as pool:
+        pending = {}
+        for series, start_period, end_period in windows:
+            future = pool.submit(_search_page, api_key, series, start_period, end_period, 1, page_size)
+            pending[future] = (series, start_period, end_period, 1)
+            outstanding[series.series_code] = outstanding.get(series.series_code, 0) + 1
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                series, start_period, end_period, first = pending.pop(future)
+                code = series.series_code
+                outstanding[code] -= 1
+                if code in failed:
+                    continue
+                try:
+                    total, rows = future.result()
+                except Exception as e:
+                    print(f"  {code} ({series.name}) page {first} failed: {e}; series skipped", flush=True)
+                    failed[code] = str(e)
+                    buffered.pop(code, None)
+                    continue
+                if first == 1:
+                    for page_first in range(page_size + 1, total + 1, page_size):
+                        nxt = pool.submit(
+                            _search_page, api_key, series, start_period, end_period,
+                            page_first, page_first + page_size - 1,
+                        )
+                        pending[nxt] = (series, start_period, end_period, page_first)
+                        outstanding[code] += 1
+                    print(f"  {code} ({series.name}) {start_period}~{end_period}: {total} rows", flush=True)
+                buffered.setdefault(code, []).extend(rows)
+                if outstanding[code]:
+                    continue
+                rows = buffered.pop(code)
+                if rows:
+                    stats.add(upsert_macro_series(db, rows))
+                    db.commit()
+                    count += len(rows)
+                    if progress_cb:
+                        progress_cb(count, None)
+    print(f"macro_series: {stats.rows} series rows upserted in {stats.seconds:.2f}s", flush=True)
+    if failed:
+        raise RuntimeError(f"ECOS StatisticSearch failed for {len(failed)} series: {', '.join(sorted(failed))}")
+    return count
+
+
+def fetch_and_save_ecos_series(
+    limit: int | None = None,
+    progress_cb=None,
+    full: bool = False,
+    concurrency: int | None = None,
+):
     """
-    Fetch key economic indicators from BOK ECOS KeyStatisticList.
+    Fetch key economic indicators from BOK ECOS: the KeyStatisticList
+    snapshot plus the full ECOS_SERIES time series (incremental).
     REAL API ONLY.
     """
     api_key = settings.ECOS_API_KEY
     print(f"Starting REAL ECOS KeyStatisticList Ingest (Key: {api_key})...", flush=True)
+    started = time.time()
 
     with SessionLocal() as db:
         try:
-            count = 0
-            for rows in _fetch_key_statistics(api_key):
-                for row in rows:
-                    if not row.get("DATA_VALUE"):
+            rows = []
+            for page in _fetch_key_statistics(api_key):
+                for row in page:
+                    value = _parse_value(row.get("DATA_VALUE"))
+                    if value is None:
                         continue
                     obs_date = _parse_ecos_time(row.get("CYCLE", "") or row.get("TIME", ""))
                     if not obs_date:
                         continue
-                    series_code = _build_series_code(row)
-                    unit = row.get("UNIT_NAME")
-                    db.execute(text("""
-                        INSERT INTO macro_series (series_code, obs_date, value, unit, created_at)
-                        VALUES (:sc, :od, :v, :u, NOW())
-                        ON CONFLICT (series_code, obs_date)
-                        DO UPDATE SET value = EXCLUDED.value, unit = EXCLUDED.unit
-                    """), {
-                        "sc": series_code,
-                        "od": obs_date,
-                        "v": float(row["DATA_VALUE"]),
-                        "u": unit
-                    })
-                    count += 1
-                    if progress_cb and count % 100 == 0:
-                        progress_cb(count, None)
-                    if limit and count >= limit:
+                    rows.append((_build_series_code(row), obs_date, value, row.get("UNIT_NAME")))
+                    if limit and len(rows) >= limit:
                         break
-                if limit and count >= limit:
+                if limit and len(rows) >= limit:
                     break
-
+            if rows:
+                upsert_macro_series(db, rows)
             db.commit()
+            count = len(rows)
+            if progress_cb:
+                progress_cb(count, None)
+
+            def series_progress(processed: int, total: int | None = None):
+                if progress_cb:
+                    progress_cb(count + processed, None)
+
+            count += fetch_ecos_statistic_series(
+                db, api_key=api_key, full=full, concurrency=concurrency, progress_cb=series_progress
+            )
             if progress_cb:
                 progress_cb(count, None)
-            print(f"Successfully saved {count} records from ECOS.")
+            print(f"Successfully saved {count} records from ECOS in {time.time() - started:.1f}s.")
         except Exception as e:
             print(f"ECOS Ingest Failed: {e}")
             db.rollback()
+            raise
         finally:
             db.close()
@@ -0,0 +1,636 @@
+"""
+Incremental indicator state for the simple_ma_v2_gate3 signal.
+
+Instead of reloading ~200 bars per ticker and recomputing every rolling
+series on each /signals call, each (ticker, rule set) keeps its rolling state
+in indicator_state:
+
+- ring buffers of closes, volumes, true ranges and ATR%
+- running sums for the SMAs
+- a sorted window for the ATR% quantile
+- the indicator values of the last `confirm` bars
+- the last required_lookback(rules) bars
+
+Applying a bar is O(window) at worst (the sorted insert) and needs no history
+reads. A signal read loads the small per-ticker snapshot of the latest bar
+and evaluates the final gates with the current weights.
+
+The persisted state stops one bar short of the latest bar, and the latest
+bar is re-applied on every refresh. Intraday KIS quotes keep rewriting
+today's price_daily row, and a revised bar must not be applied twice. A
+backfill that rewrites bars the state has already consumed deletes the
+state (invalidate_states); it is rebuilt from the latest required_lookback
+bars on the next refresh.
+
+Only ingest (refresh_known_states after quotes and backfills) and the
+nightly signals job write states. The API reads them with persist=False and
+applies any newer bars in memory.
+
+Snapshots describe the same window /signals has always evaluated: the
+latest required_lookback(rules) bars, as compute_signal_simple_ma_v2_gate3
+sees them when handed only those bars. Values whose window reaches past the
+start of that frame are NaN, and the frame's first true range has no
+previous close. With the default rules this keeps the ATR% gate on its
+60-bar mean fallback, as before, because the vol_q_window quantile needs
+more bars than the frame holds.
+"""
+import bisect
+import hashlib
+import json
+import math
+from collections import deque
+from datetime import date
+
+from sqlalchemy import text
+
+from ingest.ddl import ensure_ddl
+
+STATE_VERSION = 2
+NAN = float("nan")
+
+_TABLE_READY = False
+
+
+def rules_key(rules: dict) -> str:
+    canonical = json.dumps({k: rules[k] for k in sorted(rules)}, sort_keys=True)
+    return hashlib.sha1(f"v{STATE_VERSION}:{canonical}".encode()).hexdigest()[:16]
+
+
+def required_lookback(rules: dict) -> int:
+    """Bars with a close a ticker needs before /signals evaluates it (same rule as app.services.signal_config)."""
+    return max(rules["long"], rules["mom"], rules["slope_lb"], rules["vol_q_window"], rules["vol_n"], rules["atr_n"], 60) + 5
+
+
+def _num(value) -> float:
+    if value is None:
+        return NAN
+    return float(value)
+
+
+def _encode(values) -> list:
+    return [v if math.isfinite(v) else None for v in values]
+
+
+def _decode(values) -> list[float]:
+    return [NAN if v is None else float(v) for v in values or []]
+
+
+def _div(a: float, b: float) -> float:
+    """a / b with numpy semantics (x/0 -> +-inf, 0/0 and NaN -> NaN)."""
+    if math.isnan(a) or math.isnan(b):
+        return NAN
+    if b == 0:
+        if a == 0:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _nan_zero(value: float) -> float:
+    return NAN if value == 0 else value
+
+
+def _fmax(*values: float) -> float:
+    finite = [v for v in values if not math.isnan(v)]
+    return max(finite) if finite else NAN
+
+
+def _clip01(value: float) -> float:
+    if math.isnan(value):
+        return NAN
+    return min(max(value, 0.0), 1.0)
+
+
+class RollingMean:
+    """Trailing mean of n values; NaN until the window holds n non-NaN values (rolling(n, min_periods=n))."""
+
+    def __init__(self, n: int, values=()):
+        self.n = n
+        self.values = deque(values, maxlen=n)
+        self._resum()
+
+    def _resum(self):
+        finite = [v for v in self.values if not math.isnan(v)]
+        self.total = math.fsum(finite)
+        self.nans = len(self.values) - len(finite)
+        self.pushes = 0
+
+    def push(self, value: float) -> None:
+        if len(self.values) == self.n:
+            old = self.values[0]
+            if math.isnan(old):
+                self.nans -= 1
+            else:
+                self.total -= old
+        self.values.append(value)
+        if math.isnan(value):
+            self.nans += 1
+        else:
+            self.total += value
+        self.pushes += 1
+        if self.pushes >= self.n:
+            # Re-sum once per window length so the running sum cannot drift.
+            self._resum()
+
+    def mean(self) -> float:
+        if len(self.values) < self.n or self.nans:
+            return NAN
+        return self.total / self.n
+
+
+class RollingQuantile:
+    """Trailing linear-interpolated quantile over a ring buffer plus its sorted copy."""
+
+    def __init__(self, n: int, q: float, values=()):
+        self.n = n
+        self.q = q
+        self.values = deque(values, maxlen=n)
+        self.sorted = sorted(v for v in self.values if not math.isnan(v))
+
+    def push(self, value: float) -> None:
+        if len(self.values) == self.n:
+            old = self.values[0]
+            if not math.isnan(old):
+                del self.sorted[bisect.bisect_left(self.sorted, old)]
+        self.values.append(value)
+        if not math.isnan(value):
+            bisect.insort(self.sorted, value)
+
+    def value(self) -> float:
+        nobs = len(self.sorted)
+        if nobs < self.n:
+            return NAN
+        position = self.q * (nobs - 1)
+        idx = int(position)
+        low = self.sorted[idx]
+        if idx == position:
+            return low
+        high = self.sorted[idx + 1]
+        return low + (high - low) * (position - idx)
+
+
+ROW_FIELDS = (
+    "close", "prev_close", "ma_s", "prev_ma_s", "ma_l", "mom", "slope",
+    "vol_ratio", "atr_pct", "atr_pct_q", "atr_pct_fallback",
+)
+
+
+class GateState:
+    """
+    Rolling state of one ticker under one gate3 rule set.
+
+    The rolling series run over every bar the state has seen; snapshot() then
+    masks them to the latest required_lookback(rules) bars.
+    """
+
+    def __init__(self, rules: dict, data: dict | None = None):
+        r = rules
+        data = data or {}
+        self.rules = r
+        self.frame = required_lookback(r)
+        self.last_date: date | None = date.fromisoformat(data["last_date"]) if data.get("last_date") else None
+        self.valid_run = int(data.get("valid_run", 0))
+        self.seen = int(data.get("seen", 0))
+        self.prev_ma_s = _num(data.get("prev_ma_s"))
+
+        closes = _decode(data.get("closes"))
+        self.closes = deque(closes, maxlen=max(r["long"], r["short"], r["mom"] + 1, 2))
+        self.ma_s = RollingMean(r["short"], closes[-r["short"]:])
+        self.ma_l = RollingMean(r["long"], closes[-r["long"]:])
+        self.ma_l_hist = deque(_decode(data.get("ma_l_hist")), maxlen=r["slope_lb"] + 1)
+        self.vol = RollingMean(r["vol_n"], _decode(data.get("volumes")))
+        self.atr = RollingMean(r["atr_n"], _decode(data.get("trs")))
+        confirm = max(r["confirm"], 1)
+        atr_pcts = _decode(data.get("atr_pcts"))
+        # Also covers the quantile/fallback windows of the older confirm rows.
+        self.atr_pcts = deque(atr_pcts, maxlen=max(r["vol_q_window"], 60) + confirm - 1)
+        self.atr_pct_q = RollingQuantile(r["vol_q_window"], r["vol_q"], atr_pcts[-r["vol_q_window"]:])
+        self.atr_pct_fallback = RollingMean(60, atr_pcts[-60:])
+        self.rows = deque((tuple(_decode(row)) for row in data.get("rows", [])), maxlen=confirm)
+        # (high, low, close) of the frame, for the frame's first true ranges.
+        self.bars = deque((tuple(_decode(bar)) for bar in data.get("bars", [])), maxlen=self.frame)
+
+    def to_dict(self) -> dict:
+        return {
+            "last_date": self.last_date.isoformat() if self.last_date else None,
+            "valid_run": self.valid_run,
+            "seen": self.seen,
+            "prev_ma_s": self.prev_ma_s if math.isfinite(self.prev_ma_s) else None,
+            "closes": _encode(self.closes),
+            "ma_l_hist": _encode(self.ma_l_hist),
+            "volumes": _encode(self.vol.values),
+            "trs": _encode(self.atr.values),
+            "atr_pcts": _encode(self.atr_pcts),
+            "rows": [_encode(row) for row in self.rows],
+            "bars": [_encode(bar) for bar in self.bars],
+        }
+
+    def update(self, trade_date: date, high, low, close, volume) -> dict:
+        """Apply one bar; returns the snapshot evaluate_snapshot() needs for this bar."""
+        r = self.rules
+        high, low, close, volume = _num(high), _num(low), _num(close), _num(volume)
+
+        prev_close = self.closes[-1] if self.closes else NAN
+        if r["mom"] == 0:
+            close_then = close
+        else:
+            close_then = self.closes[-r["mom"]] if len(self.closes) >= r["mom"] else NAN
+        self.closes.append(close)
+        self.ma_s.push(close)
+        self.ma_l.push(close)
+        ma_s = self.ma_s.mean()
+        ma_l = self.ma_l.mean()
+        mom = _div(close, close_then) - 1.0
+        self.ma_l_hist.append(ma_l)
+        ma_l_then = self.ma_l_hist[0] if len(self.ma_l_hist) == r["slope_lb"] + 1 else NAN
+        slope = (ma_l - ma_l_then) / float(r["slope_lb"])
+
+        self.vol.push(volume)
+        vol_ratio = _div(volume, _nan_zero(self.vol.mean()))
+
+        tr = _fmax(abs(high - low), abs(high - prev_close), abs(low - prev_close))
+        self.atr.push(tr)
+        atr_pct = _div(self.atr.mean(), _nan_zero(close))
+        self.atr_pcts.append(atr_pct)
+        self.atr_pct_q.push(atr_pct)
+        self.atr_pct_fallback.push(atr_pct)
+
+        self.rows.append((
+            close, prev_close, ma_s, self.prev_ma_s, ma_l, mom, slope,
+            vol_ratio, atr_pct, self.atr_pct_q.value(), self.atr_pct_fallback.mean(),
+        ))
+        self.bars.append((high, low, close))
+        self.seen += 1
+        self.prev_ma_s = ma_s
+        self.valid_run = self.valid_run + 1 if not math.isnan(close) else 0
+        self.last_date = trade_date
+        return self.snapshot()
+
+    def _frame_start_atr_pct(self) -> float:
+        """ATR% at frame row atr_n-1, whose true ranges start at the frame's first bar (no previous close)."""
+        n = self.rules["atr_n"]
+        bars = list(self.bars)[:n]
+        trs = [abs(bars[0][0] - bars[0][1])]
+        for prev, bar in zip(bars, bars[1:]):
+            trs.append(_fmax(abs(bar[0] - bar[1]), abs(bar[0] - prev[2]), abs(bar[1] - prev[2])))
+        return _div(RollingMean(n, trs).mean(), _nan_zero(bars[-1][2]))
+
+    def _frame_row(self, back: int, index: int, shifted: bool) -> dict:
+        """
+        Indicator values of the row `back` bars before the latest, which sits at
+        `index` in the frame, as the reference computes them over the frame alone.
+        """
+        r = self.rules
+        row = dict(zip(ROW_FIELDS, self.rows[-1 - back]))
+        first_valid = {
+            "prev_close": 1,
+            "ma_s": r["short"] - 1,
+            "prev_ma_s": r["short"],
+            "ma_l": r["long"] - 1,
+            "mom": r["mom"],
+            "slope": r["long"] - 1 + r["slope_lb"],
+            "vol_ratio": r["vol_n"] - 1,
+            "atr_pct": r["atr_n"] - 1,
+            "atr_pct_q": r["atr_n"] - 1 + r["vol_q_window"] - 1,
+            "atr_pct_fallback": r["atr_n"] - 1 + 59,
+        }
+        for field, first in first_valid.items():
+            if index < first:
+                row[field] = NAN
+        if not shifted:
+            # The frame starts at the first bar this state saw.
+            return row
+
+        # Windows that start exactly at the frame's first ATR% see the frame-start value.
+        if index == first_valid["atr_pct"]:
+            row["atr_pct"] = self._frame_start_atr_pct()
+        for field, n in (("atr_pct_q", r["vol_q_window"]), ("atr_pct_fallback", 60)):
+            if index != first_valid[field]:
+                continue
+            end = len(self.atr_pcts) - back
+            window = [self._frame_start_atr_pct()] + list(self.atr_pcts)[end - n + 1:end]
+            if field == "atr_pct_q":
+                row[field] = RollingQuantile(n, r["vol_q"], window).value()
+            else:
+                row[field] = RollingMean(n, window).mean()
+        return row
+
+    def _gates(self, row: dict) -> dict:
+        r = self.rules
+        if math.isnan(row["atr_pct_q"]):
+            atr_gate = row["atr_pct"] <= row["atr_pct_fallback"]
+        else:
+            atr_gate = row["atr_pct"] <= row["atr_pct_q"]
+        close, ma_s, ma_l, mom, slope = row["close"], row["ma_s"], row["ma_l"], row["mom"], row["slope"]
+        buy_event = close > ma_s and row["prev_close"] <= row["prev_ma_s"]
+        sell_event = close < ma_s and row["prev_close"] >= row["prev_ma_s"]
+        buy_vol_gate = row["vol_ratio"] >= r["vol_mult"] if buy_event else row["vol_ratio"] >= 1.0
+        sell_vol_gate = row["vol_ratio"] >= r["vol_mult"] if sell_event else row["vol_ratio"] >= 1.0
+        gates = {
+            "buy_base": ma_s > ma_l and mom > 0,
+            "sell_base": ma_s < ma_l and mom < 0,
+            "buy_trend": close > ma_l and slope > 0,
+            "sell_trend": close < ma_l and slope < 0,
+            "buy_event": buy_event,
+            "sell_event": sell_event,
+            "atr_gate": atr_gate,
+        }
+        gates["buy_raw"] = gates["buy_base"] and gates["buy_trend"] and atr_gate and buy_vol_gate
+        gates["sell_raw"] = gates["sell_base"] and gates["sell_trend"] and atr_gate and sell_vol_gate
+        return gates
+
+    def snapshot(self) -> dict:
+        """Snapshot of the latest bar over the frame of the last required_lookback bars."""
+        r = self.rules
+        frame_len = min(self.seen, self.frame)
+        shifted = self.seen > self.frame
+        rows = [self._frame_row(back, frame_len - 1 - back, shifted) for back in range(len(self.rows))]
+        gates = [self._gates(row) for row in rows]
+        if r["confirm"] <= 1:
+            buy_final, sell_final = gates[0]["buy_raw"], gates[0]["sell_raw"]
+        elif frame_len >= r["confirm"]:
+            buy_final = all(g["buy_raw"] for g in gates)
+            sell_final = all(g["sell_raw"] for g in gates)
+        else:
+            buy_final = sell_final = False
+
+        last, gate = rows[0], gates[0]
+        ma_l_nz = _nan_zero(last["ma_l"])
+        if gate["buy_event"] or gate["sell_event"]:
+            vol_strength = _clip01((last["vol_ratio"] - 1.0) / max(r["vol_mult"] - 1.0, 1e-9))
+        else:
+            vol_strength = 0.0
+        vol_penalty = _clip01(_div(last["atr_pct"] - last["atr_pct_q"], _nan_zero(last["atr_pct_q"])))
+        return {
+            "buy_final": bool(buy_final),
+            "sell_final": bool(sell_final),
+            "ma_gap": _div(abs(last["ma_s"] - last["ma_l"]), ma_l_nz),
+            "trend_strength": _div(abs(last["slope"]), ma_l_nz),
+            "vol_strength": vol_strength,
+            "vol_penalty": vol_penalty,
+            "valid_run": self.valid_run,
+            "debug": {
+                "buy_base": bool(gate["buy_base"]),
+                "sell_base": bool(gate["sell_base"]),
+                "buy_trend": bool(gate["buy_trend"]),
+                "sell_trend": bool(gate["sell_trend"]),
+                "atr_gate": bool(gate["atr_gate"]),
+                "vol_ratio": last["vol_ratio"] if math.isfinite(last["vol_ratio"]) else None,
+            },
+        }
+
+
+def _zero_nan(value) -> float:
+    if value is None or math.isnan(value):
+        return 0.0
+    return value
+
+
+def evaluate_snapshot(snapshot: dict, rules: dict, weights: dict) -> dict:
+    """Final gates and confidence for one snapshot; same payload shape as compute_signal_simple_ma_v2_gate3."""
+    r = rules
+    if snapshot["buy_final"] and not snapshot["sell_final"]:
+        signal = "BUY"
+    elif snapshot["sell_final"] and not snapshot["buy_final"]:
+        signal = "SELL"
+    else:
+        signal = "WAIT"
+
+    conf = (
+        weights.get("ma_gap", 0.45) * _zero_nan(snapshot["ma_gap"])
+        + weights.get("trend_strength", 0.35) * _zero_nan(snapshot["trend_strength"])
+        + weights.get("vol_strength", 0.20) * _zero_nan(snapshot["vol_strength"])
+        + weights.get("vol_penalty", -0.40) * _zero_nan(snapshot["vol_penalty"])
+    )
+    conf = _zero_nan(_clip01(conf))
+
+    if signal in ("BUY", "SELL"):
+        op = ">" if signal == "BUY" else "<"
+        sign = ">" if signal == "BUY" else "<"
+        triggers = [
+            f"MA{r['short']} {op} MA{r['long']}",
+            f"Mom{r['mom']}d {sign} 0",
+            "TrendGate",
+            "VolumeGate",
+            "VolatilityGate",
+            f"Confirm{r['confirm']}",
+        ]
+    else:
+        triggers = ["Gates not satisfied"]
+    return {"signal": signal, "confidence": float(conf), "triggers": triggers, "debug": dict(snapshot["debug"])}
+
+
+# ---------------------------------------------------------------- persistence
+
+def ensure_indicator_state_table(db) -> None:
+    global _TABLE_READY
+    if _TABLE_READY:
+        return
+    ensure_ddl(db, [
+        """
+        CREATE TABLE IF NOT EXISTS indicator_state (
+            ticker TEXT NOT NULL,
+            rules_key TEXT NOT NULL,
+            rules JSONB NOT NULL,
+            committed_date DATE,
+            last_trade_date DATE NOT NULL,
+            last_bar JSONB NOT NULL,
+            snapshot JSONB NOT NULL,
+            state JSONB NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (rules_key, ticker)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_indicator_state_ticker ON indicator_state(ticker)",
+    ])
+    _TABLE_READY = True
+
+
+def _bar_json(bar) -> list:
+    return [bar[0].isoformat()] + [None if v is None else float(v) for v in bar[1:]]
+
+
+def _encode_snapshot(snapshot: dict) -> dict:
+    return {k: (None if isinstance(v, float) and not math.isfinite(v) else v) for k, v in snapshot.items()}
+
+
+def _decode_snapshot(snapshot: dict) -> dict:
+    return {k: (NAN if v is None and k != "debug" else v) for k, v in snapshot.items()}
+
+
+def _fetch_bars(db, tickers: list[str], since: list[date | None], limit: int) -> dict[str, list[tuple]]:
+    """Bars after `since` per ticker (all of the latest `limit` when since is None), oldest first."""
+    rows = db.execute(text("""
+        SELECT req.ticker, b.trade_date, b.high, b.low, b.close, b.volume
+        FROM unnest(CAST(:tickers AS TEXT[]), CAST(:since AS DATE[])) AS req(ticker, since)
+        JOIN LATERAL (
+            SELECT p.trade_date, p.high, p.low, p.close, p.volume
+            FROM price_daily p
+            WHERE p.ticker = req.ticker
+              AND (req.since IS NULL OR p.trade_date > req.since)
+            ORDER BY p.trade_date DESC
+            LIMIT :limit
+        ) b ON true
+        ORDER BY req.ticker, b.trade_date
+    """), {"tickers": tickers, "since": since, "limit": limit}).fetchall()
+    bars: dict[str, list[tuple]] = {}
+    for row in rows:
+        bars.setdefault(row.ticker, []).append((row.trade_date, row.high, row.low, row.close, row.volume))
+    return bars
+
+
+def refresh_states(
+    db, tickers: list[str], rules: dict, persist: bool = True, commit: bool = True, seed: bool = True
+) -> dict[str, tuple[date, dict]]:
+    """
+    Bring the states of `tickers` up to their latest bar and return
+    {ticker: (last_trade_date, snapshot)}. Tickers without bars are absent.
+    Costs one snapshot read and one index probe per ticker when nothing changed.
+
+    persist=False (the API read path) advances from the stored state in memory
+    and writes nothing; ingest (refresh_known_states) and the nightly signals
+    job persist the states.
+
+    seed=False leaves out tickers that would have to be replayed from scratch
+    (no stored state, rewritten history, or a gap of a whole frame) instead
+    of seeding them; compute_live_signals evaluates those from their bars.
+    """
+    ensure_indicator_state_table(db)
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+    key = rules_key(rules)
+    lookback = required_lookback(rules)
+
+    current = {
+        row.ticker: row
+        for row in db.execute(text("""
+            SELECT ticker, committed_date, last_trade_date, last_bar, snapshot
+            FROM indicator_state
+            WHERE rules_key = :key AND ticker = ANY(:tickers)
+        """), {"key": key, "tickers": tickers}).fetchall()
+    }
+    # Bars after the committed bar: normally just the latest bar again.
+    since = [current[t].committed_date if t in current else None for t in tickers]
+    bars = _fetch_bars(db, tickers, since, lookback)
+
+    result: dict[str, tuple[date, dict]] = {}
+    changed: list[str] = []
+    rebuild: list[str] = []
+    for ticker in tickers:
+        row = current.get(ticker)
+        new_bars = bars.get(ticker, [])
+        if row is not None and len(new_bars) == 1 and _bar_json(new_bars[0]) == row.last_bar:
+            result[ticker] = (row.last_trade_date, _decode_snapshot(row.snapshot))
+        elif new_bars:
+            changed.append(ticker)
+        elif row is not None:
+            # The bar the snapshot describes is gone (deleted rows): rebuild from what is left.
+            rebuild.append(ticker)
+
+    if rebuild:
+        if persist:
+            db.execute(text("""
+                DELETE FROM indicator_state WHERE rules_key = :key AND ticker = ANY(:tickers)
+            """), {"key": key, "tickers": rebuild})
+        for ticker in rebuild:
+            current.pop(ticker)
+        if seed:
+            bars.update(_fetch_bars(db, rebuild, [None] * len(rebuild), lookback))
+            changed.extend(t for t in rebuild if t in bars)
+    if not seed:
+        changed = [t for t in changed if t in current and len(bars[t]) < lookback]
+
+    if changed:
+        blobs = {
+            row.ticker: row.state
+            for row in db.execute(text("""
+                SELECT ticker, state FROM indicator_state
+                WHERE rules_key = :key AND ticker = ANY(:tickers)
+            """), {"key": key, "tickers": changed}).fetchall()
+        }
+        params = []
+        # Stable order so concurrent refreshes lock rows in the same order.
+        for ticker in sorted(changed):
+            new_bars = bars[ticker]
+            # A gap of a whole frame or more: replaying the latest frame from scratch is equivalent.
+            data = blobs.get(ticker) if ticker in current and len(new_bars) < lookback else None
+            state = GateState(rules, data)
+            for bar in new_bars[:-1]:
+                state.update(*bar)
+            committed = state.to_dict()
+            committed_date = state.last_date
+            snapshot = state.update(*new_bars[-1])
+            params.append({
+                "ticker": ticker,
+                "key": key,
+                "rules": json.dumps(rules, sort_keys=True),
+                "committed": committed_date,
+                "last_date": new_bars[-1][0],
+                "last_bar": json.dumps(_bar_json(new_bars[-1])),
+                "snapshot": json.dumps(_encode_snapshot(snapshot)),
+                "state": json.dumps(committed),
+            })
+            result[ticker] = (new_bars[-1][0], snapshot)
+    if changed and persist:
+        db.execute(text("""
+            INSERT INTO indicator_state
+                (ticker, rules_key, rules, committed_date, last_trade_date, last_bar, snapshot, state, updated_at)
+            VALUES (:ticker, :key, CAST(:rules AS JSONB), :committed, :last_date,
+                    CAST(:last_bar AS JSONB), CAST(:snapshot AS JSONB), CAST(:state AS JSONB), now())
+            ON CONFLICT (rules_key, ticker) DO UPDATE
+            SET committed_date = EXCLUDED.committed_date,
+                last_trade_date = EXCLUDED.last_trade_date,
+                last_bar = EXCLUDED.last_bar,
+                snapshot = EXCLUDED.snapshot,
+                state = EXCLUDED.state,
+                updated_at = now()
+        """), params)
+    if persist and commit and (changed or rebuild):
+        db.commit()
+    return result
+
+
+def refresh_known_states(db, tickers: list[str] | None = None, progress_cb=None) -> int:
+    """Advance every stored rule set for `tickers` (all tickers with state when None). Returns tickers refreshed."""
+    ensure_indicator_state_table(db)
+    rule_sets = db.execute(text("SELECT DISTINCT rules FROM indicator_state")).fetchall()
+    refreshed = 0
+    for (rules,) in rule_sets:
+        params = {"key": rules_key(rules), "rules": json.dumps(rules, sort_keys=True)}
+        if tickers is None:
+            # Includes states written under an older STATE_VERSION; they are rebuilt under the current key.
+            targets = [row[0] for row in db.execute(
+                text("SELECT DISTINCT ticker FROM indicator_state WHERE rules = CAST(:rules AS JSONB)"), params
+            ).fetchall()]
+        else:
+            targets = tickers
+        for start in range(0, len(targets), 500):
+            refreshed += len(refresh_states(db, targets[start:start + 500], rules))
+            if progress_cb:
+                progress_cb(refreshed, None)
+        db.execute(text("""
+            DELETE FROM indicator_state WHERE rules = CAST(:rules AS JSONB) AND rules_key <> :key
+        """), params)
+        db.commit()
+    return refreshed
+
+
+def invalidate_states(db, ticker: str, from_date: date) -> None:
+    """Drop states that already consumed bars on/after from_date (history rewritten). Does not commit."""
+    ensure_indicator_state_table(db)
+    db.execute(text("""
+        DELETE FROM indicator_state
+        WHERE ticker = :ticker AND committed_date >= :from_date
+    """), {"ticker": ticker, "from_date": from_date})
+
+
+def refresh_indicator_states_task(progress_cb=None) -> int:
+    """Ingest task: advance every stored indicator state to the latest bar."""
+    from ingest.db import SessionLocal
+
+    print("Refreshing indicator states...")
+    with SessionLocal() as db:
+        refreshed = refresh_known_states(db, progress_cb=progress_cb)
+    print(f"Indicator states refreshed: {refreshed}")
+    return refreshed
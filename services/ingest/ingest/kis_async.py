@@ -0,0 +1,152 @@
+"""
+Async KIS quote fetcher.
+
+Runs many inquire-price calls over one pooled httpx connection set while the
+process-wide KIS limiter (shared with KisClient and the backfill workers)
+keeps the request rate under the KIS per-second quota.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from ingest import metrics
+from ingest.config import settings
+from ingest.kis_client import RATE_LIMIT_CODE, TOKEN_EXPIRED_CODE, KisClient
+from ingest.ratelimit import TokenBucket, get_source_limiter
+
+PRICE_PATH = "/uapi/domestic-stock/v1/quotations/inquire-price"
+PRICE_TR_ID = "FHKST01010100"
+RATE_LIMIT_BACKOFF_SEC = 0.5
+
+
+class _Auth:
+    """Request headers shared by all workers; an expired token is replaced once for everyone."""
+
+    def __init__(self, kis: KisClient):
+        self.kis = kis
+        self.headers = kis._headers(PRICE_TR_ID, kis._get_token())
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, stale: dict) -> None:
+        async with self._lock:
+            if self.headers is not stale:
+                # Another worker already replaced the token this request was sent with.
+                return
+            self.kis.invalidate_token()
+            token = await asyncio.to_thread(self.kis._get_token)
+            self.headers = self.kis._headers(PRICE_TR_ID, token)
+
+
+async def _fetch_one(
+    client: httpx.AsyncClient,
+    limiter: TokenBucket,
+    auth: _Auth,
+    ticker: str,
+    max_attempts: int = 5,
+):
+    """
+    inquire-price output for one ticker, or None. Like KisClient._get, a
+    rejected token (EGW00123) is replaced and retried once and a rate-limit
+    answer (EGW00201) is retried with backoff; an HTTP 200 carrying an error
+    rt_cd is an error too.
+    """
+    params = {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": ticker}
+    token_refreshed = False
+    for attempt in range(max_attempts):
+        await limiter.acquire_async()
+        headers = auth.headers
+        started = time.perf_counter()
+        try:
+            resp = await client.get(PRICE_PATH, headers=headers, params=params)
+        except httpx.HTTPError as exc:
+            metrics.observe("kis_request_seconds", time.perf_counter() - started, endpoint="inquire-price-async", status="error")
+            if attempt == max_attempts - 1:
+                print(f"KIS Price Error for {ticker}: {exc}")
+                return None
+            await asyncio.sleep(0.5 * (attempt + 1))
+            continue
+        metrics.observe(
+            "kis_request_seconds", time.perf_counter() - started, endpoint="inquire-price-async", status=resp.status_code
+        )
+        if resp.status_code == 200:
+            data = resp.json()
+            if data.get("rt_cd") in (None, "0"):
+                return data.get("output")
+        if TOKEN_EXPIRED_CODE in resp.text and not token_refreshed and attempt < max_attempts - 1:
+            token_refreshed = True
+            await auth.refresh(headers)
+            continue
+        if RATE_LIMIT_CODE in resp.text and attempt < max_attempts - 1:
+            await asyncio.sleep(RATE_LIMIT_BACKOFF_SEC * 2 ** attempt)
+            continue
+        print(f"KIS Price Error for {ticker}: {resp.text[:200]}")
+        return None
+    return None
+
+
+async def fetch_stock_prices_async(
+    tickers: list[str],
+    kis: KisClient | None = None,
+    rate_per_sec: float | None = None,
+    concurrency: int | None = None,
+    on_result=None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict[str, dict | None]:
+    """
+    Fetch current prices for tickers concurrently.
+    on_result(ticker, output) is called as each response arrives, in arrival
+    order on one background thread, so it may block (kis_loader writes a
+    price batch from it) without stalling the event loop.
+    Requests go through the shared "kis" limiter; rate_per_sec swaps in a
+    private bucket (benchmarks against a fake server).
+    """
+    kis = kis or KisClient()
+    auth = _Auth(kis)
+    concurrency = max(1, concurrency or settings.KIS_ASYNC_CONCURRENCY)
+    limiter = TokenBucket(rate_per_sec) if rate_per_sec else get_source_limiter("kis")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for ticker in tickers:
+        queue.put_nowait(ticker)
+
+    results: dict[str, dict | None] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(5.0, connect=3.0)
+
+    loop = asyncio.get_running_loop()
+    callbacks = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kis-on-result") if on_result else None
+    pending: list[asyncio.Future] = []
+
+    try:
+        async with httpx.AsyncClient(base_url=kis.base_url, limits=limits, timeout=timeout, transport=transport) as client:
+            async def worker():
+                while True:
+                    try:
+                        ticker = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    output = await _fetch_one(client, limiter, auth, ticker)
+                    results[ticker] = output
+                    if on_result:
+                        pending.append(loop.run_in_executor(callbacks, on_result, ticker, output))
+
+            await asyncio.gather(*(worker() for _ in range(min(concurrency, len(tickers)) or 1)))
+        # Surfaces on_result errors (e.g. a failed batch write).
+        await asyncio.gather(*pending)
+    finally:
+        if callbacks:
+            callbacks.shutdown(wait=True)
+
+    return results
+
+
+def fetch_stock_prices(tickers: list[str], **kwargs) -> dict[str, dict | None]:
+    """Blocking wrapper for callers outside an event loop (threads, CLI)."""
+    started = time.time()
+    results = asyncio.run(fetch_stock_prices_async(tickers, **kwargs))
+    elapsed = time.time() - started
+    if tickers:
+        print(f"KIS async fetch: {len(tickers)} tickers in {elapsed:.1f}s ({len(tickers) / max(elapsed, 1e-9):.1f}/s)")
+    return results
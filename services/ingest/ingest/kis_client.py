@@ -1,21 +1,80 @@
-import requests
 import json
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ingest import metrics
 from ingest.config import settings
+from ingest.ratelimit import get_source_limiter
+from ingest.token_store import CachedToken, KisTokenRateLimited, get_token_provider, token_cache_key
+
+metrics.describe("kis_request_seconds", "KIS REST latency by endpoint and HTTP status.")
+
+# (connect, read) timeouts per endpoint; anything unlisted uses DEFAULT_TIMEOUT.
+DEFAULT_TIMEOUT = (3.05, 10)
+ENDPOINT_TIMEOUTS = {
+    "token": (3.05, 10),
+    "inquire-price": (3.05, 5),
+    "volume-rank": (3.05, 8),
+    "investor-trend": (3.05, 8),
+    "program-trade-daily": (3.05, 8),
+    "index-daily": (3.05, 10),
+    "index-intraday": (3.05, 10),
+    "daily-itemchartprice": (3.05, 10),
+}
+# KIS answers an expired/revoked token with EGW00123 and a quota overrun with
+# EGW00201, both as HTTP 500; _get handles them rather than the session retry.
+TOKEN_EXPIRED_CODE = "EGW00123"
+RATE_LIMIT_CODE = "EGW00201"
+RATE_LIMIT_BACKOFF_SEC = 0.5
+MAX_ATTEMPTS = 4
+
+
+class KisRequestError(Exception):
+    """A KIS request failed (transport error, non-200 or error body), as opposed to an empty result."""
+
+
+def _get_kis_session(pool_size: int | None = None):
+    session = requests.Session()
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    pool_size = pool_size or settings.KIS_HTTP_POOL_SIZE
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 class KisClient:
-    def __init__(self):
-        self.base_url = settings.KIS_BASE_URL
-        self.app_key = settings.KIS_API_KEY
-        self.app_secret = settings.KIS_API_SECRET_KEY
+    def __init__(
+        self,
+        base_url: str | None = None,
+        app_key: str | None = None,
+        app_secret: str | None = None,
+        token_provider=None,
+        session: requests.Session | None = None,
+    ):
+        self.base_url = base_url or settings.KIS_BASE_URL
+        self.app_key = app_key or settings.KIS_API_KEY
+        self.app_secret = app_secret or settings.KIS_API_SECRET_KEY
         self.access_token = None
+        self.token_provider = token_provider or get_token_provider()
+        self.token_cache_key = token_cache_key(self.base_url, self.app_key)
+        self.session = session or _get_kis_session()
+        # Process-wide, so every KisClient shares the per-app-key quota.
+        self.limiter = get_source_limiter("kis")
         
         if not self.app_key or not self.app_secret:
             print("WARNING: KIS Credentials missing.")
 
-    def _get_token(self):
-        if self.access_token:
-            return self.access_token
-            
+    def _issue_token(self) -> CachedToken:
         url = f"{self.base_url}/oauth2/tokenP"
         headers = {"content-type": "application/json"}
         body = {
@@ -24,42 +83,86 @@ class KisClient:
             "appsecret": self.app_secret
         }
         
-        resp = requests.post(url, headers=headers, data=json.dumps(body))
+        started = time.perf_counter()
+        resp = self.session.post(url, headers=headers, data=json.dumps(body), timeout=ENDPOINT_TIMEOUTS["token"])
+        metrics.observe("kis_request_seconds", time.perf_counter() - started, endpoint="token", status=resp.status_code)
         if resp.status_code == 200:
-            self.access_token = resp.json().get("access_token")
-            return self.access_token
+            return CachedToken.from_response(resp.json())
         if "EGW00133" in resp.text:
             print(f"KIS Token Error (rate limit): {resp.text}")
-            import time
-            time.sleep(65)
-            resp = requests.post(url, headers=headers, data=json.dumps(body))
-            if resp.status_code == 200:
-                self.access_token = resp.json().get("access_token")
-                return self.access_token
+            raise KisTokenRateLimited(resp.text[:300])
         print(f"KIS Token Error: {resp.text}")
         raise Exception(f"KIS token request failed: status={resp.status_code} body={resp.text[:300]}")
 
-    def get_current_price(self, ticker: str):
-        token = self._get_token()
-        url = f"{self.base_url}/uapi/domestic-stock/v1/quotations/inquire-price"
-        headers = {
-            "content-type": "application/json",
-            "authorization": f"Bearer {token}",
+    def _get_token(self):
+        # Shared across instances and processes; see ingest.token_store.
+        self.access_token = self.token_provider.get_token(self.token_cache_key, self._issue_token)
+        return self.access_token
+
+    def invalidate_token(self):
+        self.token_provider.invalidate(self.token_cache_key, self.access_token)
+        self.access_token = None
+
+    def _headers(self, tr_id: str, token: str | None = None) -> dict:
+        return {
+            "content-type": "application/json; charset=utf-8",
+            "authorization": f"Bearer {token or self.access_token}",
             "appkey": self.app_key,
             "appsecret": self.app_secret,
-            "tr_id": "FHKST01010100"
+            "tr_id": tr_id,
+            "custtype": "P",
         }
+
+    def _get(self, endpoint: str, path: str, tr_id: str, params: dict):
+        """
+        GET a quotation endpoint through the pooled session. Returns the
+        response, or None when the request itself failed (after retries).
+        A rejected token (EGW00123) is dropped from the shared cache and
+        retried once; a rate-limit answer (EGW00201) is retried with
+        exponential backoff. Any other error response is returned as is.
+        """
+        token_refreshed = False
+        resp = None
+        for attempt in range(MAX_ATTEMPTS):
+            token = self._get_token()
+            self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                resp = self.session.get(
+                    f"{self.base_url}{path}",
+                    headers=self._headers(tr_id, token),
+                    params=params,
+                    timeout=ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT),
+                )
+            except requests.exceptions.RequestException as exc:
+                metrics.observe("kis_request_seconds", time.perf_counter() - started, endpoint=endpoint, status="error")
+                print(f"KIS {endpoint} request failed: {exc}")
+                return None
+            metrics.observe("kis_request_seconds", time.perf_counter() - started, endpoint=endpoint, status=resp.status_code)
+            if resp.status_code == 200 or attempt == MAX_ATTEMPTS - 1:
+                return resp
+            if TOKEN_EXPIRED_CODE in resp.text and not token_refreshed:
+                token_refreshed = True
+                self.invalidate_token()
+                continue
+            if RATE_LIMIT_CODE in resp.text:
+                time.sleep(RATE_LIMIT_BACKOFF_SEC * 2 ** attempt)
+                continue
+            return resp
+        return resp
+
+    def get_current_price(self, ticker: str):
         params = {
             "fid_cond_mrkt_div_code": "J",
             "fid_input_iscd": ticker
         }
         
-        resp = requests.get(url, headers=headers, params=params)
-        if resp.status_code == 200:
+        resp = self._get("inquire-price", "/uapi/domestic-stock/v1/quotations/inquire-price", "FHKST01010100", params)
+        if resp is not None and resp.status_code == 200:
             return resp.json().get("output")
-        else:
+        if resp is not None:
             print(f"KIS Price Error for {ticker}: {resp.text}")
-            return None
+        return None
 
     def get_market_index(self, index_code: str):
         # 0001: KOSPI, 1001: KOSDAQ
@@ -83,19 +186,10 @@ class KisClient:
         Dates should be YYYYMMDD. If omitted, KIS decides the range.
         """
         try:
-            token = self._get_token()
+            self._get_token()
         except Exception as exc:
             print(f"KIS Index Intraday Token Error: {exc}")
             return []
-        url = f"{self.base_url}/uapi/domestic-stock/v1/quotations/inquire-daily-index-chartprice"
-        headers = {
-            "content-type": "application/json",
-            "authorization": f"Bearer {token}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": "FHKUP03500100",
-            "custtype": "P",
-        }
         params = {
             "FID_COND_MRKT_DIV_CODE": "U",
             "FID_INPUT_ISCD": index_code,
@@ -105,7 +199,11 @@ class KisClient:
             "FID_ORG_ADJ_PRC": "0",
         }
 
-        resp = requests.get(url, headers=headers, params=params)
+        resp = self._get(
+            "index-daily", "/uapi/domestic-stock/v1/quotations/inquire-daily-index-chartprice", "FHKUP03500100", params
+        )
+        if resp is None:
+            return []
         if resp.status_code == 200:
             data = resp.json()
             rows = data.get("output2") or []
@@ -120,16 +218,6 @@ class KisClient:
         """
         from datetime import datetime
 
-        token = self._get_token()
-        url = f"{self.base_url}/uapi/domestic-stock/v1/quotations/inquire-time-index-chartprice"
-        headers = {
-            "content-type": "application/json",
-            "authorization": f"Bearer {token}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": "FHKUP03500200",
-            "custtype": "P",
-        }
         target_date = date or datetime.now().strftime("%Y%m%d")
         params_base = {
             "FID_COND_MRKT_DIV_CODE": "U",
@@ -143,7 +231,14 @@ class KisClient:
                 "FID_INPUT_HOUR_1": hour,
                 "FID_PW_DATA_INCU_YN": include_prev,
             }
-            resp = requests.get(url, headers=headers, params=params)
+            resp = self._get(
+                "index-intraday",
+                "/uapi/domestic-stock/v1/quotations/inquire-time-index-chartprice",
+                "FHKUP03500200",
+                params,
+            )
+            if resp is None:
+                return []
             if resp.status_code == 200:
                 data = resp.json()
                 rows = data.get("output2") or data.get("output") or []
@@ -157,16 +252,6 @@ class KisClient:
 
     def get_volume_rank(self):
         # Volume Rank (FHPST01710000)
-        token = self._get_token()
-        url = f"{self.base_url}/uapi/domestic-stock/v1/quotations/volume-rank"
-        headers = {
-            "content-type": "application/json",
-            "authorization": f"Bearer {token}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": "FHPST01710000",
-            "custtype": "P"
-        }
         params = {
             "fid_cond_mrkt_div_code": "J",
             "fid_cond_scr_div_code": "20171",
@@ -181,7 +266,9 @@ class KisClient:
             "fid_input_date_1": ""
         }
         
-        resp = requests.get(url, headers=headers, params=params)
+        resp = self._get("volume-rank", "/uapi/domestic-stock/v1/quotations/volume-rank", "FHPST01710000", params)
+        if resp is None:
+            return None
         if resp.status_code == 200:
             return resp.json().get("output")
         print(f"KIS Volume Rank Error: {resp.text}")
@@ -193,21 +280,10 @@ class KisClient:
         Returns daily trading summaries for Investor categories.
         """
         try:
-            token = self._get_token()
+            self._get_token()
         except Exception:
             return None
 
-        # API URL for Inquire Daily Investor Trading Trend
-        url = f"{self.base_url}/uapi/domestic-stock/v1/quotations/inquire-investor-daily-trade-trend"
-        headers = {
-            "content-type": "application/json; charset=utf-8",
-            "authorization": f"Bearer {token}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": "FHKUP03500300",
-            "custtype": "P"
-        }
-        
         from datetime import datetime, timedelta
         today = datetime.now().strftime("%Y%m%d")
         week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y%m%d")
@@ -221,7 +297,14 @@ class KisClient:
             "FID_ORG_ADJ_PRC": "0"
         }
         
-        resp = requests.get(url, headers=headers, params=params)
+        resp = self._get(
+            "investor-trend",
+            "/uapi/domestic-stock/v1/quotations/inquire-investor-daily-trade-trend",
+            "FHKUP03500300",
+            params,
+        )
+        if resp is None:
+            return None
         if resp.status_code == 200:
             return resp.json().get("output")
         print(f"KIS Investor Trend Error: {resp.text}")
@@ -233,7 +316,7 @@ class KisClient:
         Returns a list of rows if available, or None on failure.
         """
         try:
-            token = self._get_token()
+            self._get_token()
         except Exception as exc:
             if return_raw:
                 return {
@@ -247,15 +330,6 @@ class KisClient:
 
         from datetime import datetime
 
-        headers = {
-            "content-type": "application/json; charset=utf-8",
-            "authorization": f"Bearer {token}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": "FHPPG04600001",
-            "custtype": "P",
-        }
-
         target_date = date or datetime.now().strftime("%Y%m%d")
         market_cls_map = {
             "0001": "K",  # KOSPI
@@ -271,8 +345,17 @@ class KisClient:
         }
 
         path = "/uapi/domestic-stock/v1/quotations/comp-program-trade-daily"
-        url = f"{self.base_url}{path}"
-        resp = requests.get(url, headers=headers, params=params)
+        resp = self._get("program-trade-daily", path, "FHPPG04600001", params)
+        if resp is None:
+            if return_raw:
+                return {
+                    "status": "exception",
+                    "raw": None,
+                    "parsed": None,
+                    "error": {"message": "request failed", "path": path},
+                    "tried": [{"path": path, "status": None}],
+                }
+            return None
         tried = [{"path": path, "status": resp.status_code}]
         if resp.status_code == 200:
             data = resp.json()
@@ -319,52 +402,43 @@ class KisClient:
         if not self._get_token():
             return None
 
-        url = f"{self.base_url}/uapi/domestic-stock/v1/quotations/inquire-price"
-        headers = {
-            "content-type": "application/json; charset=utf-8",
-            "authorization": f"Bearer {self.access_token}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": "FHKST01010100",
-            "custtype": "P"
-        }
         params = {
             "FID_COND_MRKT_DIV_CODE": "J",
             "FID_INPUT_ISCD": stock_code
         }
         
-        resp = requests.get(url, headers=headers, params=params, timeout=5)
+        resp = self._get("inquire-price", "/uapi/domestic-stock/v1/quotations/inquire-price", "FHKST01010100", params)
+        if resp is None:
+            return None
         if resp.status_code == 200:
             return resp.json().get("output")
         print(f"KIS Price Error for {stock_code}: {resp.text}")
         return None
 
-    def get_stock_daily_history(self, stock_code: str, start_date: str, end_date: str):
+    def get_stock_daily_history(self, stock_code: str, start_date: str, end_date: str, raise_on_error: bool = False):
         """
         Fetch daily price history (FHKST03010100).
         Dates must be YYYYMMDD.
+        A failed request ends the fetch with the rows read so far (possibly
+        []); with raise_on_error=True it raises KisRequestError instead, so
+        callers can tell a failure from a range without bars.
         """
+        def _fail(message: str):
+            if raise_on_error:
+                raise KisRequestError(f"{stock_code}: {message}")
+            print(f"KIS Daily History Error for {stock_code}: {message}")
+
         if not self._get_token():
+            _fail("no access token")
             return []
 
         from datetime import datetime, timedelta
-        import time
-
-        url = f"{self.base_url}/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice"
-        headers = {
-            "content-type": "application/json; charset=utf-8",
-            "authorization": f"Bearer {self.access_token}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": "FHKST03010100",
-            "custtype": "P",
-        }
 
         try:
             target_start = datetime.strptime(start_date, "%Y%m%d").date()
             target_end = datetime.strptime(end_date, "%Y%m%d").date()
         except ValueError:
-            print(f"KIS Daily History Error for {stock_code}: invalid date range")
+            _fail("invalid date range")
             return []
 
         cursor_end = target_end
@@ -384,23 +458,23 @@ class KisClient:
             # DEBUG PRINT
             # print(f"DEBUG: Requesting {stock_code} {start_date} ~ {cursor_end.strftime('%Y%m%d')}")
             
-            resp = None
-            for attempt in range(3):
-                try:
-                    resp = requests.get(url, headers=headers, params=params, timeout=10)
-                    break
-                except requests.exceptions.RequestException as exc:
-                    if attempt == 2:
-                        print(f"KIS Daily History Error for {stock_code}: {exc}")
-                        return []
-                    time.sleep(1.5 * (attempt + 1))
-            
-            if resp is None or resp.status_code != 200:
-                body = resp.text[:200] if resp is not None else "no_response"
-                print(f"KIS Daily History Error for {stock_code}: {body}")
+            # Connection errors and 502-504 are retried by the session; KIS error bodies in _get.
+            resp = self._get(
+                "daily-itemchartprice",
+                "/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice",
+                "FHKST03010100",
+                params,
+            )
+            if resp is None:
+                _fail("request failed")
+                return []
+            if resp.status_code != 200:
+                _fail(resp.text[:200])
                 break
 
             data = resp.json()
+            if raise_on_error and data.get("rt_cd") not in (None, "0"):
+                _fail(f"{data.get('msg_cd')} {data.get('msg1')}")
             rows = data.get("output2") or []
             # print(f"DEBUG: Got {len(rows)} rows for {stock_code}")
             
@@ -431,7 +505,6 @@ class KisClient:
                 break
             last_oldest = oldest_date
             cursor_end = oldest_date - timedelta(days=1)
-            time.sleep(0.25)
 
         parsed_rows.sort(key=lambda x: x[0])
         return [row for _, row in parsed_rows]
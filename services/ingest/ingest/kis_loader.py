@@ -1,88 +1,105 @@
-import time
 from datetime import date, datetime, timedelta
 from sqlalchemy import text
 from ingest.db import SessionLocal
-from ingest.kis_client import KisClient
+from ingest.kis_client import KisClient, KisRequestError
+from ingest.kis_async import fetch_stock_prices
+from ingest.bulk_writer import PriceDailyWriter, PRICE_UPDATE_QUOTE
+from ingest.indicator_state import invalidate_states, refresh_known_states
+from ingest.trading_calendar import get_trading_calendar
+from ingest.backfill_planner import (
+    FetchRange,
+    describe_plan,
+    load_expected_sessions,
+    plan_backfill,
+    record_checked_range,
+)
 
-def update_kis_prices_task(limit: int | None = None, offset: int = 0, kis: KisClient | None = None, progress_cb=None):
+def _load_tickers(db, limit: int | None = None, offset: int = 0) -> list[str]:
+    if limit is None:
+        rows = db.execute(text("""
+            SELECT s.ticker
+            FROM security s
+            JOIN company c ON s.company_id = c.company_id
+            ORDER BY s.ticker ASC
+        """)).fetchall()
+    else:
+        rows = db.execute(text("""
+            SELECT s.ticker
+            FROM security s
+            JOIN company c ON s.company_id = c.company_id
+            ORDER BY s.ticker ASC
+            OFFSET :o
+            LIMIT :l
+        """), {"l": limit, "o": offset}).fetchall()
+    return [row[0] for row in rows if row[0]]
+
+
+def update_kis_prices_task(
+    limit: int | None = None,
+    offset: int = 0,
+    kis: KisClient | None = None,
+    progress_cb=None,
+    concurrency: int | None = None,
+):
     """
     Fetch current prices for companies from KIS API and update 'price_daily' table.
-    Commits every 10 items to ensure progress visibility.
+    Quotes are fetched concurrently under the KIS rate limit; rows are written
+    in small batches with short-lived sessions so progress stays visible. The
+    writes run on kis_async's callback thread, not on the fetch event loop.
     """
     kis = kis or KisClient()
     limit_label = "ALL" if limit is None else str(limit)
     print(f"Starting KIS Price Update Task (Limit: {limit_label})...")
-    
+
     with SessionLocal() as db:
+        tickers = _load_tickers(db, limit, offset)
+    total = len(tickers)
+    if progress_cb:
+        progress_cb(0, total)
+    # Quotes fetched on a weekend/holiday describe the last session, not today.
+    today = get_trading_calendar().latest_session(date.today()) or date.today()
+
+    writer = PriceDailyWriter(batch_size=200, update_cols=PRICE_UPDATE_QUOTE, label="KIS quotes")
+    count = 0
+
+    def on_result(ticker: str, price_data: dict | None):
+        nonlocal count
+        if not price_data:
+            return
         try:
-            stmt_get_stocks = text("""
-                SELECT s.ticker, c.company_id
-                FROM security s
-                JOIN company c ON s.company_id = c.company_id
-                ORDER BY s.ticker ASC
-                OFFSET :o
-                LIMIT :l
-            """)
-            if limit is None:
-                stmt_get_stocks = text("""
-                    SELECT s.ticker, c.company_id
-                    FROM security s
-                    JOIN company c ON s.company_id = c.company_id
-                    ORDER BY s.ticker ASC
-                """)
-                stocks = db.execute(stmt_get_stocks).fetchall()
-            else:
-                stocks = db.execute(stmt_get_stocks, {"l": limit, "o": offset}).fetchall()
-            total = len(stocks)
-            if progress_cb:
-                progress_cb(0, total)
-            today = date.today()
-            
-            count = 0
-            for ticker, company_id in stocks:
-                if not ticker: continue
-                
-                price_data = kis.get_stock_price(ticker)
-                
-                if price_data:
-                    try:
-                        stmt_upsert = text("""
-                            INSERT INTO price_daily (ticker, trade_date, open, high, low, close, volume, turnover_krw, source, created_at)
-                            VALUES (:t, :d, :o, :h, :l, :c, :v, :val, 'KIS', NOW())
-                            ON CONFLICT (ticker, trade_date) 
-                            DO UPDATE SET close = EXCLUDED.close, volume = EXCLUDED.volume, created_at = NOW()
-                        """)
-                        db.execute(stmt_upsert, {
-                            "t": ticker, "d": today,
-                            "o": int(price_data.get('stck_oprc', 0)),
-                            "h": int(price_data.get('stck_hgpr', 0)),
-                            "l": int(price_data.get('stck_lwpr', 0)),
-                            "c": int(price_data.get('stck_prpr', 0)),
-                            "v": int(price_data.get('acml_vol', 0)),
-                            "val": int(price_data.get('acml_tr_pbmn', 0))
-                        })
-                        count += 1
-                        print(f"[{count}] Updated {ticker}")
-                        
-                        # Commit every 5 items for better progress visibility
-                        if count % 5 == 0:
-                            db.commit()
-                        if progress_cb:
-                            progress_cb(count, total)
-                            
-                    except Exception as e:
-                        print(f"Error for {ticker}: {e}")
-                
-                time.sleep(0.1)
-                
-            db.commit()
-            print(f"Total {count} prices updated successfully.")
-            
-        except Exception as e:
-            print(f"KIS Update CRITICAL Failed: {e}")
-            db.rollback()
-        finally:
-            db.close()
+            writer.add((
+                ticker, today,
+                int(price_data.get('stck_oprc', 0)),
+                int(price_data.get('stck_hgpr', 0)),
+                int(price_data.get('stck_lwpr', 0)),
+                int(price_data.get('stck_prpr', 0)),
+                int(price_data.get('acml_vol', 0)),
+                int(price_data.get('acml_tr_pbmn', 0)),
+            ))
+        except (TypeError, ValueError) as e:
+            print(f"Error for {ticker}: {e}")
+            return
+        count += 1
+        if count % 100 == 0:
+            print(f"[{count}/{total}] prices updated")
+        if progress_cb:
+            progress_cb(count, total)
+
+    try:
+        fetch_stock_prices(tickers, kis=kis, concurrency=concurrency, on_result=on_result)
+        writer.close()
+        print(f"Total {count} prices updated successfully.")
+    except Exception as e:
+        print(f"KIS Update CRITICAL Failed: {e}")
+        raise
+
+    # Advance the incremental signal state with the new bars (best-effort; reads catch up lazily).
+    try:
+        with SessionLocal() as db:
+            refreshed = refresh_known_states(db, tickers)
+        print(f"Indicator state refreshed for {refreshed} tickers.")
+    except Exception as e:
+        print(f"Indicator state refresh failed: {e}")
 
 
 def _to_int(value: str | int | None):
@@ -90,114 +107,122 @@ def _to_int(value: str | int | None):
         return None
     if isinstance(value, int):
         return value
-    value = value.strip()
+    value = str(value).strip().replace(",", "")
     if not value:
         return None
     try:
-        return int(value)
+        return int(float(value))
     except ValueError:
         return None
 
 
+def parse_daily_history_row(ticker: str, row: dict) -> tuple | None:
+    """
+    Convert a KIS daily chart row (FHKST03010100 output2) into a price_daily
+    tuple for bulk_writer.upsert_price_daily. Returns None for unusable rows.
+    """
+    trade_date_str = row.get("stck_bsop_date")
+    if not trade_date_str:
+        return None
+    try:
+        trade_date = datetime.strptime(trade_date_str, "%Y%m%d").date()
+    except ValueError:
+        return None
+    return (
+        ticker,
+        trade_date,
+        _to_int(row.get("stck_oprc")),
+        _to_int(row.get("stck_hgpr")),
+        _to_int(row.get("stck_lwpr")),
+        _to_int(row.get("stck_clpr")),
+        _to_int(row.get("acml_vol")),
+        _to_int(row.get("acml_tr_pbmn")),
+    )
+
+
 def backfill_kis_prices_task(
     days: int = 90,
     limit: int | None = None,
     offset: int = 0,
     kis: KisClient | None = None,
     tickers: list[str] | None = None,
+    progress_cb=None,
+    incremental: bool = True,
 ):
     """
     Fetch historical daily prices for a date range and upsert into price_daily.
+    With incremental=True only the ranges missing from price_daily are requested
+    (see ingest.backfill_planner); incremental=False re-fetches the whole window.
     """
     kis = kis or KisClient()
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
     start_str = start_date.strftime("%Y%m%d")
     end_str = end_date.strftime("%Y%m%d")
-    print(f"Starting KIS Price Backfill (days={days}, {start_str}~{end_str})...")
+    mode = "incremental" if incremental else "full"
+    print(f"Starting KIS Price Backfill (days={days}, {start_str}~{end_str}, {mode})...")
 
     with SessionLocal() as db:
-        try:
-            if tickers:
-                stocks = [(t, None) for t in tickers]
-            else:
-                stmt_get_stocks = text("""
-                    SELECT s.ticker, c.company_id
-                    FROM security s
-                    JOIN company c ON s.company_id = c.company_id
-                    ORDER BY s.ticker ASC
-                    OFFSET :o
-                    LIMIT :l
-                """)
-                if limit is None:
-                    stmt_get_stocks = text("""
-                        SELECT s.ticker, c.company_id
-                        FROM security s
-                        JOIN company c ON s.company_id = c.company_id
-                        ORDER BY s.ticker ASC
-                    """)
-                    stocks = db.execute(stmt_get_stocks).fetchall()
-                else:
-                    stocks = db.execute(stmt_get_stocks, {"l": limit, "o": offset}).fetchall()
-
-            total_rows = 0
-            for ticker, _company_id in stocks:
-                if not ticker:
-                    continue
+        if not tickers:
+            tickers = _load_tickers(db, limit, offset)
+        if incremental:
+            sessions = load_expected_sessions(start_date, end_date)
+            plan = plan_backfill(db, tickers, start_date, end_date, sessions=sessions)
+            print(describe_plan(plan, len(tickers), len(sessions)))
+        else:
+            plan = [FetchRange(ticker, start_date, end_date, 0) for ticker in tickers]
 
-                rows = kis.get_stock_daily_history(ticker, start_str, end_str)
-                if not rows:
-                    continue
+    ranges_by_ticker: dict[str, list[FetchRange]] = {}
+    for fetch_range in plan:
+        ranges_by_ticker.setdefault(fetch_range.ticker, []).append(fetch_range)
+    total = len(tickers)
+    if progress_cb:
+        progress_cb(0, total)
 
-                for row in rows:
-                    trade_date_str = row.get("stck_bsop_date")
-                    if not trade_date_str:
-                        continue
-                    try:
-                        trade_date = datetime.strptime(trade_date_str, "%Y%m%d").date()
-                    except ValueError:
-                        continue
-
-                    stmt_upsert = text("""
-                        INSERT INTO price_daily (
-                            ticker, trade_date, open, high, low, close, volume, turnover_krw, source, created_at
-                        )
-                        VALUES (:t, :d, :o, :h, :l, :c, :v, :val, 'KIS', NOW())
-                        ON CONFLICT (ticker, trade_date)
-                        DO UPDATE SET
-                            open = EXCLUDED.open,
-                            high = EXCLUDED.high,
-                            low = EXCLUDED.low,
-                            close = EXCLUDED.close,
-                            volume = EXCLUDED.volume,
-                            turnover_krw = EXCLUDED.turnover_krw,
-                            created_at = NOW()
-                    """)
-                    db.execute(stmt_upsert, {
-                        "t": ticker,
-                        "d": trade_date,
-                        "o": _to_int(row.get("stck_oprc")),
-                        "h": _to_int(row.get("stck_hgpr")),
-                        "l": _to_int(row.get("stck_lwpr")),
-                        "c": _to_int(row.get("stck_clpr")),
-                        "v": _to_int(row.get("acml_vol")),
-                        "val": _to_int(row.get("acml_tr_pbmn")),
-                    })
-                    total_rows += 1
-
-                    if total_rows % 200 == 0:
-                        db.commit()
-
-                db.commit()
-                print(f"Backfilled {ticker} ({len(rows)} rows)")
-                time.sleep(0.2)
+    writer = PriceDailyWriter(label="KIS backfill")
+    earliest: dict[str, date] = {}
+    checked: list[FetchRange] = []
+    try:
+        for idx, ticker in enumerate(tickers, start=1):
+            parsed = []
+            for fetch_range in ranges_by_ticker.get(ticker, []):
+                try:
+                    rows = kis.get_stock_daily_history(
+                        ticker,
+                        fetch_range.start.strftime("%Y%m%d"),
+                        fetch_range.end.strftime("%Y%m%d"),
+                        raise_on_error=True,
+                    )
+                except KisRequestError as e:
+                    print(f"Backfill fetch failed: {e}")
+                    continue
+                checked.append(fetch_range)
+                parsed.extend(r for r in (parse_daily_history_row(ticker, row) for row in rows or []) if r)
+            if parsed:
+                writer.extend(parsed)
+                earliest[ticker] = min(r[1] for r in parsed)
+                print(f"Backfilled {ticker} ({len(parsed)} rows)")
+            if progress_cb:
+                progress_cb(idx, total)
 
+        stats = writer.close()
+        # Only after the bars are written: a checked range is never planned again.
+        with SessionLocal() as db:
+            for fetch_range in checked:
+                record_checked_range(db, fetch_range.ticker, fetch_range.start, fetch_range.end)
             db.commit()
-            if progress_cb:
-                progress_cb(count, total)
-            print(f"Backfill complete. Total rows upserted: {total_rows}")
-        except Exception as e:
-            print(f"KIS Backfill CRITICAL Failed: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        print(f"Backfill complete. Total rows upserted: {stats.rows}")
+    except Exception as e:
+        print(f"KIS Backfill CRITICAL Failed: {e}")
+        raise
+    finally:
+        if earliest:
+            _invalidate_indicator_states(earliest)
+
+
+def _invalidate_indicator_states(earliest: dict[str, date]) -> None:
+    """Backfilled bars may rewrite history an indicator state already consumed."""
+    with SessionLocal() as db:
+        for ticker, from_date in earliest.items():
+            invalidate_states(db, ticker, from_date)
+        db.commit()
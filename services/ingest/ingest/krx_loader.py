@@ -1,70 +1,149 @@
 import FinanceDataReader as fdr
+import pandas as pd
 from sqlalchemy import text
-from ingest.db import get_db
+from ingest.bulk_writer import stage_rows
+from ingest.db import SessionLocal
 import hashlib
+import time
+
+LISTING_COLUMNS = ["ticker", "name_ko", "market", "sector_name", "sector_code"]
+
+
+def _sector_code(name: str) -> str:
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:10]
+    return f"KRX_SECTOR_{digest}"
+
+
+def build_listing_frame(df_krx: pd.DataFrame) -> pd.DataFrame:
+    """
+    fdr.StockListing('KRX') -> one row per KOSPI/KOSDAQ ticker with
+    LISTING_COLUMNS. Sector codes are hashed once per distinct sector name.
+    """
+    if 'Market' in df_krx.columns:
+        df_krx = df_krx[df_krx['Market'].isin(['KOSPI', 'KOSDAQ'])]
+    market_raw = df_krx['Market'] if 'Market' in df_krx.columns else pd.Series('', index=df_krx.index)
+    if 'Sector' in df_krx.columns:
+        sector = df_krx['Sector'].where(df_krx['Sector'].map(lambda v: isinstance(v, str)))
+        sector = sector.where(sector.str.strip() != '')
+    else:
+        sector = pd.Series(None, index=df_krx.index, dtype=object)
+    stripped = sector.str.strip()
+    codes = {name: _sector_code(name) for name in stripped.dropna().unique()}
+
+    frame = pd.DataFrame({
+        # fdr returns Code/Name. We treat Code as stock_code.
+        "ticker": df_krx['Code'].astype(str),
+        "name_ko": df_krx['Name'],
+        "market": market_raw.map({'KOSPI': 'KRX_KOSPI'}).fillna('KRX_KOSDAQ'),
+        "sector_name": sector,
+        "sector_code": stripped.map(codes),
+    })
+    frame = frame.drop_duplicates("ticker", keep="last").reset_index(drop=True)
+    return frame.astype(object).where(frame.notna(), None)
+
+
+def load_current_listing(db, tickers: list[str]) -> pd.DataFrame:
+    rows = db.execute(text("""
+        SELECT c.stock_code AS ticker, c.company_id, c.name_ko, c.sector_name, c.sector_code,
+               s.market::text AS market, s.company_id AS sec_company_id, s.ticker IS NOT NULL AS has_security
+        FROM company c
+        LEFT JOIN security s ON s.ticker = c.stock_code
+        WHERE c.stock_code = ANY(:tickers)
+    """), {"tickers": tickers}).fetchall()
+    return pd.DataFrame(
+        rows,
+        columns=["ticker", "company_id", "name_ko", "sector_name", "sector_code", "market", "sec_company_id", "has_security"],
+    )
+
+
+def diff_listing(new: pd.DataFrame, current: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """
+    Compare the fresh listing with the DB. A missing sector keeps the stored
+    one (the upsert COALESCEs), so it does not count as a change.
+    Returns (rows to write, {"inserted", "updated", "unchanged"}).
+    """
+    merged = new.merge(current, on="ticker", how="left", suffixes=("", "_db"), indicator=True)
+    has_company = merged["_merge"] == "both"
+    inserted = ~has_company | ~merged["has_security"].eq(True)
+
+    def differs(col: str, keep_db_when_missing: bool = False) -> pd.Series:
+        fresh = merged[col]
+        if keep_db_when_missing:
+            fresh = fresh.where(fresh.notna(), merged[f"{col}_db"])
+        stored = merged[f"{col}_db"]
+        return ~((fresh == stored) | (fresh.isna() & stored.isna()))
+
+    updated = ~inserted & (
+        differs("name_ko")
+        | differs("market")
+        | differs("sector_name", keep_db_when_missing=True)
+        | differs("sector_code", keep_db_when_missing=True)
+        | (merged["sec_company_id"] != merged["company_id"])
+    )
+    counts = {
+        "inserted": int(inserted.sum()),
+        "updated": int(updated.sum()),
+        "unchanged": int((~inserted & ~updated).sum()),
+    }
+    return new[(inserted | updated).to_numpy()], counts
+
+
+def apply_listing(db, changed: pd.DataFrame) -> None:
+    """Stage changed rows with COPY and upsert company, then security, set-based. Does not commit."""
+    stage_rows(
+        db,
+        "_stage_krx_listing",
+        {col: "TEXT" for col in LISTING_COLUMNS},
+        changed[LISTING_COLUMNS].itertuples(index=False, name=None),
+    )
+    # Setting company_type to 'LISTED' explicitly as we are loading listed stocks
+    db.execute(text("""
+        INSERT INTO company (name_ko, stock_code, company_type, sector_name, sector_code, created_at)
+        SELECT name_ko, ticker, 'LISTED', sector_name, sector_code, NOW()
+        FROM _stage_krx_listing
+        ON CONFLICT (stock_code) DO UPDATE
+        SET updated_at = NOW(),
+            name_ko = EXCLUDED.name_ko,
+            sector_name = COALESCE(EXCLUDED.sector_name, company.sector_name),
+            sector_code = COALESCE(EXCLUDED.sector_code, company.sector_code)
+    """))
+    db.execute(text("""
+        INSERT INTO security (ticker, company_id, market, created_at)
+        SELECT s.ticker, c.company_id, CAST(s.market AS market_scope), NOW()
+        FROM _stage_krx_listing s
+        JOIN company c ON c.stock_code = s.ticker
+        ON CONFLICT (ticker) DO UPDATE SET market = EXCLUDED.market, company_id = EXCLUDED.company_id
+    """))
+
 
 def fetch_and_save_krx_list(progress_cb=None):
-    db = next(get_db())
     print("Fetching KRX stock list via FinanceDataReader...")
-    
-    try:
-        # Fetch KRX with sector metadata
-        df_krx = fdr.StockListing('KRX')
-        if 'Market' in df_krx.columns:
-            df_krx = df_krx[df_krx['Market'].isin(['KOSPI', 'KOSDAQ'])]
-        
-        count = 0
-        total = len(df_krx)
-        if progress_cb:
-            progress_cb(0, total)
-        for _, row in df_krx.iterrows():
-            ticker = str(row['Code'])
-            name = row['Name']
-            market_raw = row.get('Market', '')
-            market = 'KRX_KOSPI' if market_raw == 'KOSPI' else 'KRX_KOSDAQ'
-            sector_name = row.get('Sector') if 'Sector' in row.index else None
-
-            sector_code = None
-            if isinstance(sector_name, str) and sector_name.strip():
-                digest = hashlib.sha1(sector_name.strip().encode('utf-8')).hexdigest()[:10]
-                sector_code = f"KRX_SECTOR_{digest}"
-
-            # 1. Insert/Update Company
-            # Setting company_type to 'LISTED' explicitly as we are loading listed stocks
-            stmt_company = text("""
-                INSERT INTO company (name_ko, stock_code, company_type, sector_name, sector_code, created_at)
-                VALUES (:n, :sc, 'LISTED', :sn, :scd, NOW())
-                ON CONFLICT (stock_code) DO UPDATE
-                SET updated_at = NOW(),
-                    name_ko = :n,
-                    sector_name = COALESCE(EXCLUDED.sector_name, company.sector_name),
-                    sector_code = COALESCE(EXCLUDED.sector_code, company.sector_code)
-                RETURNING company_id
-            """)
-            # fdr returns Code/Name. We treat Code as stock_code.
-            result = db.execute(stmt_company, {"n": name, "sc": ticker, "sn": sector_name, "scd": sector_code})
-            company_id = result.fetchone()[0]
-
-            # 2. Insert/Update Security (Removed is_active as per schema)
-            stmt_security = text("""
-                INSERT INTO security (ticker, company_id, market, created_at)
-                VALUES (:t, :cid, :m, NOW())
-                ON CONFLICT (ticker) DO UPDATE SET market = :m, company_id = :cid
-            """)
-            db.execute(stmt_security, {"t": ticker, "cid": company_id, "m": market})
-            count += 1
-            if progress_cb and count % 50 == 0:
-                progress_cb(count, total)
-            
-            if count % 200 == 0:
-                print(f"Processed {count} stocks...")
-        
-        db.commit()
-        if progress_cb:
-            progress_cb(count, total)
-        print(f"Successfully loaded {count} KRX stocks.")
-        
-    except Exception as e:
-        print(f"Error loading KRX list: {e}")
-        db.rollback()
-        raise e
+
+    with SessionLocal() as db:
+        try:
+            # Fetch KRX with sector metadata
+            df_krx = fdr.StockListing('KRX')
+            started = time.time()
+            listing = build_listing_frame(df_krx)
+            total = len(listing)
+            if progress_cb:
+                progress_cb(0, total)
+
+            current = load_current_listing(db, listing["ticker"].tolist())
+            changed, counts = diff_listing(listing, current)
+            if len(changed):
+                apply_listing(db, changed)
+            db.commit()
+
+            if progress_cb:
+                progress_cb(total, total)
+            print(
+                f"Successfully loaded {total} KRX stocks: {counts['inserted']} inserted, "
+                f"{counts['updated']} updated, {counts['unchanged']} unchanged ({time.time() - started:.2f}s)."
+            )
+            return counts
+
+        except Exception as e:
+            print(f"Error loading KRX list: {e}")
+            db.rollback()
+            raise e
@@ -10,21 +10,33 @@ from ingest.kis_loader import update_kis_prices_task
 
 def main():
     p = argparse.ArgumentParser()
-    p.add_argument("--task", required=True, choices=["kis_prices", "kis_prices_all", "krx_meta", "dart_filings", "ecos_series", "dart_financials", "naver_industries"])
+    p.add_argument("--task", choices=["kis_prices", "kis_prices_all", "krx_meta", "dart_filings", "ecos_series", "dart_financials", "naver_industries", "naver_classifications", "indicator_state"])
+    p.add_argument("--parallel", help="Comma-separated tasks (or preset, e.g. 'morning') to run in separate processes.")
+    p.add_argument("--pool-size", type=int, default=3, help="DB pool size per process with --parallel.")
+    p.add_argument("--log-dir", default="artifacts", help="Per-task log directory with --parallel.")
     p.add_argument("--limit", type=int, default=None)
     p.add_argument("--offset", type=int, default=0)
     p.add_argument("--batch", type=int, default=500)
     p.add_argument("--from", dest="date_from")
     p.add_argument("--to", dest="date_to")
+    p.add_argument("--full", action="store_true", help="dart_filings: ignore the high-water mark and sweep the whole window.")
     args = p.parse_args()
 
+    if args.parallel:
+        from ingest.orchestrator import run_parallel
+
+        tasks = [t.strip() for t in args.parallel.split(",") if t.strip()]
+        ok = run_parallel(tasks, pool_size=args.pool_size, log_dir=args.log_dir)
+        raise SystemExit(0 if ok else 1)
+    if not args.task:
+        p.error("one of --task or --parallel is required")
+
     print(f"Running Task: {args.task}")
     
     if args.task == "kis_prices":
         update_kis_prices_task(limit=args.limit, offset=args.offset)
     elif args.task == "kis_prices_all":
         from sqlalchemy import text
-        import time
         from ingest.db import SessionLocal
         from ingest.kis_client import KisClient
 
@@ -33,13 +45,13 @@ def main():
         batch = args.batch or 500
         kis = KisClient()
         for offset in range(0, total, batch):
+            # Pacing comes from the shared KIS rate limiter.
             update_kis_prices_task(limit=batch, offset=offset, kis=kis)
-            time.sleep(0.5)
     elif args.task == "krx_meta":
         fetch_and_save_krx_list()
     elif args.task == "dart_filings":
         from ingest.dart_loader import fetch_and_save_dart_filings
-        fetch_and_save_dart_filings()
+        fetch_and_save_dart_filings(full=args.full)
     elif args.task == "dart_financials":
         from ingest.dart_financials_loader import fetch_and_save_company_financials
         fetch_and_save_company_financials()
@@ -49,6 +61,12 @@ def main():
     elif args.task == "naver_industries":
         from ingest.naver_industry_backfill import backfill_company_sectors
         backfill_company_sectors()
+    elif args.task == "naver_classifications":
+        from ingest.naver_classification_sync import sync_naver_classifications
+        sync_naver_classifications()
+    elif args.task == "indicator_state":
+        from ingest.indicator_state import refresh_indicator_states_task
+        refresh_indicator_states_task()
     else:
         print(f"Unknown task: {args.task}")
 
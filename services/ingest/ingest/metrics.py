@@ -0,0 +1,91 @@
+"""
+Process-local counters and latency histograms for ingest clients.
+
+Kept dependency-free; render_prometheus() emits the text exposition format
+so the API can serve it as-is.
+"""
+import threading
+
+_LOCK = threading.Lock()
+_COUNTERS: dict[tuple[str, tuple], float] = {}
+_HISTOGRAMS: dict[tuple[str, tuple], dict] = {}
+_HELP: dict[str, str] = {}
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _key(name: str, labels: dict) -> tuple[str, tuple]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def describe(name: str, help_text: str) -> None:
+    _HELP[name] = help_text
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    key = _key(name, labels)
+    with _LOCK:
+        _COUNTERS[key] = _COUNTERS.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, buckets: tuple = DEFAULT_BUCKETS, **labels) -> None:
+    key = _key(name, labels)
+    with _LOCK:
+        hist = _HISTOGRAMS.get(key)
+        if hist is None:
+            hist = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            _HISTOGRAMS[key] = hist
+        for i, bound in enumerate(hist["buckets"]):
+            if value <= bound:
+                hist["counts"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def snapshot() -> dict[str, float]:
+    """Flat {"name{label=value}": value} view, handy for JSON status payloads."""
+    with _LOCK:
+        items = list(_COUNTERS.items())
+    return {_series(name, labels): value for (name, labels), value in sorted(items)}
+
+
+def reset() -> None:
+    with _LOCK:
+        _COUNTERS.clear()
+        _HISTOGRAMS.clear()
+
+
+def _series(name: str, labels: tuple) -> str:
+    if not labels:
+        return name
+    body = ",".join(f'{k}="{v}"' for k, v in labels)
+    return f"{name}{{{body}}}"
+
+
+def render_prometheus() -> str:
+    with _LOCK:
+        items = sorted(_COUNTERS.items())
+        histograms = sorted(
+            (key, {**hist, "counts": list(hist["counts"])}) for key, hist in _HISTOGRAMS.items()
+        )
+    lines: list[str] = []
+    seen: set[str] = set()
+    for (name, labels), value in items:
+        if name not in seen:
+            seen.add(name)
+            if name in _HELP:
+                lines.append(f"# HELP {name} {_HELP[name]}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{_series(name, labels)} {value:g}")
+    for (name, labels), hist in histograms:
+        if name not in seen:
+            seen.add(name)
+            if name in _HELP:
+                lines.append(f"# HELP {name} {_HELP[name]}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, count in zip(hist["buckets"], hist["counts"]):
+            lines.append(f"{_series(name + '_bucket', labels + (('le', f'{bound:g}'),))} {count}")
+        lines.append(f"{_series(name + '_bucket', labels + (('le', '+Inf'),))} {hist['count']}")
+        lines.append(f"{_series(name + '_sum', labels)} {hist['sum']:g}")
+        lines.append(f"{_series(name + '_count', labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,263 @@
+"""
+Naver industry / theme membership -> classification_* tables.
+
+Each run scrapes the Naver industry and theme lists plus every member page,
+then applies the result as effective-dated rows in security_classification:
+memberships that appeared get effective_from = as_of, memberships that
+disappeared get effective_to = as_of - 1 day, unchanged ones are untouched.
+Nodes whose member page failed are left as they are, so a flaky scrape
+never closes memberships.
+
+    python -m ingest.main --task naver_classifications
+"""
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from sqlalchemy import text
+
+from ingest.bulk_writer import stage_rows
+from ingest.db import SessionLocal
+
+INDUSTRY_TAXONOMY = "NAVER_INDUSTRY"
+THEME_TAXONOMY = "NAVER_THEME"
+TAXONOMIES = {
+    INDUSTRY_TAXONOMY: {"kind": "INDUSTRY", "name": "Naver 업종"},
+    THEME_TAXONOMY: {"kind": "THEME", "name": "Naver 테마"},
+}
+SOURCE = "NAVER"
+MEMBER_FETCH_WORKERS = 8
+THEME_PAGES = 10
+
+_NODE_NO = re.compile(r"[?&]no=(\d+)")
+_INDEX_READY = False
+
+
+def _load_scrapers():
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+    sys.path.append(os.path.join(repo_root, "apps/api"))
+    from app.services import scrapers
+    return scrapers
+
+
+def node_code(link: str) -> str | None:
+    """Naver group number from a detail link (…sise_group_detail.naver?type=upjong&no=278 -> "278")."""
+    match = _NODE_NO.search(link or "")
+    return match.group(1) if match else None
+
+
+def ensure_classification_indexes(db) -> None:
+    global _INDEX_READY
+    if _INDEX_READY:
+        return
+    # Open memberships by node, for /industries/members and /universe name filters.
+    db.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_sec_class_open
+        ON security_classification(taxonomy_id, code, ticker)
+        WHERE effective_to IS NULL
+    """))
+    db.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_class_node_tax_name
+        ON classification_node(taxonomy_id, name)
+    """))
+    db.commit()
+    _INDEX_READY = True
+
+
+def fetch_groups(scrapers, taxonomy_id: str) -> tuple[list[dict], bool]:
+    """
+    ([{"name", "link"}], complete) from the list pages, fetched directly (not
+    through the list caches, whose entries drop the links). Raises if a page
+    fails, so an outage is never mistaken for an empty taxonomy. complete is
+    False when every theme page had rows (there may be more pages).
+    """
+    if taxonomy_id == INDUSTRY_TAXONOMY:
+        urls = [f"{scrapers.BASE_URL}/sise/sise_group.nhn?type=upjong"]
+        parse = scrapers.parse_industry_page
+    else:
+        urls = [f"{scrapers.BASE_URL}/sise/theme.nhn?&page={page}" for page in range(1, THEME_PAGES + 1)]
+        parse = scrapers.parse_theme_page
+    groups = []
+    complete = len(urls) == 1
+    for url in urls:
+        rows = scrapers.fetch_page(url, parse, ttl_sec=0)
+        if not rows:
+            complete = True
+            break
+        groups.extend({"name": row["name"], "link": row["link"]} for row in rows if row.get("link"))
+    return groups, complete
+
+
+def fetch_memberships(scrapers, groups: list[dict]) -> tuple[list[dict], dict[str, list[str]], list[str]]:
+    """
+    groups: [{"name", "link"}] from the industry/theme list.
+    Returns (nodes, {code: tickers}, failed codes). Member pages are fetched
+    in parallel; a page that raises is reported as failed, not as empty.
+    """
+    nodes = []
+    seen = set()
+    for group in groups:
+        code = node_code(group.get("link") or "")
+        if code and group.get("name") and code not in seen:
+            seen.add(code)
+            nodes.append({"code": code, "name": group["name"], "link": group["link"]})
+
+    def fetch(node):
+        url = scrapers._absolute(node["link"])
+        try:
+            return node["code"], scrapers.fetch_page(url, scrapers.parse_member_tickers, ttl_sec=0), None
+        except Exception as exc:
+            return node["code"], None, exc
+
+    members: dict[str, list[str]] = {}
+    failed: list[str] = []
+    with ThreadPoolExecutor(max_workers=MEMBER_FETCH_WORKERS) as executor:
+        for code, tickers, error in executor.map(fetch, nodes):
+            if error is not None:
+                print(f"member page failed for {code}: {error}")
+                failed.append(code)
+            else:
+                members[code] = tickers
+    return nodes, members, failed
+
+
+def apply_memberships(
+    db,
+    taxonomy_id: str,
+    nodes: list[dict],
+    members: dict[str, list[str]],
+    as_of: date,
+    is_primary: bool = False,
+    list_complete: bool = False,
+) -> dict:
+    """
+    Upsert nodes and diff memberships against the open rows, set-based.
+    Only nodes present in `members` are diffed; with list_complete (the list
+    pages were read to the end) open rows of codes missing from `nodes` are
+    closed as well. A membership opened on `as_of` itself is deleted rather
+    than closed (it would end before it starts). Does not commit.
+    """
+    meta = TAXONOMIES[taxonomy_id]
+    db.execute(text("""
+        INSERT INTO classification_taxonomy (taxonomy_id, kind, name, provider, created_at)
+        VALUES (:tid, CAST(:kind AS taxonomy_kind), :name, :provider, now())
+        ON CONFLICT (taxonomy_id) DO NOTHING
+    """), {"tid": taxonomy_id, "kind": meta["kind"], "name": meta["name"], "provider": SOURCE})
+
+    stage_rows(
+        db,
+        "_stage_class_node",
+        {"code": "TEXT", "name": "TEXT", "link": "TEXT"},
+        ((n["code"], n["name"], n["link"]) for n in nodes),
+    )
+    db.execute(text("""
+        INSERT INTO classification_node (taxonomy_id, code, name, level, extra, created_at)
+        SELECT DISTINCT ON (code) :tid, code, name, 1, jsonb_build_object('link', link), now()
+        FROM _stage_class_node
+        ORDER BY code
+        ON CONFLICT (taxonomy_id, code) DO UPDATE
+        SET name = EXCLUDED.name, extra = EXCLUDED.extra
+    """), {"tid": taxonomy_id})
+
+    stage_rows(
+        db,
+        "_stage_class_member",
+        {"code": "TEXT", "ticker": "TEXT"},
+        ((code, ticker) for code, tickers in members.items() for ticker in tickers),
+    )
+    stage_rows(db, "_stage_class_synced", {"code": "TEXT"}, ((code,) for code in members))
+
+    gone = """
+        sc.taxonomy_id = :tid
+        AND sc.effective_to IS NULL
+        AND (
+            (sc.code IN (SELECT code FROM _stage_class_synced)
+             AND NOT EXISTS (
+                 SELECT 1 FROM _stage_class_member m
+                 WHERE m.code = sc.code AND m.ticker = sc.ticker
+             ))
+            OR (:list_complete AND sc.code NOT IN (SELECT code FROM _stage_class_node))
+        )
+    """
+    params = {"tid": taxonomy_id, "as_of": as_of, "list_complete": list_complete}
+    dropped = db.execute(text(f"""
+        DELETE FROM security_classification sc
+        WHERE {gone} AND sc.effective_from >= CAST(:as_of AS DATE)
+    """), params).rowcount
+    closed = db.execute(text(f"""
+        UPDATE security_classification sc
+        SET effective_to = CAST(:as_of AS DATE) - 1
+        WHERE {gone}
+    """), params).rowcount + dropped
+
+    # Only listed securities (security.ticker); a membership closed and re-added
+    # on the same day re-opens its row.
+    opened = db.execute(text("""
+        INSERT INTO security_classification
+            (ticker, taxonomy_id, code, is_primary, effective_from, effective_to, source, created_at)
+        SELECT DISTINCT m.ticker, :tid, m.code, :primary, CAST(:as_of AS DATE), NULL::date, :source, now()
+        FROM _stage_class_member m
+        JOIN security s ON s.ticker = m.ticker
+        WHERE NOT EXISTS (
+            SELECT 1 FROM security_classification sc
+            WHERE sc.taxonomy_id = :tid AND sc.code = m.code AND sc.ticker = m.ticker
+              AND sc.effective_to IS NULL
+        )
+        ON CONFLICT (ticker, taxonomy_id, code, effective_from) DO UPDATE
+        SET effective_to = NULL
+    """), {"tid": taxonomy_id, "as_of": as_of, "primary": is_primary, "source": SOURCE}).rowcount
+
+    return {
+        "nodes": len(nodes),
+        "synced_nodes": len(members),
+        "members": sum(len(t) for t in members.values()),
+        "opened": opened,
+        "closed": closed,
+    }
+
+
+def sync_naver_classifications(progress_cb=None, as_of: date | None = None) -> dict:
+    scrapers = _load_scrapers()
+    as_of = as_of or date.today()
+    started = time.time()
+    results = {}
+    list_errors = []
+
+    with SessionLocal() as db:
+        ensure_classification_indexes(db)
+        for taxonomy_id, is_primary in ((INDUSTRY_TAXONOMY, True), (THEME_TAXONOMY, False)):
+            try:
+                groups, list_complete = fetch_groups(scrapers, taxonomy_id)
+            except Exception as e:
+                print(f"{taxonomy_id}: list page failed ({e}); skipped.")
+                list_errors.append(f"{taxonomy_id}: {e}")
+                continue
+            if not groups:
+                print(f"{taxonomy_id}: list page returned nothing; skipped.")
+                continue
+            nodes, members, failed = fetch_memberships(scrapers, groups)
+            stats = apply_memberships(
+                db, taxonomy_id, nodes, members, as_of, is_primary=is_primary, list_complete=list_complete
+            )
+            db.commit()
+            stats["failed_nodes"] = len(failed)
+            results[taxonomy_id] = stats
+            if progress_cb:
+                progress_cb(len(results), len(TAXONOMIES))
+            print(
+                f"{taxonomy_id}: {stats['synced_nodes']}/{stats['nodes']} nodes, {stats['members']} members, "
+                f"+{stats['opened']} / -{stats['closed']} memberships, {len(failed)} failed pages"
+            )
+
+    print(f"Naver classification sync done in {time.time() - started:.1f}s (as of {as_of}).")
+    if list_errors:
+        # The other taxonomy is already synced; still report the run as failed.
+        raise RuntimeError(f"list page failed for {'; '.join(list_errors)}")
+    return results
+
+
+if __name__ == "__main__":
+    sync_naver_classifications()
@@ -0,0 +1,198 @@
+"""
+Parallel ingest runner.
+
+Runs several ingest tasks at once, one process each, so independent sources
+(KIS, DART, ECOS, Naver, KRX) finish in max(task) instead of sum(task) time.
+Every child gets its own DB pool (DB_POOL_SIZE) and its share of its
+source's request budget (<SOURCE>_RATE_LIMIT_PER_SEC split across the tasks
+that hit the same source). Children report progress over a queue and the
+parent prints one consolidated table; child output goes to per-task logs.
+A task fails by raising: the loaders log and re-raise instead of returning,
+so a returned call is the only thing reported as SUCCESS.
+
+This module must stay importable without touching ingest.config/ingest.db:
+children are spawned and apply their env overrides before those load.
+"""
+import importlib
+import inspect
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+import traceback
+from dataclasses import dataclass, field
+
+
+@dataclass
+class TaskSpec:
+    module: str
+    func: str
+    source: str
+    kwargs: dict = field(default_factory=dict)
+
+
+TASKS: dict[str, TaskSpec] = {
+    "kis_prices": TaskSpec("ingest.kis_loader", "update_kis_prices_task", "kis"),
+    "kis_backfill": TaskSpec("ingest.price_backfill_job", "resume_or_start_price_backfill", "kis"),
+    "krx_meta": TaskSpec("ingest.krx_loader", "fetch_and_save_krx_list", "krx"),
+    "dart_filings": TaskSpec("ingest.dart_loader", "fetch_and_save_dart_filings", "dart"),
+    "dart_financials": TaskSpec("ingest.dart_financials_loader", "fetch_and_save_company_financials", "dart"),
+    "ecos_series": TaskSpec("ingest.ecos_loader", "fetch_and_save_ecos_series", "ecos"),
+    "naver_industries": TaskSpec("ingest.naver_industry_backfill", "backfill_company_sectors", "naver"),
+    "naver_classifications": TaskSpec("ingest.naver_classification_sync", "sync_naver_classifications", "naver"),
+    "indicator_state": TaskSpec("ingest.indicator_state", "refresh_indicator_states_task", "db"),
+}
+
+PRESETS = {
+    "morning": ["kis_prices", "dart_filings", "ecos_series", "naver_classifications"],
+}
+
+# Total per-source budgets (requests/sec) the runner divides between tasks.
+# Sources without a limiter setting are listed as None.
+SOURCE_RATE_SETTINGS = {
+    "kis": "KIS_RATE_LIMIT_PER_SEC",
+    "dart": "DART_RATE_LIMIT_PER_SEC",
+    "ecos": "ECOS_RATE_LIMIT_PER_SEC",
+    "krx": None,
+    "naver": None,
+    "db": None,
+}
+
+
+def expand_tasks(names: list[str]) -> list[str]:
+    result: list[str] = []
+    for name in names:
+        for task in PRESETS.get(name, [name]):
+            if task not in TASKS:
+                raise ValueError(f"Unknown task: {task} (choices: {', '.join(sorted(TASKS) + sorted(PRESETS))})")
+            if task not in result:
+                result.append(task)
+    return result
+
+
+def _child_env(tasks: list[str], pool_size: int) -> dict[str, dict[str, str]]:
+    from ingest.config import settings
+
+    per_source: dict[str, int] = {}
+    for task in tasks:
+        per_source[TASKS[task].source] = per_source.get(TASKS[task].source, 0) + 1
+
+    envs = {}
+    for task in tasks:
+        source = TASKS[task].source
+        env = {"DB_POOL_SIZE": str(pool_size), "DB_MAX_OVERFLOW": str(pool_size)}
+        setting = SOURCE_RATE_SETTINGS.get(source)
+        if setting:
+            total = float(os.environ.get(setting) or getattr(settings, setting))
+            env[setting] = str(total / per_source[source])
+        envs[task] = env
+    return envs
+
+
+def _run_task(task: str, events) -> None:
+    """Call the task function and report ("done" | "failed", task, elapsed, note) on events."""
+    started = time.time()
+    try:
+        spec = TASKS[task]
+        func = getattr(importlib.import_module(spec.module), spec.func)
+        kwargs = dict(spec.kwargs)
+
+        def progress_cb(processed: int, total: int | None = None):
+            events.put(("progress", task, processed, total))
+
+        if "progress_cb" in inspect.signature(func).parameters:
+            kwargs["progress_cb"] = progress_cb
+        func(**kwargs)
+        events.put(("done", task, time.time() - started, None))
+    except BaseException as exc:
+        traceback.print_exc()
+        events.put(("failed", task, time.time() - started, f"{type(exc).__name__}: {exc}"[:200]))
+
+
+def _run_child(task: str, env: dict[str, str], events, log_dir: str) -> None:
+    os.environ.update(env)
+    os.makedirs(log_dir, exist_ok=True)
+    log_file = open(os.path.join(log_dir, f"ingest_{task}.log"), "a", encoding="utf-8", buffering=1)
+    sys.stdout = log_file
+    sys.stderr = log_file
+    print(f"=== {task} start {time.strftime('%Y-%m-%d %H:%M:%S')} env={env} ===")
+    try:
+        _run_task(task, events)
+    finally:
+        print(f"=== {task} end {time.strftime('%Y-%m-%d %H:%M:%S')} ===")
+        log_file.flush()
+
+
+def _format_table(state: dict[str, dict], started: float) -> str:
+    lines = [f"{'task':<18}{'source':<8}{'status':<9}{'progress':>18}{'elapsed':>10}  note"]
+    for task, info in state.items():
+        processed, total = info["processed"], info["total"]
+        if total:
+            progress = f"{processed}/{total} {processed * 100 // max(total, 1):>3}%"
+        else:
+            progress = str(processed) if processed else "-"
+        elapsed = (info["finished"] or time.time()) - (info["started"] or started)
+        lines.append(
+            f"{task:<18}{TASKS[task].source:<8}{info['status']:<9}{progress:>18}{elapsed:>9.0f}s  {info['note'] or ''}"
+        )
+    return "\n".join(lines)
+
+
+def run_parallel(
+    task_names: list[str],
+    pool_size: int = 3,
+    log_dir: str = "artifacts",
+    refresh_sec: float = 5.0,
+) -> bool:
+    """Run tasks concurrently; returns True when every task succeeded."""
+    tasks = expand_tasks(task_names)
+    envs = _child_env(tasks, pool_size)
+    ctx = mp.get_context("spawn")
+    events = ctx.Queue()
+    started = time.time()
+    state = {
+        task: {"status": "RUNNING", "processed": 0, "total": None, "started": started, "finished": None, "note": None}
+        for task in tasks
+    }
+    procs = {}
+    for task in tasks:
+        proc = ctx.Process(target=_run_child, args=(task, envs[task], events, log_dir), name=f"ingest-{task}")
+        proc.start()
+        procs[task] = proc
+    print(f"Parallel ingest: {', '.join(tasks)} (logs: {os.path.abspath(log_dir)}/ingest_<task>.log)")
+
+    last_print = 0.0
+    while True:
+        try:
+            kind, task, a, b = events.get(timeout=1.0)
+            info = state[task]
+            if kind == "progress":
+                info["processed"] = a
+                if b is not None:
+                    info["total"] = b
+            else:
+                info["status"] = "SUCCESS" if kind == "done" else "FAILED"
+                info["finished"] = started + a
+                info["note"] = b
+        except queue.Empty:
+            pass
+
+        for task, proc in procs.items():
+            if not proc.is_alive() and state[task]["status"] == "RUNNING":
+                # Drain late events first; a silent exit means the child died.
+                if events.empty():
+                    state[task].update(status="FAILED", finished=time.time(), note=f"exit code {proc.exitcode}")
+
+        running = any(info["status"] == "RUNNING" for info in state.values())
+        if not running or time.time() - last_print >= refresh_sec:
+            print(_format_table(state, started), flush=True)
+            print("", flush=True)
+            last_print = time.time()
+        if not running:
+            break
+
+    for proc in procs.values():
+        proc.join(timeout=5)
+    print(f"Parallel ingest finished in {time.time() - started:.1f}s")
+    return all(info["status"] == "SUCCESS" for info in state.values())
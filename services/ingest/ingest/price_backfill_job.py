@@ -0,0 +1,178 @@
+"""
+Resumable KIS price backfill on top of ingest.work_queue.
+
+plan_price_backfill_job() turns the backfill plan into work items;
+run_price_backfill_job() drains them with a pool of threads. Each item's rows
+and its DONE checkpoint are committed in the same transaction, so a crash
+never loses written rows nor redoes a finished ticker.
+"""
+import os
+import socket
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from ingest.backfill_planner import (
+    FetchRange,
+    describe_plan,
+    load_expected_sessions,
+    plan_backfill,
+    record_checked_range,
+)
+from ingest.bulk_writer import upsert_price_daily
+from ingest.db import SessionLocal
+from ingest.indicator_state import invalidate_states
+from ingest.kis_client import KisClient
+from ingest.kis_loader import parse_daily_history_row
+from ingest import work_queue
+
+JOB_TYPE = "kis_price_backfill"
+
+
+def plan_price_backfill_job(
+    start_date: date,
+    end_date: date,
+    tickers: list[str] | None = None,
+    full: bool = False,
+    log=print,
+) -> int | None:
+    """Create a job for the missing ranges (or the whole window with full=True)."""
+    with SessionLocal() as db:
+        work_queue.ensure_queue_tables(db)
+        if not tickers:
+            tickers = [r[0] for r in db.execute(text("SELECT ticker FROM security ORDER BY ticker")).fetchall()]
+        if full:
+            plan = [FetchRange(ticker, start_date, end_date, 0) for ticker in tickers]
+        else:
+            sessions = load_expected_sessions(start_date, end_date)
+            plan = plan_backfill(db, tickers, start_date, end_date, sessions=sessions)
+            log(describe_plan(plan, len(tickers), len(sessions)))
+        if not plan:
+            return None
+        return work_queue.create_job(
+            db,
+            JOB_TYPE,
+            [(r.ticker, r.start, r.end) for r in plan],
+            params={"start": start_date, "end": end_date, "full": full, "tickers": len(tickers)},
+        )
+
+
+def process_item(kis: KisClient, item: work_queue.WorkItem) -> int:
+    """
+    Fetch and write one item. A failed fetch raises (KisRequestError), so the
+    caller routes it to fail_item's retry/backoff; only a successful response
+    (possibly with no bars) completes the item and marks its range checked,
+    so sessions KIS has no bar for are not planned again.
+    """
+    rows = kis.get_stock_daily_history(
+        item.ticker, item.start_date.strftime("%Y%m%d"), item.end_date.strftime("%Y%m%d"), raise_on_error=True
+    )
+    parsed = [r for r in (parse_daily_history_row(item.ticker, row) for row in rows or []) if r]
+    with SessionLocal() as db:
+        if parsed:
+            upsert_price_daily(db, parsed)
+            invalidate_states(db, item.ticker, min(r[1] for r in parsed))
+        record_checked_range(db, item.ticker, item.start_date, item.end_date)
+        work_queue.complete_item(db, item.item_id, len(parsed))
+        db.commit()
+    return len(parsed)
+
+
+def run_price_backfill_job(
+    job_id: int,
+    kis: KisClient | None = None,
+    workers: int = 5,
+    max_attempts: int = 5,
+    lease_sec: int = 300,
+    log=print,
+    progress_cb=None,
+) -> dict | None:
+    """
+    Drain a job with `workers` threads until no item is pending or leased.
+    Returns the final job progress.
+    """
+    kis = kis or KisClient()
+    owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+    counters = {"done": 0, "failed": 0, "rows": 0}
+    lock = threading.Lock()
+    started = time.time()
+
+    def report():
+        if not progress_cb:
+            return
+        with SessionLocal() as db:
+            progress = work_queue.job_progress(db, job_id=job_id)
+        if progress:
+            progress_cb(progress["done"], progress["total"])
+
+    def worker(index: int):
+        owner = f"{owner_prefix}:{index}"
+        while True:
+            with SessionLocal() as db:
+                items = work_queue.lease_items(db, job_id, owner, limit=1, lease_sec=lease_sec)
+                if not items:
+                    wait = work_queue.seconds_until_next_item(db, job_id)
+                    if wait is None:
+                        return
+            if not items:
+                time.sleep(min(max(wait, 1.0), 5.0))
+                continue
+
+            item = items[0]
+            try:
+                rows = process_item(kis, item)
+            except Exception as exc:
+                with SessionLocal() as db:
+                    status = work_queue.fail_item(db, item, str(exc), max_attempts=max_attempts)
+                log(f"FAIL {item.ticker} {item.start_date}~{item.end_date} (attempt {item.attempts}, {status}): {exc}")
+                with lock:
+                    counters["failed"] += 1
+                continue
+
+            with lock:
+                counters["done"] += 1
+                counters["rows"] += rows
+                done = counters["done"]
+            if done % 50 == 0:
+                elapsed = max(time.time() - started, 1e-9)
+                log(f"Progress: {done} items this run, {counters['rows']} rows ({done / elapsed:.1f} items/sec)")
+                report()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with SessionLocal() as db:
+        status = work_queue.finish_job(db, job_id)
+        progress = work_queue.job_progress(db, job_id=job_id)
+    report()
+    log(
+        f"Job {job_id} {status}: {counters['done']} items done this run, {counters['failed']} failed attempts, "
+        f"{counters['rows']} rows in {time.time() - started:.1f}s"
+    )
+    return progress
+
+
+def resume_or_start_price_backfill(sessions: int = 252, workers: int = 5, full: bool = False, progress_cb=None):
+    """Entry point for the API trigger: resume the unfinished job if any, else plan a new one."""
+    from ingest.trading_calendar import get_trading_calendar
+
+    with SessionLocal() as db:
+        work_queue.ensure_queue_tables(db)
+        job_id = work_queue.find_resumable_job(db, JOB_TYPE)
+    if job_id is None:
+        end_date = date.today()
+        start_date = get_trading_calendar().sessions_back(end_date, sessions - 1)
+        job_id = plan_price_backfill_job(start_date, end_date, full=full)
+        if job_id is None:
+            print("KIS backfill: nothing missing.")
+            return None
+    progress = run_price_backfill_job(job_id, workers=workers, progress_cb=progress_cb)
+    if progress and progress["failed"]:
+        # Items that used up their retries stay FAILED in the queue; the run is not a success.
+        raise RuntimeError(f"KIS backfill job {job_id}: {progress['failed']} of {progress['total']} items failed")
+    return progress
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket limiter shared by threads and asyncio tasks.
+    Callers reserve a slot under the lock and then sleep outside of it,
+    so waiting callers are served in arrival order. `capacity` is the burst
+    allowed on top of the steady rate; the default of one token means a fresh
+    bucket paces from the first call instead of spending a second's quota at once.
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float | None = None):
+        if rate_per_sec <= 0:
+            raise ValueError("rate_per_sec must be positive")
+        self.rate = float(rate_per_sec)
+        self.capacity = float(capacity) if capacity is not None else 1.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_SOURCE_LIMITERS: dict[str, TokenBucket] = {}
+_SOURCE_LOCK = threading.Lock()
+
+
+def get_source_limiter(source: str) -> TokenBucket:
+    """
+    Process-wide limiter for an upstream source ("kis", "dart", "ecos", ...),
+    sized from settings.<SOURCE>_RATE_LIMIT_PER_SEC (burst from the optional
+    <SOURCE>_RATE_LIMIT_BURST). The parallel runner gives each child process
+    its share of the budget through that setting.
+    """
+    limiter = _SOURCE_LIMITERS.get(source)
+    if limiter is not None:
+        return limiter
+    from ingest.config import settings
+
+    with _SOURCE_LOCK:
+        limiter = _SOURCE_LIMITERS.get(source)
+        if limiter is None:
+            rate = getattr(settings, f"{source.upper()}_RATE_LIMIT_PER_SEC")
+            limiter = TokenBucket(rate, getattr(settings, f"{source.upper()}_RATE_LIMIT_BURST", None))
+            _SOURCE_LIMITERS[source] = limiter
+    return limiter
@@ -0,0 +1,398 @@
+"""
+Shared KIS OAuth token cache.
+
+KIS issues at most one token per minute per app key (EGW00133) and each token
+is valid for 24h, so every process (API, worker, scripts) should reuse the
+same token instead of asking for its own. Tokens are kept in memory, then in
+a store shared between processes:
+
+- FileTokenStore: JSON file guarded by an OS file lock (default).
+- DbTokenStore: kis_token_cache table guarded by a Postgres advisory lock.
+- MemoryTokenStore: process-local, for tests and benchmarks.
+
+Only one caller issues a new token at a time (thread lock + store lock);
+the rest pick up the token it saved.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from ingest import metrics
+from ingest.config import settings
+
+metrics.describe("kis_token_requests_total", "KIS token lookups by where the token came from.")
+
+
+class KisTokenRateLimited(Exception):
+    """KIS refused to issue a token because one was issued in the last minute (EGW00133)."""
+
+
+@dataclass
+class CachedToken:
+    access_token: str
+    expires_at: float
+    issued_at: float
+
+    def valid_for(self, now: float | None = None) -> float:
+        return self.expires_at - (now if now is not None else time.time())
+
+    def to_dict(self) -> dict:
+        return {"access_token": self.access_token, "expires_at": self.expires_at, "issued_at": self.issued_at}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CachedToken | None":
+        try:
+            return cls(str(data["access_token"]), float(data["expires_at"]), float(data.get("issued_at") or 0))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @classmethod
+    def from_response(cls, payload: dict) -> "CachedToken":
+        now = time.time()
+        try:
+            expires_in = float(payload.get("expires_in") or 86400)
+        except (TypeError, ValueError):
+            expires_in = 86400.0
+        return cls(payload["access_token"], now + expires_in, now)
+
+
+def token_cache_key(base_url: str, app_key: str | None) -> str:
+    return hashlib.sha1(f"{base_url}|{app_key or ''}".encode("utf-8")).hexdigest()[:16]
+
+
+class MemoryTokenStore:
+    def __init__(self):
+        self._tokens: dict[str, CachedToken] = {}
+        self._lock = threading.Lock()
+
+    def load(self, key: str) -> CachedToken | None:
+        return self._tokens.get(key)
+
+    def save(self, key: str, token: CachedToken) -> None:
+        self._tokens[key] = token
+
+    def delete(self, key: str) -> None:
+        self._tokens.pop(key, None)
+
+    @contextmanager
+    def lock(self, key: str):
+        with self._lock:
+            yield
+
+
+@contextmanager
+def _file_lock(path: str):
+    fh = open(path, "a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    finally:
+        fh.close()
+
+
+class FileTokenStore:
+    """
+    Tokens for all app keys in one JSON file. Writes go through a temp file +
+    os.replace so readers never see a partial file; save/delete must be called
+    while holding lock().
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.path.join(os.path.expanduser("~"), ".cache", "stockmanager", "kis_token.json")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def _read_all(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write_all(self, data: dict) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        if os.name != "nt":
+            os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+    def load(self, key: str) -> CachedToken | None:
+        entry = self._read_all().get(key)
+        return CachedToken.from_dict(entry) if isinstance(entry, dict) else None
+
+    def save(self, key: str, token: CachedToken) -> None:
+        now = time.time()
+        data = {
+            k: v for k, v in self._read_all().items()
+            if isinstance(v, dict) and float(v.get("expires_at") or 0) > now
+        }
+        data[key] = token.to_dict()
+        self._write_all(data)
+
+    def delete(self, key: str) -> None:
+        data = self._read_all()
+        if data.pop(key, None) is not None:
+            self._write_all(data)
+
+    @contextmanager
+    def lock(self, key: str):
+        with _file_lock(f"{self.path}.lock"):
+            yield
+
+
+class DbTokenStore:
+    """Tokens in kis_token_cache; issuance serialized with pg_advisory_lock."""
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from ingest.db import engine as default_engine
+
+            engine = default_engine
+        self.engine = engine
+        self._table_ready = False
+
+    def _ensure_table(self, conn) -> None:
+        if self._table_ready:
+            return
+        from sqlalchemy import text
+
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS kis_token_cache (
+                cache_key TEXT PRIMARY KEY,
+                access_token TEXT NOT NULL,
+                expires_at DOUBLE PRECISION NOT NULL,
+                issued_at DOUBLE PRECISION NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """))
+        self._table_ready = True
+
+    def load(self, key: str) -> CachedToken | None:
+        from sqlalchemy import text
+
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            row = conn.execute(
+                text("SELECT access_token, expires_at, issued_at FROM kis_token_cache WHERE cache_key = :k"),
+                {"k": key},
+            ).mappings().first()
+        return CachedToken.from_dict(dict(row)) if row else None
+
+    def save(self, key: str, token: CachedToken) -> None:
+        from sqlalchemy import text
+
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            conn.execute(text("""
+                INSERT INTO kis_token_cache (cache_key, access_token, expires_at, issued_at, updated_at)
+                VALUES (:k, :t, :e, :i, NOW())
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    access_token = EXCLUDED.access_token,
+                    expires_at = EXCLUDED.expires_at,
+                    issued_at = EXCLUDED.issued_at,
+                    updated_at = NOW()
+            """), {"k": key, "t": token.access_token, "e": token.expires_at, "i": token.issued_at})
+
+    def delete(self, key: str) -> None:
+        from sqlalchemy import text
+
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            conn.execute(text("DELETE FROM kis_token_cache WHERE cache_key = :k"), {"k": key})
+
+    @contextmanager
+    def lock(self, key: str):
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(hashtext(:k))"), {"k": f"kis_token:{key}"})
+            conn.commit()
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(hashtext(:k))"), {"k": f"kis_token:{key}"})
+                conn.commit()
+
+
+class KisTokenProvider:
+    """
+    Hands out a valid token for a cache key, issuing a new one only when the
+    shared store has none that is still valid for refresh_margin_sec.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        refresh_margin_sec: float | None = None,
+        rate_limit_wait_sec: float | None = None,
+        poll_interval_sec: float = 1.0,
+    ):
+        self.store = store if store is not None else MemoryTokenStore()
+        self.refresh_margin_sec = (
+            settings.KIS_TOKEN_REFRESH_MARGIN_SEC if refresh_margin_sec is None else refresh_margin_sec
+        )
+        self.rate_limit_wait_sec = (
+            settings.KIS_TOKEN_RATE_LIMIT_WAIT_SEC if rate_limit_wait_sec is None else rate_limit_wait_sec
+        )
+        self.poll_interval_sec = poll_interval_sec
+        self._memory: dict[str, CachedToken] = {}
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        # key -> time before which issuing is known to hit EGW00133
+        self._rate_limited_until: dict[str, float] = {}
+
+    def _fresh(self, token: CachedToken | None) -> bool:
+        return token is not None and token.valid_for() > self.refresh_margin_sec
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._guard:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _load_store(self, key: str) -> CachedToken | None:
+        try:
+            return self.store.load(key)
+        except Exception as exc:
+            print(f"KIS token store read failed: {exc}")
+            metrics.inc("kis_token_store_errors_total", op="load")
+            return None
+
+    def _remember(self, key: str, token: CachedToken, source: str) -> str:
+        self._memory[key] = token
+        metrics.inc("kis_token_requests_total", source=source)
+        return token.access_token
+
+    def get_token(self, key: str, issue) -> str:
+        """
+        issue() must return a CachedToken or raise KisTokenRateLimited.
+        While issuing is rate limited, callers wait for a peer's token without
+        holding the key lock (invalidate() and other keys are never stalled),
+        and none of them calls issue() again before the window has passed.
+        """
+        token = self._memory.get(key)
+        if self._fresh(token):
+            return self._remember(key, token, "memory")
+
+        with self._key_lock(key):
+            token = self._memory.get(key)
+            if self._fresh(token):
+                return self._remember(key, token, "memory")
+            token = self._load_store(key)
+            if self._fresh(token):
+                return self._remember(key, token, "store")
+
+            if time.time() >= self._rate_limited_until.get(key, 0.0):
+                with self.store.lock(key):
+                    token = self._load_store(key)
+                    if self._fresh(token):
+                        return self._remember(key, token, "store")
+                    try:
+                        return self._issue(key, issue)
+                    except KisTokenRateLimited:
+                        metrics.inc("kis_token_requests_total", source="rate_limited")
+                        self._rate_limited_until[key] = time.time() + self.rate_limit_wait_sec
+
+        return self._wait_for_peer(key, issue)
+
+    def _issue(self, key: str, issue) -> str:
+        started = time.time()
+        try:
+            token = issue()
+        except KisTokenRateLimited:
+            raise
+        except Exception:
+            metrics.inc("kis_token_requests_total", source="failed")
+            raise
+        metrics.inc("kis_token_issue_seconds_total", time.time() - started)
+        try:
+            self.store.save(key, token)
+        except Exception as exc:
+            print(f"KIS token store write failed: {exc}")
+            metrics.inc("kis_token_store_errors_total", op="save")
+        return self._remember(key, token, "issued")
+
+    def _wait_for_peer(self, key: str, issue) -> str:
+        """
+        EGW00133 means someone issued a token within the last minute. Use any
+        token that has not actually expired yet, otherwise poll the store for
+        the peer's token and only re-issue once the window has passed.
+        """
+        for token in (self._memory.get(key), self._load_store(key)):
+            if token is not None and token.valid_for() > 0:
+                return self._remember(key, token, "stale")
+
+        deadline = self._rate_limited_until.get(key, time.time())
+        while time.time() < deadline:
+            time.sleep(min(self.poll_interval_sec, max(deadline - time.time(), 0.0)))
+            token = self._memory.get(key) or self._load_store(key)
+            if self._fresh(token):
+                return self._remember(key, token, "store")
+
+        with self._key_lock(key):
+            token = self._memory.get(key)
+            if self._fresh(token):
+                return self._remember(key, token, "memory")
+            with self.store.lock(key):
+                token = self._load_store(key)
+                if self._fresh(token):
+                    return self._remember(key, token, "store")
+                self._rate_limited_until.pop(key, None)
+                return self._issue(key, issue)
+
+    def invalidate(self, key: str, access_token: str | None = None) -> None:
+        """Drop a token the API rejected. Only removes it if it is still the cached one."""
+        with self._key_lock(key):
+            current = self._memory.get(key)
+            if current and (access_token is None or current.access_token == access_token):
+                self._memory.pop(key, None)
+            with self.store.lock(key):
+                stored = self._load_store(key)
+                if stored and (access_token is None or stored.access_token == access_token):
+                    self.store.delete(key)
+
+
+_PROVIDER: KisTokenProvider | None = None
+_PROVIDER_LOCK = threading.Lock()
+
+
+def _build_store():
+    backend = (settings.KIS_TOKEN_STORE or "file").lower()
+    if backend == "db":
+        return DbTokenStore()
+    if backend == "memory":
+        return MemoryTokenStore()
+    return FileTokenStore(settings.KIS_TOKEN_CACHE_PATH)
+
+
+def get_token_provider() -> KisTokenProvider:
+    global _PROVIDER
+    if _PROVIDER is None:
+        with _PROVIDER_LOCK:
+            if _PROVIDER is None:
+                _PROVIDER = KisTokenProvider(_build_store())
+    return _PROVIDER
@@ -0,0 +1,169 @@
+"""
+KRX trading calendar.
+
+Session days are weekdays that are not exchange holidays. For years listed in
+KRX_HOLIDAYS the table is authoritative; for other years inside the span of
+loaded price data, a weekday counts as a session only if price_daily has
+bars for it, and outside that span every weekday is assumed to trade.
+
+Lookups are O(1): the calendar precomputes, for every calendar day in its
+range, the index of the last session on or before that day.
+"""
+import threading
+import time
+from datetime import date, timedelta
+from typing import Iterable
+
+from sqlalchemy import text
+
+# KRX closures on weekdays (public holidays, substitutes, election days,
+# year-end close). Update when KRX publishes the next year's schedule.
+KRX_HOLIDAYS: dict[int, frozenset[date]] = {
+    2024: frozenset(date(2024, m, d) for m, d in [
+        (1, 1), (2, 9), (2, 12), (3, 1), (4, 10), (5, 1), (5, 6), (5, 15), (6, 6),
+        (8, 15), (9, 16), (9, 17), (9, 18), (10, 1), (10, 3), (10, 9), (12, 25), (12, 31),
+    ]),
+    2025: frozenset(date(2025, m, d) for m, d in [
+        (1, 1), (1, 27), (1, 28), (1, 29), (1, 30), (3, 3), (5, 1), (5, 5), (5, 6), (6, 3),
+        (6, 6), (8, 15), (10, 3), (10, 6), (10, 7), (10, 8), (10, 9), (12, 25), (12, 31),
+    ]),
+    2026: frozenset(date(2026, m, d) for m, d in [
+        (1, 1), (2, 16), (2, 17), (2, 18), (3, 2), (5, 1), (5, 5), (5, 25), (6, 3),
+        (8, 17), (9, 24), (9, 25), (10, 5), (10, 9), (12, 25), (12, 31),
+    ]),
+}
+
+
+class TradingCalendar:
+    def __init__(
+        self,
+        start: date,
+        end: date,
+        holidays: dict[int, frozenset[date]] | None = None,
+        observed: Iterable[date] = (),
+    ):
+        if end < start:
+            raise ValueError("end must not be before start")
+        holidays = KRX_HOLIDAYS if holidays is None else holidays
+        observed_set = set(observed)
+        obs_min = min(observed_set) if observed_set else None
+        obs_max = max(observed_set) if observed_set else None
+
+        self.start = start
+        self.end = end
+        self._base = start.toordinal()
+        days = end.toordinal() - self._base + 1
+
+        sessions: list[date] = []
+        floor_idx = [-1] * days
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            if day.weekday() < 5:
+                if day.year in holidays:
+                    is_session = day not in holidays[day.year]
+                elif obs_min is not None and obs_min <= day <= obs_max:
+                    is_session = day in observed_set
+                else:
+                    is_session = True
+                if is_session:
+                    sessions.append(day)
+            floor_idx[offset] = len(sessions) - 1
+
+        self.sessions = sessions
+        self._floor = floor_idx
+        self._session_set = frozenset(sessions)
+
+    def _offset(self, day: date) -> int:
+        offset = day.toordinal() - self._base
+        if offset < 0 or offset >= len(self._floor):
+            raise ValueError(f"{day} is outside the calendar range {self.start}~{self.end}")
+        return offset
+
+    def _floor_index(self, day: date) -> int:
+        """Index of the last session on or before day (-1 if none)."""
+        return self._floor[self._offset(day)]
+
+    def is_session(self, day: date) -> bool:
+        return day in self._session_set
+
+    def latest_session(self, on_or_before: date | None = None) -> date | None:
+        idx = self._floor_index(on_or_before or date.today())
+        return self.sessions[idx] if idx >= 0 else None
+
+    def prev_session(self, day: date) -> date | None:
+        idx = self._floor_index(day)
+        if idx >= 0 and self.sessions[idx] == day:
+            idx -= 1
+        return self.sessions[idx] if idx >= 0 else None
+
+    def next_session(self, day: date) -> date | None:
+        idx = self._floor_index(day) + 1
+        return self.sessions[idx] if idx < len(self.sessions) else None
+
+    def sessions_between(self, start: date, end: date) -> list[date]:
+        """Sessions in [start, end], inclusive."""
+        if end < start:
+            return []
+        first = self._floor_index(start - timedelta(days=1)) + 1 if start > self.start else 0
+        last = self._floor_index(end)
+        return self.sessions[first:last + 1]
+
+    def count_sessions(self, start: date, end: date) -> int:
+        return len(self.sessions_between(start, end))
+
+    def sessions_back(self, day: date, count: int) -> date | None:
+        """The session `count` sessions before the latest session on/before day."""
+        idx = self._floor_index(day) - count
+        return self.sessions[idx] if 0 <= idx < len(self.sessions) else None
+
+
+_CALENDAR: TradingCalendar | None = None
+_CALENDAR_AT = 0.0
+_CALENDAR_LOCK = threading.Lock()
+_CALENDAR_TTL_SEC = 6 * 3600
+
+
+def load_observed_sessions(db) -> list[date]:
+    """Distinct price_daily trade dates via a loose index scan on idx_price_daily_date."""
+    rows = db.execute(text("""
+        WITH RECURSIVE d AS (
+            (SELECT trade_date FROM price_daily ORDER BY trade_date LIMIT 1)
+            UNION ALL
+            SELECT (
+                SELECT p.trade_date FROM price_daily p
+                WHERE p.trade_date > d.trade_date
+                ORDER BY p.trade_date
+                LIMIT 1
+            )
+            FROM d
+            WHERE d.trade_date IS NOT NULL
+        )
+        SELECT trade_date FROM d WHERE trade_date IS NOT NULL
+    """)).fetchall()
+    return [row[0] for row in rows]
+
+
+def get_trading_calendar(refresh: bool = False) -> TradingCalendar:
+    """
+    Process-wide calendar covering 2000-01-01 through two years ahead,
+    rebuilt from price_daily every few hours.
+    """
+    global _CALENDAR, _CALENDAR_AT
+    now = time.time()
+    if _CALENDAR is not None and not refresh and now - _CALENDAR_AT < _CALENDAR_TTL_SEC:
+        return _CALENDAR
+    with _CALENDAR_LOCK:
+        if _CALENDAR is not None and not refresh and now - _CALENDAR_AT < _CALENDAR_TTL_SEC:
+            return _CALENDAR
+        observed: list[date] = []
+        try:
+            from ingest.db import SessionLocal
+
+            with SessionLocal() as db:
+                observed = load_observed_sessions(db)
+        except Exception as exc:
+            print(f"Trading calendar: could not load observed sessions ({exc}); using holiday table only")
+        today = date.today()
+        _CALENDAR = TradingCalendar(date(2000, 1, 1), date(today.year + 2, 12, 31), observed=observed)
+        _CALENDAR_AT = now
+        return _CALENDAR
@@ -0,0 +1,88 @@
+"""
+High-water marks for incremental ingests.
+
+One row per source: the newest date/key already stored. Loaders read it to
+ask upstream only for newer data and advance it after a clean run.
+
+ingest_data_version keeps a per-key "last written" time for a source (e.g.
+one row per ticker for price_daily), which readers use as a data version.
+"""
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import text
+
+from ingest.ddl import ensure_ddl
+
+_TABLE_READY = False
+
+
+@dataclass
+class Watermark:
+    source: str
+    last_date: date | None
+    last_key: str | None
+
+
+def ensure_watermark_table(db) -> None:
+    global _TABLE_READY
+    if _TABLE_READY:
+        return
+    ensure_ddl(db, [
+        """
+        CREATE TABLE IF NOT EXISTS ingest_watermark (
+          source     TEXT PRIMARY KEY,
+          last_date  DATE,
+          last_key   TEXT,
+          updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ingest_data_version (
+          source     TEXT NOT NULL,
+          key        TEXT NOT NULL,
+          updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+          PRIMARY KEY (source, key)
+        )
+        """,
+    ])
+    _TABLE_READY = True
+
+
+def get_watermark(db, source: str) -> Watermark | None:
+    ensure_watermark_table(db)
+    row = db.execute(
+        text("SELECT source, last_date, last_key FROM ingest_watermark WHERE source = :s"), {"s": source}
+    ).fetchone()
+    return Watermark(*row) if row else None
+
+
+def advance_watermark(db, source: str, last_date: date | None, last_key: str | None) -> None:
+    """Move the mark forward (never back: keys compare as text, dates as dates). Commits."""
+    ensure_watermark_table(db)
+    db.execute(text("""
+        INSERT INTO ingest_watermark (source, last_date, last_key, updated_at)
+        VALUES (:s, :d, :k, now())
+        ON CONFLICT (source) DO UPDATE SET
+          last_date = GREATEST(ingest_watermark.last_date, EXCLUDED.last_date),
+          last_key = GREATEST(ingest_watermark.last_key, EXCLUDED.last_key),
+          updated_at = now()
+    """), {"s": source, "d": last_date, "k": last_key})
+    db.commit()
+
+
+
+def touch_versions(db, source: str, keys: list[str]) -> None:
+    """
+    Record that `keys` of `source` changed (updated_at = now()). Does not
+    commit, so the touch lands atomically with the caller's writes; readers
+    use updated_at as a per-key data version (e.g. the API's signal cache).
+    """
+    if not keys:
+        return
+    ensure_watermark_table(db)
+    db.execute(text("""
+        INSERT INTO ingest_data_version (source, key, updated_at)
+        SELECT :s, k, now() FROM unnest(CAST(:keys AS TEXT[])) AS k
+        ON CONFLICT (source, key) DO UPDATE SET updated_at = now()
+    """), {"s": source, "keys": sorted(set(keys))})
@@ -0,0 +1,215 @@
+"""
+Persistent work queue for long backfills.
+
+A job is a set of work items (ticker x date range). Workers lease items with
+FOR UPDATE SKIP LOCKED, so several threads or processes can drain one job;
+a crashed worker's lease simply expires and the item is picked up again.
+Failed items are retried with exponential backoff until max_attempts.
+Finished items stay DONE, so re-running a job resumes where it stopped.
+"""
+import json
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import text
+
+from ingest.ddl import ensure_ddl
+
+PENDING = "PENDING"
+LEASED = "LEASED"
+DONE = "DONE"
+FAILED = "FAILED"
+
+_TABLES_READY = False
+
+
+@dataclass
+class WorkItem:
+    item_id: int
+    job_id: int
+    ticker: str
+    start_date: date
+    end_date: date
+    attempts: int
+
+
+def ensure_queue_tables(db) -> None:
+    global _TABLES_READY
+    if _TABLES_READY:
+        return
+    ensure_ddl(db, [
+        """
+        CREATE TABLE IF NOT EXISTS backfill_job (
+          job_id      BIGSERIAL PRIMARY KEY,
+          job_type    TEXT NOT NULL,
+          status      TEXT NOT NULL DEFAULT 'RUNNING',
+          params      JSONB,
+          created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+          updated_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+          finished_at TIMESTAMPTZ
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS backfill_work_item (
+          item_id          BIGSERIAL PRIMARY KEY,
+          job_id           BIGINT NOT NULL REFERENCES backfill_job(job_id) ON DELETE CASCADE,
+          ticker           TEXT NOT NULL,
+          start_date       DATE NOT NULL,
+          end_date         DATE NOT NULL,
+          status           TEXT NOT NULL DEFAULT 'PENDING',
+          attempts         INTEGER NOT NULL DEFAULT 0,
+          lease_owner      TEXT,
+          lease_expires_at TIMESTAMPTZ,
+          next_attempt_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+          rows_written     INTEGER,
+          last_error       TEXT,
+          updated_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_backfill_work_item_job_status
+        ON backfill_work_item(job_id, status, next_attempt_at)
+        """,
+    ])
+    _TABLES_READY = True
+
+
+def create_job(db, job_type: str, items: list[tuple[str, date, date]], params: dict | None = None) -> int:
+    """Create a job with its work items in one transaction. Commits."""
+    job_id = db.execute(
+        text("INSERT INTO backfill_job (job_type, params) VALUES (:t, CAST(:p AS JSONB)) RETURNING job_id"),
+        {"t": job_type, "p": json.dumps(params or {}, default=str)},
+    ).scalar()
+    if items:
+        db.execute(
+            text("""
+                INSERT INTO backfill_work_item (job_id, ticker, start_date, end_date)
+                VALUES (:job_id, :ticker, :start_date, :end_date)
+            """),
+            [{"job_id": job_id, "ticker": t, "start_date": s, "end_date": e} for t, s, e in items],
+        )
+    db.commit()
+    return job_id
+
+
+def find_resumable_job(db, job_type: str) -> int | None:
+    """Latest job of this type that still has unfinished items."""
+    return db.execute(text("""
+        SELECT j.job_id
+        FROM backfill_job j
+        WHERE j.job_type = :t
+          AND j.status = 'RUNNING'
+          AND EXISTS (
+              SELECT 1 FROM backfill_work_item w
+              WHERE w.job_id = j.job_id AND w.status IN ('PENDING', 'LEASED')
+          )
+        ORDER BY j.job_id DESC
+        LIMIT 1
+    """), {"t": job_type}).scalar()
+
+
+def lease_items(db, job_id: int, worker_id: str, limit: int = 1, lease_sec: int = 300) -> list[WorkItem]:
+    """Claim up to `limit` due items (pending, or leased with an expired lease). Commits."""
+    rows = db.execute(text("""
+        UPDATE backfill_work_item w
+        SET status = 'LEASED',
+            lease_owner = :owner,
+            lease_expires_at = now() + make_interval(secs => :lease_sec),
+            attempts = w.attempts + 1,
+            updated_at = now()
+        WHERE w.item_id IN (
+            SELECT item_id
+            FROM backfill_work_item
+            WHERE job_id = :job_id
+              AND (
+                  (status = 'PENDING' AND next_attempt_at <= now())
+                  OR (status = 'LEASED' AND lease_expires_at < now())
+              )
+            ORDER BY item_id
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING w.item_id, w.job_id, w.ticker, w.start_date, w.end_date, w.attempts
+    """), {"owner": worker_id, "lease_sec": lease_sec, "job_id": job_id, "limit": limit}).fetchall()
+    db.commit()
+    return [WorkItem(*row) for row in rows]
+
+
+def complete_item(db, item_id: int, rows_written: int) -> None:
+    """Mark an item DONE. Does not commit, so callers can checkpoint it atomically with their writes."""
+    db.execute(text("""
+        UPDATE backfill_work_item
+        SET status = 'DONE', rows_written = :rows, lease_owner = NULL,
+            lease_expires_at = NULL, last_error = NULL, updated_at = now()
+        WHERE item_id = :id
+    """), {"id": item_id, "rows": rows_written})
+
+
+def fail_item(db, item: WorkItem, error: str, max_attempts: int = 5, base_backoff_sec: float = 30.0) -> str:
+    """Release an item for retry after an exponential backoff, or mark it FAILED. Commits."""
+    status = FAILED if item.attempts >= max_attempts else PENDING
+    delay = base_backoff_sec * (2 ** max(item.attempts - 1, 0))
+    db.execute(text("""
+        UPDATE backfill_work_item
+        SET status = :status,
+            last_error = :error,
+            lease_owner = NULL,
+            lease_expires_at = NULL,
+            next_attempt_at = now() + make_interval(secs => :delay),
+            updated_at = now()
+        WHERE item_id = :id
+    """), {"id": item.item_id, "status": status, "error": error[:500], "delay": delay})
+    db.commit()
+    return status
+
+
+def seconds_until_next_item(db, job_id: int) -> float | None:
+    """None when nothing is left to run; otherwise how long until an item becomes due."""
+    row = db.execute(text("""
+        SELECT MIN(CASE WHEN status = 'PENDING' THEN next_attempt_at ELSE lease_expires_at END)
+        FROM backfill_work_item
+        WHERE job_id = :job_id AND status IN ('PENDING', 'LEASED')
+    """), {"job_id": job_id}).fetchone()
+    if not row or row[0] is None:
+        return None
+    wait = db.execute(text("SELECT EXTRACT(EPOCH FROM (CAST(:t AS TIMESTAMPTZ) - now()))"), {"t": row[0]}).scalar()
+    return max(float(wait or 0), 0.0)
+
+
+def finish_job(db, job_id: int) -> str:
+    """Close the job once no item is pending or leased. Commits."""
+    counts = job_progress(db, job_id=job_id)
+    if counts is None or counts["pending"] or counts["leased"]:
+        return "RUNNING"
+    status = "FAILED" if counts["failed"] else "DONE"
+    db.execute(text("""
+        UPDATE backfill_job SET status = :s, finished_at = now(), updated_at = now()
+        WHERE job_id = :id
+    """), {"s": status, "id": job_id})
+    db.commit()
+    return status
+
+
+def job_progress(db, job_type: str | None = None, job_id: int | None = None) -> dict | None:
+    """Item counts for a job (by id, or the latest job of job_type)."""
+    if job_id is None:
+        job_id = db.execute(
+            text("SELECT MAX(job_id) FROM backfill_job WHERE job_type = :t"), {"t": job_type}
+        ).scalar()
+        if job_id is None:
+            return None
+    row = db.execute(text("""
+        SELECT j.job_id, j.job_type, j.status, j.created_at, j.updated_at, j.finished_at,
+               COUNT(w.item_id) AS total,
+               COUNT(*) FILTER (WHERE w.status = 'DONE') AS done,
+               COUNT(*) FILTER (WHERE w.status = 'PENDING') AS pending,
+               COUNT(*) FILTER (WHERE w.status = 'LEASED') AS leased,
+               COUNT(*) FILTER (WHERE w.status = 'FAILED') AS failed,
+               COALESCE(SUM(w.rows_written), 0) AS rows_written,
+               MAX(w.updated_at) AS last_activity
+        FROM backfill_job j
+        LEFT JOIN backfill_work_item w ON w.job_id = j.job_id
+        WHERE j.job_id = :id
+        GROUP BY j.job_id
+    """), {"id": job_id}).mappings().first()
+    return dict(row) if row else None
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from apps.api.app.orm import Security
+from apps.api.app.services.signal_config import load_signal_config, signal_config_hash
+from apps.api.app.services.signal_engine import compute_live_signals, write_signal_rows
+
+DB_URL = os.getenv("DATABASE_URL")
+if not DB_URL:
+    raise RuntimeError("DATABASE_URL env var is required")
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../"))
+RUN_STATUS_PATH = os.path.join(ROOT_PATH, "artifacts", "signals_nightly_last_run.json")
+
+CHUNK_SIZE = 500
+
+
+def run(as_of: date, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Evaluate the configured signal engine for every security and every
+    configured horizon, and upsert the /signals items (with target range and
+    config hash) into timing_signal. GET /signals?tickers= serves these rows
+    while they match the ticker's latest bar and the current config.
+
+    The indicator states behind gate3 signals are stored as well, so the API
+    read path (which never writes) finds them up to date.
+
+    Rows describe each ticker's latest bar; tickers whose latest bar is older
+    than `as_of` are counted as stale_bars.
+    """
+    engine = create_engine(DB_URL, pool_pre_ping=True)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    run_stats: dict = {"as_of_date": as_of.isoformat(), "tickers": 0, "horizons": {}}
+    started = time.time()
+
+    try:
+        config, mode, _ = load_signal_config(session)
+        run_stats["engine"] = config["engine"]
+        run_stats["config_mode"] = mode
+        tickers = [t for t in session.execute(select(Security.ticker).order_by(Security.ticker)).scalars().all() if t]
+        run_stats["tickers"] = len(tickers)
+
+        for horizon in config["horizons"]:
+            config_hash = signal_config_hash(config, horizon)
+            signals: Counter = Counter()
+            written = 0
+            stale_bars = 0
+            for start in range(0, len(tickers), chunk_size):
+                items = compute_live_signals(
+                    session, tickers[start:start + chunk_size], horizon, config, persist_state=True
+                )
+                written += write_signal_rows(session, items, config_hash)
+                session.commit()
+                for item in items:
+                    signals[item["signal"]] += 1
+                    if "NO_PRICE_DATA" not in item["risk_flags"] and item["ts"] < as_of.isoformat():
+                        stale_bars += 1
+            run_stats["horizons"][horizon] = {
+                "config_hash": config_hash,
+                "written": written,
+                "stale_bars": stale_bars,
+                "signals": dict(signals),
+            }
+            print(f"[signals_nightly] {horizon}: {written} rows {dict(signals)}")
+
+        run_stats["elapsed_sec"] = round(time.time() - started, 1)
+        os.makedirs(os.path.dirname(RUN_STATUS_PATH), exist_ok=True)
+        with open(RUN_STATUS_PATH, "w", encoding="utf-8") as f:
+            json.dump({**run_stats, "status": "SUCCESS"}, f, ensure_ascii=True, indent=2)
+        return run_stats
+    except Exception as exc:
+        session.rollback()
+        os.makedirs(os.path.dirname(RUN_STATUS_PATH), exist_ok=True)
+        with open(RUN_STATUS_PATH, "w", encoding="utf-8") as f:
+            json.dump({**run_stats, "status": "FAILED", "reason": str(exc)}, f, ensure_ascii=True, indent=2)
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    run(date.today())
@@ -8,7 +8,7 @@ from worker.jobs.daily_close import StrategyParams, run as run_daily_close
 
 def main():
     p = argparse.ArgumentParser()
-    p.add_argument("--job", required=True, choices=["daily_close"])
+    p.add_argument("--job", required=True, choices=["daily_close", "signals_nightly"])
     p.add_argument("--asof", required=True, help="YYYY-MM-DD")
     p.add_argument("--top_n", type=int, default=5)
     args = p.parse_args()
@@ -19,6 +19,11 @@ def main():
         params = StrategyParams(top_n=args.top_n)
         run_daily_close(as_of, params)
         print({"job": args.job, "asof": as_of.isoformat(), "status": "OK"})
+    elif args.job == "signals_nightly":
+        from worker.jobs.signals_nightly import run as run_signals_nightly
+
+        stats = run_signals_nightly(as_of)
+        print({"job": args.job, "asof": as_of.isoformat(), "status": "OK", "tickers": stats["tickers"]})
 
 
 if __name__ == "__main__":